@@ -7,6 +7,7 @@ Configuração robusta para produção com Gunicorn
 
 import os
 import multiprocessing
+import importlib.util
 
 # Server socket
 bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
@@ -14,12 +15,21 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = "sync"
-worker_connections = 1000
+# Streams SSE (/api/progress/stream) ficam abertos durante toda a análise:
+# gthread atende cada stream com uma thread leve sem que o worker estoure o
+# timeout; com gevent instalado à parte (não está no requirements.txt),
+# GUNICORN_WORKER_CLASS=gevent usa greenlets e worker_connections por worker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+    print("⚠️ gevent não instalado - usando worker gthread")
+    worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
 timeout = 60
 keepalive = 2
 
-# Restart workers after this many requests, to help prevent memory leaks
+# Restart workers after this many requests, to help prevent memory leaks.
+# Analysis jobs running in a recycled worker are resumed by another worker
 max_requests = 1000
 max_requests_jitter = 100
 
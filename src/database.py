@@ -106,12 +106,11 @@ class DatabaseManager:
         """Retorna estatísticas do banco"""
         # Combina estatísticas do Supabase e arquivos locais
         supabase_stats = self.supabase.get_stats()
-        local_analyses = self.local_files.list_local_analyses()
         
         return {
             **supabase_stats,
-            'local_analyses_count': len(local_analyses),
-            'local_analyses': local_analyses[:10],  # Últimas 10
+            'local_analyses_count': self.local_files.count_local_analyses(),
+            'local_analyses': self.local_files.list_local_analyses(limit=10),  # Últimas 10
             'storage_type': 'hybrid_supabase_local'
         }
     
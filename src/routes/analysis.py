@@ -11,16 +11,20 @@ import time
 import json
 from datetime import datetime
 from flask import Blueprint, request, jsonify, session, send_file
-from services.enhanced_analysis_pipeline import enhanced_analysis_pipeline
-from services.quality_assurance_manager import quality_assurance_manager
-from services.ai_manager import ai_manager
-from services.production_search_manager import production_search_manager
-from services.attachment_service import attachment_service
+from services.service_registry import service_registry
 from database import db_manager
-from routes.progress import get_progress_tracker, update_analysis_progress
+from routes.progress import get_progress_tracker, update_analysis_progress, remove_progress_tracker
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
-from services.consolidated_report_generator import consolidated_report_generator
-from services.gemini_2_5_client import gemini_25_client
+from services.analysis_job_queue import analysis_job_queue, ACTIVE_STATUSES
+
+# Serviços pesados (clientes de IA, extratores, pipeline) são construídos no primeiro uso
+enhanced_analysis_pipeline = service_registry.register('enhanced_analysis_pipeline', 'services.enhanced_analysis_pipeline')
+quality_assurance_manager = service_registry.register('quality_assurance_manager', 'services.quality_assurance_manager')
+ai_manager = service_registry.register('ai_manager', 'services.ai_manager')
+production_search_manager = service_registry.register('production_search_manager', 'services.production_search_manager')
+attachment_service = service_registry.register('attachment_service', 'services.attachment_service')
+consolidated_report_generator = service_registry.register('consolidated_report_generator', 'services.consolidated_report_generator')
+gemini_25_client = service_registry.register('gemini_25_client', 'services.gemini_2_5_client')
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +36,6 @@ def analyze_market():
     """Endpoint principal para análise de mercado"""
     
     try:
-        start_time = time.time()
-        logger.info("🚀 Iniciando análise de mercado aprimorada")
-        
         # Coleta dados da requisição
         data = request.get_json()
         if not data:
@@ -54,6 +55,28 @@ def analyze_market():
         if not data.get('session_id'):
             data['session_id'] = f"session_{int(time.time())}_{os.urandom(4).hex()}"
         
+        # Modo assíncrono: enfileira e retorna job_id imediatamente
+        if data.get('async') or request.args.get('mode') == 'async':
+            return _submit_analysis_job(data)
+        
+        result, status_code = _run_market_analysis(data, _get_client_info())
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao receber análise: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Erro na análise',
+            'message': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+def _run_market_analysis(data: dict, client_info: dict) -> tuple:
+    """Executa a análise completa e retorna (resposta, status HTTP)"""
+    
+    try:
+        start_time = time.time()
+        logger.info("🚀 Iniciando análise de mercado aprimorada")
+        
         # Inicia sessão de salvamento automático
         session_id = data['session_id']
         auto_save_manager.iniciar_sessao(session_id)
@@ -62,8 +85,8 @@ def analyze_market():
         salvar_etapa("requisicao_analise", {
             "input_data": data,
             "timestamp": datetime.now().isoformat(),
-            "ip_address": request.remote_addr,
-            "user_agent": request.headers.get('User-Agent', '')
+            "ip_address": client_info.get('ip_address'),
+            "user_agent": client_info.get('user_agent', '')
         }, categoria="analise_completa")
         
         # Inicia rastreamento de progresso
@@ -129,12 +152,15 @@ def analyze_market():
             
             if not quality_validation['valid']:
                 logger.error(f"❌ Análise rejeitada: {quality_validation['errors']}")
+                
+                # Uma nova tentativa com os mesmos dados não deve receber as mesmas respostas do cache
+                ai_manager.discard_cached_responses(session_id)
                 salvar_erro("validacao_falha", Exception("Análise rejeitada por baixa qualidade"), contexto=quality_validation)
                 
                 # Consolida dados parciais
                 dados_parciais = auto_save_manager.consolidar_sessao(session_id)
                 
-                return jsonify({
+                return {
                     'error': 'Análise de baixa qualidade rejeitada',
                     'message': 'Análise não atende critérios de qualidade ultra-rigorosos',
                     'quality_report': quality_validation,
@@ -142,7 +168,7 @@ def analyze_market():
                     'dados_parciais': dados_parciais,
                     'session_id': session_id,
                     'timestamp': datetime.now().isoformat()
-                }), 422
+                }, 422
             
             # Remove dados brutos do relatório final
             clean_analysis = quality_assurance_manager.filter_raw_data_comprehensive(analysis_result)
@@ -164,7 +190,7 @@ def analyze_market():
                 dados_recuperados = auto_save_manager.consolidar_sessao(session_id)
                 logger.info(f"🔄 Dados recuperados automaticamente: {dados_recuperados}")
                 
-                return jsonify({
+                return {
                     'error': 'Pipeline falhou mas dados preservados',
                     'message': str(e),
                     'dados_preservados': True,
@@ -172,12 +198,12 @@ def analyze_market():
                     'relatorio_parcial': dados_recuperados,
                     'timestamp': datetime.now().isoformat(),
                     'recommendation': 'Dados preservados - configure APIs e tente novamente'
-                }), 206  # Partial Content
+                }, 206  # Partial Content
                 
             except Exception as recovery_error:
                 logger.error(f"❌ Falha na recuperação automática: {recovery_error}")
             
-            return jsonify({
+            return {
                 'error': 'Falha crítica na análise',
                 'message': str(e),
                 'timestamp': datetime.now().isoformat(),
@@ -193,19 +219,19 @@ def analyze_market():
                     'ai_status': ai_manager.get_provider_status(),
                     'search_status': production_search_manager.get_provider_status()
                 }
-            }), 500
+            }, 500
         
         # Verifica se a análise foi bem-sucedida
         if not clean_analysis or not isinstance(clean_analysis, dict):
             logger.error("❌ Análise limpa inválida")
             salvar_erro("analise_limpa_invalida", Exception("Análise limpa inválida"))
-            return jsonify({
+            return {
                 'error': 'Análise final inválida',
                 'message': 'Falha na limpeza da análise',
                 'timestamp': datetime.now().isoformat(),
                 'session_id': session_id,
                 'recommendation': 'Verifique logs e tente novamente'
-            }), 500
+            }, 500
         
         # Marca progresso como completo
         progress_tracker.complete()
@@ -292,19 +318,19 @@ def analyze_market():
         
         logger.info(f"✅ Análise concluída em {processing_time:.2f} segundos")
         
-        return jsonify(clean_analysis)
+        return clean_analysis, 200
         
     except Exception as e:
         logger.error(f"❌ Erro crítico na análise: {str(e)}", exc_info=True)
         
         # Remove progresso em caso de erro
         try:
-            if 'session_id' in locals() and session_id in get_progress_tracker.__globals__.get('progress_sessions', {}):
-                del get_progress_tracker.__globals__['progress_sessions'][session_id]
+            if 'session_id' in locals():
+                remove_progress_tracker(session_id)
         except:
             pass  # Ignora erros de limpeza
         
-        return jsonify({
+        return {
             'error': 'Erro na análise',
             'message': str(e),
             'timestamp': datetime.now().isoformat(),
@@ -318,6 +344,105 @@ def analyze_market():
                 'ai_status': ai_manager.get_provider_status(),
                 'search_status': production_search_manager.get_provider_status()
             }
+        }, 500
+
+def _get_client_info() -> dict:
+    """Captura dados do cliente enquanto o contexto da requisição existe"""
+    return {
+        'ip_address': request.remote_addr,
+        'user_agent': request.headers.get('User-Agent', '')
+    }
+
+# Registrado na importação: qualquer worker pode retomar jobs de um worker encerrado
+analysis_job_queue.register_runner('market_analysis', _run_market_analysis)
+
+@analysis_bp.before_app_request
+def _start_job_reaper():
+    analysis_job_queue.ensure_reaper_started()
+
+def _submit_analysis_job(data: dict):
+    """Enfileira análise no pool de background e retorna 202 com o job_id"""
+    
+    job, rejection = analysis_job_queue.submit(data, 'market_analysis', context=_get_client_info())
+    
+    if not job:
+        logger.warning(f"⚠️ Análise recusada pela fila: {rejection}")
+        return jsonify({
+            'error': 'Fila de análises cheia',
+            'message': rejection,
+            'queue': analysis_job_queue.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        }), 429
+    
+    return jsonify({
+        **job,
+        'status_url': f"/api/analyze/jobs/{job['job_id']}",
+        'result_url': f"/api/analyze/jobs/{job['job_id']}/result",
+        'progress_url': f"/api/get_progress/{job['session_id']}",
+        'progress_stream_url': f"/api/progress/stream/{job['session_id']}"
+    }), 202
+
+@analysis_bp.route('/analyze/jobs', methods=['GET'])
+def list_analysis_jobs():
+    """Lista jobs de análise recentes e ocupação da fila"""
+    
+    try:
+        status = request.args.get('status')
+        limit = min(int(request.args.get('limit', 50)), 200)
+        
+        return jsonify({
+            'jobs': analysis_job_queue.list_jobs(status=status, limit=limit),
+            'queue': analysis_job_queue.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao listar jobs: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao listar jobs',
+            'message': str(e)
+        }), 500
+
+@analysis_bp.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Retorna status de um job de análise"""
+    
+    try:
+        job = analysis_job_queue.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado', 'job_id': job_id}), 404
+        
+        return jsonify(job)
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter job {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter job',
+            'message': str(e)
+        }), 500
+
+@analysis_bp.route('/analyze/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id):
+    """Retorna resultado de um job finalizado com o status HTTP original"""
+    
+    try:
+        job = analysis_job_queue.get_job(job_id, include_result=True)
+        if not job:
+            return jsonify({'error': 'Job não encontrado', 'job_id': job_id}), 404
+        
+        if job['status'] in ACTIVE_STATUSES:
+            return jsonify(job), 202
+        
+        if 'result' not in job:
+            return jsonify(job), job.get('status_code') or 500
+        
+        return jsonify(job['result']), job.get('status_code') or 200
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter resultado do job {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter resultado',
+            'message': str(e)
         }), 500
 
 @analysis_bp.route('/status', methods=['GET'])
@@ -348,13 +473,15 @@ def get_analysis_status():
                     'status': 'healthy' if total_ai_available > 0 else 'error',
                     'available_count': total_ai_available,
                     'total_count': len(ai_status),
-                    'providers': ai_status
+                    'providers': ai_status,
+                    'response_cache': ai_manager.get_cache_stats()
                 },
                 'search_providers': {
                     'status': 'healthy' if total_search_available > 0 else 'error',
                     'available_count': total_search_available,
                     'total_count': len(search_status),
-                    'providers': search_status
+                    'providers': search_status,
+                    'cache': production_search_manager.get_cache_stats()
                 },
                 'database': {
                     'status': 'healthy' if db_status else 'error',
@@ -759,6 +886,7 @@ def get_stats():
         return jsonify({
             'database_stats': db_stats,
             'ai_providers': ai_status,
+            'ai_response_cache': ai_manager.get_cache_stats(),
             'search_providers': search_status,
             'system_health': {
                 'ai_available': len([p for p in ai_status.values() if p['available']]),
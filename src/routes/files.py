@@ -6,6 +6,7 @@ Endpoints para gerenciamento de arquivos locais das análises
 """
 
 import os
+import json
 import logging
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_file
@@ -19,15 +20,24 @@ files_bp = Blueprint('files', __name__)
 
 @files_bp.route('/list_local_analyses', methods=['GET'])
 def list_local_analyses():
-    """Lista análises salvas localmente"""
+    """Lista análises salvas localmente (paginado: limit, offset, sort, order, segmento)"""
     
     try:
-        analyses = local_file_manager.list_local_analyses()
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        sort_by = request.args.get('sort', 'created_at')
+        descending = request.args.get('order', 'desc').lower() != 'asc'
+        segmento = request.args.get('segmento')
+        
+        analyses = local_file_manager.list_local_analyses(limit, offset, sort_by, descending, segmento)
         
         return jsonify({
             'success': True,
             'analyses': analyses,
             'count': len(analyses),
+            'total': local_file_manager.count_local_analyses(segmento),
+            'limit': limit,
+            'offset': offset,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -46,21 +56,9 @@ def get_analysis_files(analysis_id):
         # Busca arquivos no Supabase
         supabase_files = db_manager.get_analysis_files(analysis_id)
         
-        # Busca diretório local
+        # Busca arquivos locais no catálogo
         local_directory = local_file_manager.get_analysis_directory(analysis_id)
-        
-        local_files = []
-        if local_directory:
-            for file in os.listdir(local_directory):
-                if analysis_id[:8] in file:
-                    file_path = os.path.join(local_directory, file)
-                    local_files.append({
-                        'name': file,
-                        'path': file_path,
-                        'size': os.path.getsize(file_path),
-                        'type': file.split('_')[-1].split('.')[0] if '_' in file else 'unknown',
-                        'modified': datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-                    })
+        local_files = local_file_manager.get_analysis_files(analysis_id)
         
         return jsonify({
             'success': True,
@@ -202,10 +200,10 @@ def export_analysis(analysis_id):
         import zipfile
         import tempfile
         
-        # Busca diretório da análise
-        analysis_dir = local_file_manager.get_analysis_directory(analysis_id)
+        # Busca arquivos da análise
+        analysis_files = local_file_manager.get_analysis_files(analysis_id)
         
-        if not analysis_dir:
+        if not analysis_files:
             return jsonify({
                 'error': 'Análise não encontrada'
             }), 404
@@ -216,13 +214,13 @@ def export_analysis(analysis_id):
         
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             # Adiciona todos os arquivos da análise
-            for root, dirs, files in os.walk(local_file_manager.base_dir):
-                for file in files:
-                    if analysis_id[:8] in file:
-                        file_path = os.path.join(root, file)
-                        # Nome no ZIP será relativo ao diretório base
-                        arcname = os.path.relpath(file_path, local_file_manager.base_dir)
-                        zipf.write(file_path, arcname)
+            for file_info in analysis_files:
+                file_path = file_info['path']
+                if not os.path.exists(file_path):
+                    continue
+                # Nome no ZIP será relativo ao diretório base
+                arcname = os.path.relpath(file_path, local_file_manager.base_dir)
+                zipf.write(file_path, arcname)
         
         return send_file(
             zip_path,
@@ -243,43 +241,26 @@ def get_storage_stats():
     """Obtém estatísticas de armazenamento"""
     
     try:
-        # Estatísticas do diretório local
-        total_size = 0
-        total_files = 0
-        
-        for root, dirs, files in os.walk(local_file_manager.base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    total_size += os.path.getsize(file_path)
-                    total_files += 1
-                except:
-                    continue
+        # Estatísticas do catálogo local (consultas indexadas, sem varrer o disco)
+        catalog_stats = local_file_manager.get_storage_stats()
+        total_size = catalog_stats.get('total_size_bytes', 0)
+        total_files = catalog_stats.get('total_files', 0)
         
         # Estatísticas por tipo
         type_stats = {}
-        for subdir in ['avatars', 'drivers_mentais', 'provas_visuais', 'anti_objecao', 
-                      'pre_pitch', 'predicoes_futuro', 'posicionamento', 'concorrencia',
-                      'palavras_chave', 'metricas', 'funil_vendas', 'plano_acao', 
-                      'insights', 'pesquisa_web', 'completas', 'metadata']:
-            
-            subdir_path = os.path.join(local_file_manager.base_dir, subdir)
-            if os.path.exists(subdir_path):
-                subdir_files = len([f for f in os.listdir(subdir_path) if os.path.isfile(os.path.join(subdir_path, f))])
-                subdir_size = sum(os.path.getsize(os.path.join(subdir_path, f)) 
-                                for f in os.listdir(subdir_path) 
-                                if os.path.isfile(os.path.join(subdir_path, f)))
-                
-                type_stats[subdir] = {
-                    'files': subdir_files,
-                    'size_bytes': subdir_size,
-                    'size_mb': round(subdir_size / (1024 * 1024), 2)
-                }
+        for subdir in local_file_manager.SECTIONS:
+            section = catalog_stats.get('sections', {}).get(subdir, {'files': 0, 'size_bytes': 0})
+            type_stats[subdir] = {
+                'files': section['files'],
+                'size_bytes': section['size_bytes'],
+                'size_mb': round(section['size_bytes'] / (1024 * 1024), 2)
+            }
         
         return jsonify({
             'success': True,
             'storage_stats': {
                 'base_directory': local_file_manager.base_dir,
+                'total_analyses': catalog_stats.get('total_analyses', 0),
                 'total_files': total_files,
                 'total_size_bytes': total_size,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
@@ -309,34 +290,14 @@ def cleanup_old_files():
         from datetime import timedelta
         cutoff_date = datetime.now() - timedelta(days=days_old)
         
-        files_to_remove = []
-        total_size_to_remove = 0
+        # Busca arquivos antigos no catálogo
+        files_to_remove = local_file_manager.get_old_files(days_old)
+        total_size_to_remove = sum(file_info['size'] for file_info in files_to_remove)
         
-        # Busca arquivos antigos
-        for root, dirs, files in os.walk(local_file_manager.base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    
-                    if file_mtime < cutoff_date:
-                        file_size = os.path.getsize(file_path)
-                        files_to_remove.append({
-                            'path': file_path,
-                            'name': file,
-                            'size': file_size,
-                            'modified': file_mtime.isoformat()
-                        })
-                        total_size_to_remove += file_size
-                        
-                        # Remove arquivo se não for dry run
-                        if not dry_run:
-                            os.remove(file_path)
-                            logger.info(f"🗑️ Arquivo removido: {file}")
-                            
-                except Exception as e:
-                    logger.error(f"Erro ao processar arquivo {file}: {str(e)}")
-                    continue
+        # Remove arquivos se não for dry run
+        if not dry_run:
+            removed = local_file_manager.delete_files([file_info['path'] for file_info in files_to_remove])
+            logger.info(f"🗑️ {removed} arquivos antigos removidos")
         
         action = "Simulação de limpeza" if dry_run else "Limpeza executada"
         
@@ -386,12 +347,9 @@ def backup_to_supabase():
                 
                 # Carrega análise completa do arquivo JSON
                 json_file = None
-                for root, dirs, files in os.walk(local_file_manager.base_dir):
-                    for file in files:
-                        if analysis_id[:8] in file and file.endswith('_completa.json'):
-                            json_file = os.path.join(root, file)
-                            break
-                    if json_file:
+                for file_info in local_file_manager.get_analysis_files(analysis_id, 'completas'):
+                    if file_info['name'].endswith('_completa.json'):
+                        json_file = file_info['path']
                         break
                 
                 if json_file:
@@ -6,13 +6,18 @@ ARQV30 Enhanced v2.0 - Monitoring Routes
 Endpoints para monitoramento do sistema de extração
 """
 from flask import Blueprint, jsonify, request
-from services.robust_content_extractor import robust_content_extractor
+from services.service_registry import service_registry
+from services.health_prober import health_prober
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 monitoring_bp = Blueprint('monitoring', __name__)
 
+# Extrator construído no primeiro uso (detecta Playwright, Selenium e afins)
+robust_content_extractor = service_registry.register('robust_content_extractor', 'services.robust_content_extractor')
+
 
 @monitoring_bp.route('/api/extractor_stats', methods=['GET'])
 def get_extractor_stats():
@@ -82,44 +87,67 @@ def test_extraction():
 
 @monitoring_bp.route('/api/health', methods=['GET'])
 def health_check():
-    """Verifica saúde do sistema"""
+    """
+    Verifica saúde do sistema a partir dos resultados do health prober.
+    Grupos sem sondagem (IA e busca são opt-in) contam os provedores
+    configurados; até a primeira rodada terminar, o status segue os
+    mesmos critérios estáticos do antigo /api/health.
+    """
     try:
-        # Testa extração com URL brasileira real
-        test_url = "https://g1.globo.com/"
-        content = robust_content_extractor.extract_content(test_url)
-        extraction_success = content is not None and len(content) > 100
+        summary = health_prober.get_summary(include_history=request.args.get('history') == 'true')
+        checks = summary['checks']
+        groups = summary['groups']
+        fetch_check = checks.get('extractor:fetch', {})
         
-        stats = robust_content_extractor.get_extractor_stats()
-        global_stats = stats.get('global', {})
-        available_extractors = sum(1 for name, data in stats.items() 
-                                 if name != 'global' and data.get('available', False))
+        available_extractors = groups['extractor']['healthy']
+        available_ai = groups['ai']['healthy']
+        available_search = groups['search']['healthy']
+        sources = {'extractor': 'probe', 'ai': 'probe', 'search': 'probe'}
         
-        # Verifica status das APIs de IA
-        from services.ai_manager import ai_manager
-        ai_status = ai_manager.get_provider_status()
-        available_ai = sum(1 for provider in ai_status.values() if provider.get('available', False))
+        if not groups['ai']['total']:
+            from services.ai_manager import ai_manager
+            available_ai = sum(1 for provider in ai_manager.get_provider_status().values() if provider.get('available'))
+            sources['ai'] = 'configured'
         
-        # Verifica status de busca
-        from services.production_search_manager import production_search_manager
-        search_status = production_search_manager.get_provider_status()
-        available_search = sum(1 for provider in search_status.values() if provider.get('enabled', False))
+        if not groups['search']['total']:
+            from services.production_search_manager import production_search_manager
+            available_search = sum(1 for provider in production_search_manager.get_provider_status().values() if provider.get('enabled'))
+            sources['search'] = 'configured'
+        
+        status = summary['status']
+        if status in ('starting', 'unprobed'):
+            # Sem rodada concluída: disponibilidade declarada pelos extratores
+            extractor_stats = robust_content_extractor.get_extractor_stats()
+            available_extractors = sum(
+                1 for name, data in extractor_stats.items()
+                if name != 'global' and data.get('available', False)
+            )
+            sources['extractor'] = 'configured'
+            
+            status = 'healthy'
+            if available_extractors == 0:
+                status = 'critical'
+            elif available_extractors < 2:
+                status = 'degraded'
         
-        overall_health = 'healthy'
-        if available_extractors == 0 or available_ai == 0:
-            overall_health = 'critical'
-        elif available_extractors < 2 or available_search == 0:
-            overall_health = 'degraded'
+        # Grupos não sondados entram no status pelos provedores configurados
+        if sources['ai'] == 'configured' and available_ai == 0:
+            status = 'critical'
+        elif sources['search'] == 'configured' and available_search == 0 and status == 'healthy':
+            status = 'degraded'
         
         return jsonify({
             'success': True,
-            'status': overall_health,
+            'status': status,
+            'probe_status': summary['status'],
             'available_extractors': available_extractors,
             'available_ai_providers': available_ai,
             'available_search_providers': available_search,
-            'test_extraction': extraction_success,
-            'extraction_stats': global_stats,
-            'ai_status': ai_status,
-            'search_status': search_status,
+            'availability_source': sources,
+            'test_extraction': fetch_check.get('healthy', False),
+            'groups': groups,
+            'checks': checks,
+            'prober': summary['prober'],
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
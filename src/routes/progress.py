@@ -10,48 +10,87 @@ import logging
 import time
 import json
 from datetime import datetime
-from flask import Blueprint, request, jsonify, session
-from flask_socketio import SocketIO, emit, join_room, leave_room
-import threading
-from queue import Queue
+from typing import Dict, List, Any, Optional
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
+from services.progress_bus import progress_bus
 
 logger = logging.getLogger(__name__)
 
 # Cria blueprint
 progress_bp = Blueprint('progress', __name__)
 
-# Sistema de progresso global
-progress_sessions = {}
-progress_queues = {}
+# Streaming SSE: heartbeat mantém proxies abertos; a duração máxima devolve a
+# conexão ao pool e o navegador reconecta sozinho com Last-Event-ID
+SSE_HEARTBEAT_SECONDS = float(os.getenv('PROGRESS_SSE_HEARTBEAT', 15))
+SSE_MAX_STREAM_SECONDS = float(os.getenv('PROGRESS_SSE_MAX_SECONDS', 600))
+SSE_RETRY_MS = int(os.getenv('PROGRESS_SSE_RETRY_MS', 3000))
 
 class ProgressTracker:
-    """Rastreador de progresso em tempo real"""
+    """
+    Rastreador de progresso em tempo real. O estado e os eventos ficam no
+    progress_bus, então qualquer worker enxerga a sessão criada por outro.
+    """
     
-    def __init__(self, session_id: str):
+    STEPS = [
+        "🔍 Coletando dados do formulário",
+        "📊 Processando anexos inteligentes",
+        "🌐 Realizando pesquisa profunda massiva",
+        "🧠 Analisando com múltiplas IAs",
+        "👤 Criando avatar arqueológico completo",
+        "🧠 Gerando drivers mentais customizados",
+        "🎭 Desenvolvendo provas visuais instantâneas",
+        "🛡️ Construindo sistema anti-objeção",
+        "🎯 Arquitetando pré-pitch invisível",
+        "⚔️ Mapeando concorrência profunda",
+        "📈 Calculando métricas e projeções",
+        "🔮 Predizendo futuro do mercado",
+        "✨ Consolidando insights exclusivos"
+    ]
+    
+    def __init__(self, session_id: str, state: Optional[Dict[str, Any]] = None):
         self.session_id = session_id
-        self.current_step = 0
-        self.total_steps = 13
-        self.start_time = time.time()
-        self.steps = [
-            "🔍 Coletando dados do formulário",
-            "📊 Processando anexos inteligentes", 
-            "🌐 Realizando pesquisa profunda massiva",
-            "🧠 Analisando com múltiplas IAs",
-            "👤 Criando avatar arqueológico completo",
-            "🧠 Gerando drivers mentais customizados",
-            "🎭 Desenvolvendo provas visuais instantâneas",
-            "🛡️ Construindo sistema anti-objeção",
-            "🎯 Arquitetando pré-pitch invisível",
-            "⚔️ Mapeando concorrência profunda",
-            "📈 Calculando métricas e projeções",
-            "🔮 Predizendo futuro do mercado",
-            "✨ Consolidando insights exclusivos"
+        self.steps = self.STEPS
+        self.total_steps = len(self.STEPS)
+        
+        if state is None:
+            # Nova sessão (ou reinício de uma existente)
+            self.start_time = time.time()
+            self.current_step = 0
+            progress_bus.create_session(session_id, self._state())
+        else:
+            self.start_time = state.get('start_time', time.time())
+            self.current_step = state.get('current_step', 0)
+            self.total_steps = state.get('total_steps', self.total_steps)
+    
+    @classmethod
+    def load(cls, session_id: str) -> Optional['ProgressTracker']:
+        """Tracker de uma sessão existente no barramento, criada em qualquer worker"""
+        stored = progress_bus.get_session(session_id)
+        if stored is None:
+            return None
+        return cls(session_id, stored['state'])
+    
+    def _state(self) -> Dict[str, Any]:
+        return {
+            'start_time': self.start_time,
+            'current_step': self.current_step,
+            'total_steps': self.total_steps
+        }
+    
+    @property
+    def detailed_logs(self) -> List[Dict[str, Any]]:
+        """Logs derivados dos eventos de progresso da sessão"""
+        return [
+            {
+                "step": event['data'].get('current_step'),
+                "message": event['data'].get('current_message'),
+                "details": event['data'].get('details'),
+                "timestamp": event['data'].get('timestamp'),
+                "elapsed": event['data'].get('elapsed_time')
+            }
+            for event in progress_bus.read_events(self.session_id, limit=None)
+            if event['event'] == 'progress'
         ]
-        self.detailed_logs = []
-        
-        # Registra sessão global
-        progress_sessions[session_id] = self
-        progress_queues[session_id] = Queue()
     
     def update_progress(self, step: int, message: str, details: str = None):
         """Atualiza progresso da análise"""
@@ -73,28 +112,20 @@ class ProgressTracker:
             "percentage": (step / self.total_steps) * 100,
             "current_message": message,
             "detailed_message": details or message,
+            "details": details,
             "elapsed_time": elapsed,
             "estimated_remaining": remaining,
             "estimated_total": elapsed + remaining,
             "timestamp": datetime.now().isoformat()
         }
         
-        # Log detalhado
-        log_entry = {
-            "step": step,
-            "message": message,
-            "details": details,
-            "timestamp": datetime.now().isoformat(),
-            "elapsed": elapsed
-        }
-        self.detailed_logs.append(log_entry)
-        
-        # Adiciona à queue para polling
-        if self.session_id in progress_queues:
-            try:
-                progress_queues[self.session_id].put(progress_data)
-            except:
-                pass
+        # Publica no barramento para polling/streaming em qualquer worker
+        try:
+            progress_data["event_id"] = progress_bus.publish(
+                self.session_id, 'progress', progress_data, state=self._state()
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao publicar progresso de {self.session_id}: {e}")
         
         logger.info(f"Progress {self.session_id}: Step {step}/{self.total_steps} - {message}")
         
@@ -104,15 +135,14 @@ class ProgressTracker:
         """Marca análise como completa"""
         self.update_progress(self.total_steps, "🎉 Análise concluída! Preparando resultados...")
         
-        # Remove da sessão após 5 minutos
-        def cleanup():
-            time.sleep(300)  # 5 minutos
-            if self.session_id in progress_sessions:
-                del progress_sessions[self.session_id]
-            if self.session_id in progress_queues:
-                del progress_queues[self.session_id]
-        
-        threading.Thread(target=cleanup, daemon=True).start()
+        # A sessão expira pelo TTL de sessões concluídas
+        try:
+            progress_bus.publish(
+                self.session_id, 'complete', self.get_current_status(),
+                state=self._state(), ttl=progress_bus.completed_ttl
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao publicar conclusão de {self.session_id}: {e}")
     
     def get_current_status(self):
         """Retorna status atual"""
@@ -158,7 +188,7 @@ def start_tracking():
             'message': 'Rastreamento iniciado',
             'status': tracker.get_current_status()
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao iniciar rastreamento: {str(e)}")
         return jsonify({
@@ -170,20 +200,20 @@ def start_tracking():
 def get_progress(session_id):
     """Obtém progresso atual da análise"""
     try:
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if tracker is None:
             return jsonify({
                 'error': 'Sessão não encontrada',
                 'session_id': session_id
             }), 404
         
-        tracker = progress_sessions[session_id]
         status = tracker.get_current_status()
         
         return jsonify({
             'success': True,
             'progress': status
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao obter progresso: {str(e)}")
         return jsonify({
@@ -193,30 +223,30 @@ def get_progress(session_id):
 
 @progress_bp.route('/poll_updates/<session_id>', methods=['GET'])
 def poll_updates(session_id):
-    """Polling para atualizações de progresso"""
+    """
+    Polling para atualizações de progresso. `cursor` é o último event_id
+    recebido; com `timeout` (segundos) a requisição espera por novos eventos.
+    """
     try:
-        if session_id not in progress_queues:
+        if progress_bus.get_session(session_id) is None:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        queue = progress_queues[session_id]
-        updates = []
+        cursor = request.args.get('cursor', 0, type=int)
+        timeout = request.args.get('timeout', 0, type=float)
         
-        # Coleta todas as atualizações disponíveis
-        while not queue.empty():
-            try:
-                update = queue.get_nowait()
-                updates.append(update)
-            except:
-                break
+        events = progress_bus.wait_for_events(session_id, cursor, timeout=timeout)
+        updates = [event['data'] for event in events if event['event'] == 'progress']
         
         return jsonify({
             'success': True,
             'updates': updates,
-            'has_updates': len(updates) > 0
+            'has_updates': len(updates) > 0,
+            'cursor': events[-1]['id'] if events else cursor,
+            'is_complete': any(event['event'] == 'complete' for event in events)
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro no polling: {str(e)}")
         return jsonify({
@@ -224,6 +254,52 @@ def poll_updates(session_id):
             'message': str(e)
         }), 500
 
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Frame SSE com id (para Last-Event-ID), tipo e dados JSON"""
+    data = json.dumps(event['data'], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+@progress_bp.route('/progress/stream/<session_id>', methods=['GET'])
+def stream_progress(session_id):
+    """
+    Server-Sent Events com as atualizações de etapa ('progress'), as seções
+    da análise já concluídas ('section') e o fim da análise ('complete').
+    Retoma do cabeçalho Last-Event-ID (ou ?last_event_id=) ao reconectar.
+    """
+    if progress_bus.get_session(session_id) is None:
+        return jsonify({
+            'error': 'Sessão não encontrada',
+            'session_id': session_id
+        }), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        cursor = max(int(last_event_id), 0)
+    except (TypeError, ValueError):
+        cursor = 0
+    
+    def generate():
+        deadline = time.time() + SSE_MAX_STREAM_SECONDS
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        
+        for event in progress_bus.subscribe(session_id, cursor, heartbeat=SSE_HEARTBEAT_SECONDS):
+            if event is None:
+                yield ": heartbeat\n\n"
+            else:
+                yield _format_sse(event)
+            
+            if time.time() >= deadline:
+                break
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @progress_bp.route('/update_progress', methods=['POST'])
 def update_progress():
     """Atualiza progresso (usado internamente)"""
@@ -234,19 +310,19 @@ def update_progress():
         message = data.get('message')
         details = data.get('details')
         
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if tracker is None:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        tracker = progress_sessions[session_id]
         progress_data = tracker.update_progress(step, message, details)
         
         return jsonify({
             'success': True,
             'progress': progress_data
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao atualizar progresso: {str(e)}")
         return jsonify({
@@ -261,12 +337,12 @@ def complete_analysis():
         data = request.get_json()
         session_id = data.get('session_id')
         
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if tracker is None:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        tracker = progress_sessions[session_id]
         tracker.complete()
         
         return jsonify({
@@ -274,7 +350,7 @@ def complete_analysis():
             'message': 'Análise marcada como completa',
             'final_status': tracker.get_current_status()
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao completar análise: {str(e)}")
         return jsonify({
@@ -286,21 +362,22 @@ def complete_analysis():
 def get_detailed_logs(session_id):
     """Obtém logs detalhados da análise"""
     try:
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if tracker is None:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        tracker = progress_sessions[session_id]
+        logs = tracker.detailed_logs
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'logs': tracker.detailed_logs,
-            'total_logs': len(tracker.detailed_logs),
+            'logs': logs,
+            'total_logs': len(logs),
             'analysis_duration': time.time() - tracker.start_time
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao obter logs: {str(e)}")
         return jsonify({
@@ -315,9 +392,10 @@ def get_active_sessions():
         active = []
         current_time = time.time()
         
-        for session_id, tracker in progress_sessions.items():
+        for stored in progress_bus.list_sessions():
+            tracker = ProgressTracker(stored['session_id'], stored['state'])
             active.append({
-                'session_id': session_id,
+                'session_id': tracker.session_id,
                 'current_step': tracker.current_step,
                 'total_steps': tracker.total_steps,
                 'elapsed_time': current_time - tracker.start_time,
@@ -330,7 +408,7 @@ def get_active_sessions():
             'active_sessions': active,
             'total_active': len(active)
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao listar sessões: {str(e)}")
         return jsonify({
@@ -341,169 +419,18 @@ def get_active_sessions():
 # Função helper para usar em outros módulos
 def get_progress_tracker(session_id: str) -> ProgressTracker:
     """Obtém tracker de progresso para uma sessão"""
-    if session_id not in progress_sessions:
+    tracker = ProgressTracker.load(session_id)
+    if tracker is None:
         return ProgressTracker(session_id)
-    return progress_sessions[session_id]
+    return tracker
 
 def update_analysis_progress(session_id: str, step: int, message: str, details: str = None):
     """Função helper para atualizar progresso de qualquer lugar"""
-    if session_id in progress_sessions:
-        tracker = progress_sessions[session_id]
+    tracker = ProgressTracker.load(session_id)
+    if tracker is not None:
         return tracker.update_progress(step, message, details)
     return None
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-ARQV30 Enhanced v2.0 - Rotas de Progresso
-Tracking de progresso das análises
-"""
-
-import logging
-from flask import Blueprint, request, jsonify, session
-from datetime import datetime
-import uuid
-
-logger = logging.getLogger(__name__)
-
-progress_bp = Blueprint('progress', __name__)
-
-# Armazenamento em memória para progresso (em produção usaria Redis/Database)
-progress_data = {}
-
-@progress_bp.route('/progress/start_tracking', methods=['POST'])
-def start_tracking():
-    """Inicia tracking de progresso"""
-    try:
-        data = request.get_json() or {}
-        
-        # Gerar ID de sessão se não existir
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            session['session_id'] = session_id
-        
-        # Inicializar progresso
-        progress_data[session_id] = {
-            'status': 'iniciado',
-            'progress': 0,
-            'message': 'Preparando análise...',
-            'started_at': datetime.now().isoformat(),
-            'steps': [
-                {'name': 'Validação de dados', 'status': 'pending'},
-                {'name': 'Análise de mercado', 'status': 'pending'},
-                {'name': 'Geração de insights', 'status': 'pending'},
-                {'name': 'Criação de estratégias', 'status': 'pending'},
-                {'name': 'Finalização', 'status': 'pending'}
-            ]
-        }
-        
-        logger.info(f"Tracking iniciado para sessão: {session_id}")
-        
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'message': 'Tracking iniciado'
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao iniciar tracking: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
-@progress_bp.route('/progress/update', methods=['POST'])
-def update_progress():
-    """Atualiza progresso"""
-    try:
-        data = request.get_json()
-        session_id = data.get('session_id') or session.get('session_id')
-        
-        if not session_id or session_id not in progress_data:
-            return jsonify({
-                'success': False,
-                'error': 'Sessão não encontrada'
-            }), 404
-        
-        # Atualizar progresso
-        progress_data[session_id].update({
-            'progress': data.get('progress', 0),
-            'message': data.get('message', ''),
-            'updated_at': datetime.now().isoformat()
-        })
-        
-        # Atualizar step se fornecido
-        step_index = data.get('step_index')
-        if step_index is not None and 0 <= step_index < len(progress_data[session_id]['steps']):
-            progress_data[session_id]['steps'][step_index]['status'] = data.get('step_status', 'completed')
-        
-        return jsonify({
-            'success': True,
-            'message': 'Progresso atualizado'
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao atualizar progresso: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
 
-@progress_bp.route('/progress/status/<session_id>', methods=['GET'])
-def get_progress(session_id):
-    """Obtém status do progresso"""
-    try:
-        if session_id not in progress_data:
-            return jsonify({
-                'success': False,
-                'error': 'Sessão não encontrada'
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'data': progress_data[session_id]
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao obter progresso: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
-@progress_bp.route('/progress/complete', methods=['POST'])
-def complete_progress():
-    """Completa progresso"""
-    try:
-        data = request.get_json()
-        session_id = data.get('session_id') or session.get('session_id')
-        
-        if not session_id or session_id not in progress_data:
-            return jsonify({
-                'success': False,
-                'error': 'Sessão não encontrada'
-            }), 404
-        
-        # Completar progresso
-        progress_data[session_id].update({
-            'status': 'concluido',
-            'progress': 100,
-            'message': 'Análise concluída com sucesso!',
-            'completed_at': datetime.now().isoformat()
-        })
-        
-        # Marcar todos os steps como concluídos
-        for step in progress_data[session_id]['steps']:
-            step['status'] = 'completed'
-        
-        return jsonify({
-            'success': True,
-            'message': 'Progresso concluído'
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao completar progresso: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+def remove_progress_tracker(session_id: str):
+    """Descarta a sessão de progresso (ex.: análise abortada)"""
+    progress_bus.delete_session(session_id)
@@ -7,9 +7,15 @@ Análise Ultra-Detalhada de Mercado com IA Avançada
 
 import os
 import sys
+import time
 import logging
 import locale
 from datetime import datetime
+
+# Perfil de importações (IMPORT_PROFILE=true) precisa entrar antes dos imports pesados
+from services.import_profiler import import_profiler
+import_profiler.install()
+
 from flask import Flask, request, jsonify, render_template, send_file
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -50,6 +56,7 @@ logger = logging.getLogger(__name__)
 
 def create_app():
     """Cria e configura a aplicação Flask"""
+    create_start = time.time()
     app = Flask(__name__)
 
     # Força encoding UTF-8
@@ -137,6 +144,22 @@ def create_app():
     except ImportError as e:
         logger.warning(f"⚠️ Files routes não disponível: {e}")
 
+    # Verificações de saúde em segundo plano: a thread sobe no primeiro request de cada worker
+    from services.health_prober import health_prober
+    from services.circuit_breaker import circuit_breakers
+
+    @app.before_request
+    def start_health_prober():
+        health_prober.ensure_started()
+
+    # Serviços carregados antes do fork (gunicorn preload_app): SERVICE_PRELOAD=all ou lista separada por vírgula
+    from services.service_registry import service_registry
+    preload = os.getenv('SERVICE_PRELOAD', '').strip()
+    if preload:
+        names = None if preload == 'all' else [name.strip() for name in preload.split(',') if name.strip()]
+        loaded = service_registry.preload(names)
+        logger.info(f"⚙️ Serviços pré-carregados: {', '.join(name for name, ok in loaded.items() if ok) or 'nenhum'}")
+
     # Service Worker route
     @app.route('/sw.js')
     def service_worker():
@@ -194,6 +217,20 @@ def create_app():
             'version': '2.0.0'
         })
 
+    # Liveness: processo respondendo, sem tocar em serviços
+    @app.route('/livez')
+    def livez():
+        """Verifica se o processo está vivo"""
+        return jsonify({**health_prober.get_liveness(), 'timestamp': datetime.now().isoformat()})
+
+    # Readiness: só estado local (processo e armazenamentos); provedores ficam em /api/health
+    @app.route('/readyz')
+    def readyz():
+        """Verifica se a aplicação está pronta para receber tráfego"""
+        readiness = health_prober.get_readiness()
+        readiness['timestamp'] = datetime.now().isoformat()
+        return jsonify(readiness), 200 if readiness['ready'] else 503
+
     # Status da aplicação
     @app.route('/api/app_status')
     def app_status():
@@ -201,9 +238,11 @@ def create_app():
         try:
             # Importa serviços dinamicamente para evitar erros
             search_status = {}
+            search_cache = {}
             try:
                 from services.production_search_manager import production_search_manager
                 search_status = production_search_manager.get_provider_status()
+                search_cache = production_search_manager.get_cache_stats()
             except ImportError as e:
                 logger.warning(f"Search manager não disponível: {e}")
                 search_status = {'error': 'Não disponível'}
@@ -227,12 +266,18 @@ def create_app():
                     'search_providers': {
                         'available': available_search,
                         'total': total_search,
-                        'details': search_status
+                        'details': search_status,
+                        'cache': search_cache
                     },
                     'content_extraction': {'available': True},
                     'cache': {'enabled': os.getenv('CACHE_ENABLED', 'true').lower() == 'true'},
                     'database': {'available': bool(os.getenv('SUPABASE_URL'))}
                 },
+                'startup': {
+                    **import_profiler.get_report(top=15),
+                    'lazy_services': service_registry.get_stats()
+                },
+                'circuit_breakers': circuit_breakers.get_stats(),
                 'environment': {
                     'python_version': sys.version,
                     'flask_env': os.getenv('FLASK_ENV', 'production'),
@@ -353,6 +398,11 @@ def create_app():
             'timestamp': datetime.now().isoformat()
         }), 413
 
+    import_profiler.record_startup('create_app_seconds', time.time() - create_start)
+    import_profiler.record_startup('boot_to_app_seconds', time.time() - import_profiler.startup['profiler_loaded_at'])
+    logger.info(f"🚀 Aplicação criada em {time.time() - create_start:.2f}s")
+    import_profiler.log_report()
+
     return app
 
 def setup_signal_handlers():
@@ -376,6 +426,12 @@ def cleanup_on_exit():
         except ImportError:
             pass
         
+        try:
+            from services.page_cache import page_cache
+            page_cache.cleanup_expired()
+        except ImportError:
+            pass
+        
         try:
             from services.production_content_extractor import production_content_extractor
             production_content_extractor.clear_cache()
@@ -15,7 +15,8 @@ from services.secondary_search_engines import secondary_search_engines
 from services.robust_content_extractor import robust_content_extractor
 from services.content_quality_validator import content_quality_validator
 from services.url_filter_manager import url_filter_manager
-from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.auto_save_manager import salvar_etapa, salvar_erro, com_sessao
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -397,7 +398,7 @@ class AdvancedSearchOrchestrator:
         
         with ThreadPoolExecutor(max_workers=4) as executor:
             future_to_result = {
-                executor.submit(self._extract_single_url_advanced, result, context): result 
+                executor.submit(com_sessao(self._extract_single_url_advanced), result, context): result 
                 for result in results_to_extract
             }
             
@@ -503,7 +504,6 @@ class AdvancedSearchOrchestrator:
     def _extract_with_multiple_attempts(self, url: str, context: Dict[str, Any]) -> Optional[str]:
         """Extração com múltiplas tentativas"""
         
-        import requests
         from bs4 import BeautifulSoup
         
         # Múltiplas configurações de tentativa
@@ -515,7 +515,7 @@ class AdvancedSearchOrchestrator:
         
         for i, config in enumerate(attempt_configs):
             try:
-                response = requests.get(url, **config)
+                response = http_client.get(url, **config)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
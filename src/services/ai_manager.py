@@ -9,8 +9,14 @@ import os
 import logging
 import time
 import json
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple
 import requests
+from services.incremental_json import IncrementalJSONParser
+from services.llm_response_cache import llm_response_cache
+from services.circuit_breaker import circuit_breakers
+from services.auto_save_manager import auto_save_manager
 
 # Imports condicionais para os clientes de IA
 try:
@@ -82,6 +88,16 @@ class AIManager:
             }
         }
 
+        # Disjuntor por provedor: abre após max_errors falhas seguidas e se recupera sozinho
+        self.breakers = circuit_breakers.group('ai')
+        for name, provider in self.providers.items():
+            self.breakers.breaker(name, provider['max_errors'])
+
+        # Chaves de cache usadas por análise (sessão), para descartar as de uma análise rejeitada
+        self.max_tracked_sessions = 100
+        self._session_cache_keys: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._session_cache_lock = threading.Lock()
+
         self.initialize_providers()
         available_count = len([p for p in self.providers.values() if p['available']])
         logger.info(f"🤖 AI Manager inicializado com {available_count} provedores disponíveis.")
@@ -140,65 +156,73 @@ class AIManager:
         except Exception as e:
             logger.warning(f"⚠️ Falha ao inicializar HuggingFace: {str(e)}")
 
-    def get_best_provider(self) -> Optional[str]:
-        """Retorna o melhor provedor disponível com base na prioridade e contagem de erros."""
-        current_time = time.time()
-        
-        # Primeiro, tenta reabilitar provedores que podem ter se recuperado
-        for name, provider in self.providers.items():
-            if (not provider['available'] and 
-                provider.get('last_success') and 
-                current_time - provider['last_success'] > 300):  # 5 minutos
-                logger.info(f"🔄 Tentando reabilitar provedor {name} após cooldown")
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
-                if name == 'gemini' and HAS_GEMINI:
-                    provider['available'] = True
-                elif name == 'groq' and HAS_GROQ_CLIENT:
-                    provider['available'] = True
-                elif name == 'openai' and HAS_OPENAI:
-                    provider['available'] = True
-                elif name == 'huggingface':
-                    provider['available'] = True
-        
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items() 
-            if provider['available'] and provider['consecutive_failures'] < provider.get('max_errors', 2)
-        ]
-
-        if not available_providers:
-            logger.warning("🔄 Nenhum provedor saudável disponível. Resetando contadores.")
-            for provider in self.providers.values():
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
-            available_providers = [(name, p) for name, p in self.providers.items() if p['available']]
+    def _provider_priorities(self, exclude: Optional[List[str]] = None) -> Dict[str, int]:
+        return {
+            name: provider['priority'] for name, provider in self.providers.items()
+            if provider['available'] and name not in (exclude or [])
+        }
 
-        if available_providers:
-            # Ordena por prioridade e falhas consecutivas
-            available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
-            return available_providers[0][0]
+    def peek_best_provider(self, exclude: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Provedor que get_best_provider escolheria agora, sem reservar a chamada
+        no disjuntor. Para planejamento (ex.: orçamento de tokens do prompt):
+        reservar aqui faria a chamada real pular um provedor em recuperação.
+        """
+        ordered = self.breakers.order(self._provider_priorities(exclude))
+        return ordered[0] if ordered else None
 
+    def get_best_provider(self, exclude: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Retorna o provedor configurado mais rápido entre os de circuito fechado
+        (ou meio-aberto aguardando teste), reservando a chamada no disjuntor.
+        Sem histórico de latência, vale a prioridade.
+        """
+        priorities = self._provider_priorities(exclude)
+        
+        for name in self.breakers.order(priorities):
+            if self.breakers.breaker(name).allow_request():
+                return name
+        
+        if priorities:
+            logger.warning(f"⚠️ Circuito aberto em todos os provedores de IA: {', '.join(priorities)}")
         return None
 
-    def generate_analysis(self, prompt: str, max_tokens: int = 8192, provider: Optional[str] = None) -> Optional[str]:
-        """Gera análise usando um provedor específico ou o melhor disponível com fallback."""
+    def generate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """
+        Gera análise usando um provedor específico ou o melhor disponível com fallback.
+        Com `use_cache=False` a resposta é sempre gerada de novo (e substitui a do cache).
+        Com `validate`, só respostas aceitas por ele entram no cache ou saem dele.
+        """
+        
+        if use_cache:
+            cached = self._get_cached_response(provider, prompt, max_tokens, validate)
+            if cached:
+                return cached['content']
         
         start_time = time.time()
         
         # Se um provedor específico for solicitado
         if provider:
-            if self.providers.get(provider) and self.providers[provider]['available']:
+            if self._allow_provider(provider):
                 logger.info(f"🤖 Usando provedor solicitado: {provider.upper()}")
                 try:
                     result = self._call_provider(provider, prompt, max_tokens)
                     if result:
-                        self._record_success(provider)
+                        self._record_success(provider, time.time() - start_time)
+                        self._cache_response(provider, prompt, max_tokens, result, time.time() - start_time, validate)
                         return result
                     else:
                         raise Exception("Resposta vazia")
                 except Exception as e:
                     logger.error(f"❌ Provedor solicitado {provider.upper()} falhou: {e}")
-                    self._record_failure(provider, str(e))
+                    self._record_failure(provider, str(e), time.time() - start_time)
                     return None # Não tenta fallback se um provedor específico foi pedido e falhou
             else:
                 logger.error(f"❌ Provedor solicitado '{provider}' não está disponível.")
@@ -212,14 +236,135 @@ class AIManager:
         try:
             result = self._call_provider(provider_name, prompt, max_tokens)
             if result:
-                self._record_success(provider_name)
+                self._record_success(provider_name, time.time() - start_time)
+                self._cache_response(provider_name, prompt, max_tokens, result, time.time() - start_time, validate)
                 return result
             else:
                 raise Exception("Resposta vazia do provedor")
         except Exception as e:
             logger.error(f"❌ Erro no provedor {provider_name}: {e}")
-            self._record_failure(provider_name, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude=[provider_name])
+            self._record_failure(provider_name, str(e), time.time() - start_time)
+            return self._try_fallback(prompt, max_tokens, exclude=[provider_name], validate=validate)
+    
+    def generate_analysis_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        used_providers: Optional[List[str]] = None
+    ) -> Iterator[str]:
+        """
+        Gera análise em streaming, entregando pedaços de texto à medida que
+        chegam. O fallback para outro provedor só acontece antes do primeiro
+        pedaço; depois disso uma falha é propagada. Os provedores tentados
+        são anotados em `used_providers`.
+        """
+        
+        used = used_providers if used_providers is not None else []
+        
+        if provider:
+            if not self._allow_provider(provider):
+                logger.error(f"❌ Provedor solicitado '{provider}' não está disponível.")
+                return
+            provider_name = provider
+        else:
+            provider_name = self.get_best_provider()
+            if not provider_name:
+                raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
+        
+        while provider_name:
+            used.append(provider_name)
+            started = False
+            total_chars = 0
+            attempt_start = time.time()
+            
+            try:
+                for chunk in self._stream_provider(provider_name, prompt, max_tokens):
+                    started = True
+                    total_chars += len(chunk)
+                    yield chunk
+                
+                if not total_chars:
+                    raise Exception("Resposta vazia do provedor")
+                
+                logger.info(f"✅ {provider_name} transmitiu {total_chars} caracteres")
+                self._record_success(provider_name, time.time() - attempt_start)
+                return
+            
+            except Exception as e:
+                logger.error(f"❌ Erro no streaming do provedor {provider_name}: {e}")
+                self._record_failure(provider_name, str(e), time.time() - attempt_start)
+                if started or provider:
+                    raise
+                provider_name = self._next_fallback_provider(used)
+        
+        logger.critical("❌ Todos os provedores de fallback falharam.")
+    
+    def stream_analysis(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        on_section: Optional[Callable[[Any, Any], None]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """
+        Igual a generate_analysis, mas consome a resposta em streaming e
+        chama `on_section(chave, valor)` para cada seção JSON de primeiro
+        nível assim que ela fecha. Se o streaming cair no meio, a resposta é
+        gerada de novo pelo fallback e as seções são reemitidas. Uma resposta
+        em cache é entregue de uma vez, com as mesmas chamadas. `validate`
+        funciona como em generate_analysis.
+        """
+        
+        parser = IncrementalJSONParser()
+        used: List[str] = []
+        
+        def emit(sections):
+            for key, value in sections:
+                if on_section:
+                    try:
+                        on_section(key, value)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Callback de seção '{key}' falhou: {e}")
+        
+        if use_cache:
+            cached = self._get_cached_response(provider, prompt, max_tokens, validate)
+            if cached:
+                if on_chunk:
+                    on_chunk(cached['content'])
+                emit(parser.feed(cached['content']))
+                return cached['content']
+        
+        start_time = time.time()
+        
+        try:
+            for chunk in self.generate_analysis_stream(prompt, max_tokens, provider, used_providers=used):
+                if on_chunk:
+                    on_chunk(chunk)
+                emit(parser.feed(chunk))
+            
+            if parser.text:
+                self._cache_response(used[-1], prompt, max_tokens, parser.text, time.time() - start_time, validate)
+            return parser.text or None
+        
+        except Exception as e:
+            if parser.complete:
+                # O documento já tinha fechado: a falha veio depois (ex.: no pedaço final)
+                logger.warning(f"⚠️ Streaming falhou após o JSON completo ({len(parser.text)} caracteres): {e}")
+                return parser.text
+            if provider:
+                return None
+            if not used:
+                raise
+            
+            logger.warning(f"⚠️ Streaming interrompido após {len(parser.text)} caracteres: {e}")
+            result = self._try_fallback(prompt, max_tokens, exclude=used, validate=validate)
+            if result:
+                emit(IncrementalJSONParser().feed(result))
+            return result
     
     def generate_parallel_analysis(self, prompts: List[Dict[str, Any]], max_tokens: int = 8192) -> Dict[str, Any]:
         """Gera múltiplas análises em paralelo usando diferentes provedores"""
@@ -263,26 +408,126 @@ class AIManager:
         
         return results
     
-    def _record_success(self, provider_name: str):
+    def _allow_provider(self, provider_name: str) -> bool:
+        """Provedor configurado e com o disjuntor aceitando a chamada"""
+        return (
+            bool(self.providers.get(provider_name)) and
+            self.providers[provider_name]['available'] and
+            self.breakers.breaker(provider_name).allow_request()
+        )
+    
+    def _record_success(self, provider_name: str, latency: Optional[float] = None):
         """Registra sucesso do provedor"""
         if provider_name in self.providers:
             self.providers[provider_name]['consecutive_failures'] = 0
             self.providers[provider_name]['last_success'] = time.time()
+            self.breakers.breaker(provider_name).record_success(latency)
             logger.info(f"✅ Sucesso registrado para {provider_name}")
     
-    def _record_failure(self, provider_name: str, error_msg: str):
-        """Registra falha do provedor"""
+    def _record_failure(self, provider_name: str, error_msg: str, latency: Optional[float] = None):
+        """Registra falha do provedor; o disjuntor decide quando tirá-lo de rotação"""
         if provider_name in self.providers:
             self.providers[provider_name]['error_count'] += 1
             self.providers[provider_name]['consecutive_failures'] += 1
-            
-            # Desabilita temporariamente se muitas falhas consecutivas
-            if self.providers[provider_name]['consecutive_failures'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Desabilitando {provider_name} temporariamente após {self.providers[provider_name]['consecutive_failures']} falhas consecutivas")
-                self.providers[provider_name]['available'] = False
+            self.breakers.breaker(provider_name).record_failure(latency)
             
             logger.error(f"❌ Falha registrada para {provider_name}: {error_msg}")
 
+    def _provider_model(self, provider_name: str) -> str:
+        """Modelo do provedor usado na chave de cache (HuggingFace rotaciona entre a lista)"""
+        provider = self.providers[provider_name]
+        return provider.get('model') or '+'.join(provider.get('models', []))
+
+    def _cache_candidates(self, provider: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        (provedor, modelo) cujas respostas em cache servem para a chamada: só o
+        solicitado ou, sem provedor fixo, os disponíveis em ordem de prioridade.
+        """
+        if provider:
+            return [(provider, self._provider_model(provider))] if provider in self.providers else []
+        
+        available = sorted(
+            (name for name, config in self.providers.items() if config['available']),
+            key=lambda name: (self.providers[name]['priority'], self.providers[name]['consecutive_failures'])
+        )
+        return [(name, self._provider_model(name)) for name in available]
+
+    def _is_valid_response(self, content: str, validate: Optional[Callable[[str], bool]]) -> bool:
+        if validate is None:
+            return True
+        try:
+            return bool(validate(content))
+        except Exception:
+            return False
+
+    def _get_cached_response(
+        self,
+        provider: Optional[str],
+        prompt: str,
+        max_tokens: int,
+        validate: Optional[Callable[[str], bool]]
+    ) -> Optional[Dict[str, Any]]:
+        """Resposta em cache aceita por `validate`; uma rejeitada é removida e a geração segue"""
+        cached = llm_response_cache.get(self._cache_candidates(provider), prompt, max_tokens)
+        if not cached:
+            return None
+        
+        if not self._is_valid_response(cached['content'], validate):
+            logger.warning(f"⚠️ Resposta em cache de {cached['provider']} rejeitada pela validação: gerando de novo")
+            llm_response_cache.delete(cached['key'])
+            return None
+        
+        self._track_cache_key(cached['key'])
+        return cached
+
+    def _cache_response(
+        self,
+        provider_name: str,
+        prompt: str,
+        max_tokens: int,
+        content: str,
+        latency: float,
+        validate: Optional[Callable[[str], bool]] = None
+    ):
+        """Grava a resposta gerada no cache, sem deixar falhas de cache derrubarem a geração"""
+        if not self._is_valid_response(content, validate):
+            logger.warning(f"⚠️ Resposta de {provider_name} rejeitada pela validação: não vai para o cache")
+            return
+        try:
+            key = llm_response_cache.set(provider_name, self._provider_model(provider_name), prompt, max_tokens, content, latency)
+            if key:
+                self._track_cache_key(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar resposta de {provider_name} no cache: {e}")
+
+    def _track_cache_key(self, key: str):
+        """Anota a resposta usada pela análise atual, para descartá-la se a análise for rejeitada"""
+        session_id = auto_save_manager.session_id
+        if not session_id:
+            return
+        with self._session_cache_lock:
+            self._session_cache_keys.setdefault(session_id, []).append(key)
+            self._session_cache_keys.move_to_end(session_id)
+            while len(self._session_cache_keys) > self.max_tracked_sessions:
+                self._session_cache_keys.popitem(last=False)
+
+    def discard_cached_responses(self, session_id: str) -> int:
+        """
+        Remove do cache as respostas usadas pela análise `session_id` (ex.:
+        rejeitada pelo controle de qualidade), para uma nova tentativa gerar
+        outras em vez de repetir as mesmas.
+        """
+        with self._session_cache_lock:
+            keys = self._session_cache_keys.pop(session_id, [])
+        for key in keys:
+            try:
+                llm_response_cache.delete(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao remover resposta do cache: {e}")
+        if keys:
+            logger.info(f"🗑️ {len(keys)} respostas da análise {session_id} removidas do cache")
+        return len(keys)
+
     def _call_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
         """Chama a função de geração do provedor especificado."""
         if provider_name == 'gemini':
@@ -295,9 +540,20 @@ class AIManager:
             return self._generate_with_huggingface(prompt, max_tokens)
         return None
 
-    def _generate_with_gemini(self, prompt: str, max_tokens: int) -> Optional[str]:
-        """Gera conteúdo usando Gemini."""
-        client = self.providers['gemini']['client']
+    def _stream_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Pedaços da resposta do provedor; HuggingFace não transmite e entrega tudo de uma vez."""
+        if provider_name == 'gemini':
+            return self._stream_with_gemini(prompt, max_tokens)
+        elif provider_name == 'groq':
+            return self.providers['groq']['client'].stream(prompt, max_tokens=min(max_tokens, 8192))
+        elif provider_name == 'openai':
+            return self._stream_with_openai(prompt, max_tokens)
+        
+        content = self._call_provider(provider_name, prompt, max_tokens)
+        return iter([content] if content else [])
+
+    def _gemini_settings(self, max_tokens: int):
+        """Configuração de geração e segurança usada nas chamadas ao Gemini."""
         config = {
             "temperature": 0.9, 
             "max_output_tokens": min(max_tokens, 8192),
@@ -308,6 +564,43 @@ class AIManager:
             {"category": c, "threshold": "BLOCK_NONE"} 
             for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]
         ]
+        return config, safety
+
+    def _stream_with_gemini(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Gera conteúdo usando Gemini em streaming."""
+        client = self.providers['gemini']['client']
+        config, safety = self._gemini_settings(max_tokens)
+        response = client.generate_content(prompt, generation_config=config, safety_settings=safety, stream=True)
+        for chunk in response:
+            # chunk.text levanta exceção em pedaços sem partes (ex.: o de finalização)
+            try:
+                text = chunk.text
+            except (ValueError, IndexError, AttributeError):
+                continue
+            if text:
+                yield text
+
+    def _stream_with_openai(self, prompt: str, max_tokens: int) -> Iterator[str]:
+        """Gera conteúdo usando OpenAI em streaming."""
+        client = self.providers['openai']['client']
+        stream = client.chat.completions.create(
+            model=self.providers['openai']['model'],
+            messages=[
+                {"role": "system", "content": "Você é um especialista em análise de mercado ultra-detalhada."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=min(max_tokens, 4096),
+            temperature=0.7,
+            stream=True
+        )
+        for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+
+    def _generate_with_gemini(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """Gera conteúdo usando Gemini."""
+        client = self.providers['gemini']['client']
+        config, safety = self._gemini_settings(max_tokens)
         response = client.generate_content(prompt, generation_config=config, safety_settings=safety)
         if response.text:
             logger.info(f"✅ Gemini gerou {len(response.text)} caracteres")
@@ -379,6 +672,7 @@ class AIManager:
                 self.providers[provider_name]['error_count'] = 0
                 self.providers[provider_name]['consecutive_failures'] = 0
                 self.providers[provider_name]['available'] = True
+                self.breakers.reset(provider_name)
                 logger.info(f"🔄 Reset erros do provedor: {provider_name}")
         else:
             for provider in self.providers.values():
@@ -386,41 +680,43 @@ class AIManager:
                 provider['consecutive_failures'] = 0
                 if provider.get('client'):  # Só reabilita se tem cliente configurado
                     provider['available'] = True
+            self.breakers.reset()
             logger.info("🔄 Reset erros de todos os provedores")
 
-    def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str]) -> Optional[str]:
+    def _try_fallback(
+        self,
+        prompt: str,
+        max_tokens: int,
+        exclude: List[str],
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
         """Tenta usar o próximo provedor disponível como fallback."""
         logger.info(f"🔄 Acionando fallback, excluindo: {', '.join(exclude)}")
         
-        # Ordena provedores por prioridade, excluindo os que já falharam
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items()
-            if (provider['available'] and 
-                name not in exclude and 
-                provider['consecutive_failures'] < provider.get('max_errors', 2))
-        ]
-        
-        if not available_providers:
+        next_provider = self._next_fallback_provider(exclude)
+        if not next_provider:
             logger.critical("❌ Todos os provedores de fallback falharam.")
             return None
         
-        # Ordena por prioridade
-        available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
-        next_provider = available_providers[0][0]
-        
         logger.info(f"🔄 Tentando fallback para: {next_provider.upper()}")
         
+        start_time = time.time()
         try:
             result = self._call_provider(next_provider, prompt, max_tokens)
             if result:
-                self._record_success(next_provider)
+                self._record_success(next_provider, time.time() - start_time)
+                self._cache_response(next_provider, prompt, max_tokens, result, time.time() - start_time, validate)
                 return result
             else:
                 raise Exception("Resposta vazia do fallback")
         except Exception as e:
             logger.error(f"❌ Fallback para {next_provider} também falhou: {e}")
-            self._record_failure(next_provider, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude + [next_provider])
+            self._record_failure(next_provider, str(e), time.time() - start_time)
+            return self._try_fallback(prompt, max_tokens, exclude + [next_provider], validate)
+    
+    def _next_fallback_provider(self, exclude: List[str]) -> Optional[str]:
+        """Melhor provedor saudável fora de `exclude`."""
+        return self.get_best_provider(exclude)
     
     def get_provider_status(self) -> Dict[str, Any]:
         """Retorna status detalhado dos provedores"""
@@ -428,16 +724,23 @@ class AIManager:
         
         for name, provider in self.providers.items():
             status[name] = {
-                'available': provider['available'],
+                'available': provider['available'] and self.breakers.breaker(name).is_available(),
+                'configured': provider['available'],
                 'priority': provider['priority'],
                 'error_count': provider['error_count'],
                 'consecutive_failures': provider['consecutive_failures'],
                 'last_success': provider.get('last_success'),
                 'max_errors': provider['max_errors'],
-                'model': provider.get('model', 'N/A')
+                'model': provider.get('model', 'N/A'),
+                'circuit': self.breakers.breaker(name).snapshot(),
+                'cache': llm_response_cache.provider_stats(name)
             }
         
         return status
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache de respostas (fora de get_provider_status: cache não é provedor)"""
+        return llm_response_cache.get_stats()
 
 # Instância global
 ai_manager = AIManager()
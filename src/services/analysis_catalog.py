@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Analysis Catalog
+Catálogo SQLite das análises salvas localmente: uma linha por análise e
+uma por arquivo, com tamanhos e seções, para listagem, busca, remoção e
+estatísticas sem varrer o diretório
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from contextlib import closing
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Colunas aceitas para ordenação da listagem
+SORTABLE_COLUMNS = ('created_at', 'timestamp', 'segmento', 'produto', 'quality_score', 'processing_time', 'total_files', 'total_size')
+
+class AnalysisCatalog:
+    """Índice das análises e arquivos em `base_dir`"""
+    
+    def __init__(self, base_dir: str, db_path: str):
+        """Inicializa catálogo"""
+        self.base_dir = base_dir
+        self.db_path = db_path
+        
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    prefix TEXT NOT NULL,
+                    timestamp TEXT,
+                    created_at TEXT,
+                    segmento TEXT,
+                    produto TEXT,
+                    publico TEXT,
+                    preco TEXT,
+                    total_files INTEGER NOT NULL DEFAULT 0,
+                    total_size INTEGER NOT NULL DEFAULT 0,
+                    quality_score REAL,
+                    processing_time REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_files (
+                    path TEXT PRIMARY KEY,
+                    prefix TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    modified REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_prefix ON analyses(prefix)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_prefix ON analysis_files(prefix, section)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_section ON analysis_files(section)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_modified ON analysis_files(modified)")
+    
+    def _prefix(self, analysis_id: str) -> str:
+        """Arquivos são nomeados pelos 8 primeiros caracteres do ID"""
+        return analysis_id[:8]
+    
+    def record_file(self, analysis_id: str, section: str, file_path: str):
+        """Registra (ou atualiza) um arquivo recém-gravado"""
+        stat = os.stat(file_path)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_files (path, prefix, section, name, size, modified) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (file_path, self._prefix(analysis_id), section, os.path.basename(file_path), stat.st_size, stat.st_mtime)
+            )
+    
+    def record_analysis(self, metadata: Dict[str, Any], files: List[Dict[str, Any]]):
+        """
+        Registra a análise e seus arquivos em uma única transação; até aqui
+        a análise não aparece na listagem.
+        """
+        
+        prefix = self._prefix(metadata['analysis_id'])
+        
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for file_info in files:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO analysis_files (path, prefix, section, name, size, modified) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (file_info['path'], prefix, file_info['type'], file_info['name'],
+                         file_info['size'], file_info.get('modified', time.time()))
+                    )
+                
+                self._upsert_analysis(conn, metadata)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def list_analyses(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        sort_by: str = 'created_at',
+        descending: bool = True,
+        segmento: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Página de análises ordenada por uma coluna indexável"""
+        
+        if sort_by not in SORTABLE_COLUMNS:
+            sort_by = 'created_at'
+        
+        query = "SELECT * FROM analyses"
+        params: List[Any] = []
+        if segmento:
+            query += " WHERE segmento = ?"
+            params.append(segmento)
+        
+        query += f" ORDER BY {sort_by} {'DESC' if descending else 'ASC'}, analysis_id"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+    
+    def count_analyses(self, segmento: Optional[str] = None) -> int:
+        with closing(self._connect()) as conn:
+            if segmento:
+                return conn.execute("SELECT COUNT(*) FROM analyses WHERE segmento = ?", (segmento,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+    
+    def get_files(self, analysis_id: str, section: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Arquivos da análise, opcionalmente de uma seção"""
+        
+        query = "SELECT * FROM analysis_files WHERE prefix = ?"
+        params: List[Any] = [self._prefix(analysis_id)]
+        if section:
+            query += " AND section = ?"
+            params.append(section)
+        
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY section, name", params)]
+    
+    def get_files_older_than(self, cutoff_time: float) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT * FROM analysis_files WHERE modified < ? ORDER BY modified", (cutoff_time,)
+            )]
+    
+    def remove_files(self, paths: List[str]):
+        """Remove arquivos do catálogo e atualiza/remove as análises afetadas"""
+        
+        if not paths:
+            return
+        
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                prefixes = set()
+                for path in paths:
+                    row = conn.execute("SELECT prefix FROM analysis_files WHERE path = ?", (path,)).fetchone()
+                    if row:
+                        prefixes.add(row['prefix'])
+                        conn.execute("DELETE FROM analysis_files WHERE path = ?", (path,))
+                
+                for prefix in prefixes:
+                    totals = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_files WHERE prefix = ?",
+                        (prefix,)
+                    ).fetchone()
+                    if totals[0] == 0:
+                        conn.execute("DELETE FROM analyses WHERE prefix = ?", (prefix,))
+                    else:
+                        conn.execute(
+                            "UPDATE analyses SET total_files = ?, total_size = ? WHERE prefix = ?",
+                            (totals[0], totals[1], prefix)
+                        )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def remove_analysis(self, analysis_id: str):
+        """Remove análise e todos os seus arquivos do catálogo"""
+        prefix = self._prefix(analysis_id)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM analysis_files WHERE prefix = ?", (prefix,))
+                conn.execute("DELETE FROM analyses WHERE prefix = ?", (prefix,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Totais de arquivos e bytes, geral e por seção"""
+        
+        with closing(self._connect()) as conn:
+            totals = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_files").fetchone()
+            sections = conn.execute(
+                "SELECT section, COUNT(*) AS files, COALESCE(SUM(size), 0) AS size_bytes "
+                "FROM analysis_files GROUP BY section ORDER BY section"
+            ).fetchall()
+            analyses = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        
+        return {
+            'total_analyses': analyses,
+            'total_files': totals[0],
+            'total_size_bytes': totals[1],
+            'sections': {row['section']: {'files': row['files'], 'size_bytes': row['size_bytes']} for row in sections}
+        }
+    
+    def ensure_populated(self, sections: List[str]):
+        """Importa os arquivos existentes na primeira execução com catálogo"""
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'populated_at'").fetchone()
+        
+        if not row:
+            self.rebuild(sections)
+    
+    def rebuild(self, sections: List[str]) -> Dict[str, int]:
+        """Reconstrói o catálogo a partir dos arquivos em disco"""
+        
+        start_time = time.time()
+        files = []
+        metadata_files = []
+        
+        for section in sections:
+            section_dir = os.path.join(self.base_dir, section)
+            if not os.path.isdir(section_dir):
+                continue
+            
+            with os.scandir(section_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or '_' not in entry.name:
+                        continue
+                    stat = entry.stat()
+                    files.append((entry.path, entry.name[:8], section, entry.name, stat.st_size, stat.st_mtime))
+                    if section == 'metadata' and entry.name.endswith('_metadata.json'):
+                        metadata_files.append(entry.path)
+        
+        analyses = []
+        for path in metadata_files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    analyses.append(json.load(f))
+            except Exception as e:
+                logger.error(f"❌ Erro ao ler metadata {os.path.basename(path)}: {str(e)}")
+        
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM analysis_files")
+                conn.execute("DELETE FROM analyses")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO analysis_files (path, prefix, section, name, size, modified) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    files
+                )
+                
+                for metadata in analyses:
+                    if metadata.get('analysis_id'):
+                        self._upsert_analysis(conn, metadata)
+                
+                conn.execute(
+                    "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('populated_at', ?)",
+                    (str(time.time()),)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        
+        logger.info(
+            f"📚 Catálogo local reconstruído: {len(analyses)} análises, {len(files)} arquivos "
+            f"em {time.time() - start_time:.2f}s"
+        )
+        return {'analyses': len(analyses), 'files': len(files)}
+    
+    def _upsert_analysis(self, conn: sqlite3.Connection, metadata: Dict[str, Any]):
+        """Grava a linha da análise com totais calculados dos arquivos catalogados"""
+        
+        analysis_id = metadata['analysis_id']
+        project = metadata.get('project_data', {})
+        prefix = self._prefix(analysis_id)
+        
+        totals = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_files WHERE prefix = ?",
+            (prefix,)
+        ).fetchone()
+        
+        conn.execute(
+            "INSERT OR REPLACE INTO analyses (analysis_id, prefix, timestamp, created_at, segmento, produto, "
+            "publico, preco, total_files, total_size, quality_score, processing_time) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (analysis_id, prefix, metadata.get('timestamp'), metadata.get('created_at'),
+             project.get('segmento'), project.get('produto'),
+             self._as_text(project.get('publico')), self._as_text(project.get('preco')),
+             totals[0], totals[1], metadata.get('quality_score', 0), metadata.get('processing_time', 0))
+        )
+    
+    def _as_text(self, value: Any) -> Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value, ensure_ascii=False, default=str)
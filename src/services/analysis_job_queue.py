@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Analysis Job Queue
+Fila de análises em segundo plano com estado persistente compartilhado entre workers.
+Jobs de um worker que morreu (reciclagem por max_requests, crash) voltam para
+a fila e são retomados por outro worker
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import contextvars
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_COMPLETED = 'completed'
+JOB_STATUS_FAILED = 'failed'
+
+ACTIVE_STATUSES = (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING)
+
+
+class AnalysisJobQueue:
+    """Executa análises em pool local e guarda o estado em SQLite"""
+    
+    def __init__(self):
+        """Inicializa fila de jobs"""
+        self.db_path = Path(os.getenv('ANALYSIS_JOBS_DB', 'relatorios_intermediarios/analysis_jobs.db'))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self.max_concurrent = int(os.getenv('ANALYSIS_MAX_CONCURRENT', 2))
+        self.max_queued = int(os.getenv('ANALYSIS_MAX_QUEUED', 10))
+        self.slot_poll_interval = 2.0
+        self.job_retention_seconds = int(os.getenv('ANALYSIS_JOB_RETENTION_HOURS', 24)) * 3600
+        # Execuções iniciadas por job antes de desistir (evita reiniciar para sempre um job que derruba o worker)
+        self.max_attempts = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', 3))
+        self.reap_interval = float(os.getenv('ANALYSIS_JOB_REAP_INTERVAL', 30))
+        
+        # Executores por nome: o job guarda o nome para ser retomado em outro processo
+        self._runners: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Tuple[Dict[str, Any], int]]] = {}
+        
+        # O pool é criado sob demanda em cada processo (gunicorn usa preload_app)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._executor_lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_pid: Optional[int] = None
+        
+        self._init_db()
+        
+        logger.info(
+            f"Analysis Job Queue inicializada: {self.max_concurrent} análises simultâneas, "
+            f"fila de {self.max_queued}"
+        )
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abre conexão com o banco de jobs"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def ping(self):
+        """Falha se o banco de jobs não puder ser lido"""
+        with closing(self._connect()) as conn:
+            conn.execute("SELECT 1 FROM analysis_jobs LIMIT 1").fetchall()
+    
+    def _init_db(self):
+        """Cria tabela de jobs se necessário"""
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    session_id TEXT,
+                    status TEXT NOT NULL,
+                    input_data TEXT,
+                    result TEXT,
+                    status_code INTEGER,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs(status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_session ON analysis_jobs(session_id)")
+            
+            # Bancos criados antes da retomada de jobs
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(analysis_jobs)")}
+            for column, definition in (('runner', 'TEXT'), ('context', 'TEXT'), ('attempts', 'INTEGER NOT NULL DEFAULT 0')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {column} {definition}")
+    
+    def register_runner(
+        self,
+        name: str,
+        runner: Callable[[Dict[str, Any], Dict[str, Any]], Tuple[Dict[str, Any], int]]
+    ):
+        """
+        Registra a função que executa jobs com este nome. Deve ser feito na
+        importação do app, para todo worker conseguir retomar jobs órfãos.
+        """
+        self._runners[name] = runner
+    
+    def ensure_reaper_started(self):
+        """Inicia neste processo a thread que retoma jobs de workers encerrados"""
+        if self._reaper is not None and self._reaper_pid == os.getpid() and self._reaper.is_alive():
+            return
+        
+        with self._executor_lock:
+            if self._reaper is not None and self._reaper_pid == os.getpid() and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='analysis-job-reaper', daemon=True)
+            self._reaper_pid = os.getpid()
+            self._reaper.start()
+    
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self._reap_orphaned_jobs()
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao verificar jobs órfãos: {e}")
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Retorna pool do processo atual, recriando após fork"""
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent,
+                    thread_name_prefix='analysis-job'
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+    
+    def submit(
+        self,
+        data: Dict[str, Any],
+        runner: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Enfileira uma análise para o executor registrado como `runner`, que
+        recebe (data, context). Retorna (job, None) quando aceita ou
+        (None, motivo) quando a fila está cheia.
+        """
+        
+        if runner not in self._runners:
+            raise ValueError(f"Executor de jobs não registrado: {runner}")
+        
+        self._reap_orphaned_jobs()
+        context = context or {}
+        
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        
+        with closing(self._connect()) as conn:
+            # Admissão atômica: conta jobs ativos em todos os workers
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                active = conn.execute(
+                    f"SELECT COUNT(*) FROM analysis_jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                    ACTIVE_STATUSES
+                ).fetchone()[0]
+                
+                if active >= self.max_concurrent + self.max_queued:
+                    conn.execute("ROLLBACK")
+                    return None, f"Capacidade esgotada: {active} análises ativas"
+                
+                conn.execute(
+                    "INSERT INTO analysis_jobs (job_id, session_id, status, input_data, runner, context, worker_pid, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, data.get('session_id'), JOB_STATUS_QUEUED,
+                     json.dumps(data, ensure_ascii=False, default=str), runner,
+                     json.dumps(context, ensure_ascii=False, default=str), os.getpid(), now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        
+        self._get_executor().submit(self._run_job, job_id, data, runner, context)
+        
+        logger.info(f"📥 Job {job_id} enfileirado (sessão {data.get('session_id')})")
+        return self.get_job(job_id), None
+    
+    def _run_job(
+        self,
+        job_id: str,
+        data: Dict[str, Any],
+        runner: str,
+        context: Dict[str, Any]
+    ):
+        """Executa job após obter vaga global"""
+        
+        try:
+            # Dentro do try: falha no SQLite ao pegar a vaga marca o job como falho em vez de deixá-lo na fila
+            self._acquire_slot(job_id)
+            logger.info(f"🚀 Job {job_id} iniciado")
+            
+            # Contexto limpo por job: a sessão de auto save não vaza para o próximo job desta thread
+            payload, status_code = contextvars.Context().run(self._runners[runner], data, context)
+            status = JOB_STATUS_COMPLETED if status_code < 400 else JOB_STATUS_FAILED
+            self._finish_job(job_id, status, payload, status_code)
+            logger.info(f"✅ Job {job_id} finalizado com status {status_code}")
+        
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} falhou: {e}", exc_info=True)
+            self._finish_job(job_id, JOB_STATUS_FAILED, None, 500, error=str(e))
+    
+    def _acquire_slot(self, job_id: str):
+        """Aguarda até haver menos de max_concurrent jobs rodando em todos os workers"""
+        
+        while True:
+            with closing(self._connect()) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                running = conn.execute(
+                    "SELECT COUNT(*) FROM analysis_jobs WHERE status = ?",
+                    (JOB_STATUS_RUNNING,)
+                ).fetchone()[0]
+                
+                if running < self.max_concurrent:
+                    conn.execute(
+                        "UPDATE analysis_jobs SET status = ?, started_at = ?, worker_pid = ?, attempts = attempts + 1 "
+                        "WHERE job_id = ?",
+                        (JOB_STATUS_RUNNING, time.time(), os.getpid(), job_id)
+                    )
+                    conn.execute("COMMIT")
+                    return
+                
+                conn.execute("ROLLBACK")
+            
+            time.sleep(self.slot_poll_interval)
+    
+    def _finish_job(
+        self,
+        job_id: str,
+        status: str,
+        payload: Optional[Dict[str, Any]],
+        status_code: int,
+        error: Optional[str] = None
+    ):
+        """Persiste resultado final do job"""
+        
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE analysis_jobs SET status = ?, result = ?, status_code = ?, error = ?, finished_at = ? "
+                "WHERE job_id = ?",
+                (status,
+                 json.dumps(payload, ensure_ascii=False, default=str) if payload is not None else None,
+                 status_code, error, time.time(), job_id)
+            )
+    
+    def _reap_orphaned_jobs(self):
+        """
+        Jobs cujo processo worker não existe mais voltam para a fila deste
+        processo, até max_attempts execuções; depois disso são marcados como
+        falhos. A troca de dono é condicional ao pid antigo, então só um
+        worker retoma cada job.
+        """
+        
+        resumed = []
+        
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT job_id, worker_pid, status, attempts, runner, input_data, context FROM analysis_jobs "
+                f"WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                ACTIVE_STATUSES
+            ).fetchall()
+            
+            for row in rows:
+                if not row['worker_pid'] or row['worker_pid'] == os.getpid() or self._pid_alive(row['worker_pid']):
+                    continue
+                
+                if row['runner'] in self._runners and row['attempts'] < self.max_attempts:
+                    claimed = conn.execute(
+                        "UPDATE analysis_jobs SET status = ?, worker_pid = ?, started_at = NULL "
+                        "WHERE job_id = ? AND worker_pid = ? AND status IN (?, ?)",
+                        (JOB_STATUS_QUEUED, os.getpid(), row['job_id'], row['worker_pid'], *ACTIVE_STATUSES)
+                    ).rowcount
+                    if claimed:
+                        resumed.append(row)
+                        logger.warning(
+                            f"♻️ Job {row['job_id']} retomado: worker {row['worker_pid']} encerrado "
+                            f"({row['attempts']}/{self.max_attempts} execuções)"
+                        )
+                    continue
+                
+                reason = (
+                    f"Worker encerrado durante a análise ({row['attempts']} execuções)"
+                    if row['runner'] in self._runners else 'Worker encerrado durante a análise'
+                )
+                conn.execute(
+                    "UPDATE analysis_jobs SET status = ?, status_code = 500, error = ?, finished_at = ? "
+                    "WHERE job_id = ? AND worker_pid = ? AND status IN (?, ?)",
+                    (JOB_STATUS_FAILED, reason, time.time(), row['job_id'], row['worker_pid'], *ACTIVE_STATUSES)
+                )
+                logger.warning(f"⚠️ Job {row['job_id']} órfão (worker {row['worker_pid']} encerrado): {reason}")
+            
+            conn.execute(
+                "DELETE FROM analysis_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.job_retention_seconds,)
+            )
+        
+        for row in resumed:
+            self._get_executor().submit(
+                self._run_job, row['job_id'], json.loads(row['input_data']),
+                row['runner'], json.loads(row['context'] or '{}')
+            )
+    
+    def _pid_alive(self, pid: int) -> bool:
+        """Verifica se um processo ainda existe"""
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+    
+    def get_job(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Retorna estado do job"""
+        
+        self._reap_orphaned_jobs()
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        return self._row_to_job(row, include_result)
+    
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Lista jobs mais recentes"""
+        
+        with closing(self._connect()) as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM analysis_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                    (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM analysis_jobs ORDER BY created_at DESC LIMIT ?",
+                    (limit,)
+                ).fetchall()
+        
+        return [self._row_to_job(row) for row in rows]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna ocupação da fila"""
+        
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS total FROM analysis_jobs GROUP BY status"
+            ).fetchall()
+        
+        counts = {row['status']: row['total'] for row in rows}
+        
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queued': self.max_queued,
+            'queued': counts.get(JOB_STATUS_QUEUED, 0),
+            'running': counts.get(JOB_STATUS_RUNNING, 0),
+            'completed': counts.get(JOB_STATUS_COMPLETED, 0),
+            'failed': counts.get(JOB_STATUS_FAILED, 0)
+        }
+    
+    def _row_to_job(self, row: sqlite3.Row, include_result: bool = False) -> Dict[str, Any]:
+        """Converte linha do banco em dicionário de resposta"""
+        
+        def _iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+        
+        job = {
+            'job_id': row['job_id'],
+            'session_id': row['session_id'],
+            'status': row['status'],
+            'status_code': row['status_code'],
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': _iso(row['created_at']),
+            'started_at': _iso(row['started_at']),
+            'finished_at': _iso(row['finished_at'])
+        }
+        
+        if include_result and row['result']:
+            job['result'] = json.loads(row['result'])
+        
+        return job
+
+# Instância global
+analysis_job_queue = AnalysisJobQueue()
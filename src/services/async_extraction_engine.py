@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Async Extraction Engine
+Busca centenas de URLs em um único event loop com limite global e por
+domínio; o parsing (trafilatura, readability, BeautifulSoup) roda em pool
+de processos
+"""
+
+import os
+import time
+import asyncio
+import multiprocessing
+import logging
+import threading
+from functools import partial
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.http_client import http_client, DEFAULT_USER_AGENT
+from services.page_cache import page_cache
+from services.auto_save_manager import com_sessao
+
+# Imports condicionais para não quebrar se não estiver instalado
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain', 'text/xml', 'application/xml')
+
+def parse_html(html: str, url: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extrai o texto principal do HTML com os extratores estáticos do
+    RobustContentExtractor. Roda no pool de processos; retorna
+    (conteúdo, extrator) ou (None, None).
+    """
+    from services.robust_content_extractor import robust_content_extractor as extractor
+    
+    parsers = [
+        ('trafilatura', extractor._extract_with_trafilatura),
+        ('readability', extractor._extract_with_readability),
+        ('beautifulsoup', extractor._extract_with_beautifulsoup)
+    ]
+    
+    for name, parser in parsers:
+        if not extractor._is_extractor_available(name):
+            continue
+        try:
+            content = parser(html, url)
+        except Exception:
+            continue
+        if content and extractor._validate_content(content, url):
+            return content, name
+    
+    return None, None
+
+class AsyncExtractionEngine:
+    """Extração em lote com asyncio, sem uma thread por URL"""
+    
+    def __init__(self):
+        """Inicializa engine assíncrona"""
+        self.enabled = os.getenv('ASYNC_EXTRACTION_ENABLED', 'true').lower() == 'true'
+        self.max_concurrency = int(os.getenv('ASYNC_EXTRACTION_CONCURRENCY', 200))
+        self.per_domain_limit = int(os.getenv('ASYNC_EXTRACTION_PER_DOMAIN', 4))
+        self.timeout = float(os.getenv('ASYNC_EXTRACTION_TIMEOUT', 30))
+        self.parse_workers = int(os.getenv('ASYNC_EXTRACTION_PARSE_WORKERS', os.cpu_count() or 2))
+        # fork copiaria locks de threads do worker gthread (loops, SQLite, browser pool) no meio do uso
+        self.parse_start_method = os.getenv('ASYNC_EXTRACTION_START_METHOD', 'forkserver')
+        if self.parse_start_method not in multiprocessing.get_all_start_methods():
+            self.parse_start_method = 'spawn'
+        
+        self.stats = {
+            'batches': 0,
+            'urls': 0,
+            'cache_hits': 0,
+            'fetched': 0,
+            'fetch_failures': 0,
+            'parsed': 0,
+            'parse_failures': 0,
+            'skipped': 0
+        }
+        self._stats_lock = threading.Lock()
+        
+        # Pool de processos criado sob demanda em cada processo (gunicorn usa preload_app)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_pid: Optional[int] = None
+        self._pool_lock = threading.Lock()
+        
+        logger.info(
+            f"Async Extraction Engine inicializada: {self.max_concurrency} simultâneas, "
+            f"{self.per_domain_limit}/domínio, {self.parse_workers} processos de parsing, "
+            f"cliente {'aiohttp' if HAS_AIOHTTP else 'http_client (threads)'}"
+        )
+    
+    def extract_batch(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Extrai as URLs e retorna, por URL, o mesmo formato das camadas do
+        MultiLayerExtractor: success, content, method, url e error. Falhas
+        trazem `stage` ('fetch', 'parse' ou 'skipped') para o chamador
+        decidir se aciona os extratores pesados.
+        """
+        
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        if not unique_urls:
+            return {}
+        
+        self._count('batches')
+        self._count('urls', len(unique_urls))
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._extract_all(unique_urls))
+        
+        # Chamado de dentro de um event loop: roda o lote em thread própria
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='async-extraction') as executor:
+            return executor.submit(com_sessao(asyncio.run), self._extract_all(unique_urls)).result()
+    
+    async def _extract_all(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Agenda todas as URLs no loop atual"""
+        
+        start_time = time.time()
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        domain_limits: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.per_domain_limit))
+        
+        if HAS_AIOHTTP:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_domain_limit,
+                ttl_dns_cache=300,
+                ssl=False  # Mesmo comportamento do extrator robusto (verify=False)
+            )
+            async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    'User-Agent': DEFAULT_USER_AGENT,
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8'
+                }
+            ) as session:
+                results = await asyncio.gather(*(
+                    self._extract_one(url, session, global_limit, domain_limits) for url in urls
+                ))
+        else:
+            results = await asyncio.gather(*(
+                self._extract_one(url, None, global_limit, domain_limits) for url in urls
+            ))
+        
+        successful = sum(1 for result in results if result['success'])
+        logger.info(f"⚡ Extração assíncrona: {successful}/{len(urls)} URLs em {time.time() - start_time:.2f}s")
+        
+        return dict(zip(urls, results))
+    
+    async def _extract_one(
+        self,
+        url: str,
+        session: Optional['aiohttp.ClientSession'],
+        global_limit: asyncio.Semaphore,
+        domain_limits: Dict[str, asyncio.Semaphore]
+    ) -> Dict[str, Any]:
+        """Busca, faz parsing e guarda uma URL"""
+        
+        start_time = time.time()
+        result = {
+            'success': False,
+            'content': None,
+            'method': None,
+            'url': url,
+            'stage': 'fetch',
+            'error': None
+        }
+        
+        cached_content = page_cache.get_fresh_content(url)
+        if cached_content:
+            self._count('cache_hits')
+            result.update({'success': True, 'content': cached_content, 'method': 'page_cache', 'stage': None})
+            return result
+        
+        if urlparse(url).path.lower().endswith('.pdf'):
+            self._count('skipped')
+            result.update({'stage': 'skipped', 'error': 'PDF requer extrator especializado'})
+            return result
+        
+        domain = urlparse(url).netloc.lower().replace('www.', '')
+        
+        try:
+            # Domínio primeiro para não ocupar vaga global enquanto espera o host
+            async with domain_limits[domain], global_limit:
+                if session is not None:
+                    fetched = await self._fetch_aiohttp(session, url)
+                else:
+                    fetched = await self._fetch_threaded(url)
+        except Exception as e:
+            self._count('fetch_failures')
+            result['error'] = f"Erro no download: {str(e) or type(e).__name__}"
+            return result
+        
+        status, final_url, content_type, html, etag, last_modified = fetched
+        
+        if status != 200 or not html:
+            self._count('fetch_failures')
+            result['error'] = f"HTTP {status}"
+            return result
+        
+        if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+            self._count('skipped')
+            result.update({'stage': 'skipped', 'error': f"Conteúdo {content_type} requer extrator especializado"})
+            return result
+        
+        self._count('fetched')
+        result.update({'stage': 'parse', 'url': final_url})
+        
+        try:
+            content, extractor = await self._parse(html, final_url)
+        except Exception as e:
+            content, extractor = None, None
+            result['error'] = f"Erro no parsing: {str(e)}"
+        
+        if not content:
+            self._count('parse_failures')
+            result['error'] = result['error'] or 'Extratores estáticos não obtiveram conteúdo válido'
+            return result
+        
+        self._count('parsed')
+        page_cache.store(final_url, html, content, extractor, etag, last_modified)
+        if final_url != url:
+            page_cache.store_resolved_url(url, final_url)
+        
+        result.update({
+            'success': True,
+            'content': content,
+            'method': f'async_{extractor}',
+            'stage': None,
+            'extraction_time': time.time() - start_time
+        })
+        return result
+    
+    async def _fetch_aiohttp(self, session: 'aiohttp.ClientSession', url: str) -> Tuple:
+        """Baixa com aiohttp respeitando o limite de tamanho do transporte HTTP"""
+        
+        async with session.get(url, allow_redirects=True) as response:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            
+            chunks = []
+            received = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                received += len(chunk)
+                if received > http_client.max_response_bytes:
+                    raise ValueError(f"Resposta excedeu {http_client.max_response_bytes} bytes")
+                chunks.append(chunk)
+            
+            body = b''.join(chunks)
+            encoding = response.charset or 'utf-8'
+            try:
+                html = body.decode(encoding, errors='replace')
+            except LookupError:
+                html = body.decode('utf-8', errors='replace')
+            
+            return (
+                response.status, str(response.url), content_type, html,
+                response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+    
+    async def _fetch_threaded(self, url: str) -> Tuple:
+        """Sem aiohttp: usa o transporte compartilhado no executor padrão do loop"""
+        
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None, partial(http_client.get, url, timeout=self.timeout, verify=False)
+        )
+        
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        
+        return (
+            response.status_code, response.url, content_type, response.text,
+            response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
+    
+    async def _parse(self, html: str, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """Envia o parsing ao pool de processos (ou a threads se desabilitado)"""
+        
+        loop = asyncio.get_running_loop()
+        pool = self._get_process_pool()
+        
+        if pool is None:
+            return await loop.run_in_executor(None, parse_html, html, url)
+        
+        try:
+            return await loop.run_in_executor(pool, parse_html, html, url)
+        except BrokenProcessPool:
+            logger.warning("⚠️ Pool de parsing quebrado, recriando e processando na thread")
+            self._reset_process_pool()
+            return await loop.run_in_executor(None, parse_html, html, url)
+    
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Retorna pool de parsing do processo atual, recriando após fork"""
+        if self.parse_workers <= 0:
+            return None
+        
+        with self._pool_lock:
+            if self._process_pool is None or self._process_pool_pid != os.getpid():
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context(self.parse_start_method)
+                )
+                self._process_pool_pid = os.getpid()
+            return self._process_pool
+    
+    def _reset_process_pool(self):
+        with self._pool_lock:
+            if self._process_pool is not None and self._process_pool_pid == os.getpid():
+                # Pool quebrado já falhou todos os pendentes com BrokenProcessPool;
+                # cancel_futures exige Python 3.9
+                self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+    
+    def _count(self, counter: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[counter] += amount
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores da engine"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        
+        stats.update({
+            'enabled': self.enabled,
+            'client': 'aiohttp' if HAS_AIOHTTP else 'http_client',
+            'max_concurrency': self.max_concurrency,
+            'per_domain_limit': self.per_domain_limit,
+            'parse_workers': self.parse_workers,
+            'parse_start_method': self.parse_start_method
+        })
+        return stats
+
+# Instância global
+async_extraction_engine = AsyncExtractionEngine()
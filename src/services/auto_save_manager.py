@@ -12,10 +12,19 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
 import uuid
+import contextvars
 from pathlib import Path
+from typing import Callable, Tuple
+from services.session_journal import SessionJournal
 
 logger = logging.getLogger(__name__)
 
+# Sessão da análise em execução: cada análise (thread do job e tarefas que ela
+# dispara via com_sessao) enxerga só a sua, mesmo com várias no mesmo processo
+_sessao_atual: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    'auto_save_sessao', default=None
+)
+
 class AutoSaveManager:
     """Gerenciador de salvamento automático ultra-robusto"""
     
@@ -41,19 +50,28 @@ class AutoSaveManager:
         for subdir in self.subdirs.values():
             subdir.mkdir(exist_ok=True)
         
-        self.session_id = None
-        self.analysis_id = None
+        # Etapas vão para um journal append-only por sessão
+        self.journal = SessionJournal(self.base_dir / 'journal')
         
         logger.info(f"✅ Auto Save Manager inicializado: {self.base_dir}")
     
+    @property
+    def session_id(self) -> Optional[str]:
+        """Sessão do contexto atual (None fora de uma análise)"""
+        sessao = _sessao_atual.get()
+        return sessao[0] if sessao else None
+    
+    @property
+    def analysis_id(self) -> Optional[str]:
+        sessao = _sessao_atual.get()
+        return sessao[1] if sessao else None
+    
     def iniciar_sessao(self, session_id: str = None) -> str:
-        """Inicia nova sessão de salvamento"""
-        self.session_id = session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-        self.analysis_id = f"analysis_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-        
-        # Cria diretório da sessão
-        session_dir = self.base_dir / self.session_id
-        session_dir.mkdir(exist_ok=True)
+        """Inicia nova sessão de salvamento no contexto atual"""
+        _sessao_atual.set((
+            session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}",
+            f"analysis_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        ))
         
         # Salva metadados da sessão
         self.salvar_etapa("session_metadata", {
@@ -74,34 +92,11 @@ class AutoSaveManager:
         timestamp: Optional[float] = None,
         categoria: str = "geral"
     ) -> str:
-        """Salva etapa imediatamente com timestamp único"""
-        
-        # Validação e limpeza crítica para JSON válido
-        try:
-            # Tenta serializar para validar JSON
-            json.dumps(dados, default=str)
-        except (TypeError, ValueError) as e:
-            logger.warning(f"⚠️ Dados não serializáveis para JSON: {e}")
-            # Converte para formato serializável
-            dados = self._make_json_serializable(dados)
+        """Registra etapa no journal da sessão (gravado em segundo plano)"""
         
         timestamp = timestamp or time.time()
         timestamp_str = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        
-        # Determina diretório baseado na categoria
-        if categoria in self.subdirs:
-            save_dir = self.subdirs[categoria]
-        else:
-            save_dir = self.base_dir
-        
-        # Se há sessão ativa, cria subdiretório
-        if self.session_id:
-            save_dir = save_dir / self.session_id
-            save_dir.mkdir(exist_ok=True)
-        
-        # Nome do arquivo com timestamp único
-        filename = f"{nome_etapa}_{timestamp_str}.json"
-        filepath = save_dir / filename
+        session_key = self.session_id or 'sem_sessao'
         
         try:
             # Prepara dados para salvamento
@@ -113,22 +108,22 @@ class AutoSaveManager:
                 "timestamp_iso": datetime.fromtimestamp(timestamp).isoformat(),
                 "session_id": self.session_id,
                 "analysis_id": self.analysis_id,
-                "categoria": categoria,
-                "tamanho_dados": len(str(dados)) if dados else 0
+                "categoria": categoria
             }
             
-            # Salva arquivo JSON - CORREÇÃO: mode='w' para arquivo único
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2, default=str)
-            
-            # Log de sucesso
-            logger.info(f"💾 Etapa '{nome_etapa}' salva: {filepath}")
+            # Serialização única no momento da chamada (default=str cobre tipos não JSON)
+            payload = json.dumps(save_data, ensure_ascii=False, default=str)
             
-            # Salva também um backup compactado se dados grandes
-            if len(str(dados)) > 50000:  # > 50KB
-                self._salvar_backup_compactado(filepath, save_data)
+            journal_path = self.journal.append(session_key, {
+                "etapa": nome_etapa,
+                "status": status,
+                "categoria": categoria,
+                "timestamp": timestamp,
+                "tamanho": len(payload)
+            }, payload, urgent=(status == "erro"))
             
-            return str(filepath)
+            logger.info(f"💾 Etapa '{nome_etapa}' registrada no journal: {journal_path}")
+            return str(journal_path)
             
         except Exception as e:
             # Salvamento de emergência em caso de erro
@@ -188,64 +183,51 @@ class AutoSaveManager:
         return self.salvar_etapa("progresso", progresso_data, categoria="logs")
     
     def recuperar_etapa(self, nome_etapa: str, session_id: str = None) -> Optional[Dict[str, Any]]:
-        """Recupera dados de uma etapa salva"""
+        """Recupera o registro bem-sucedido mais recente de uma etapa"""
         
         session_id = session_id or self.session_id
         if not session_id:
             return None
         
-        # Busca em todos os subdiretórios
-        for categoria, subdir in self.subdirs.items():
-            session_dir = subdir / session_id
-            if session_dir.exists():
-                # Busca arquivos que começam com o nome da etapa
-                for filepath in session_dir.glob(f"{nome_etapa}_*.json"):
-                    try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        
-                        if data.get("status") == "sucesso":
-                            logger.info(f"📂 Etapa '{nome_etapa}' recuperada: {filepath}")
-                            return data
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao recuperar {filepath}: {e}")
-                        continue
+        for entry in reversed(self.journal.read_index(session_id)):
+            if entry.get("etapa") != nome_etapa or entry.get("status") != "sucesso":
+                continue
+            
+            try:
+                data = self.journal.read_record(session_id, entry)
+                logger.info(f"📂 Etapa '{nome_etapa}' recuperada do journal da sessão {session_id}")
+                return data
+            except Exception as e:
+                logger.error(f"❌ Erro ao recuperar '{nome_etapa}' (offset {entry.get('offset')}): {e}")
+                continue
         
-        return None
+        return self._recuperar_etapa_legado(nome_etapa, session_id)
     
     def listar_etapas_salvas(self, session_id: str = None) -> Dict[str, Any]:
-        """Lista todas as etapas salvas de uma sessão"""
+        """Lista todas as etapas salvas de uma sessão a partir do índice"""
         
         session_id = session_id or self.session_id
         if not session_id:
             return {}
         
-        etapas_encontradas = {}
+        etapas_encontradas = self._listar_etapas_legado(session_id)
+        journal_path = str(self.journal.data_path(session_id))
         
-        for categoria, subdir in self.subdirs.items():
-            session_dir = subdir / session_id
-            if session_dir.exists():
-                for filepath in session_dir.glob("*.json"):
-                    try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        
-                        etapa = data.get("etapa", "unknown")
-                        if etapa not in etapas_encontradas:
-                            etapas_encontradas[etapa] = []
-                        
-                        etapas_encontradas[etapa].append({
-                            "arquivo": str(filepath),
-                            "status": data.get("status"),
-                            "timestamp": data.get("timestamp"),
-                            "categoria": categoria,
-                            "tamanho": data.get("tamanho_dados", 0)
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao ler {filepath}: {e}")
-                        continue
+        for entry in self.journal.read_index(session_id):
+            etapa = entry.get("etapa", "unknown")
+            if etapa not in etapas_encontradas:
+                etapas_encontradas[etapa] = []
+            
+            etapas_encontradas[etapa].append({
+                "arquivo": journal_path,
+                "offset": entry.get("offset"),
+                "length": entry.get("length"),
+                "compression": entry.get("compression"),
+                "status": entry.get("status"),
+                "timestamp": entry.get("timestamp"),
+                "categoria": entry.get("categoria"),
+                "tamanho": entry.get("tamanho", 0)
+            })
         
         return etapas_encontradas
     
@@ -270,12 +252,11 @@ class AutoSaveManager:
         }
         
         for etapa_nome, arquivos in etapas.items():
-            # Pega o arquivo mais recente de cada etapa
-            arquivo_mais_recente = max(arquivos, key=lambda x: x["timestamp"])
+            # Pega o registro mais recente de cada etapa
+            arquivo_mais_recente = max(arquivos, key=lambda x: x["timestamp"] or 0)
             
             try:
-                with open(arquivo_mais_recente["arquivo"], "r", encoding="utf-8") as f:
-                    dados_etapa = json.load(f)
+                dados_etapa = self._ler_registro(session_id, arquivo_mais_recente)
                 
                 relatorio_consolidado["etapas_processadas"][etapa_nome] = dados_etapa
                 
@@ -302,19 +283,70 @@ class AutoSaveManager:
         logger.info(f"📋 Relatório consolidado salvo: {relatorio_path}")
         return str(relatorio_path)
     
-    def _salvar_backup_compactado(self, filepath: Path, data: Dict[str, Any]):
-        """Salva backup compactado para dados grandes"""
-        try:
-            import gzip
-            
-            backup_path = filepath.with_suffix('.json.gz')
-            with gzip.open(backup_path, 'wt', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-            
-            logger.info(f"🗜️ Backup compactado salvo: {backup_path}")
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao salvar backup compactado: {e}")
+    def flush(self):
+        """Grava imediatamente as etapas pendentes no journal"""
+        self.journal.flush()
+    
+    def _ler_registro(self, session_id: str, registro: Dict[str, Any]) -> Dict[str, Any]:
+        """Lê registro do journal (por offset) ou arquivo JSON de sessões antigas"""
+        
+        if registro.get("offset") is not None:
+            return self.journal.read_record(session_id, registro)
+        
+        with open(registro["arquivo"], "r", encoding="utf-8") as f:
+            return json.load(f)
+    
+    def _recuperar_etapa_legado(self, nome_etapa: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """Recupera etapa de sessões gravadas antes do journal (um arquivo por etapa)"""
+        
+        for categoria, subdir in self.subdirs.items():
+            session_dir = subdir / session_id
+            if session_dir.exists():
+                for filepath in session_dir.glob(f"{nome_etapa}_*.json"):
+                    try:
+                        with open(filepath, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                        
+                        if data.get("status") == "sucesso":
+                            logger.info(f"📂 Etapa '{nome_etapa}' recuperada: {filepath}")
+                            return data
+                            
+                    except Exception as e:
+                        logger.error(f"❌ Erro ao recuperar {filepath}: {e}")
+                        continue
+        
+        return None
+    
+    def _listar_etapas_legado(self, session_id: str) -> Dict[str, Any]:
+        """Lista etapas de sessões gravadas antes do journal"""
+        
+        etapas_encontradas = {}
+        
+        for categoria, subdir in self.subdirs.items():
+            session_dir = subdir / session_id
+            if session_dir.exists():
+                for filepath in session_dir.glob("*.json"):
+                    try:
+                        with open(filepath, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                        
+                        etapa = data.get("etapa", "unknown")
+                        if etapa not in etapas_encontradas:
+                            etapas_encontradas[etapa] = []
+                        
+                        etapas_encontradas[etapa].append({
+                            "arquivo": str(filepath),
+                            "status": data.get("status"),
+                            "timestamp": data.get("timestamp"),
+                            "categoria": categoria,
+                            "tamanho": data.get("tamanho_dados", 0)
+                        })
+                        
+                    except Exception as e:
+                        logger.error(f"❌ Erro ao ler {filepath}: {e}")
+                        continue
+        
+        return etapas_encontradas
     
     def _get_stack_trace(self, erro: Exception) -> str:
         """Obtém stack trace do erro"""
@@ -339,6 +371,8 @@ class AutoSaveManager:
                             removidas += 1
                             logger.info(f"🗑️ Sessão antiga removida: {session_dir}")
             
+            removidas += self.journal.remove_older_than(cutoff_time)
+            
             logger.info(f"🧹 Limpeza concluída: {removidas} sessões antigas removidas")
             
         except Exception as e:
@@ -347,6 +381,20 @@ class AutoSaveManager:
 # Instância global
 auto_save_manager = AutoSaveManager()
 
+def com_sessao(func: Callable) -> Callable:
+    """
+    Envolve `func` para rodar em outra thread com a sessão atual. Use ao
+    submeter tarefas de uma análise a um pool: threads novas não herdam
+    o contexto de quem as criou.
+    """
+    contexto = contextvars.copy_context()
+    
+    def executar(*args, **kwargs):
+        # Cópia por execução: o mesmo wrapper pode rodar em várias threads ao mesmo tempo
+        return contexto.copy().run(func, *args, **kwargs)
+    
+    return executar
+
 # Função de conveniência
 def salvar_etapa(nome_etapa: str, dados: Any, status: str = "sucesso", categoria: str = "geral") -> str:
     """Função de conveniência para salvamento rápido"""
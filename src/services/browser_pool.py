@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Browser Pool
+Chromium headless persistente em um event loop dedicado: N contextos
+aquecidos com páginas reutilizadas, rotação por número de páginas e
+watchdog que relança o browser após crash; falhas ao lançar o browser ou
+recriar contextos são repetidas com espera exponencial
+"""
+
+import os
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+logger = logging.getLogger(__name__)
+
+# Import condicional do Playwright
+try:
+    from playwright.async_api import async_playwright
+    HAS_PLAYWRIGHT = True
+except ImportError:
+    HAS_PLAYWRIGHT = False
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--no-first-run',
+    '--no-zygote',
+    '--disable-gpu',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding'
+]
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'locale': 'pt-BR',
+    'timezone_id': 'America/Sao_Paulo',
+    'extra_http_headers': {
+        'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8'
+    }
+}
+
+@dataclass
+class _ContextSlot:
+    """Contexto aquecido com uma página reutilizável"""
+    context: Any
+    generation: int
+    page: Any = None
+    pages_served: int = 0
+    created_at: float = 0.0
+
+class BrowserPool:
+    """Pool de contextos Chromium servido por uma thread com event loop próprio"""
+    
+    def __init__(self):
+        """Inicializa pool (o browser só é lançado na primeira requisição)"""
+        self.size = int(os.getenv('BROWSER_POOL_CONTEXTS', 3))
+        self.max_pages_per_context = int(os.getenv('BROWSER_POOL_MAX_PAGES_PER_CONTEXT', 50))
+        self.job_timeout = float(os.getenv('BROWSER_POOL_JOB_TIMEOUT', 60))
+        self.acquire_timeout = float(os.getenv('BROWSER_POOL_ACQUIRE_TIMEOUT', 60))
+        self.watchdog_interval = float(os.getenv('BROWSER_POOL_WATCHDOG_INTERVAL', 15))
+        self.retry_base_delay = float(os.getenv('BROWSER_POOL_RETRY_BASE_DELAY', 5))
+        self.retry_max_delay = float(os.getenv('BROWSER_POOL_RETRY_MAX_DELAY', 300))
+        
+        self.last_error: Optional[str] = None
+        # Falhas seguidas ao lançar o Chromium e até quando novas tentativas esperam
+        self._launch_failures = 0
+        self._retry_at = 0.0
+        
+        self.stats = {
+            'jobs_submitted': 0,
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'jobs_timed_out': 0,
+            'browser_launches': 0,
+            'browser_crashes': 0,
+            'contexts_created': 0,
+            'contexts_rotated': 0,
+            'launch_failures': 0,
+            'slot_refill_failures': 0,
+            'pages_created': 0,
+            'pages_reused': 0,
+            'stray_pages_closed': 0
+        }
+        self._stats_lock = threading.Lock()
+        
+        self._context_setup: Optional[Callable[[Any], Awaitable[None]]] = None
+        self._context_options: Dict[str, Any] = dict(CONTEXT_OPTIONS)
+        
+        # Loop e thread criados sob demanda em cada processo (gunicorn usa preload_app)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        
+        # Estado abaixo só é tocado dentro do loop do pool
+        self._playwright = None
+        self._browser = None
+        self._generation = 0
+        self._idle: Optional[asyncio.Queue] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._slots: List[_ContextSlot] = []
+        self._watchdog_task = None
+        self._refill_task = None
+        
+        atexit.register(self.close)
+    
+    @property
+    def available(self) -> bool:
+        """Playwright instalado e fora da espera após uma falha de lançamento"""
+        return HAS_PLAYWRIGHT and time.time() >= self._retry_at
+    
+    def _backoff(self, attempt: int) -> float:
+        return min(self.retry_max_delay, self.retry_base_delay * (2 ** max(0, attempt - 1)))
+    
+    def set_context_setup(
+        self,
+        setup: Callable[[Any], Awaitable[None]],
+        context_options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Registra corrotina aplicada a cada contexto novo (rotas, scripts de
+        inicialização) e opções que sobrescrevem CONTEXT_OPTIONS. Vale para
+        os contextos criados a partir de agora.
+        """
+        self._context_setup = setup
+        self._context_options = {**CONTEXT_OPTIONS, **(context_options or {})}
+    
+    def submit(self, job: Callable[[Any], Awaitable[Any]], timeout: Optional[float] = None) -> Future:
+        """
+        Agenda `job(page)` em uma página aquecida e retorna um
+        concurrent.futures.Future. Pode ser chamado de qualquer thread.
+        """
+        
+        if not self.available:
+            future = Future()
+            future.set_exception(RuntimeError(self.last_error or 'Playwright não disponível'))
+            return future
+        
+        loop = self._ensure_loop()
+        self._count('jobs_submitted')
+        return asyncio.run_coroutine_threadsafe(self._run_job(job, timeout or self.job_timeout), loop)
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Inicia a thread do event loop no processo atual"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return self._loop
+        
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return self._loop
+            
+            # Objetos herdados do processo pai pertencem a outro loop
+            self._playwright = None
+            self._browser = None
+            self._slots = []
+            self._idle = None
+            self._launch_lock = None
+            self._watchdog_task = None
+            self._refill_task = None
+            
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            
+            def _serve():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+            
+            self._thread = threading.Thread(target=_serve, name='browser-pool', daemon=True)
+            self._thread.start()
+            ready.wait()
+            
+            self._loop = loop
+            self._pid = os.getpid()
+            return loop
+    
+    async def _run_job(self, job: Callable[[Any], Awaitable[Any]], timeout: float) -> Any:
+        """Empresta um contexto, executa o job e devolve o contexto ao pool"""
+        
+        await self._ensure_browser()
+        slot = await asyncio.wait_for(self._idle.get(), timeout=self.acquire_timeout)
+        healthy = True
+        
+        try:
+            page = await self._get_page(slot)
+            slot.pages_served += 1
+            result = await asyncio.wait_for(job(page), timeout=timeout)
+            self._count('jobs_completed')
+            return result
+        except asyncio.TimeoutError:
+            # A página pode ter ficado presa em navegação; não é reutilizada
+            healthy = False
+            self._count('jobs_timed_out')
+            raise TimeoutError(f"Página excedeu {timeout:g}s no browser pool")
+        except Exception:
+            healthy = False
+            self._count('jobs_failed')
+            raise
+        finally:
+            await self._release(slot, healthy)
+    
+    async def _get_page(self, slot: _ContextSlot):
+        """Página do contexto, reutilizada entre jobs enquanto estiver aberta"""
+        if slot.page is not None and not slot.page.is_closed():
+            self._count('pages_reused')
+            return slot.page
+        
+        slot.page = await slot.context.new_page()
+        self._count('pages_created')
+        return slot.page
+    
+    async def _release(self, slot: _ContextSlot, healthy: bool):
+        """Recicla página/contexto e devolve o slot à fila de ociosos"""
+        
+        if slot.generation != self._generation:
+            # Slot de um browser que já foi substituído
+            return
+        
+        if slot.pages_served >= self.max_pages_per_context:
+            await self._close_slot(slot)
+            self._count('contexts_rotated')
+            try:
+                await self._add_slot()
+            except Exception as e:
+                # Tenta de novo em segundo plano para o pool não encolher de vez
+                self._count('slot_refill_failures')
+                logger.error(f"❌ Erro ao rotacionar contexto do browser pool: {e}")
+                self._schedule_refill()
+            return
+        
+        if slot.page is not None and not slot.page.is_closed():
+            try:
+                if healthy:
+                    # Descarrega o documento anterior antes de voltar à fila
+                    await slot.page.goto('about:blank', timeout=5000)
+                else:
+                    await slot.page.close()
+                    slot.page = None
+            except Exception:
+                slot.page = None
+        
+        self._idle.put_nowait(slot)
+    
+    async def _ensure_browser(self):
+        """Lança browser e contextos na primeira chamada e após crashes"""
+        if self._browser is not None and self._browser.is_connected():
+            return
+        
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            
+            if self._browser is not None:
+                self._count('browser_crashes')
+                logger.warning("⚠️ Chromium desconectado, relançando browser pool")
+            
+            if time.time() < self._retry_at:
+                raise RuntimeError(self.last_error or 'Browser pool aguardando nova tentativa')
+            
+            try:
+                await self._launch()
+            except Exception as e:
+                # Browser parcial (contextos faltando) é descartado: a próxima tentativa relança tudo
+                await self._teardown_browser()
+                self._launch_failures += 1
+                self._count('launch_failures')
+                delay = self._backoff(self._launch_failures)
+                self._retry_at = time.time() + delay
+                self.last_error = f"Falha ao lançar Chromium: {e}"
+                logger.error(f"❌ {self.last_error} (nova tentativa em {delay:.0f}s)")
+                raise
+            
+            self._launch_failures = 0
+            self._retry_at = 0.0
+            self.last_error = None
+            
+            if self._watchdog_task is None:
+                self._watchdog_task = asyncio.get_running_loop().create_task(self._watchdog())
+    
+    async def _launch(self):
+        """(Re)lança o Chromium e cria os contextos aquecidos"""
+        
+        await self._teardown_browser()
+        
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        
+        self._browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        self._generation += 1
+        self._slots = []
+        
+        # Mesma fila de antes: jobs aguardando um contexto recebem os novos
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        self._count('browser_launches')
+        
+        for _ in range(self.size):
+            await self._add_slot()
+        
+        logger.info(f"✅ Browser pool pronto: {self.size} contextos aquecidos")
+    
+    async def _add_slot(self):
+        """Cria um contexto novo e o coloca na fila"""
+        context = await self._browser.new_context(**self._context_options)
+        if self._context_setup is not None:
+            await self._context_setup(context)
+        
+        slot = _ContextSlot(context=context, generation=self._generation, created_at=time.time())
+        self._slots.append(slot)
+        self._count('contexts_created')
+        self._idle.put_nowait(slot)
+    
+    def _schedule_refill(self):
+        """Agenda a recriação dos contextos que faltam, se ainda não houver uma em curso"""
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.get_running_loop().create_task(self._refill_slots(self._generation))
+    
+    async def _refill_slots(self, generation: int):
+        """Recria contextos até o pool voltar ao tamanho configurado, com espera exponencial"""
+        attempt = 0
+        while generation == self._generation and len(self._slots) < self.size:
+            attempt += 1
+            await asyncio.sleep(self._backoff(attempt))
+            
+            # Um relançamento do browser já recria todos os contextos
+            if generation != self._generation or self._browser is None or not self._browser.is_connected():
+                return
+            
+            try:
+                while len(self._slots) < self.size:
+                    await self._add_slot()
+                logger.info(f"✅ Browser pool recomposto: {self.size} contextos aquecidos")
+            except Exception as e:
+                self._count('slot_refill_failures')
+                logger.warning(f"⚠️ Nova falha ao recriar contexto do browser pool (tentativa {attempt}): {e}")
+    
+    async def _close_slot(self, slot: _ContextSlot):
+        if slot in self._slots:
+            self._slots.remove(slot)
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao fechar contexto do browser pool: {e}")
+    
+    async def _teardown_browser(self):
+        """Fecha contextos e browser atuais, se houver"""
+        for slot in list(self._slots):
+            await self._close_slot(slot)
+        
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+    
+    async def _watchdog(self):
+        """Relança o browser se ele cair e fecha páginas abertas fora do pool"""
+        while True:
+            await asyncio.sleep(self.watchdog_interval)
+            
+            try:
+                if self._browser is None:
+                    continue
+                
+                if not self._browser.is_connected():
+                    await self._ensure_browser()
+                    continue
+                
+                # Popups e páginas abertas por scripts vazam memória no contexto
+                for slot in list(self._slots):
+                    for page in list(slot.context.pages):
+                        if page is not slot.page:
+                            await page.close()
+                            self._count('stray_pages_closed')
+            
+            except Exception as e:
+                logger.error(f"❌ Erro no watchdog do browser pool: {e}")
+    
+    def _count(self, counter: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[counter] += amount
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores e estado do pool"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        
+        running = self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+        
+        stats.update({
+            'available': self.available,
+            'last_error': self.last_error,
+            'launch_retry_in': round(max(0.0, self._retry_at - time.time()), 1),
+            'size': self.size,
+            'contexts': len(self._slots) if running else 0,
+            'max_pages_per_context': self.max_pages_per_context,
+            'browser_active': running and self._browser is not None,
+            'idle_contexts': self._idle.qsize() if running and self._idle is not None else 0
+        })
+        return stats
+    
+    def close(self, timeout: float = 10):
+        """Fecha browser e encerra a thread do loop"""
+        
+        with self._lock:
+            if self._pid != os.getpid() or self._loop is None or not self._thread.is_alive():
+                return
+            loop = self._loop
+            self._loop = None
+            self._pid = None
+        
+        async def _shutdown():
+            if self._watchdog_task is not None:
+                self._watchdog_task.cancel()
+                self._watchdog_task = None
+            if self._refill_task is not None:
+                self._refill_task.cancel()
+                self._refill_task = None
+            await self._teardown_browser()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+        
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout)
+            logger.info("✅ Browser pool fechado")
+        except Exception as e:
+            logger.error(f"❌ Erro ao fechar browser pool: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout)
+
+# Instância global
+browser_pool = BrowserPool()
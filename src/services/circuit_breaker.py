@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Circuit Breaker
+Disjuntor por provedor (fechado / aberto / meio-aberto) com espera exponencial
+e uma única requisição de teste na recuperação, mais janela deslizante de
+latência e erros usada para ordenar os provedores pelo mais rápido saudável
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Estado de um provedor; vale para o processo atual"""
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        base_cooldown: float,
+        max_cooldown: float,
+        window_size: int,
+        error_rate_threshold: float,
+        min_samples: int,
+        probe_timeout: float
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.probe_timeout = probe_timeout
+        
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        # Aberturas seguidas sem recuperação: definem a espera exponencial
+        self.open_streak = 0
+        self.opened_at: Optional[float] = None
+        self.open_until: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        self.times_opened = 0
+        
+        # (sucesso, latência) das últimas chamadas
+        self.window = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+    
+    def _probe_in_flight(self, now: float) -> bool:
+        return self.probe_started_at is not None and now - self.probe_started_at < self.probe_timeout
+    
+    def is_available(self) -> bool:
+        """Se uma chamada seria aceita agora, sem reservar o teste de recuperação"""
+        now = time.time()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return now >= self.open_until
+            return not self._probe_in_flight(now)
+    
+    def allow_request(self) -> bool:
+        """
+        Autoriza uma chamada. Depois da espera, o circuito passa a meio-aberto
+        e só a primeira chamada passa, como teste; as demais são recusadas
+        até o resultado dela.
+        """
+        now = time.time()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            
+            if self.state == OPEN:
+                if now < self.open_until:
+                    return False
+                self.state = HALF_OPEN
+                logger.info(f"🔌 Circuito de {self.name} meio-aberto: enviando requisição de teste")
+            
+            if self._probe_in_flight(now):
+                return False
+            self.probe_started_at = now
+            return True
+    
+    def release_probe(self):
+        """Devolve a reserva do teste quando a chamada autorizada não chegou a acontecer"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_started_at = None
+    
+    def record_success(self, latency: Optional[float] = None):
+        with self._lock:
+            if self.state != CLOSED:
+                # Janela recomeça: as falhas da queda não podem reabrir o circuito logo em seguida
+                self.window.clear()
+                logger.info(f"✅ Circuito de {self.name} fechado: provedor recuperado")
+            self.window.append((True, latency))
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self.open_streak = 0
+            self.probe_started_at = None
+            self.open_until = None
+    
+    def record_failure(self, latency: Optional[float] = None):
+        with self._lock:
+            self.window.append((False, latency))
+            self.consecutive_failures += 1
+            
+            if self.state == HALF_OPEN:
+                self._open("teste de recuperação falhou")
+            elif self.state == CLOSED:
+                if self.consecutive_failures >= self.failure_threshold:
+                    self._open(f"{self.consecutive_failures} falhas consecutivas")
+                elif len(self.window) >= self.min_samples and self._error_rate() >= self.error_rate_threshold:
+                    self._open(f"taxa de erro de {self._error_rate() * 100:.0f}% na janela")
+    
+    def _open(self, reason: str):
+        now = time.time()
+        self.open_streak += 1
+        self.times_opened += 1
+        cooldown = min(self.max_cooldown, self.base_cooldown * (2 ** (self.open_streak - 1)))
+        # Jitter para os workers não testarem o provedor todos ao mesmo tempo
+        cooldown *= random.uniform(0.9, 1.1)
+        
+        self.state = OPEN
+        self.opened_at = now
+        self.open_until = now + cooldown
+        self.probe_started_at = None
+        logger.warning(f"⚠️ Circuito de {self.name} aberto por {cooldown:.0f}s ({reason})")
+    
+    def _error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for success, _ in self.window if not success) / len(self.window)
+    
+    def score(self) -> Optional[float]:
+        """
+        Custo esperado de uma chamada: latência média dos sucessos dividida
+        pela taxa de sucesso da janela. None sem amostras suficientes.
+        """
+        with self._lock:
+            samples = list(self.window)
+        
+        latencies = [latency for success, latency in samples if success and latency is not None]
+        if len(samples) < self.min_samples or not latencies:
+            return None
+        
+        success_rate = sum(1 for success, _ in samples if success) / len(samples)
+        return (sum(latencies) / len(latencies)) / max(success_rate, 0.05)
+    
+    def reset(self):
+        """Fecha o circuito e limpa a janela"""
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.open_streak = 0
+            self.opened_at = None
+            self.open_until = None
+            self.probe_started_at = None
+            self.window.clear()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Resumo para relatórios de status"""
+        score = self.score()
+        now = time.time()
+        with self._lock:
+            latencies = [latency for success, latency in self.window if success and latency is not None]
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'retry_in': round(max(0.0, self.open_until - now), 1) if self.state == OPEN else None,
+                'window_samples': len(self.window),
+                'error_rate': round(self._error_rate() * 100, 1),
+                'mean_latency': round(sum(latencies) / len(latencies), 4) if latencies else None,
+                'score': round(score, 4) if score is not None else None
+            }
+
+
+class CircuitBreakerGroup:
+    """Disjuntores dos provedores de um gerenciador, com a ordenação adaptativa"""
+    
+    def __init__(self, namespace: str, defaults: Dict[str, Any], adaptive: bool = True):
+        self.namespace = namespace
+        self.defaults = defaults
+        self.adaptive = adaptive
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def breaker(self, name: str, failure_threshold: Optional[int] = None) -> CircuitBreaker:
+        """Disjuntor do provedor, criado no primeiro uso"""
+        with self._lock:
+            if name not in self.breakers:
+                settings = dict(self.defaults)
+                if failure_threshold is not None:
+                    settings['failure_threshold'] = failure_threshold
+                self.breakers[name] = CircuitBreaker(f"{self.namespace}:{name}", **settings)
+            return self.breakers[name]
+    
+    def order(self, priorities: Dict[str, int]) -> List[str]:
+        """
+        Provedores disponíveis por prioridade. Com ordenação adaptativa, os
+        que já têm amostras suficientes trocam de posição entre si pelo
+        custo esperado; os sem histórico ficam onde a prioridade os colocou.
+        """
+        ordered = sorted(
+            (name for name in priorities if self.breaker(name).is_available()),
+            key=lambda name: priorities[name]
+        )
+        if not self.adaptive:
+            return ordered
+        
+        scores = {name: self.breaker(name).score() for name in ordered}
+        measured = [name for name in ordered if scores[name] is not None]
+        ranked = iter(sorted(measured, key=lambda name: (scores[name], priorities[name])))
+        return [next(ranked) if scores[name] is not None else name for name in ordered]
+    
+    def reset(self, name: Optional[str] = None):
+        with self._lock:
+            breakers = [self.breakers[name]] if name in self.breakers else (list(self.breakers.values()) if name is None else [])
+        for breaker in breakers:
+            breaker.reset()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+class CircuitBreakerRegistry:
+    """Grupos de disjuntores por gerenciador, com os padrões do ambiente"""
+    
+    def __init__(self):
+        """Inicializa registro"""
+        self.adaptive_ordering = os.getenv('CIRCUIT_ADAPTIVE_ORDERING', 'true').lower() == 'true'
+        self.defaults = {
+            'failure_threshold': int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3)),
+            'base_cooldown': float(os.getenv('CIRCUIT_BASE_COOLDOWN', 30)),
+            'max_cooldown': float(os.getenv('CIRCUIT_MAX_COOLDOWN', 900)),
+            'window_size': int(os.getenv('CIRCUIT_WINDOW_SIZE', 50)),
+            'error_rate_threshold': float(os.getenv('CIRCUIT_ERROR_RATE_THRESHOLD', 0.5)),
+            'min_samples': int(os.getenv('CIRCUIT_MIN_SAMPLES', 10)),
+            'probe_timeout': float(os.getenv('CIRCUIT_PROBE_TIMEOUT', 120))
+        }
+        self.groups: Dict[str, CircuitBreakerGroup] = {}
+        self._lock = threading.Lock()
+    
+    def group(self, namespace: str) -> CircuitBreakerGroup:
+        with self._lock:
+            if namespace not in self.groups:
+                self.groups[namespace] = CircuitBreakerGroup(namespace, self.defaults, self.adaptive_ordering)
+            return self.groups[namespace]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            groups = dict(self.groups)
+        return {
+            'adaptive_ordering': self.adaptive_ordering,
+            'defaults': self.defaults,
+            'groups': {namespace: group.snapshot() for namespace, group in groups.items()}
+        }
+
+# Instância global
+circuit_breakers = CircuitBreakerRegistry()
@@ -5,11 +5,14 @@ ARQV30 Enhanced v2.0 - Component Orchestrator
 Orquestrador seguro de componentes com validação rigorosa
 """
 
+import os
 import logging
 import time
 import json
+import threading
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
+from services.parallel_component_executor import ParallelComponentExecutor, ComponentTask
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +30,10 @@ class ComponentOrchestrator:
         self.validation_rules = {}
         self.component_results = {}
         self.execution_stats = {}
+        self.max_workers = int(os.getenv('COMPONENT_ORCHESTRATOR_WORKERS', 4))
+        self.default_timeout = int(os.getenv('COMPONENT_TIMEOUT_SECONDS', 300))
         
-        logger.info("Component Orchestrator inicializado")
+        logger.info(f"Component Orchestrator inicializado: {self.max_workers} componentes simultâneos")
     
     def register_component(
         self, 
@@ -36,7 +41,8 @@ class ComponentOrchestrator:
         executor: Callable,
         dependencies: List[str] = None,
         validation_rules: Dict[str, Any] = None,
-        required: bool = True
+        required: bool = True,
+        timeout: Optional[int] = None
     ):
         """Registra um componente no orquestrador"""
         
@@ -45,6 +51,7 @@ class ComponentOrchestrator:
             'dependencies': dependencies or [],
             'validation_rules': validation_rules or {},
             'required': required,
+            'timeout': timeout or self.default_timeout,
             'status': 'pending'
         }
         
@@ -58,58 +65,81 @@ class ComponentOrchestrator:
         input_data: Dict[str, Any],
         progress_callback: Optional[Callable] = None
     ) -> Dict[str, Any]:
-        """Executa todos os componentes registrados em ordem"""
+        """
+        Executa os componentes registrados como um DAG: cada componente
+        começa assim que suas dependências terminam com sucesso, em paralelo
+        com os demais componentes prontos. `previous_results` contém os
+        resultados de todos os ancestrais declarados do componente.
+        """
         
         logger.info(f"🚀 Iniciando execução de {len(self.component_registry)} componentes")
         start_time = time.time()
         
         successful_components = {}
         failed_components = {}
+        started = []
         
-        for i, component_name in enumerate(self.execution_order):
-            if progress_callback:
-                progress_callback(i + 1, f"Executando {component_name}...")
+        dependencies = {
+            name: self.component_registry[name]['dependencies']
+            for name in self.execution_order
+        }
+        
+        def _make_task_func(component_name: str):
+            missing = [dep for dep in dependencies[component_name] if dep not in self.component_registry]
             
-            try:
-                # Verifica dependências
-                if not self._check_dependencies(component_name):
-                    error_msg = f"Dependências não atendidas para {component_name}"
-                    logger.error(f"❌ {error_msg}")
-                    failed_components[component_name] = error_msg
-                    self._mark_component_failed(component_name, error_msg)
-                    continue
+            def _run(dep_results: Dict[str, Any], cancel_event: threading.Event) -> Any:
+                if missing:
+                    raise ComponentValidationError(f"Dependências não registradas: {', '.join(missing)}")
                 
-                # Executa componente
-                result = self._execute_single_component(component_name, input_data, successful_components)
+                result = self._execute_single_component(component_name, input_data, dep_results, cancel_event)
                 
-                if result is not None:
-                    # Valida resultado
-                    if self._validate_component_result(component_name, result):
-                        successful_components[component_name] = result
-                        self._mark_component_successful(component_name, result)
-                        logger.info(f"✅ Componente {component_name} executado com sucesso")
-                    else:
-                        error_msg = f"Resultado inválido para {component_name}"
-                        logger.error(f"❌ {error_msg}")
-                        failed_components[component_name] = error_msg
-                        self._mark_component_failed(component_name, error_msg)
-                else:
-                    error_msg = f"Componente {component_name} retornou None"
-                    logger.error(f"❌ {error_msg}")
-                    failed_components[component_name] = error_msg
-                    self._mark_component_failed(component_name, error_msg)
+                if cancel_event.is_set():
+                    # Estourou o timeout: o relatório já registrou a falha
+                    return None
+                if result is None:
+                    raise ComponentValidationError(f"Componente {component_name} retornou None")
+                if not self._validate_component_result(component_name, result):
+                    raise ComponentValidationError(f"Resultado inválido para {component_name}")
                 
-            except Exception as e:
-                error_msg = f"Erro na execução de {component_name}: {str(e)}"
-                logger.error(f"❌ {error_msg}")
+                return result
+            return _run
+        
+        tasks = [
+            ComponentTask(
+                name=name,
+                func=_make_task_func(name),
+                dependencies=self._get_ancestors(name, dependencies),
+                timeout=self.component_registry[name]['timeout']
+            )
+            for name in self.execution_order
+        ]
+        
+        def _on_start(component_name: str):
+            started.append(component_name)
+            if progress_callback:
+                progress_callback(len(started), f"Executando {component_name}...")
+        
+        def _on_finish(component_name: str, status: str):
+            if status == 'success':
+                logger.info(f"✅ Componente {component_name} executado com sucesso")
+            elif self.component_registry[component_name]['required']:
+                logger.error(f"🚨 Componente obrigatório {component_name} falhou - análise comprometida")
+        
+        executor = ParallelComponentExecutor(max_workers=self.max_workers, default_timeout=self.default_timeout)
+        run = executor.run(tasks, on_start=_on_start, on_finish=_on_finish)
+        
+        for component_name in self.execution_order:
+            if component_name in run['results']:
+                successful_components[component_name] = run['results'][component_name]
+                self._mark_component_successful(component_name, run['results'][component_name])
+            else:
+                error_msg = run['errors'].get(component_name, f"Componente {component_name} não executado")
                 failed_components[component_name] = error_msg
                 self._mark_component_failed(component_name, error_msg)
-                
-                # Se é componente obrigatório, pode interromper
-                if self.component_registry[component_name]['required']:
-                    logger.error(f"🚨 Componente obrigatório {component_name} falhou - análise comprometida")
         
         execution_time = time.time() - start_time
+        critical_path = executor.critical_path(dependencies, run['timings'])
+        self._record_timings(run['timings'], run['errors'], execution_time)
         
         # Gera relatório final
         execution_report = {
@@ -119,37 +149,75 @@ class ComponentOrchestrator:
                 'total_components': len(self.component_registry),
                 'successful_count': len(successful_components),
                 'failed_count': len(failed_components),
-                'success_rate': (len(successful_components) / len(self.component_registry)) * 100,
+                'success_rate': (len(successful_components) / len(self.component_registry)) * 100 if self.component_registry else 0,
                 'execution_time': execution_time,
+                'critical_path': critical_path['path'],
+                'critical_path_time': critical_path['time'],
                 'timestamp': datetime.now().isoformat()
             },
             'component_details': self.execution_stats
         }
         
         logger.info(f"📊 Execução concluída: {len(successful_components)}/{len(self.component_registry)} componentes bem-sucedidos")
+        if critical_path['path']:
+            logger.info(f"🧭 Caminho crítico ({critical_path['time']:.2f}s): {' → '.join(critical_path['path'])}")
         
         return execution_report
     
-    def _check_dependencies(self, component_name: str) -> bool:
-        """Verifica se as dependências de um componente foram atendidas"""
+    def _get_ancestors(self, component_name: str, dependencies: Dict[str, List[str]]) -> List[str]:
+        """Retorna todos os ancestrais registrados do componente, na ordem de registro"""
         
-        component = self.component_registry.get(component_name, {})
-        dependencies = component.get('dependencies', [])
+        ancestors = set()
+        stack = list(dependencies.get(component_name, []))
         
-        for dependency in dependencies:
-            if dependency not in self.component_results or self.component_results[dependency]['status'] != 'success':
-                logger.warning(f"⚠️ Dependência {dependency} não atendida para {component_name}")
-                return False
+        while stack:
+            dependency = stack.pop()
+            if dependency in ancestors:
+                continue
+            ancestors.add(dependency)
+            stack.extend(dependencies.get(dependency, []))
         
-        return True
+        return [name for name in self.execution_order if name in ancestors]
+    
+    def _record_timings(
+        self,
+        timings: Dict[str, Dict[str, float]],
+        errors: Dict[str, str],
+        total_time: float
+    ):
+        """Anexa início, fim e participação na latência total a cada componente"""
+        
+        for component_name, timing in timings.items():
+            stats = self.execution_stats.setdefault(component_name, {})
+            
+            if 'start' not in timing:
+                stats['status'] = 'cancelled'
+                continue
+            
+            duration = timing.get('end', timing['start']) - timing['start']
+            stats.update({
+                'start_time': timing['start'],
+                'end_time': timing.get('end'),
+                'queue_time': timing['start'] - timing['submitted'],
+                'execution_time': duration,
+                'latency_share': (duration / total_time) * 100 if total_time > 0 else 0
+            })
+            
+            if component_name in errors:
+                stats['status'] = 'failed'
+                stats['error'] = errors[component_name]
     
     def _execute_single_component(
         self, 
         component_name: str, 
         input_data: Dict[str, Any],
-        previous_results: Dict[str, Any]
+        previous_results: Dict[str, Any],
+        cancel_event: Optional[threading.Event] = None
     ) -> Any:
-        """Executa um único componente"""
+        """
+        Executa um único componente. Se o componente já foi cancelado por
+        timeout quando termina, as estatísticas não são sobrescritas.
+        """
         
         component = self.component_registry[component_name]
         executor = component['executor']
@@ -168,6 +236,10 @@ class ComponentOrchestrator:
             
             execution_time = time.time() - start_time
             
+            if cancel_event is not None and cancel_event.is_set():
+                logger.warning(f"⏹️ Resultado tardio de {component_name} ignorado (timeout)")
+                return None
+            
             # Registra estatísticas
             self.execution_stats[component_name] = {
                 'execution_time': execution_time,
@@ -176,10 +248,13 @@ class ComponentOrchestrator:
             }
             
             return result
-            
+        
         except Exception as e:
             execution_time = time.time() - start_time
             
+            if cancel_event is not None and cancel_event.is_set():
+                raise e
+            
             self.execution_stats[component_name] = {
                 'execution_time': execution_time,
                 'status': 'failed',
@@ -238,7 +313,7 @@ class ComponentOrchestrator:
                     return False
             
             return True
-            
+        
         except Exception as e:
             logger.error(f"❌ Erro na validação de {component_name}: {str(e)}")
             return False
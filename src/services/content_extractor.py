@@ -8,11 +8,11 @@ Extrator de conteúdo robusto com múltiplas estratégias
 import os
 import logging
 import time
-import requests
 from typing import Optional, Dict, Any
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import re
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -86,7 +86,7 @@ class ContentExtractor:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = http_client.get(
                 jina_url,
                 headers=headers,
                 timeout=60
@@ -109,7 +109,7 @@ class ContentExtractor:
     def _extract_direct(self, url: str) -> Optional[str]:
         """Extração direta usando BeautifulSoup"""
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=20,
@@ -154,7 +154,7 @@ class ContentExtractor:
     def _extract_with_readability(self, url: str) -> Optional[str]:
         """Extração usando algoritmo de readability"""
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=20,
@@ -201,7 +201,7 @@ class ContentExtractor:
     def _extract_fallback(self, url: str) -> Optional[str]:
         """Extração de fallback mais agressiva"""
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=15,
@@ -267,7 +267,7 @@ class ContentExtractor:
     def extract_metadata(self, url: str) -> Dict[str, Any]:
         """Extrai metadados da página"""
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=15,
@@ -342,7 +342,7 @@ class ContentExtractor:
     def extract_links(self, url: str, internal_only: bool = True) -> list:
         """Extrai links da página"""
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=15,
@@ -6,9 +6,9 @@ Validador de qualidade de conteúdo extraído
 """
 
 import logging
-import re
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from services.text_features import text_features, TextFeatures
 
 logger = logging.getLogger(__name__)
 
@@ -69,15 +69,18 @@ class ContentQualityValidator:
                 'details': {}
             }
         
+        # Tokeniza uma vez; todas as verificações leem os mesmos atributos
+        features = text_features.extract(content)
+        
         # Executa todas as validações
         validations = {
-            'length_check': self._check_content_length(content),
-            'error_page_check': self._check_error_page(content),
-            'navigation_ratio_check': self._check_navigation_ratio(content),
-            'information_density_check': self._check_information_density(content),
-            'language_check': self._check_language(content),
-            'structure_check': self._check_content_structure(content),
-            'relevance_check': self._check_relevance(content, context or {})
+            'length_check': self._check_content_length(features),
+            'error_page_check': self._check_error_page(features),
+            'navigation_ratio_check': self._check_navigation_ratio(features),
+            'information_density_check': self._check_information_density(features),
+            'language_check': self._check_language(features),
+            'structure_check': self._check_content_structure(features),
+            'relevance_check': self._check_relevance(features, context or {})
         }
         
         # Calcula score geral
@@ -105,14 +108,14 @@ class ContentQualityValidator:
             'score': round(final_score, 2),
             'reason': main_reason,
             'details': validations,
-            'content_stats': self._get_content_stats(content),
+            'content_stats': self._get_content_stats(features),
             'url': url,
             'validated_at': datetime.now().isoformat()
         }
     
-    def _check_content_length(self, content: str) -> Dict[str, Any]:
+    def _check_content_length(self, features: TextFeatures) -> Dict[str, Any]:
         """Verifica comprimento do conteúdo"""
-        length = len(content)
+        length = features.character_count
         
         if length >= self.min_content_length:
             score = min(100, (length / 2000) * 100)  # Score baseado em 2000 chars como ideal
@@ -133,14 +136,9 @@ class ContentQualityValidator:
                 'value': length
             }
     
-    def _check_error_page(self, content: str) -> Dict[str, Any]:
+    def _check_error_page(self, features: TextFeatures) -> Dict[str, Any]:
         """Verifica se é página de erro"""
-        content_lower = content.lower()
-        
-        found_errors = []
-        for indicator in self.error_indicators:
-            if indicator in content_lower:
-                found_errors.append(indicator)
+        found_errors = [indicator for indicator in self.error_indicators if features.contains(indicator)]
         
         if found_errors:
             return {
@@ -159,11 +157,9 @@ class ContentQualityValidator:
                 'value': []
             }
     
-    def _check_navigation_ratio(self, content: str) -> Dict[str, Any]:
+    def _check_navigation_ratio(self, features: TextFeatures) -> Dict[str, Any]:
         """Verifica proporção de palavras de navegação"""
-        words = content.lower().split()
-        
-        if len(words) == 0:
+        if features.word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -172,8 +168,7 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        navigation_count = sum(1 for word in words if word in self.navigation_words)
-        navigation_ratio = navigation_count / len(words)
+        navigation_ratio = features.ratio(self.navigation_words)
         
         if navigation_ratio <= self.max_navigation_ratio:
             score = (1 - navigation_ratio) * 100
@@ -194,11 +189,9 @@ class ContentQualityValidator:
                 'value': navigation_ratio
             }
     
-    def _check_information_density(self, content: str) -> Dict[str, Any]:
+    def _check_information_density(self, features: TextFeatures) -> Dict[str, Any]:
         """Verifica densidade de informação"""
-        words = content.lower().split()
-        
-        if len(words) == 0:
+        if features.word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -208,8 +201,7 @@ class ContentQualityValidator:
             }
         
         # Conta palavras informativas
-        info_count = sum(1 for word in words if word in self.quality_indicators)
-        info_density = info_count / len(words)
+        info_density = features.ratio(self.quality_indicators)
         
         if info_density >= self.min_information_density:
             score = min(100, info_density * 1000)  # Amplifica score
@@ -230,21 +222,9 @@ class ContentQualityValidator:
                 'value': info_density
             }
     
-    def _check_language(self, content: str) -> Dict[str, Any]:
+    def _check_language(self, features: TextFeatures) -> Dict[str, Any]:
         """Verifica se o conteúdo está em português"""
-        # Palavras comuns em português
-        portuguese_words = [
-            'que', 'não', 'uma', 'para', 'com', 'mais', 'como',
-            'mas', 'foi', 'pelo', 'pela', 'até', 'isso', 'ela',
-            'entre', 'depois', 'sem', 'mesmo', 'aos', 'seus',
-            'quem', 'nas', 'me', 'esse', 'eles', 'você', 'tinha',
-            'foram', 'essa', 'num', 'nem', 'suas', 'meu', 'às',
-            'minha', 'numa', 'pelos', 'elas', 'qual', 'nós', 'deles'
-        ]
-        
-        words = content.lower().split()
-        
-        if len(words) == 0:
+        if features.word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -253,8 +233,7 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        portuguese_count = sum(1 for word in words if word in portuguese_words)
-        portuguese_ratio = portuguese_count / len(words)
+        portuguese_ratio = features.language_signals['pt']
         
         if portuguese_ratio >= 0.05:  # Pelo menos 5% de palavras em português
             score = min(100, portuguese_ratio * 500)
@@ -274,10 +253,9 @@ class ContentQualityValidator:
                 'value': portuguese_ratio
             }
     
-    def _check_content_structure(self, content: str) -> Dict[str, Any]:
+    def _check_content_structure(self, features: TextFeatures) -> Dict[str, Any]:
         """Verifica estrutura do conteúdo"""
-        lines = content.split('\n')
-        paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
+        paragraphs = features.paragraphs
         
         # Verifica se tem parágrafos substanciais
         if len(paragraphs) >= 3:
@@ -299,7 +277,7 @@ class ContentQualityValidator:
                 'value': len(paragraphs)
             }
     
-    def _check_relevance(self, content: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _check_relevance(self, features: TextFeatures, context: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica relevância do conteúdo para o contexto"""
         if not context:
             return {
@@ -310,7 +288,6 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        content_lower = content.lower()
         relevance_score = 0
         
         # Verifica termos do contexto
@@ -328,7 +305,7 @@ class ContentQualityValidator:
         # Conta ocorrências dos termos
         for term in context_terms:
             if term and len(term) > 2:
-                occurrences = content_lower.count(term)
+                occurrences = features.count_term(term)
                 relevance_score += occurrences * 10
         
         # Normaliza score
@@ -351,27 +328,24 @@ class ContentQualityValidator:
                 'value': relevance_score
             }
     
-    def _get_content_stats(self, content: str) -> Dict[str, Any]:
+    def _get_content_stats(self, features: TextFeatures) -> Dict[str, Any]:
         """Obtém estatísticas do conteúdo"""
-        words = content.split()
-        lines = content.split('\n')
-        paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
-        
-        # Conta números e percentuais
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        
-        # Conta valores monetários
-        money_values = re.findall(r'R\$\s*[\d,\.]+', content)
+        word_count = features.word_count
+        paragraph_count = features.paragraph_count
         
         return {
-            'character_count': len(content),
-            'word_count': len(words),
-            'line_count': len(lines),
-            'paragraph_count': len(paragraphs),
-            'number_count': len(numbers),
-            'money_value_count': len(money_values),
-            'avg_words_per_paragraph': len(words) / max(len(paragraphs), 1),
-            'avg_chars_per_word': len(content) / max(len(words), 1)
+            'character_count': features.character_count,
+            'word_count': word_count,
+            'line_count': features.line_count,
+            'paragraph_count': paragraph_count,
+            'sentence_count': features.sentence_count,
+            'number_count': features.number_count,
+            'percentage_count': features.percentage_count,
+            'money_value_count': features.money_value_count,
+            'navigation_ratio': round(features.navigation_ratio, 4),
+            'language_signals': {lang: round(ratio, 4) for lang, ratio in features.language_signals.items()},
+            'avg_words_per_paragraph': word_count / max(paragraph_count, 1),
+            'avg_chars_per_word': features.character_count / max(word_count, 1)
         }
     
     def validate_batch(self, content_list: List[Dict[str, Any]], context: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -8,9 +8,12 @@ Motor de síntese de conteúdo que processa dados brutos em insights estruturado
 import logging
 import re
 import json
+import threading
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from collections import Counter
+from services.relevance_ranker import relevance_ranker
+from services.near_duplicate_index import near_duplicate_detector
 
 logger = logging.getLogger(__name__)
 
@@ -111,17 +114,24 @@ class ContentSynthesisEngine:
             'temporal_data': self._extract_temporal_data
         }
     
+    def create_content_stream(self) -> 'ContentSynthesisStream':
+        """Cria acumulador incremental para fontes que chegam em paralelo"""
+        return ContentSynthesisStream(self)
+    
     def synthesize_research_content(
         self, 
         raw_content_list: List[Dict[str, Any]], 
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        combined_content: Optional[str] = None
     ) -> Dict[str, Any]:
         """Sintetiza conteúdo bruto em insights estruturados"""
         
         logger.info(f"🔄 Sintetizando {len(raw_content_list)} fontes de conteúdo")
         
-        # Combina todo o conteúdo
-        combined_content = self._combine_content_sources(raw_content_list)
+        # Combina todo o conteúdo (ou reaproveita o combinado pelo stream, já sem duplicatas)
+        if combined_content is None:
+            raw_content_list, _ = near_duplicate_detector.deduplicate(raw_content_list)
+            combined_content = self._combine_content_sources(raw_content_list)
         
         # Extrai dados estruturados
         structured_data = self._extract_structured_data(combined_content, context)
@@ -158,19 +168,28 @@ class ContentSynthesisEngine:
         combined = ""
         
         for i, content_item in enumerate(content_list, 1):
-            if content_item.get('success') and content_item.get('content'):
-                content = content_item['content']
-                title = content_item.get('title', f'Fonte {i}')
-                url = content_item.get('url', '')
-                
-                # Adiciona cabeçalho da fonte (sem URL completa)
-                domain = self._extract_domain(url) if url else 'fonte_desconhecida'
-                combined += f"\n=== FONTE {i}: {title} ({domain}) ===\n"
-                combined += content[:2000]  # Limita tamanho por fonte
-                combined += "\n\n"
+            combined += self._format_content_source(i, content_item)
         
         return combined
     
+    def _format_content_source(self, index: int, content_item: Dict[str, Any]) -> str:
+        """Formata uma única fonte para o conteúdo combinado"""
+        
+        if not (content_item.get('success') and content_item.get('content')):
+            return ""
+        
+        content = content_item['content']
+        title = content_item.get('title', f'Fonte {index}')
+        url = content_item.get('url', '')
+        
+        # Adiciona cabeçalho da fonte (sem URL completa)
+        domain = self._extract_domain(url) if url else 'fonte_desconhecida'
+        block = f"\n=== FONTE {index}: {title} ({domain}) ===\n"
+        block += content[:2000]  # Limita tamanho por fonte
+        block += "\n\n"
+        
+        return block
+    
     def _extract_structured_data(self, content: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Extrai dados estruturados do conteúdo"""
         
@@ -645,5 +664,66 @@ class ContentSynthesisEngine:
         
         return '\n'.join(summary)
 
+class ContentSynthesisStream:
+    """Acumula fontes à medida que chegam e sintetiza ao final"""
+    
+    def __init__(self, engine: ContentSynthesisEngine):
+        self.engine = engine
+        self.sources: List[Dict[str, Any]] = []
+        self.duplicates: List[Dict[str, Any]] = []
+        self._blocks: List[str] = []
+        self._index = near_duplicate_detector.create_index()
+        self._lock = threading.Lock()
+    
+    def add(self, content_item: Dict[str, Any]) -> int:
+        """
+        Adiciona uma fonte já extraída e retorna o total acumulado. Fontes
+        quase idênticas a uma já recebida ficam em `duplicates` e não
+        entram na síntese.
+        """
+        original = near_duplicate_detector.check(
+            self._index, content_item.get('url') or f'fonte_{id(content_item)}', content_item.get('content') or ''
+        )
+        
+        with self._lock:
+            if original is not None:
+                content_item['duplicate_of'] = original
+                self.duplicates.append(content_item)
+                return len(self.sources)
+            
+            self.sources.append(content_item)
+            self._blocks.append(
+                self.engine._format_content_source(len(self.sources), content_item)
+            )
+            return len(self.sources)
+    
+    def __len__(self) -> int:
+        return len(self.sources)
+    
+    def synthesize(
+        self,
+        context: Dict[str, Any],
+        query: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa a síntese sobre o conteúdo acumulado. Com `top_k`, sintetiza
+        só as fontes mais relevantes para a query segundo o ranking BM25.
+        """
+        with self._lock:
+            sources = list(self.sources)
+            combined = "".join(self._blocks)
+        
+        if top_k and len(sources) > top_k:
+            sources = relevance_ranker.rank(sources, query or '', context, top_k=top_k)
+            combined = "".join(
+                self.engine._format_content_source(index, item)
+                for index, item in enumerate(sources, 1)
+            )
+        
+        return self.engine.synthesize_research_content(
+            sources, context, combined_content=combined
+        )
+
 # Instância global
 content_synthesis_engine = ContentSynthesisEngine()
\ No newline at end of file
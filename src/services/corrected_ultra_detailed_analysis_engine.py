@@ -334,7 +334,11 @@ class CorrectedUltraDetailedAnalysisEngine:
         logger.info("🤖 Executando análise rigorosa com IA...")
         
         # Executa com IA
-        ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        ai_response = ai_manager.generate_analysis(
+            prompt,
+            max_tokens=8192,
+            validate=lambda text: bool(self._process_ai_response_ultra_strict(text, data))
+        )
         
         if not ai_response:
             raise Exception("IA NÃO RESPONDEU: Nenhum provedor de IA disponível")
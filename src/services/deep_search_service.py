@@ -8,13 +8,16 @@ Pesquisa avançada REAL na internet - SEM SIMULAÇÃO OU CACHE
 import os
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 import json
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
+from services.http_client import http_client
+from services.text_features import text_features
+from services.relevance_ranker import relevance_ranker
+from services.near_duplicate_index import near_duplicate_detector
 
 logger = logging.getLogger(__name__)
 
@@ -125,7 +128,7 @@ class DeepSearchService:
                 'sort': 'date'
             }
             
-            response = requests.get(
+            response = http_client.get(
                 self.google_search_url, 
                 params=params, 
                 headers=self.headers,
@@ -160,7 +163,7 @@ class DeepSearchService:
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(
+            response = http_client.get(
                 search_url,
                 headers=self.headers,
                 timeout=15
@@ -205,7 +208,7 @@ class DeepSearchService:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
+            response = http_client.get(
                 search_url,
                 headers=self.headers,
                 timeout=15
@@ -272,7 +275,7 @@ class DeepSearchService:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = http_client.get(
                 jina_url,
                 headers=headers,
                 timeout=30
@@ -298,7 +301,7 @@ class DeepSearchService:
         """Extração REAL direta usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=20,
@@ -358,7 +361,8 @@ class DeepSearchService:
         if not content or len(content) < 100:
             return 0.0
         
-        content_lower = content.lower()
+        # Frequências calculadas uma vez por conteúdo (e reaproveitadas entre chamadas)
+        features = text_features.extract(content)
         query_lower = query.lower()
         
         score = 0.0
@@ -366,7 +370,7 @@ class DeepSearchService:
         # Score baseado na query (peso alto)
         query_words = [w for w in query_lower.split() if len(w) > 2]
         for word in query_words:
-            occurrences = content_lower.count(word)
+            occurrences = features.count_term(word)
             score += occurrences * 3.0  # Peso aumentado
         
         # Score baseado no contexto
@@ -383,7 +387,7 @@ class DeepSearchService:
         
         for term in context_terms:
             if term and len(term) > 2:
-                occurrences = content_lower.count(term)
+                occurrences = features.count_term(term)
                 score += occurrences * 2.0
         
         # Bonus para termos de mercado específicos REAIS
@@ -395,23 +399,21 @@ class DeepSearchService:
         ]
         
         for term in market_terms:
-            occurrences = content_lower.count(term)
+            occurrences = features.count_term(term)
             score += occurrences * 1.0
         
         # Bonus por densidade de informação REAL
-        word_count = len(content.split())
+        word_count = features.word_count
         if word_count > 1000:
             score += 5.0
         elif word_count > 500:
             score += 3.0
         
         # Bonus por presença de números/percentuais REAIS
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        score += len(numbers) * 0.5
+        score += features.number_count * 0.5
         
         # Bonus por presença de valores monetários REAIS
-        money_values = re.findall(r'R\$\s*[\d,\.]+', content)
-        score += len(money_values) * 1.0
+        score += features.money_value_count * 1.0
         
         # Normaliza score baseado no tamanho do conteúdo
         normalized_score = score / (len(content) / 1000 + 1)
@@ -451,8 +453,9 @@ class DeepSearchService:
         if not content_results:
             return self._generate_real_emergency_search(query, context)
         
-        # Ordena por relevância REAL
-        content_results.sort(key=lambda x: x["relevance_score"], reverse=True)
+        # Colapsa páginas espelhadas e ranqueia o restante de uma vez (BM25), mantendo as 10 mais relevantes
+        content_results, _ = near_duplicate_detector.deduplicate(content_results)
+        content_results = relevance_ranker.rank(content_results, query, context, top_k=10)
         
         # Combina conteúdo das páginas mais relevantes
         combined_content = f"PESQUISA PROFUNDA REAL PARA: {query}\n\n"
@@ -463,7 +466,7 @@ class DeepSearchService:
         trends = []
         opportunities = []
         
-        for i, result in enumerate(content_results[:10]):  # Top 10 páginas
+        for i, result in enumerate(content_results):
             combined_content += f"--- FONTE REAL {i+1}: {result['title']} ---\n"
             combined_content += f"URL: {result['url']}\n"
             combined_content += f"Relevância: {result['relevance_score']:.2f}\n"
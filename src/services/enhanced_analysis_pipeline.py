@@ -5,6 +5,7 @@ ARQV30 Enhanced v2.0 - Enhanced Analysis Pipeline
 Pipeline de análise aprimorado com Gemini 2.5 Pro e fallback Groq
 """
 
+import os
 import time
 import logging
 import json
@@ -14,6 +15,10 @@ from services.ai_manager import ai_manager
 from services.production_search_manager import production_search_manager
 from services.robust_content_extractor import robust_content_extractor
 from services.content_synthesis_engine import content_synthesis_engine
+from services.relevance_ranker import relevance_ranker
+from services.prompt_packer import prompt_packer
+from services.parallel_research_executor import parallel_research_executor
+from services.parallel_component_executor import ParallelComponentExecutor, ComponentTask
 from services.mental_drivers_architect import mental_drivers_architect
 from services.visual_proofs_generator import visual_proofs_generator
 from services.anti_objection_system import anti_objection_system
@@ -21,6 +26,7 @@ from services.enhanced_pre_pitch_architect import enhanced_pre_pitch_architect
 from services.future_prediction_engine import future_prediction_engine
 from services.local_file_manager import local_file_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.progress_bus import progress_bus
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +46,9 @@ class EnhancedAnalysisPipeline:
             'min_avatar_depth': 10
         }
         
+        # Timeout por componente avançado na fase 3
+        self.component_timeout = int(os.getenv('COMPONENT_TIMEOUT_SECONDS', 300))
+        
         self.consolidation_rules = {
             'remove_raw_data': True,
             'enhance_insights': True,
@@ -122,43 +131,31 @@ class EnhancedAnalysisPipeline:
         # Gera queries inteligentes expandidas
         queries = self._generate_intelligent_queries(data)
         
-        # Executa busca multi-fonte
-        all_results = []
-        extracted_content = []
+        # Executa busca multi-fonte em paralelo, alimentando a síntese conforme chegam
+        content_stream = content_synthesis_engine.create_content_stream()
+        
+        research_run = parallel_research_executor.execute(
+            queries,
+            search_func=lambda query: production_search_manager.search_with_fallback(query, max_results=12),
+            extract_func=robust_content_extractor.extract_content,
+            on_content=content_stream.add,
+            urls_per_query=8,
+            min_content_length=500,
+            progress_callback=progress_callback
+        )
         
-        for i, query in enumerate(queries):
-            if progress_callback:
-                progress_callback(1, f"🔍 Pesquisando: {query[:50]}...", f"Query {i+1}/{len(queries)}")
-            
-            try:
-                # Busca com múltiplos provedores
-                search_results = production_search_manager.search_with_fallback(query, max_results=12)
-                all_results.extend(search_results)
-                
-                # Extrai conteúdo com validação
-                for result in search_results[:8]:
-                    content = robust_content_extractor.extract_content(result['url'])
-                    if content and len(content) > 500:
-                        extracted_content.append({
-                            'url': result['url'],
-                            'title': result.get('title', ''),
-                            'content': content,
-                            'query': query,
-                            'source': result.get('source', 'unknown')
-                        })
-                
-                time.sleep(0.5)  # Rate limiting
-                
-            except Exception as e:
-                logger.warning(f"⚠️ Erro na query '{query}': {e}")
-                continue
+        all_results = research_run['all_results']
+        extracted_content = content_stream.sources
         
         # Síntese inteligente do conteúdo
         if progress_callback:
             progress_callback(2, "🧠 Sintetizando conteúdo extraído...")
         
-        synthesis_result = content_synthesis_engine.synthesize_research_content(
-            extracted_content, data
+        # Só as páginas mais relevantes (BM25) seguem para a síntese
+        synthesis_result = content_stream.synthesize(
+            data,
+            query=data.get('query') or ' '.join(queries[:1]),
+            top_k=relevance_ranker.default_top_k
         )
         
         # Salva dados de pesquisa (sem conteúdo bruto)
@@ -172,7 +169,11 @@ class EnhancedAnalysisPipeline:
                 'successful_extractions': len(extracted_content),
                 'total_content_length': sum(len(c['content']) for c in extracted_content),
                 'unique_domains': len(set(c['url'].split('/')[2] for c in extracted_content)),
-                'avg_content_length': sum(len(c['content']) for c in extracted_content) / len(extracted_content) if extracted_content else 0
+                'avg_content_length': sum(len(c['content']) for c in extracted_content) / len(extracted_content) if extracted_content else 0,
+                'failed_queries': research_run['statistics']['queries_failed'],
+                'duplicates_skipped': research_run['statistics']['duplicates_skipped'],
+                'duplicates_collapsed': len(content_stream.duplicates),
+                'deadline_reached': research_run['statistics']['deadline_reached']
             }
         }
         
@@ -191,20 +192,19 @@ class EnhancedAnalysisPipeline:
         
         logger.info("🧠 Executando análise com IA avançada")
         
-        # Prepara contexto de síntese
-        synthesis_context = self._prepare_synthesis_context(research_data)
-        
-        # Constrói prompt ultra-avançado
-        prompt = self._build_advanced_analysis_prompt(data, synthesis_context)
+        # Constrói prompt ultra-avançado dentro do orçamento de tokens do Gemini
+        prompt = self._build_packed_analysis_prompt(data, research_data, 'gemini')
         
         # Tenta Gemini 2.5 Pro primeiro
         try:
             logger.info("🚀 Tentando análise com Gemini 2.5 Pro...")
             
-            ai_response = ai_manager.generate_analysis(
+            ai_response = ai_manager.stream_analysis(
                 prompt, 
                 max_tokens=8192,
-                provider='gemini'  # Força uso do Gemini
+                provider='gemini',  # Força uso do Gemini
+                on_section=lambda section, content: self._save_partial_section(section, content, data.get('session_id')),
+                validate=lambda text: bool(self._process_advanced_ai_response(text, data, 'gemini'))
             )
             
             if ai_response:
@@ -221,10 +221,15 @@ class EnhancedAnalysisPipeline:
             try:
                 logger.info("🔄 Fallback para Groq...")
                 
-                ai_response = ai_manager.generate_analysis(
+                # Reempacota o contexto para a janela do Groq
+                prompt = self._build_packed_analysis_prompt(data, research_data, 'groq')
+                
+                ai_response = ai_manager.stream_analysis(
                     prompt,
                     max_tokens=8192,
-                    provider='groq'  # Força uso do Groq
+                    provider='groq',  # Força uso do Groq
+                    on_section=lambda section, content: self._save_partial_section(section, content, data.get('session_id')),
+                    validate=lambda text: bool(self._process_advanced_ai_response(text, data, 'groq'))
                 )
                 
                 if ai_response:
@@ -244,113 +249,201 @@ class EnhancedAnalysisPipeline:
         data: Dict[str, Any],
         progress_callback: Optional[Callable] = None
     ) -> Dict[str, Any]:
-        """Gera componentes avançados ultra-robustos"""
+        """Gera componentes avançados ultra-robustos (independentes em paralelo)"""
         
-        components = {}
+        avatar_data = core_analysis.get('avatar_ultra_detalhado', {})
         
-        # Drivers Mentais Ultra-Robustos
-        if progress_callback:
-            progress_callback(6, "🧠 Gerando drivers mentais ultra-robustos...")
+        def _cancelled(name: str, cancel_event) -> bool:
+            """Componente que estourou o timeout para de trabalhar e não salva nada"""
+            if cancel_event.is_set():
+                logger.warning(f"⏹️ Componente {name} cancelado: resultado descartado")
+                return True
+            return False
         
-        try:
-            avatar_data = core_analysis.get('avatar_ultra_detalhado', {})
-            drivers_system = mental_drivers_architect.generate_complete_drivers_system(
-                avatar_data, data
-            )
-            
-            if drivers_system and not drivers_system.get('fallback_mode'):
-                # Aprimora drivers com análise adicional
-                enhanced_drivers = self._enhance_mental_drivers(drivers_system, core_analysis)
-                components['drivers_mentais_customizados'] = enhanced_drivers
-                salvar_etapa("drivers_ultra_robustos", enhanced_drivers, categoria="drivers_mentais")
-                logger.info("✅ Drivers mentais ultra-robustos gerados")
+        # Drivers Mentais Ultra-Robustos
+        def _drivers(deps, cancel_event):
+            try:
+                drivers_system = mental_drivers_architect.generate_complete_drivers_system(
+                    avatar_data, data
+                )
+                if _cancelled('drivers_mentais_customizados', cancel_event):
+                    return None
+                
+                if drivers_system and not drivers_system.get('fallback_mode'):
+                    # Aprimora drivers com análise adicional
+                    enhanced_drivers = self._enhance_mental_drivers(drivers_system, core_analysis)
+                    if _cancelled('drivers_mentais_customizados', cancel_event):
+                        return None
+                    salvar_etapa("drivers_ultra_robustos", enhanced_drivers, categoria="drivers_mentais")
+                    logger.info("✅ Drivers mentais ultra-robustos gerados")
+                    return enhanced_drivers
+                
+            except Exception as e:
+                logger.error(f"❌ Erro nos drivers mentais: {e}")
+                if not cancel_event.is_set():
+                    salvar_erro("drivers_mentais", e)
             
-        except Exception as e:
-            logger.error(f"❌ Erro nos drivers mentais: {e}")
-            salvar_erro("drivers_mentais", e)
+            return None
         
         # Provas Visuais Inovadoras
-        if progress_callback:
-            progress_callback(7, "🎭 Criando provas visuais inovadoras...")
-        
-        try:
-            concepts = self._extract_proof_concepts(core_analysis, data)
-            visual_proofs = visual_proofs_generator.generate_complete_proofs_system(
-                concepts, avatar_data, data
-            )
-            
-            if visual_proofs:
-                # Aprimora provas com elementos inovadores
-                enhanced_proofs = self._enhance_visual_proofs(visual_proofs, core_analysis)
-                components['provas_visuais_inovadoras'] = enhanced_proofs
-                salvar_etapa("provas_inovadoras", enhanced_proofs, categoria="provas_visuais")
-                logger.info("✅ Provas visuais inovadoras criadas")
+        def _visual_proofs(deps, cancel_event):
+            try:
+                concepts = self._extract_proof_concepts(core_analysis, data)
+                if _cancelled('provas_visuais_inovadoras', cancel_event):
+                    return None
+                visual_proofs = visual_proofs_generator.generate_complete_proofs_system(
+                    concepts, avatar_data, data
+                )
+                if _cancelled('provas_visuais_inovadoras', cancel_event):
+                    return None
+                
+                if visual_proofs:
+                    # Aprimora provas com elementos inovadores
+                    enhanced_proofs = self._enhance_visual_proofs(visual_proofs, core_analysis)
+                    if _cancelled('provas_visuais_inovadoras', cancel_event):
+                        return None
+                    salvar_etapa("provas_inovadoras", enhanced_proofs, categoria="provas_visuais")
+                    logger.info("✅ Provas visuais inovadoras criadas")
+                    return enhanced_proofs
+                
+            except Exception as e:
+                logger.error(f"❌ Erro nas provas visuais: {e}")
+                if not cancel_event.is_set():
+                    salvar_erro("provas_visuais", e)
             
-        except Exception as e:
-            logger.error(f"❌ Erro nas provas visuais: {e}")
-            salvar_erro("provas_visuais", e)
+            return None
         
         # Sistema Anti-Objeção Avançado
-        if progress_callback:
-            progress_callback(8, "🛡️ Construindo sistema anti-objeção avançado...")
-        
-        try:
-            objections = avatar_data.get('objecoes_reais', [])
-            if not objections:
-                objections = self._generate_intelligent_objections(core_analysis, data)
-            
-            anti_objection = anti_objection_system.generate_complete_anti_objection_system(
-                objections, avatar_data, data
-            )
-            
-            if anti_objection and not anti_objection.get('fallback_mode'):
-                # Aprimora sistema com técnicas avançadas
-                enhanced_anti_objection = self._enhance_anti_objection_system(anti_objection, core_analysis)
-                components['sistema_anti_objecao_avancado'] = enhanced_anti_objection
-                salvar_etapa("anti_objecao_avancado", enhanced_anti_objection, categoria="anti_objecao")
-                logger.info("✅ Sistema anti-objeção avançado construído")
+        def _anti_objection(deps, cancel_event):
+            try:
+                objections = avatar_data.get('objecoes_reais', [])
+                if not objections:
+                    objections = self._generate_intelligent_objections(core_analysis, data)
+                if _cancelled('sistema_anti_objecao_avancado', cancel_event):
+                    return None
+                
+                anti_objection = anti_objection_system.generate_complete_anti_objection_system(
+                    objections, avatar_data, data
+                )
+                if _cancelled('sistema_anti_objecao_avancado', cancel_event):
+                    return None
+                
+                if anti_objection and not anti_objection.get('fallback_mode'):
+                    # Aprimora sistema com técnicas avançadas
+                    enhanced_anti_objection = self._enhance_anti_objection_system(anti_objection, core_analysis)
+                    if _cancelled('sistema_anti_objecao_avancado', cancel_event):
+                        return None
+                    salvar_etapa("anti_objecao_avancado", enhanced_anti_objection, categoria="anti_objecao")
+                    logger.info("✅ Sistema anti-objeção avançado construído")
+                    return enhanced_anti_objection
+                
+            except Exception as e:
+                logger.error(f"❌ Erro no sistema anti-objeção: {e}")
+                if not cancel_event.is_set():
+                    salvar_erro("anti_objecao", e)
             
-        except Exception as e:
-            logger.error(f"❌ Erro no sistema anti-objeção: {e}")
-            salvar_erro("anti_objecao", e)
-        
-        # Pré-Pitch Revolucionário
-        if progress_callback:
-            progress_callback(9, "🎯 Arquitetando pré-pitch revolucionário...")
+            return None
         
-        try:
-            drivers_data = components.get('drivers_mentais_customizados', {})
-            pre_pitch = enhanced_pre_pitch_architect.generate_enhanced_pre_pitch_system(
-                drivers_data, avatar_data, data
-            )
-            
-            if pre_pitch and pre_pitch.get('validacao_status') == 'ENHANCED_VALID':
-                # Adiciona elementos revolucionários
-                revolutionary_pre_pitch = self._create_revolutionary_pre_pitch(pre_pitch, core_analysis)
-                components['pre_pitch_revolucionario'] = revolutionary_pre_pitch
-                salvar_etapa("pre_pitch_revolucionario", revolutionary_pre_pitch, categoria="pre_pitch")
-                logger.info("✅ Pré-pitch revolucionário arquitetado")
+        # Pré-Pitch Revolucionário (único que depende dos drivers)
+        def _pre_pitch(deps, cancel_event):
+            try:
+                if _cancelled('pre_pitch_revolucionario', cancel_event):
+                    return None
+                drivers_data = deps.get('drivers_mentais_customizados') or {}
+                pre_pitch = enhanced_pre_pitch_architect.generate_enhanced_pre_pitch_system(
+                    drivers_data, avatar_data, data
+                )
+                if _cancelled('pre_pitch_revolucionario', cancel_event):
+                    return None
+                
+                if pre_pitch and pre_pitch.get('validacao_status') == 'ENHANCED_VALID':
+                    # Adiciona elementos revolucionários
+                    revolutionary_pre_pitch = self._create_revolutionary_pre_pitch(pre_pitch, core_analysis)
+                    if _cancelled('pre_pitch_revolucionario', cancel_event):
+                        return None
+                    salvar_etapa("pre_pitch_revolucionario", revolutionary_pre_pitch, categoria="pre_pitch")
+                    logger.info("✅ Pré-pitch revolucionário arquitetado")
+                    return revolutionary_pre_pitch
+                
+            except Exception as e:
+                logger.error(f"❌ Erro no pré-pitch: {e}")
+                if not cancel_event.is_set():
+                    salvar_erro("pre_pitch", e)
             
-        except Exception as e:
-            logger.error(f"❌ Erro no pré-pitch: {e}")
-            salvar_erro("pre_pitch", e)
+            return None
         
         # Predições Futuras Avançadas
-        try:
-            future_predictions = future_prediction_engine.predict_market_future(
-                data.get('segmento', 'negócios'), data, horizon_months=48
-            )
-            
-            if future_predictions:
-                # Aprimora predições com análise de cenários
-                enhanced_predictions = self._enhance_future_predictions(future_predictions, core_analysis)
-                components['predicoes_futuro_avancadas'] = enhanced_predictions
-                salvar_etapa("predicoes_avancadas", enhanced_predictions, categoria="predicoes_futuro")
-                logger.info("✅ Predições futuras avançadas geradas")
+        def _future_predictions(deps, cancel_event):
+            try:
+                future_predictions = future_prediction_engine.predict_market_future(
+                    data.get('segmento', 'negócios'), data, horizon_months=48
+                )
+                if _cancelled('predicoes_futuro_avancadas', cancel_event):
+                    return None
+                
+                if future_predictions:
+                    # Aprimora predições com análise de cenários
+                    enhanced_predictions = self._enhance_future_predictions(future_predictions, core_analysis)
+                    if _cancelled('predicoes_futuro_avancadas', cancel_event):
+                        return None
+                    salvar_etapa("predicoes_avancadas", enhanced_predictions, categoria="predicoes_futuro")
+                    logger.info("✅ Predições futuras avançadas geradas")
+                    return enhanced_predictions
+                
+            except Exception as e:
+                logger.error(f"❌ Erro nas predições: {e}")
+                if not cancel_event.is_set():
+                    salvar_erro("predicoes_futuro", e)
             
-        except Exception as e:
-            logger.error(f"❌ Erro nas predições: {e}")
-            salvar_erro("predicoes_futuro", e)
+            return None
+        
+        timeout = self.component_timeout
+        tasks = [
+            ComponentTask('drivers_mentais_customizados', _drivers, timeout=timeout),
+            ComponentTask('provas_visuais_inovadoras', _visual_proofs, timeout=timeout),
+            ComponentTask('sistema_anti_objecao_avancado', _anti_objection, timeout=timeout),
+            ComponentTask(
+                'pre_pitch_revolucionario', _pre_pitch,
+                dependencies=['drivers_mentais_customizados'],
+                timeout=timeout,
+                require_dependencies=False
+            ),
+            ComponentTask('predicoes_futuro_avancadas', _future_predictions, timeout=timeout)
+        ]
+        
+        progress_messages = {
+            'drivers_mentais_customizados': (6, "🧠 Gerando drivers mentais ultra-robustos..."),
+            'provas_visuais_inovadoras': (7, "🎭 Criando provas visuais inovadoras..."),
+            'sistema_anti_objecao_avancado': (8, "🛡️ Construindo sistema anti-objeção avançado..."),
+            'pre_pitch_revolucionario': (9, "🎯 Arquitetando pré-pitch revolucionário...")
+        }
+        
+        def _on_start(name: str):
+            if progress_callback and name in progress_messages:
+                progress_callback(*progress_messages[name])
+        
+        def _on_finish(name: str, status: str):
+            if status == 'timeout':
+                salvar_erro(name, TimeoutError(f"Componente {name} excedeu {timeout}s"))
+        
+        execution = ParallelComponentExecutor(default_timeout=timeout).run(
+            tasks, on_start=_on_start, on_finish=_on_finish
+        )
+        
+        # Mantém a ordem original das chaves no resultado
+        components = {}
+        for task in tasks:
+            result = execution['results'].get(task.name)
+            if result:
+                components[task.name] = result
+        
+        sequential_time = sum(
+            t['end'] - t['start'] for t in execution['timings'].values() if 'start' in t and 'end' in t
+        )
+        logger.info(
+            f"⚡ {len(components)}/{len(tasks)} componentes gerados em {execution['wall_time']:.1f}s "
+            f"(sequencial seria {sequential_time:.1f}s)"
+        )
         
         return components
     
@@ -481,57 +574,58 @@ class EnhancedAnalysisPipeline:
         
         return formats
     
-    def _prepare_synthesis_context(self, research_data: Dict[str, Any]) -> str:
-        """Prepara contexto de síntese para IA"""
+    def _save_partial_section(self, section: str, content: Any, session_id: Optional[str] = None):
+        """Salva cada seção da análise assim que o streaming da IA a fecha e a envia ao stream de progresso"""
+        logger.info(f"🧩 Seção recebida da IA: {section}")
+        salvar_etapa(f"analise_parcial_{section}", content, categoria="analise_completa")
+        progress_bus.publish_section(session_id, section, content)
+    
+    def _build_packed_analysis_prompt(self, data: Dict[str, Any], research_data: Dict[str, Any], provider: str) -> str:
+        """Constrói o prompt com o contexto de síntese limitado ao orçamento do provedor"""
+        
+        template = self._build_advanced_analysis_prompt(data, "")
+        budget = prompt_packer.budget_for(provider, template, max_output_tokens=8192)
+        
+        synthesis_context = self._prepare_synthesis_context(research_data, provider, budget)
+        prompt = self._build_advanced_analysis_prompt(data, synthesis_context)
+        
+        logger.info(f"📏 Prompt para {provider}: ~{prompt_packer.estimate_tokens(prompt, provider)} tokens")
+        return prompt
+    
+    def _prepare_synthesis_context(
+        self,
+        research_data: Dict[str, Any],
+        provider: Optional[str] = None,
+        budget_tokens: Optional[int] = None
+    ) -> str:
+        """Prepara contexto de síntese para IA, com os fatos de maior score que cabem no orçamento"""
         
         synthesis_result = research_data.get('synthesis_result', {})
         
         context = "SÍNTESE INTELIGENTE DE PESQUISA MASSIVA:\n\n"
         
-        # Dados estruturados
-        structured_data = synthesis_result.get('structured_data', {})
-        if structured_data:
-            context += "=== DADOS ESTRUTURADOS EXTRAÍDOS ===\n"
-            for data_type, data_content in structured_data.items():
-                context += f"{data_type.upper()}:\n"
-                if isinstance(data_content, dict):
-                    for key, values in data_content.items():
-                        if isinstance(values, list) and values:
-                            context += f"  {key}: {', '.join(str(v) for v in values[:5])}\n"
-                context += "\n"
-        
-        # Insights categorizados
-        insights = synthesis_result.get('categorized_insights', {})
-        priority_insights = insights.get('priority_insights', [])
-        if priority_insights:
-            context += "=== INSIGHTS PRIORITÁRIOS ===\n"
-            for i, insight in enumerate(priority_insights[:15], 1):
-                context += f"{i}. {insight}\n"
-            context += "\n"
-        
-        # Padrões identificados
-        patterns = synthesis_result.get('identified_patterns', {})
-        if patterns:
-            context += "=== PADRÕES IDENTIFICADOS ===\n"
-            
-            themes = patterns.get('recurring_themes', [])
-            if themes:
-                context += f"Temas recorrentes: {', '.join(themes[:10])}\n"
-            
-            data_patterns = patterns.get('data_patterns', [])
-            for pattern in data_patterns:
-                context += f"Padrão: {pattern}\n"
-            context += "\n"
-        
-        # Estatísticas da pesquisa
+        # Estatísticas da pesquisa (fixas, descontadas do orçamento)
         stats = research_data.get('statistics', {})
-        context += "=== ESTATÍSTICAS DA PESQUISA ===\n"
-        context += f"Fontes analisadas: {stats.get('successful_extractions', 0)}\n"
-        context += f"Conteúdo total: {stats.get('total_content_length', 0):,} caracteres\n"
-        context += f"Domínios únicos: {stats.get('unique_domains', 0)}\n"
-        context += f"Qualidade média: {stats.get('avg_content_length', 0):.0f} chars/fonte\n"
+        stats_block = "=== ESTATÍSTICAS DA PESQUISA ===\n"
+        stats_block += f"Fontes analisadas: {stats.get('successful_extractions', 0)}\n"
+        stats_block += f"Conteúdo total: {stats.get('total_content_length', 0):,} caracteres\n"
+        stats_block += f"Domínios únicos: {stats.get('unique_domains', 0)}\n"
+        stats_block += f"Qualidade média: {stats.get('avg_content_length', 0):.0f} chars/fonte\n"
+        
+        if budget_tokens is None:
+            budget_tokens = prompt_packer.budget_for(provider)
+        fixed_tokens = prompt_packer.estimate_tokens(context + stats_block, provider)
+        
+        packed = prompt_packer.pack(
+            prompt_packer.items_from_synthesis(synthesis_result),
+            provider=provider,
+            budget_tokens=max(0, budget_tokens - fixed_tokens)
+        )
+        
+        if packed.text:
+            context += packed.text + "\n"
         
-        return context
+        return context + stats_block
     
     def _build_advanced_analysis_prompt(self, data: Dict[str, Any], synthesis_context: str) -> str:
         """Constrói prompt ultra-avançado para IA"""
@@ -8,11 +8,11 @@ Serviço aprimorado de tendências com múltiplas fontes e fallbacks
 import os
 import logging
 import time
-import requests
 import random
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import json
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,7 @@ class EnhancedTrendsService:
     
     def __init__(self):
         """Inicializa o serviço de tendências"""
-        self.session = requests.Session()
+        self.session = http_client.create_session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -7,7 +7,7 @@ Cliente para interagir com a API da Groq, servindo como um provedor de IA de alt
 import os
 import logging
 import time
-from typing import Optional
+from typing import Optional, Iterator
 
 try:
     from groq import Groq
@@ -78,5 +78,35 @@ class GroqClient:
             logger.error(f"❌ Erro na chamada da API Groq: {e}", exc_info=True)
             raise
 
+    def stream(self, prompt: str, max_tokens: int = 8192) -> Iterator[str]:
+        """
+        Gera texto em streaming, entregando cada pedaço assim que chega.
+
+        Args:
+            prompt (str): O prompt para a geração de texto.
+            max_tokens (int): O número máximo de tokens a serem gerados.
+
+        Yields:
+            str: Pedaços do texto gerado.
+        """
+        if not self.is_enabled():
+            raise Exception("Cliente Groq não está habilitado ou configurado corretamente.")
+
+        stream = self.client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model="llama-3.3-70b-versatile",
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True,
+        )
+        for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+
 # Instância singleton
 groq_client = GroqClient()
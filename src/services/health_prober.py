@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Health Prober
+Verificações de saúde em segundo plano: extratores, provedores de busca e
+provedores de IA são testados periodicamente (com jitter) e o histórico de
+latência e sucesso fica em SQLite, lido por /api/health. /livez e /readyz só
+olham o estado local do processo
+"""
+
+import os
+import time
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Página fixa usada para testar os extratores de HTML sem acessar a rede
+PROBE_HTML = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="UTF-8"><title>Mercado digital no Brasil</title></head>
+<body>
+<nav><a href="/">Início</a> <a href="/economia">Economia</a></nav>
+<main>
+<article>
+<h1>Mercado digital no Brasil cresce com pequenas empresas</h1>
+<p>O mercado digital brasileiro segue em expansão impulsionado por pequenas e médias empresas que passaram a vender pela internet. Levantamentos do setor apontam crescimento consistente do comércio eletrônico nos últimos anos, com destaque para as regiões Nordeste e Centro-Oeste.</p>
+<p>Especialistas explicam que a adoção de meios de pagamento instantâneos reduziu custos e ampliou o acesso de novos consumidores. Ao mesmo tempo, a concorrência exige investimento em atendimento, logística e presença nas redes sociais para manter a margem de lucro.</p>
+<p>Para os próximos anos, a expectativa é de que o segmento de serviços digitais, como cursos online e consultorias, ganhe participação relevante no faturamento total do setor.</p>
+</article>
+</main>
+<footer>Todos os direitos reservados</footer>
+</body>
+</html>"""
+
+# Extratores de HTML testados com a página fixa (nome nas estatísticas -> método)
+HTML_EXTRACTORS = {
+    'trafilatura': '_extract_with_trafilatura',
+    'readability': '_extract_with_readability',
+    'newspaper': '_extract_with_newspaper',
+    'beautifulsoup': '_extract_with_beautifulsoup'
+}
+
+
+class SQLiteHealthStore:
+    """Agenda e histórico das verificações em SQLite (WAL), compartilhados entre workers"""
+    
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS health_checks (
+                    name TEXT PRIMARY KEY,
+                    check_group TEXT NOT NULL,
+                    interval REAL NOT NULL,
+                    next_run_at REAL NOT NULL,
+                    registered_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS health_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    success INTEGER NOT NULL,
+                    latency REAL NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_health_results_name ON health_results(name, id)")
+    
+    def register(self, checks: Dict[str, Dict[str, Any]], first_run_at: Dict[str, float]):
+        """Registra as verificações atuais e remove as que deixaram de existir"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name, check in checks.items():
+                    # Mantém o agendamento existente: outro worker pode já ter registrado
+                    conn.execute(
+                        "INSERT OR IGNORE INTO health_checks (name, check_group, interval, next_run_at, registered_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (name, check['group'], check['interval'], first_run_at[name], now)
+                    )
+                    conn.execute(
+                        "UPDATE health_checks SET check_group = ?, interval = ? WHERE name = ?",
+                        (check['group'], check['interval'], name)
+                    )
+                
+                placeholders = ','.join('?' for _ in checks) or "''"
+                conn.execute(f"DELETE FROM health_checks WHERE name NOT IN ({placeholders})", tuple(checks))
+                conn.execute(f"DELETE FROM health_results WHERE name NOT IN ({placeholders})", tuple(checks))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def claim(self, name: str, now: float, next_run_at: float) -> bool:
+        """Reserva a execução da verificação vencida; só um worker consegue por rodada"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE health_checks SET next_run_at = ? WHERE name = ? AND next_run_at <= ?",
+                (next_run_at, name, now)
+            )
+            return cursor.rowcount == 1
+    
+    def record(self, name: str, success: bool, latency: float, error: Optional[str], keep: int):
+        """Grava o resultado e descarta o histórico além dos `keep` mais recentes"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO health_results (name, success, latency, error, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (name, 1 if success else 0, latency, error, time.time())
+                )
+                conn.execute(
+                    "DELETE FROM health_results WHERE name = ? AND id NOT IN "
+                    "(SELECT id FROM health_results WHERE name = ? ORDER BY id DESC LIMIT ?)",
+                    (name, name, keep)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def ping(self):
+        with closing(self._connect()) as conn:
+            conn.execute("SELECT 1 FROM health_checks LIMIT 1").fetchall()
+    
+    def list_checks(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM health_checks ORDER BY check_group, name").fetchall()
+        return [
+            {'name': row['name'], 'group': row['check_group'], 'interval': row['interval'], 'next_run_at': row['next_run_at']}
+            for row in rows
+        ]
+    
+    def history(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Histórico de todas as verificações, do mais recente para o mais antigo"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT name, success, latency, error, created_at FROM health_results ORDER BY id DESC"
+            ).fetchall()
+        
+        history: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            history.setdefault(row['name'], []).append({
+                'success': bool(row['success']),
+                'latency': row['latency'],
+                'error': row['error'],
+                'timestamp': row['created_at']
+            })
+        return history
+
+
+class HealthProber:
+    """Executa as verificações em uma thread por processo e resume o estado salvo"""
+    
+    def __init__(self):
+        """Inicializa prober"""
+        self.enabled = os.getenv('HEALTH_PROBER_ENABLED', 'true').lower() == 'true'
+        self.intervals = {
+            'extractor': float(os.getenv('HEALTH_PROBE_EXTRACTOR_INTERVAL', 300)),
+            'search': float(os.getenv('HEALTH_PROBE_SEARCH_INTERVAL', 21600)),
+            'ai': float(os.getenv('HEALTH_PROBE_AI_INTERVAL', 21600))
+        }
+        self.jitter = float(os.getenv('HEALTH_PROBE_JITTER', 0.2))
+        self.timeout = float(os.getenv('HEALTH_PROBE_TIMEOUT', 30))
+        self.tick = float(os.getenv('HEALTH_PROBE_TICK', 5))
+        self.max_workers = int(os.getenv('HEALTH_PROBE_MAX_WORKERS', 6))
+        self.initial_spread = float(os.getenv('HEALTH_PROBE_INITIAL_SPREAD', 10))
+        self.history_size = int(os.getenv('HEALTH_PROBE_HISTORY', 50))
+        # Resultado mais antigo que `stale_factor` intervalos não conta como saudável
+        self.stale_factor = float(os.getenv('HEALTH_PROBE_STALE_FACTOR', 3))
+        self.probe_url = os.getenv('HEALTH_PROBE_URL', 'https://g1.globo.com/')
+        self.search_query = os.getenv('HEALTH_PROBE_SEARCH_QUERY', 'teste mercado digital Brasil')
+        # Buscas e chamadas de IA são pagas (a cota gratuita do Google CSE é de
+        # 100 consultas por dia): só são testadas quando habilitadas
+        self.search_probe_enabled = os.getenv('HEALTH_PROBE_SEARCH_ENABLED', 'false').lower() == 'true'
+        self.ai_probe_enabled = os.getenv('HEALTH_PROBE_AI_ENABLED', 'false').lower() == 'true'
+        
+        self.store = SQLiteHealthStore(os.getenv('HEALTH_PROBE_DB', 'relatorios_intermediarios/health_probes.db'))
+        self.started_at = time.time()
+        
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        # nome -> (future, início, se o timeout já foi registrado)
+        self._inflight: Dict[str, Tuple[Future, float, bool]] = {}
+        
+        # Thread criada sob demanda em cada processo (gunicorn usa preload_app)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+    
+    def ensure_started(self):
+        """Inicia a thread de verificações neste processo, se ainda não estiver rodando"""
+        if not self.enabled:
+            return
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            
+            self._stop = threading.Event()
+            self._inflight = {}
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='health_probe')
+            self._thread = threading.Thread(target=self._run, name='health_prober', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            logger.info(f"🩺 Health prober iniciado no processo {self._thread_pid}")
+    
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+    
+    def is_running(self) -> bool:
+        return (
+            self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive()
+        )
+    
+    def _run(self):
+        try:
+            self._discover_checks()
+        except Exception as e:
+            logger.error(f"❌ Falha ao montar verificações de saúde: {e}")
+        
+        while True:
+            try:
+                self._collect_results()
+                self._dispatch_due_checks()
+            except Exception as e:
+                logger.error(f"❌ Erro no ciclo do health prober: {e}")
+            if self._stop.wait(self.tick):
+                return
+    
+    def _next_delay(self, interval: float) -> float:
+        """Intervalo com jitter, para as verificações dos workers não baterem juntas"""
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+    
+    def _discover_checks(self):
+        """Monta as verificações a partir dos extratores e provedores configurados"""
+        checks: Dict[str, Dict[str, Any]] = {}
+        
+        def add(group: str, name: str, function: Callable[[], Any]):
+            checks[f"{group}:{name}"] = {'group': group, 'interval': self.intervals[group], 'function': function}
+        
+        from services.robust_content_extractor import robust_content_extractor
+        
+        if self.probe_url:
+            add('extractor', 'fetch', lambda: robust_content_extractor._fetch_html(self.probe_url))
+        
+        for name, method in HTML_EXTRACTORS.items():
+            if robust_content_extractor.stats.get(name, {}).get('available'):
+                extract = getattr(robust_content_extractor, method)
+                add('extractor', name, lambda extract=extract: extract(PROBE_HTML, 'https://health.probe/artigo'))
+        
+        # Extratores de navegador: só disponibilidade, sem abrir páginas a cada rodada
+        from services import robust_content_extractor as extractor_module
+        if extractor_module.HAS_PLAYWRIGHT_INTEGRATION:
+            add('extractor', 'playwright_dynamic', lambda: extractor_module.playwright_extractor.available)
+        if extractor_module.HAS_SELENIUM_INTEGRATION:
+            add('extractor', 'selenium_js', lambda: extractor_module.selenium_extractor.available)
+        
+        if self.search_probe_enabled:
+            from services.production_search_manager import production_search_manager
+            for name, provider in production_search_manager.providers.items():
+                if provider['enabled']:
+                    add('search', name, lambda name=name: production_search_manager._run_provider(name, self.search_query, 3))
+        
+        if self.ai_probe_enabled:
+            from services.ai_manager import ai_manager
+            for name, provider in ai_manager.providers.items():
+                if provider.get('client') is not None:
+                    add('ai', name, lambda name=name: ai_manager._call_provider(name, "Responda apenas: OK", 16))
+        
+        now = time.time()
+        # Primeira rodada logo após subir, espalhada para não disparar tudo junto
+        first_run_at = {name: now + random.uniform(0, self.initial_spread) for name in checks}
+        self.store.register(checks, first_run_at)
+        self.checks = checks
+        
+        logger.info(f"🩺 {len(checks)} verificações de saúde registradas: {', '.join(checks)}")
+    
+    def _dispatch_due_checks(self):
+        now = time.time()
+        for name, check in self.checks.items():
+            # Inclui verificações que estouraram o timeout e ainda ocupam uma
+            # thread: não há nova rodada até a anterior terminar
+            if name in self._inflight:
+                continue
+            if not self.store.claim(name, now, now + self._next_delay(check['interval'])):
+                continue
+            self._inflight[name] = (self._executor.submit(self._probe, check['function']), time.time(), False)
+    
+    def _probe(self, function: Callable[[], Any]) -> Tuple[bool, float, Optional[str]]:
+        """Executa a verificação medindo só a chamada (sem a espera do ciclo)"""
+        start_time = time.perf_counter()
+        try:
+            success = bool(function())
+            error = None if success else 'resultado vazio'
+        except Exception as e:
+            success, error = False, str(e)[:500]
+        return success, time.perf_counter() - start_time, error
+    
+    def _collect_results(self):
+        now = time.time()
+        for name, (future, started, timed_out) in list(self._inflight.items()):
+            if future.done():
+                del self._inflight[name]
+                if timed_out:
+                    # Falha já registrada; o resultado tardio é descartado
+                    continue
+                success, latency, error = future.result()
+            elif not timed_out and now - started > self.timeout:
+                # A chamada segue na thread do pool até terminar
+                self._inflight[name] = (future, started, True)
+                success, latency, error = False, now - started, f"timeout após {self.timeout:.0f}s"
+            else:
+                continue
+            
+            self.store.record(name, success, round(latency, 4), error, self.history_size)
+            if not success:
+                logger.warning(f"🩺 Verificação {name} falhou: {error}")
+    
+    def _summarize_check(self, check: Dict[str, Any], history: List[Dict[str, Any]], now: float) -> Dict[str, Any]:
+        latencies = sorted(result['latency'] for result in history if result['success'])
+        consecutive_failures = 0
+        for result in history:
+            if result['success']:
+                break
+            consecutive_failures += 1
+        
+        last = history[0] if history else None
+        stale = last is None or now - last['timestamp'] > check['interval'] * self.stale_factor
+        
+        return {
+            'group': check['group'],
+            'healthy': bool(last and last['success'] and not stale),
+            'stale': stale,
+            'last_success': last['success'] if last else None,
+            'last_checked': last['timestamp'] if last else None,
+            'last_error': next((result['error'] for result in history if not result['success']), None),
+            'last_latency': last['latency'] if last else None,
+            'consecutive_failures': consecutive_failures,
+            'success_rate': round(sum(1 for result in history if result['success']) / len(history) * 100, 1) if history else None,
+            'latency_p50': latencies[len(latencies) // 2] if latencies else None,
+            'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+            'samples': len(history),
+            'next_run_at': check['next_run_at']
+        }
+    
+    def get_summary(self, include_history: bool = False) -> Dict[str, Any]:
+        """Estado das verificações lido do armazenamento, sem executar nenhuma"""
+        now = time.time()
+        checks = self.store.list_checks()
+        history = self.store.history()
+        
+        summary = {}
+        for check in checks:
+            summary[check['name']] = self._summarize_check(check, history.get(check['name'], []), now)
+            if include_history:
+                summary[check['name']]['history'] = history.get(check['name'], [])
+        
+        groups = {}
+        for group in self.intervals:
+            group_checks = [item for item in summary.values() if item['group'] == group]
+            groups[group] = {
+                'total': len(group_checks),
+                'healthy': sum(1 for item in group_checks if item['healthy']),
+                'checked': sum(1 for item in group_checks if item['last_checked'] is not None)
+            }
+        
+        # Mesmos critérios do antigo /api/health, agora sobre resultados em cache
+        html_extractors = [
+            item for name, item in summary.items()
+            if item['group'] == 'extractor' and name != 'extractor:fetch'
+        ]
+        healthy_extractors = sum(1 for item in html_extractors if item['healthy'])
+        if not self.enabled:
+            status = 'unprobed'
+        elif not checks or not any(item['last_checked'] for item in summary.values()):
+            status = 'starting'
+        elif healthy_extractors == 0 or (groups['ai']['total'] and groups['ai']['healthy'] == 0):
+            status = 'critical'
+        elif healthy_extractors < 2 or (groups['search']['total'] and groups['search']['healthy'] == 0):
+            status = 'degraded'
+        else:
+            status = 'healthy'
+        
+        return {
+            'status': status,
+            'groups': groups,
+            'checks': summary,
+            'prober': {
+                'enabled': self.enabled,
+                'running': self.is_running(),
+                'pid': os.getpid(),
+                'intervals': self.intervals,
+                'jitter': self.jitter,
+                'search_probes': self.search_probe_enabled,
+                'ai_probes': self.ai_probe_enabled,
+                'stuck_probes': [name for name, (_, _, timed_out) in list(self._inflight.items()) if timed_out]
+            }
+        }
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """
+        Pronto para tráfego se os armazenamentos locais respondem. A saúde de
+        provedores externos fica em get_summary: uma queda de terceiros não
+        pode tirar todos os workers do balanceador.
+        """
+        from services.progress_bus import progress_bus
+        from services.analysis_job_queue import analysis_job_queue
+        
+        stores = {
+            'health_store': self.store.ping,
+            'progress_store': progress_bus.ping,
+            'job_queue': analysis_job_queue.ping
+        }
+        
+        checks = {}
+        for name, ping in stores.items():
+            try:
+                ping()
+                checks[name] = {'ok': True}
+            except Exception as e:
+                checks[name] = {'ok': False, 'error': str(e)[:500]}
+        
+        return {
+            'ready': all(check['ok'] for check in checks.values()),
+            'pid': os.getpid(),
+            'checks': checks
+        }
+    
+    def get_liveness(self) -> Dict[str, Any]:
+        """Só o processo: não consulta armazenamento nem serviços"""
+        return {
+            'status': 'alive',
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'prober_running': self.is_running()
+        }
+
+# Instância global
+health_prober = HealthProber()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - HTTP Client
+Transporte HTTP compartilhado pelo processo: pools de conexão por host com
+keep-alive, retry de conexão com backoff, cache de DNS opcional e limite de
+tamanho de resposta
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+class ResponseTooLargeError(requests.RequestException):
+    """Resposta excedeu o limite de bytes configurado"""
+    pass
+
+class CappedRetry(Retry):
+    """Retry que nunca espera mais que `max_retry_after` por um cabeçalho Retry-After"""
+    
+    max_retry_after = float(os.getenv('HTTP_MAX_RETRY_AFTER', 5))
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+class PooledSession(requests.Session):
+    """Session com cabeçalhos e cookies próprios sobre o transporte compartilhado"""
+    
+    def __init__(self, client: 'HttpClient', headers: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self._client = client
+        if headers:
+            self.headers.update(headers)
+    
+    def get_adapter(self, url: str) -> HTTPAdapter:
+        """Sempre usa o adapter (pool) do processo atual"""
+        return self._client.get_adapter(url)
+    
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Executa a requisição lendo o corpo em streaming. Com `stream=True`
+        a resposta é devolvida sem ler o corpo; caso contrário o corpo é
+        lido até `max_bytes` (padrão HTTP_MAX_RESPONSE_BYTES).
+        """
+        
+        max_bytes = kwargs.pop('max_bytes', self._client.max_response_bytes)
+        stream = kwargs.pop('stream', False)
+        kwargs.setdefault('timeout', self._client.default_timeout)
+        
+        try:
+            response = super().request(method, url, stream=True, **kwargs)
+        except requests.RequestException:
+            self._client._count('errors')
+            raise
+        
+        self._client._count('requests')
+        
+        if stream:
+            return response
+        
+        return self._client._read_body(response, max_bytes)
+
+class HttpClient:
+    """Transporte HTTP único por processo"""
+    
+    def __init__(self):
+        """Inicializa cliente HTTP compartilhado"""
+        self.pool_connections = int(os.getenv('HTTP_POOL_CONNECTIONS', 32))
+        self.pool_maxsize = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+        self.max_retries = int(os.getenv('HTTP_MAX_RETRIES', 2))
+        # Os chamadores já repetem em 429/5xx com a própria espera; o adapter só
+        # repete em status se configurado, para não multiplicar as tentativas
+        self.status_retries = int(os.getenv('HTTP_STATUS_RETRIES', 0))
+        self.backoff_factor = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.3))
+        self.default_timeout = float(os.getenv('HTTP_DEFAULT_TIMEOUT', 15))
+        self.max_response_bytes = int(os.getenv('HTTP_MAX_RESPONSE_BYTES', 10 * 1024 * 1024))
+        # Desligado por padrão: o cache substitui socket.getaddrinfo do processo
+        # inteiro, afetando também SDKs de LLM, supabase e redis
+        self.dns_cache_ttl = int(os.getenv('HTTP_DNS_CACHE_TTL', 0))
+        
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'bytes_received': 0,
+            'oversized_responses': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
+        self._stats_lock = threading.Lock()
+        
+        # Adapter e sessão padrão são criados sob demanda em cada processo (gunicorn usa preload_app)
+        self._adapter: Optional[HTTPAdapter] = None
+        self._session: Optional[PooledSession] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        
+        self._dns_cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self._dns_lock = threading.Lock()
+        self._original_getaddrinfo = socket.getaddrinfo
+        if self.dns_cache_ttl > 0:
+            socket.getaddrinfo = self._cached_getaddrinfo
+            logger.warning(f"⚠️ Cache de DNS ativo para todo o processo (TTL {self.dns_cache_ttl}s)")
+        
+        logger.info(
+            f"HTTP Client inicializado: {self.pool_connections} hosts x {self.pool_maxsize} conexões, "
+            f"{self.max_retries} retries de conexão, {self.status_retries} de status, "
+            f"DNS cache {self.dns_cache_ttl}s"
+        )
+    
+    def _ensure_process(self):
+        """Recria pool e sessão padrão após fork"""
+        if self._pid == os.getpid():
+            return
+        
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            
+            retry = CappedRetry(
+                total=self.max_retries,
+                connect=self.max_retries,
+                read=self.max_retries,
+                status=self.status_retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=(429, 500, 502, 503, 504) if self.status_retries > 0 else (),
+                allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            self._adapter = HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                max_retries=retry,
+                pool_block=False
+            )
+            self._session = PooledSession(self, {'User-Agent': DEFAULT_USER_AGENT})
+            # A sessão padrão é usada por todos os provedores, sites e threads:
+            # não guarda cookies, para que um site não receba os de outro
+            self._session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            self._pid = os.getpid()
+    
+    def get_adapter(self, url: str) -> HTTPAdapter:
+        """Adapter compartilhado para URLs http/https"""
+        scheme = urlparse(url).scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise requests.exceptions.InvalidSchema(f"Sem adapter para {url}")
+        
+        self._ensure_process()
+        return self._adapter
+    
+    def create_session(self, headers: Optional[Dict[str, str]] = None) -> PooledSession:
+        """Cria sessão com cabeçalhos e cookies próprios que reutiliza as conexões do processo"""
+        return PooledSession(self, headers)
+    
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Requisição pela sessão padrão do processo"""
+        self._ensure_process()
+        return self._session.request(method, url, **kwargs)
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+    
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+    
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+    
+    def _read_body(self, response: requests.Response, max_bytes: Optional[int]) -> requests.Response:
+        """Lê o corpo em blocos respeitando o limite de tamanho"""
+        
+        if max_bytes:
+            declared = response.headers.get('Content-Length', '')
+            if declared.isdigit() and int(declared) > max_bytes:
+                response.close()
+                self._count('oversized_responses')
+                raise ResponseTooLargeError(
+                    f"Resposta de {response.url} declara {declared} bytes (limite {max_bytes})",
+                    response=response
+                )
+        
+        chunks = []
+        received = 0
+        
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                received += len(chunk)
+                if max_bytes and received > max_bytes:
+                    self._count('oversized_responses')
+                    raise ResponseTooLargeError(
+                        f"Resposta de {response.url} excedeu {max_bytes} bytes",
+                        response=response
+                    )
+                chunks.append(chunk)
+        except Exception:
+            response.close()
+            raise
+        
+        response._content = b''.join(chunks)
+        response._content_consumed = True
+        
+        with self._stats_lock:
+            self.stats['bytes_received'] += received
+        
+        return response
+    
+    def _cached_getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """socket.getaddrinfo com cache por TTL"""
+        
+        key = (host, port, family, type, proto, flags)
+        now = time.time()
+        
+        with self._dns_lock:
+            cached = self._dns_cache.get(key)
+        
+        if cached and cached[0] > now:
+            self._count('dns_cache_hits')
+            return cached[1]
+        
+        result = self._original_getaddrinfo(host, port, family, type, proto, flags)
+        self._count('dns_cache_misses')
+        
+        with self._dns_lock:
+            if len(self._dns_cache) >= 4096:
+                self._dns_cache = {k: v for k, v in self._dns_cache.items() if v[0] > now}
+            self._dns_cache[key] = (now + self.dns_cache_ttl, result)
+        
+        return result
+    
+    def _count(self, counter: str):
+        with self._stats_lock:
+            self.stats[counter] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores e configuração do transporte"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        
+        with self._dns_lock:
+            stats['dns_cache_entries'] = len(self._dns_cache)
+        
+        stats.update({
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'max_retries': self.max_retries,
+            'status_retries': self.status_retries,
+            'max_retry_after': CappedRetry.max_retry_after,
+            'dns_cache_ttl': self.dns_cache_ttl,
+            'max_response_bytes': self.max_response_bytes
+        })
+        
+        return stats
+
+# Instância global
+http_client = HttpClient()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Import Profiler
+Mede o custo de importação de cada módulo (tempo próprio e acumulado) e o
+tempo de inicialização da aplicação, para acompanhar o cold start
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedLoader:
+    """Envolve o loader original e cronometra a criação/execução do módulo"""
+    
+    def __init__(self, profiler: 'ImportProfiler', loader: Any, fullname: str):
+        self._profiler = profiler
+        self._loader = loader
+        self._fullname = fullname
+    
+    def create_module(self, spec):
+        return self._profiler._timed(self._fullname, self._loader.create_module, spec)
+    
+    def exec_module(self, module):
+        # O módulo fica com o loader original (importlib.resources, pkgutil etc.)
+        module.__loader__ = self._loader
+        if getattr(module, '__spec__', None) is not None:
+            module.__spec__.loader = self._loader
+        return self._profiler._timed(self._fullname, self._loader.exec_module, module)
+    
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._loader, item)
+
+
+class _TimingFinder:
+    """Finder no início de sys.meta_path que delega aos demais e troca o loader"""
+    
+    def __init__(self, profiler: 'ImportProfiler'):
+        self._profiler = profiler
+    
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimedLoader(self._profiler, spec.loader, fullname)
+            return spec
+        return None
+
+
+class ImportProfiler:
+    """Perfil de importações ativado com IMPORT_PROFILE=true no ambiente do processo"""
+    
+    def __init__(self):
+        """Inicializa profiler"""
+        self.enabled = os.getenv('IMPORT_PROFILE', 'false').lower() == 'true'
+        self.report_top = int(os.getenv('IMPORT_PROFILE_TOP', 25))
+        
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.startup: Dict[str, Any] = {'profiler_loaded_at': time.time()}
+        self._finder: Optional[_TimingFinder] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def install(self):
+        """Instala o finder; sem IMPORT_PROFILE=true não faz nada"""
+        if not self.enabled or self._finder is not None:
+            return
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+    
+    def uninstall(self):
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+    
+    def _timed(self, fullname: str, function, argument):
+        """Executa a fase de carga, descontando do pai o tempo dos imports aninhados"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        
+        frame = {'children': 0.0}
+        stack.append(frame)
+        start_time = time.perf_counter()
+        try:
+            return function(argument)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stack.pop()
+            if stack:
+                stack[-1]['children'] += elapsed
+            
+            with self._lock:
+                record = self.records.setdefault(fullname, {'cumulative': 0.0, 'self': 0.0})
+                record['cumulative'] += elapsed
+                record['self'] += elapsed - frame['children']
+    
+    def record_startup(self, phase: str, seconds: float):
+        """Registra a duração de uma fase da inicialização (ex.: create_app)"""
+        self.startup[phase] = round(seconds, 4)
+    
+    def get_report(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """Módulos mais caros por tempo acumulado, com o tempo próprio de cada um"""
+        with self._lock:
+            records = [
+                {'module': name, 'cumulative_seconds': round(record['cumulative'], 4), 'self_seconds': round(record['self'], 4)}
+                for name, record in self.records.items()
+            ]
+        
+        records.sort(key=lambda record: -record['cumulative_seconds'])
+        return {
+            'enabled': self.enabled,
+            'startup': dict(self.startup),
+            'modules_profiled': len(records),
+            'total_import_seconds': round(sum(record['self_seconds'] for record in records), 4),
+            'top_modules': records[:top or self.report_top]
+        }
+    
+    def log_report(self):
+        """Resumo do perfil no log"""
+        if not self.enabled:
+            return
+        report = self.get_report()
+        logger.info(
+            f"⏱️ Imports: {report['total_import_seconds']:.2f}s em {report['modules_profiled']} módulos "
+            f"(startup: {report['startup']})"
+        )
+        for record in report['top_modules']:
+            logger.info(
+                f"⏱️   {record['module']}: {record['cumulative_seconds']:.3f}s acumulado, "
+                f"{record['self_seconds']:.3f}s próprio"
+            )
+
+# Instância global
+import_profiler = ImportProfiler()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Incremental JSON Parser
+Parser de JSON alimentado por pedaços de uma resposta em streaming, que
+entrega cada seção de primeiro nível assim que ela fecha
+"""
+
+import json
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class IncrementalJSONParser:
+    """
+    Acompanha o documento JSON raiz (objeto ou lista) dentro do texto
+    recebido, ignorando o que vem antes (ex.: ```json) e depois dele.
+    Para um objeto, cada par chave/valor de primeiro nível é emitido ao
+    fechar; para uma lista, cada elemento.
+    """
+    
+    def __init__(self):
+        self._text = ''
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._root_type: Optional[str] = None
+        self._member_start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._index = 0
+        self.sections: Dict[Any, Any] = {}
+    
+    @property
+    def complete(self) -> bool:
+        """Documento raiz já fechou"""
+        return self._root_end is not None
+    
+    @property
+    def text(self) -> str:
+        """Todo o texto recebido até agora"""
+        return self._text
+    
+    def feed(self, chunk: str) -> List[Tuple[Any, Any]]:
+        """Adiciona um pedaço e retorna as seções (chave ou índice, valor) que fecharam nele"""
+        
+        self._text += chunk
+        emitted: List[Tuple[Any, Any]] = []
+        text = self._text
+        position = self._pos
+        
+        while position < len(text) and self._root_end is None:
+            char = text[position]
+            
+            if self._root_start is None:
+                if char in '{[':
+                    self._root_start = position
+                    self._root_type = char
+                    self._depth = 1
+                    self._member_start = position + 1
+            
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            
+            elif char == '"':
+                self._in_string = True
+            
+            elif char in '{[':
+                self._depth += 1
+            
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[self._member_start:position], emitted)
+                    self._root_end = position + 1
+            
+            elif char == ',' and self._depth == 1:
+                self._emit(text[self._member_start:position], emitted)
+                self._member_start = position + 1
+            
+            position += 1
+        
+        self._pos = position
+        return emitted
+    
+    def document(self) -> Any:
+        """Documento completo; JSONDecodeError se a resposta terminou antes de fechar"""
+        if self._root_start is None:
+            raise json.JSONDecodeError("Nenhum JSON encontrado na resposta", self._text, 0)
+        if self._root_end is None:
+            raise json.JSONDecodeError("JSON incompleto na resposta", self._text, len(self._text))
+        return json.loads(self._text[self._root_start:self._root_end])
+    
+    def _emit(self, fragment: str, emitted: List[Tuple[Any, Any]]):
+        """Decodifica um membro de primeiro nível já fechado"""
+        fragment = fragment.strip()
+        if not fragment:
+            return
+        
+        try:
+            if self._root_type == '{':
+                key, value = next(iter(json.loads('{' + fragment + '}').items()))
+            else:
+                key, value = self._index, json.loads(fragment)
+                self._index += 1
+        except (json.JSONDecodeError, StopIteration) as e:
+            # O documento completo também vai falhar; o chamador trata o erro lá
+            logger.debug(f"Seção JSON inválida ignorada: {e}")
+            return
+        
+        self.sections[key] = value
+        emitted.append((key, value))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Latency Histogram
+Janela deslizante de latências com percentis para decisões de hedge
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+class LatencyHistogram:
+    """Guarda as últimas N latências (em segundos) de um provedor"""
+    
+    def __init__(self, max_samples: int = 200):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.total_count = 0
+    
+    def record(self, seconds: float):
+        """Registra uma latência observada"""
+        with self._lock:
+            self._samples.append(seconds)
+            self.total_count += 1
+    
+    def count(self) -> int:
+        """Número de amostras na janela"""
+        with self._lock:
+            return len(self._samples)
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Percentil (0-100) das amostras da janela, ou None se vazia"""
+        with self._lock:
+            samples = sorted(self._samples)
+        
+        if not samples:
+            return None
+        
+        rank = (percentile / 100) * (len(samples) - 1)
+        lower = int(rank)
+        upper = min(lower + 1, len(samples) - 1)
+        return samples[lower] + (samples[upper] - samples[lower]) * (rank - lower)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Resumo da janela para relatórios de status"""
+        with self._lock:
+            samples = list(self._samples)
+            total_count = self.total_count
+        
+        if not samples:
+            return {'samples': 0, 'total_count': total_count}
+        
+        return {
+            'samples': len(samples),
+            'total_count': total_count,
+            'mean': sum(samples) / len(samples),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': max(samples)
+        }
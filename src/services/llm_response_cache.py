@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - LLM Response Cache
+Cache de respostas dos provedores de IA por provedor, modelo, max_tokens e
+hash do prompt normalizado, em disco local com LRU por tamanho e TTL, e
+camada opcional de prompts quase idênticos por similaridade de shingles
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.tiered_cache import TieredCache
+from services.near_duplicate_index import near_duplicate_detector, NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normaliza espaços e a forma Unicode do prompt. Caixa e acentos são
+    mantidos: ao contrário de uma query de busca, mudam o que o modelo responde.
+    """
+    return ' '.join(unicodedata.normalize('NFC', prompt or '').split())
+
+class LLMResponseCache:
+    """Cache de respostas de geração com contadores por provedor"""
+    
+    def __init__(self):
+        """Inicializa cache"""
+        self.enabled = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl = int(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+        self.similar_enabled = os.getenv('LLM_CACHE_SIMILAR_ENABLED', 'false').lower() == 'true'
+        self.similar_threshold = float(os.getenv('LLM_CACHE_SIMILAR_THRESHOLD', 0.95))
+        self.similar_max_entries = int(os.getenv('LLM_CACHE_SIMILAR_MAX_ENTRIES', 2000))
+        
+        self.cache = TieredCache(
+            namespace='llm_responses',
+            default_ttl=self.ttl,
+            memory_max_bytes=int(os.getenv('LLM_CACHE_MEMORY_MAX_BYTES', 8 * 1024 * 1024)),
+            shared_backend=os.getenv('LLM_CACHE_BACKEND', 'sqlite'),
+            shared_max_bytes=int(os.getenv('LLM_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))
+        )
+        
+        # Índices de similaridade por escopo (provedor|modelo|max_tokens), só deste processo
+        self._similar_indexes: Dict[str, NearDuplicateIndex] = {}
+        self._similar_lock = threading.Lock()
+        
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._stats_lock = threading.Lock()
+        
+        logger.info(
+            f"LLM Response Cache inicializado (ativo={self.enabled}, TTL {self.ttl}s, "
+            f"similares={self.similar_enabled})"
+        )
+    
+    def _scope(self, provider: str, model: str, max_tokens: int) -> str:
+        return f"{provider}|{model}|{max_tokens}"
+    
+    def _build_key(self, scope: str, prompt: str) -> str:
+        """Chave da entrada: escopo + SHA-256 do prompt normalizado"""
+        digest = hashlib.sha256(normalize_prompt(prompt).encode('utf-8', 'surrogatepass')).hexdigest()
+        return f"{scope}|{digest}"
+    
+    def _count(self, provider: str, counter: str, amount: float = 1):
+        with self._stats_lock:
+            provider_stats = self.stats.setdefault(provider, {
+                'hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0, 'saved_latency_seconds': 0.0
+            })
+            provider_stats[counter] += amount
+    
+    def get(
+        self,
+        candidates: List[Tuple[str, str]],
+        prompt: str,
+        max_tokens: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Procura a resposta em cada (provedor, modelo) candidato, na ordem
+        recebida: primeiro pelo prompt exato, depois por um prompt quase
+        idêntico se a camada de similares estiver ativa. Um miss é atribuído
+        ao primeiro candidato, que é quem vai gerar a resposta.
+        """
+        if not self.enabled or not candidates:
+            return None
+        
+        for provider, model in candidates:
+            scope = self._scope(provider, model, max_tokens)
+            key = self._build_key(scope, prompt)
+            entry = self.cache.get(key)
+            counter = 'hits'
+            
+            if entry is None and self.similar_enabled:
+                key, entry = self._get_similar(scope, prompt)
+                counter = 'similar_hits'
+            
+            if entry is not None:
+                self._count(provider, counter)
+                self._count(provider, 'saved_latency_seconds', entry.get('latency', 0.0))
+                logger.info(
+                    f"💾 Resposta de {provider} ({model}) servida do cache"
+                    f"{' por prompt similar' if counter == 'similar_hits' else ''}, "
+                    f"{entry.get('latency', 0.0):.1f}s economizados"
+                )
+                return {**entry, 'key': key, 'provider': provider, 'model': model, 'similar': counter == 'similar_hits'}
+        
+        self._count(candidates[0][0], 'misses')
+        return None
+    
+    def _get_similar(self, scope: str, prompt: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        with self._similar_lock:
+            index = self._similar_indexes.get(scope)
+        if index is None:
+            return None, None
+        
+        key = index.find(normalize_prompt(prompt))
+        return (key, self.cache.get(key)) if key else (None, None)
+    
+    def set(self, provider: str, model: str, prompt: str, max_tokens: int, content: str, latency: float) -> Optional[str]:
+        """Grava a resposta gerada com a latência que custou para gerá-la; retorna a chave"""
+        if not self.enabled or not content:
+            return None
+        
+        scope = self._scope(provider, model, max_tokens)
+        key = self._build_key(scope, prompt)
+        self.cache.set(key, {'content': content, 'latency': round(latency, 3), 'created_at': time.time()})
+        self._count(provider, 'stores')
+        
+        if self.similar_enabled:
+            with self._similar_lock:
+                index = self._similar_indexes.get(scope)
+                if index is None or len(index) >= self.similar_max_entries:
+                    index = near_duplicate_detector.create_index(threshold=self.similar_threshold)
+                    self._similar_indexes[scope] = index
+            index.add(key, normalize_prompt(prompt))
+        return key
+    
+    def delete(self, key: str):
+        """Remove uma resposta (ex.: rejeitada pela validação de quem a consumiu)"""
+        self.cache.delete(key)
+    
+    def provider_stats(self, provider: str) -> Dict[str, Any]:
+        """Contadores de um provedor"""
+        with self._stats_lock:
+            provider_stats = dict(self.stats.get(provider, {}))
+        
+        hits = provider_stats.get('hits', 0) + provider_stats.get('similar_hits', 0)
+        lookups = hits + provider_stats.get('misses', 0)
+        return {
+            'hits': provider_stats.get('hits', 0),
+            'similar_hits': provider_stats.get('similar_hits', 0),
+            'misses': provider_stats.get('misses', 0),
+            'stores': provider_stats.get('stores', 0),
+            'hit_rate': (hits / lookups * 100) if lookups else 0.0,
+            'saved_latency_seconds': round(provider_stats.get('saved_latency_seconds', 0.0), 3)
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores somados dos provedores e ocupação das camadas"""
+        with self._stats_lock:
+            providers = list(self.stats)
+        
+        totals = {'hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0, 'saved_latency_seconds': 0.0}
+        for provider in providers:
+            for counter, value in self.provider_stats(provider).items():
+                if counter in totals:
+                    totals[counter] += value
+        
+        hits = totals['hits'] + totals['similar_hits']
+        lookups = hits + totals['misses']
+        return {
+            **totals,
+            'saved_latency_seconds': round(totals['saved_latency_seconds'], 3),
+            'hit_rate': (hits / lookups * 100) if lookups else 0.0,
+            'enabled': self.enabled,
+            'similar_enabled': self.similar_enabled,
+            'storage': self.cache.get_stats()
+        }
+    
+    def clear(self):
+        """Esvazia o cache e os índices de similaridade"""
+        self.cache.clear()
+        with self._similar_lock:
+            self._similar_indexes.clear()
+
+# Instância global
+llm_response_cache = LLMResponseCache()
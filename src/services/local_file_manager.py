@@ -12,34 +12,45 @@ import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import uuid
+from services.analysis_catalog import AnalysisCatalog
 
 logger = logging.getLogger(__name__)
 
 class LocalFileManager:
     """Gerenciador de arquivos locais para análises"""
     
+    SECTIONS = [
+        'avatars', 'drivers_mentais', 'provas_visuais', 'anti_objecao',
+        'pre_pitch', 'predicoes_futuro', 'posicionamento', 'concorrencia',
+        'palavras_chave', 'metricas', 'funil_vendas', 'plano_acao',
+        'insights', 'pesquisa_web', 'completas', 'metadata'
+    ]
+    
     def __init__(self):
         """Inicializa o gerenciador de arquivos locais"""
         self.base_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'analyses_data')
         self._ensure_directory_structure()
         
+        # Catálogo indexado: listagem, busca e estatísticas sem varrer o diretório
+        self.catalog = AnalysisCatalog(
+            self.base_dir,
+            os.getenv('LOCAL_CATALOG_DB_PATH', os.path.join(self.base_dir, 'catalog', 'analyses_catalog.db'))
+        )
+        try:
+            self.catalog.ensure_populated(self.SECTIONS)
+        except Exception as e:
+            logger.error(f"❌ Erro ao popular catálogo local: {str(e)}")
+        
         logger.info(f"Local File Manager inicializado: {self.base_dir}")
     
     def _ensure_directory_structure(self):
         """Garante que a estrutura de diretórios existe"""
         
-        subdirs = [
-            'avatars', 'drivers_mentais', 'provas_visuais', 'anti_objecao',
-            'pre_pitch', 'predicoes_futuro', 'posicionamento', 'concorrencia',
-            'palavras_chave', 'metricas', 'funil_vendas', 'plano_acao',
-            'insights', 'pesquisa_web', 'completas', 'metadata'
-        ]
-        
         # Cria diretório base
         os.makedirs(self.base_dir, exist_ok=True)
         
         # Cria subdiretórios
-        for subdir in subdirs:
+        for subdir in self.SECTIONS:
             os.makedirs(os.path.join(self.base_dir, subdir), exist_ok=True)
     
     def save_analysis_locally(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -95,14 +106,18 @@ class LocalFileManager:
                 })
             
             # Salva metadados
-            metadata_file_path = self._save_metadata(analysis_data, analysis_id, timestamp, saved_files)
-            if metadata_file_path:
+            metadata = self._save_metadata(analysis_data, analysis_id, timestamp, saved_files)
+            if metadata:
+                metadata_file_path = metadata['file_path']
                 saved_files.append({
                     'type': 'metadata',
                     'name': os.path.basename(metadata_file_path),
                     'path': metadata_file_path,
                     'size': os.path.getsize(metadata_file_path)
                 })
+                
+                # A análise só entra na listagem depois que todos os arquivos existem
+                self.catalog.record_analysis(metadata['metadata'], saved_files)
             
             logger.info(f"✅ Análise salva localmente: {len(saved_files)} arquivos")
             
@@ -138,6 +153,8 @@ class LocalFileManager:
             with open(file_path, 'w', encoding='utf-8') as f:
                 json.dump(section_data, f, ensure_ascii=False, indent=2)
             
+            self.catalog.record_file(analysis_id, section_name, file_path)
+            
             return file_path
             
         except Exception as e:
@@ -171,8 +188,8 @@ class LocalFileManager:
         analysis_id: str, 
         timestamp: str,
         saved_files: List[Dict[str, Any]]
-    ) -> Optional[str]:
-        """Salva metadados da análise"""
+    ) -> Optional[Dict[str, Any]]:
+        """Salva metadados da análise; retorna o dicionário gravado e o caminho"""
         
         try:
             metadata = {
@@ -198,81 +215,81 @@ class LocalFileManager:
             with open(file_path, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
             
-            return file_path
+            return {'metadata': metadata, 'file_path': file_path}
             
         except Exception as e:
             logger.error(f"❌ Erro ao salvar metadados: {str(e)}")
             return None
     
-    def list_local_analyses(self) -> List[Dict[str, Any]]:
-        """Lista análises salvas localmente"""
+    def list_local_analyses(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        sort_by: str = 'created_at',
+        descending: bool = True,
+        segmento: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Lista análises salvas localmente (mais recentes primeiro por padrão)"""
         
         try:
-            analyses = []
-            metadata_dir = os.path.join(self.base_dir, 'metadata')
-            
-            if not os.path.exists(metadata_dir):
-                return []
-            
-            for filename in os.listdir(metadata_dir):
-                if filename.endswith('_metadata.json'):
-                    file_path = os.path.join(metadata_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        
-                        analyses.append({
-                            'analysis_id': metadata.get('analysis_id'),
-                            'timestamp': metadata.get('timestamp'),
-                            'created_at': metadata.get('created_at'),
-                            'segmento': metadata.get('project_data', {}).get('segmento'),
-                            'produto': metadata.get('project_data', {}).get('produto'),
-                            'total_files': metadata.get('total_files', 0),
-                            'quality_score': metadata.get('quality_score', 0),
-                            'processing_time': metadata.get('processing_time', 0)
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao ler metadata {filename}: {str(e)}")
-                        continue
-            
-            # Ordena por data de criação (mais recente primeiro)
-            analyses.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-            return analyses
+            rows = self.catalog.list_analyses(limit, offset, sort_by, descending, segmento)
+            
+            return [{
+                'analysis_id': row['analysis_id'],
+                'timestamp': row['timestamp'],
+                'created_at': row['created_at'],
+                'segmento': row['segmento'],
+                'produto': row['produto'],
+                'total_files': row['total_files'],
+                'total_size': row['total_size'],
+                'quality_score': row['quality_score'],
+                'processing_time': row['processing_time']
+            } for row in rows]
             
         except Exception as e:
             logger.error(f"❌ Erro ao listar análises locais: {str(e)}")
             return []
     
+    def count_local_analyses(self, segmento: Optional[str] = None) -> int:
+        """Total de análises catalogadas"""
+        try:
+            return self.catalog.count_analyses(segmento)
+        except Exception as e:
+            logger.error(f"❌ Erro ao contar análises locais: {str(e)}")
+            return 0
+    
     def get_analysis_directory(self, analysis_id: str) -> Optional[str]:
         """Obtém diretório de uma análise específica"""
         
-        # Busca por arquivos que contenham o ID da análise
-        for root, dirs, files in os.walk(self.base_dir):
-            for file in files:
-                if analysis_id[:8] in file:
-                    return root
+        files = self.catalog.get_files(analysis_id)
+        if not files:
+            return None
+        
+        # Prefere o diretório da análise completa, como referência principal
+        for file_info in files:
+            if file_info['section'] == 'completas':
+                return os.path.dirname(file_info['path'])
         
-        return None
+        return os.path.dirname(files[0]['path'])
     
     def delete_local_analysis(self, analysis_id: str) -> bool:
         """Remove análise local por ID"""
         
         try:
+            files = self.catalog.get_files(analysis_id)
             deleted_files = 0
             
-            # Busca e remove todos os arquivos relacionados
-            for root, dirs, files in os.walk(self.base_dir):
-                for file in files:
-                    if analysis_id[:8] in file:
-                        file_path = os.path.join(root, file)
-                        try:
-                            os.remove(file_path)
-                            deleted_files += 1
-                            logger.info(f"🗑️ Arquivo removido: {file}")
-                        except Exception as e:
-                            logger.error(f"❌ Erro ao remover {file}: {str(e)}")
+            for file_info in files:
+                try:
+                    os.remove(file_info['path'])
+                    deleted_files += 1
+                    logger.info(f"🗑️ Arquivo removido: {file_info['name']}")
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.error(f"❌ Erro ao remover {file_info['name']}: {str(e)}")
+            
+            self.catalog.remove_analysis(analysis_id)
             
             if deleted_files > 0:
                 logger.info(f"✅ Análise {analysis_id} removida: {deleted_files} arquivos")
@@ -285,51 +302,57 @@ class LocalFileManager:
             logger.error(f"❌ Erro ao deletar análise {analysis_id}: {str(e)}")
             return False
     
-    def get_analysis_files(self, analysis_id: str) -> List[Dict[str, Any]]:
+    def delete_files(self, paths: List[str]) -> int:
+        """Remove arquivos avulsos do disco e do catálogo"""
+        
+        removed = []
+        for path in paths:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except FileNotFoundError:
+                removed.append(path)
+            except Exception as e:
+                logger.error(f"❌ Erro ao remover {path}: {str(e)}")
+        
+        self.catalog.remove_files(removed)
+        return len(removed)
+    
+    def get_analysis_files(self, analysis_id: str, section: Optional[str] = None) -> List[Dict[str, Any]]:
         """Obtém lista de arquivos de uma análise"""
         
         try:
-            files = []
-            
-            for root, dirs, filenames in os.walk(self.base_dir):
-                for filename in filenames:
-                    if analysis_id[:8] in filename:
-                        file_path = os.path.join(root, filename)
-                        
-                        # Determina tipo baseado no diretório
-                        section_type = os.path.basename(root)
-                        
-                        files.append({
-                            'name': filename,
-                            'path': file_path,
-                            'type': section_type,
-                            'size': os.path.getsize(file_path),
-                            'modified': datetime.fromtimestamp(
-                                os.path.getmtime(file_path)
-                            ).isoformat()
-                        })
-            
-            return files
+            return [{
+                'name': file_info['name'],
+                'path': file_info['path'],
+                'type': file_info['section'],
+                'size': file_info['size'],
+                'modified': datetime.fromtimestamp(file_info['modified']).isoformat()
+            } for file_info in self.catalog.get_files(analysis_id, section)]
             
         except Exception as e:
             logger.error(f"❌ Erro ao obter arquivos da análise {analysis_id}: {str(e)}")
             return []
     
+    def get_old_files(self, days_old: int) -> List[Dict[str, Any]]:
+        """Arquivos catalogados modificados há mais de `days_old` dias"""
+        
+        cutoff_time = time.time() - days_old * 24 * 3600
+        return [{
+            'name': file_info['name'],
+            'path': file_info['path'],
+            'type': file_info['section'],
+            'size': file_info['size'],
+            'modified': datetime.fromtimestamp(file_info['modified']).isoformat()
+        } for file_info in self.catalog.get_files_older_than(cutoff_time)]
+    
     def load_analysis_section(self, analysis_id: str, section_name: str) -> Optional[Dict[str, Any]]:
         """Carrega uma seção específica da análise"""
         
         try:
-            section_dir = os.path.join(self.base_dir, section_name)
-            
-            if not os.path.exists(section_dir):
-                return None
-            
-            # Busca arquivo da seção
-            for filename in os.listdir(section_dir):
-                if analysis_id[:8] in filename and filename.endswith('.json'):
-                    file_path = os.path.join(section_dir, filename)
-                    
-                    with open(file_path, 'r', encoding='utf-8') as f:
+            for file_info in self.catalog.get_files(analysis_id, section_name):
+                if file_info['name'].endswith('.json'):
+                    with open(file_info['path'], 'r', encoding='utf-8') as f:
                         return json.load(f)
             
             return None
@@ -342,35 +365,12 @@ class LocalFileManager:
         """Obtém estatísticas de armazenamento"""
         
         try:
-            stats = {
-                'base_directory': self.base_dir,
-                'total_files': 0,
-                'total_size_bytes': 0,
-                'sections': {}
-            }
-            
-            for root, dirs, files in os.walk(self.base_dir):
-                section_name = os.path.basename(root)
-                
-                if section_name not in stats['sections']:
-                    stats['sections'][section_name] = {
-                        'files': 0,
-                        'size_bytes': 0
-                    }
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        stats['total_files'] += 1
-                        stats['total_size_bytes'] += file_size
-                        stats['sections'][section_name]['files'] += 1
-                        stats['sections'][section_name]['size_bytes'] += file_size
-                    except:
-                        continue
+            stats = self.catalog.get_storage_stats()
+            stats['base_directory'] = self.base_dir
             
             # Converte bytes para MB
             stats['total_size_mb'] = round(stats['total_size_bytes'] / (1024 * 1024), 2)
+            stats['total_size_gb'] = round(stats['total_size_bytes'] / (1024 * 1024 * 1024), 3)
             
             for section in stats['sections'].values():
                 section['size_mb'] = round(section['size_bytes'] / (1024 * 1024), 2)
@@ -380,6 +380,10 @@ class LocalFileManager:
         except Exception as e:
             logger.error(f"❌ Erro ao obter estatísticas: {str(e)}")
             return {}
+    
+    def rebuild_catalog(self) -> Dict[str, int]:
+        """Reindexa os arquivos em disco (após cópias ou remoções manuais)"""
+        return self.catalog.rebuild(self.SECTIONS)
 
 # Instância global
 local_file_manager = LocalFileManager()
\ No newline at end of file
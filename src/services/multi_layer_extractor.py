@@ -14,7 +14,9 @@ from services.robust_content_extractor import robust_content_extractor
 from services.playwright_extractor import playwright_extractor
 from services.content_quality_validator import content_quality_validator
 from services.url_resolver import url_resolver
-from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.auto_save_manager import salvar_etapa, salvar_erro, com_sessao
+from services.http_client import http_client
+from services.async_extraction_engine import async_extraction_engine
 
 logger = logging.getLogger(__name__)
 
@@ -204,12 +206,11 @@ class MultiLayerExtractor:
         """Camada 3: Extração agressiva com múltiplas tentativas"""
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             import re
             
             # Múltiplas tentativas com diferentes configurações
-            session = requests.Session()
+            session = http_client.create_session()
             
             # Headers mais agressivos
             aggressive_headers = {
@@ -305,7 +306,6 @@ class MultiLayerExtractor:
         """Camada 4: Extração de fallback com técnicas alternativas"""
         
         try:
-            import requests
             from urllib.parse import urlparse
             
             # Tenta diferentes abordagens de fallback
@@ -342,7 +342,6 @@ class MultiLayerExtractor:
         """Tenta versão mobile do site"""
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             from urllib.parse import urlparse
             
@@ -361,7 +360,7 @@ class MultiLayerExtractor:
             
             for mobile_url in mobile_urls:
                 try:
-                    response = requests.get(mobile_url, headers=mobile_headers, timeout=15)
+                    response = http_client.get(mobile_url, headers=mobile_headers, timeout=15)
                     
                     if response.status_code == 200:
                         soup = BeautifulSoup(response.content, 'html.parser')
@@ -393,7 +392,6 @@ class MultiLayerExtractor:
         """Tenta versão AMP do site"""
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             from urllib.parse import urlparse
             
@@ -409,7 +407,7 @@ class MultiLayerExtractor:
             
             for amp_url in amp_urls:
                 try:
-                    response = requests.get(amp_url, timeout=15)
+                    response = http_client.get(amp_url, timeout=15)
                     
                     if response.status_code == 200:
                         soup = BeautifulSoup(response.content, 'html.parser')
@@ -441,7 +439,6 @@ class MultiLayerExtractor:
         """Tenta versão em cache (Google Cache, Archive.org)"""
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             from urllib.parse import quote
             
@@ -453,7 +450,7 @@ class MultiLayerExtractor:
             
             for cache_url in cache_urls:
                 try:
-                    response = requests.get(cache_url, timeout=20)
+                    response = http_client.get(cache_url, timeout=20)
                     
                     if response.status_code == 200:
                         soup = BeautifulSoup(response.content, 'html.parser')
@@ -485,7 +482,6 @@ class MultiLayerExtractor:
         """Tenta endpoints alternativos (RSS, API, sitemap)"""
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             from urllib.parse import urljoin, urlparse
             
@@ -505,7 +501,7 @@ class MultiLayerExtractor:
             
             for endpoint in alternative_endpoints:
                 try:
-                    response = requests.get(endpoint, timeout=10)
+                    response = http_client.get(endpoint, timeout=10)
                     
                     if response.status_code == 200:
                         content_type = response.headers.get('content-type', '').lower()
@@ -625,11 +621,22 @@ class MultiLayerExtractor:
         """Extrai múltiplas URLs usando sistema multi-camadas"""
         
         results = {}
+        pending_urls = urls
+        
+        # Camada estática de todo o lote em um único event loop; só as URLs
+        # que falharem passam pelas camadas pesadas em threads
+        if async_extraction_engine.enabled:
+            for url, async_result in async_extraction_engine.extract_batch(urls).items():
+                if async_result['success'] and self._accept_async_result(url, async_result, context):
+                    results[url] = async_result
+            
+            pending_urls = [url for url in urls if url not in results]
+            logger.info(f"⚡ {len(results)}/{len(urls)} URLs extraídas pela camada assíncrona")
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_url = {
-                executor.submit(self.extract_with_multiple_strategies, url, context): url 
-                for url in urls
+                executor.submit(com_sessao(self.extract_with_multiple_strategies), url, context): url 
+                for url in pending_urls
             }
             
             for future in as_completed(future_to_url):
@@ -652,6 +659,26 @@ class MultiLayerExtractor:
         
         return results
     
+    def _accept_async_result(self, url: str, result: Dict[str, Any], context: Dict[str, Any] = None) -> bool:
+        """Aplica à camada assíncrona os mesmos critérios de qualidade das demais"""
+        
+        validation = content_quality_validator.validate_content(result['content'], url, context)
+        if not self._meets_quality_criteria(result, validation):
+            return False
+        
+        # Rejeitadas são contabilizadas ao passar pelas camadas completas
+        self.stats['total_attempts'] += 1
+        self.stats['layer_usage']['static_extraction'] += 1
+        self.stats['successful_extractions'] += 1
+        self.stats['quality_distribution'][self._classify_quality(validation['score'])] += 1
+        
+        result.update({
+            'extraction_layer': 'static_extraction',
+            'quality_validation': validation,
+            'meets_criteria': True
+        })
+        return True
+    
     def get_comprehensive_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas abrangentes"""
         
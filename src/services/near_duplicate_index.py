@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Near Duplicate Index
+Detecção de conteúdo quase duplicado (espelhos, releases sindicados,
+versões AMP/mobile) com MinHash sobre shingles de palavras e buckets LSH
+"""
+
+import os
+import zlib
+import random
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.text_features import tokenize
+
+# NumPy é opcional: sem ele as assinaturas são calculadas em Python puro
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+UINT64_MASK = (1 << 64) - 1
+
+class NearDuplicateIndex:
+    """Índice LSH de assinaturas MinHash de uma execução"""
+    
+    def __init__(
+        self,
+        permutations: Tuple[List[int], List[int]],
+        bands: int,
+        threshold: float,
+        shingle_size: int,
+        min_tokens: int,
+        max_tokens: int
+    ):
+        self._a, self._b = permutations
+        self.num_perm = len(self._a)
+        self.bands = bands
+        self.rows = self.num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        
+        if HAS_NUMPY:
+            self._a_array = np.asarray(self._a, dtype=np.uint64)
+            self._b_array = np.asarray(self._b, dtype=np.uint64)
+    
+    def __len__(self) -> int:
+        return len(self._signatures)
+    
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """Assinatura MinHash do texto, ou None se for curto demais para comparar"""
+        
+        tokens = tokenize(text or '')[:self.max_tokens]
+        if len(tokens) < self.min_tokens:
+            return None
+        
+        size = min(self.shingle_size, len(tokens))
+        shingles = {
+            zlib.crc32(' '.join(tokens[index:index + size]).encode('utf-8'))
+            for index in range(len(tokens) - size + 1)
+        }
+        
+        if HAS_NUMPY:
+            values = np.asarray(list(shingles), dtype=np.uint64)
+            # Overflow de uint64 é intencional, igual ao cálculo em Python puro abaixo
+            with np.errstate(over='ignore'):
+                hashed = (np.outer(self._a_array, values) + self._b_array[:, None]) % np.uint64(MERSENNE_PRIME)
+            return tuple((hashed & np.uint64(MAX_HASH)).min(axis=1).tolist())
+        
+        return tuple(
+            min(((a * value + b) & UINT64_MASK) % MERSENNE_PRIME & MAX_HASH for value in shingles)
+            for a, b in zip(self._a, self._b)
+        )
+    
+    def find(self, text: str) -> Optional[str]:
+        """Chave do documento indexado quase idêntico ao texto, se houver"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            return self._find_signature(signature)
+    
+    def add(self, key: str, text: str) -> Optional[str]:
+        """
+        Indexa o texto sob `key`, a menos que já exista um quase duplicado:
+        nesse caso retorna a chave do original e não indexa.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        
+        with self._lock:
+            original = self._find_signature(signature)
+            if original is not None:
+                return original
+            
+            self._signatures[key] = signature
+            for band, bucket in enumerate(self._buckets):
+                bucket.setdefault(self._band_key(signature, band), []).append(key)
+        
+        return None
+    
+    def _find_signature(self, signature: Tuple[int, ...]) -> Optional[str]:
+        """Confere os candidatos dos buckets pela similaridade estimada"""
+        checked = set()
+        for band, bucket in enumerate(self._buckets):
+            for key in bucket.get(self._band_key(signature, band), ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                
+                stored = self._signatures[key]
+                similarity = sum(1 for x, y in zip(signature, stored) if x == y) / self.num_perm
+                if similarity >= self.threshold:
+                    return key
+        return None
+    
+    def _band_key(self, signature: Tuple[int, ...], band: int) -> Tuple[int, ...]:
+        start = band * self.rows
+        return signature[start:start + self.rows]
+
+class NearDuplicateDetector:
+    """Cria índices por execução e colapsa listas de fontes quase duplicadas"""
+    
+    def __init__(self):
+        """Inicializa detector"""
+        self.enabled = os.getenv('NEAR_DUP_ENABLED', 'true').lower() == 'true'
+        self.num_perm = int(os.getenv('NEAR_DUP_NUM_PERM', 128))
+        self.bands = int(os.getenv('NEAR_DUP_BANDS', 16))
+        self.threshold = float(os.getenv('NEAR_DUP_THRESHOLD', 0.8))
+        self.snippet_threshold = float(os.getenv('NEAR_DUP_SNIPPET_THRESHOLD', 0.9))
+        self.shingle_size = int(os.getenv('NEAR_DUP_SHINGLE_SIZE', 5))
+        self.max_tokens = int(os.getenv('NEAR_DUP_MAX_TOKENS', 10000))
+        
+        if self.num_perm % self.bands:
+            self.num_perm = (self.num_perm // self.bands + 1) * self.bands
+        
+        # Mesmas permutações em todos os índices do processo
+        rng = random.Random(1)
+        self._permutations = (
+            [rng.randint(1, MERSENNE_PRIME - 1) for _ in range(self.num_perm)],
+            [rng.randint(0, MERSENNE_PRIME - 1) for _ in range(self.num_perm)]
+        )
+        
+        self.stats = {'checked': 0, 'duplicates': 0}
+        self._stats_lock = threading.Lock()
+        
+        logger.info(
+            f"Near Duplicate Detector inicializado (MinHash {self.num_perm}, "
+            f"{self.bands} bandas, limiar {self.threshold})"
+        )
+    
+    def create_index(self, snippets: bool = False, threshold: Optional[float] = None) -> NearDuplicateIndex:
+        """Índice para conteúdo completo ou, com `snippets`, para título + snippet de busca"""
+        if snippets:
+            return NearDuplicateIndex(
+                self._permutations, self.bands, threshold or self.snippet_threshold,
+                shingle_size=3, min_tokens=12, max_tokens=self.max_tokens
+            )
+        return NearDuplicateIndex(
+            self._permutations, self.bands, threshold or self.threshold,
+            shingle_size=self.shingle_size, min_tokens=50, max_tokens=self.max_tokens
+        )
+    
+    def snippet_text(self, search_result: Dict[str, Any]) -> str:
+        """Texto usado na checagem antecipada de um resultado de busca"""
+        return f"{search_result.get('title', '')} {search_result.get('snippet', '')}"
+    
+    def check(self, index: NearDuplicateIndex, key: str, text: str) -> Optional[str]:
+        """Indexa o texto e retorna a chave do original se for quase duplicado"""
+        if not self.enabled:
+            return None
+        
+        original = index.add(key, text)
+        
+        with self._stats_lock:
+            self.stats['checked'] += 1
+            if original is not None:
+                self.stats['duplicates'] += 1
+        
+        return original
+    
+    def deduplicate(
+        self,
+        items: List[Dict[str, Any]],
+        text_key: str = 'content',
+        snippets: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Separa a lista em (únicos, duplicados) mantendo a primeira ocorrência.
+        Cada duplicado recebe `duplicate_of` com a URL do original.
+        """
+        if not self.enabled or len(items) < 2:
+            return list(items), []
+        
+        index = self.create_index(snippets=snippets)
+        unique, duplicates = [], []
+        
+        for position, item in enumerate(items):
+            key = item.get('url') or f'item_{position}'
+            text = self.snippet_text(item) if snippets else (item.get(text_key) or '')
+            
+            original = self.check(index, key, text)
+            if original is None:
+                unique.append(item)
+            else:
+                item['duplicate_of'] = original
+                duplicates.append(item)
+        
+        if duplicates:
+            logger.info(f"🧬 {len(duplicates)} fontes quase duplicadas colapsadas de {len(items)}")
+        
+        return unique, duplicates
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas acumuladas do processo"""
+        with self._stats_lock:
+            return {**self.stats, 'enabled': self.enabled, 'numpy': HAS_NUMPY}
+
+# Instância global
+near_duplicate_detector = NearDuplicateDetector()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Page Cache
+Cache persistente de páginas extraídas, chaveado pela URL resolvida,
+com revalidação condicional via ETag/Last-Modified
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class PageCache:
+    """Guarda HTML comprimido, texto extraído e validadores HTTP por URL"""
+    
+    def __init__(self):
+        """Inicializa cache de páginas"""
+        self.enabled = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+        self.db_path = Path(os.getenv('PAGE_CACHE_DB_PATH', 'cache/page_cache.db'))
+        self.freshness_seconds = int(os.getenv('PAGE_CACHE_FRESHNESS_SECONDS', 24 * 3600))
+        self.retention_seconds = int(os.getenv('PAGE_CACHE_RETENTION_DAYS', 30)) * 24 * 3600
+        
+        self.counters = {
+            'hits_fresh': 0,
+            'hits_revalidated': 0,
+            'hits_unchanged_html': 0,
+            'misses': 0,
+            'stores': 0
+        }
+        self._counter_lock = threading.Lock()
+        
+        if self.enabled:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._init_db()
+            except Exception as e:
+                logger.warning(f"⚠️ Cache de páginas desabilitado: {e}")
+                self.enabled = False
+        
+        logger.info(f"Page Cache {'ativo' if self.enabled else 'desabilitado'}: janela de {self.freshness_seconds}s")
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    html BLOB,
+                    html_hash TEXT,
+                    content BLOB NOT NULL,
+                    extractor TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    validated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS url_aliases (
+                    url_key TEXT PRIMARY KEY,
+                    resolved_url TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_validated ON pages(validated_at)")
+    
+    def _url_key(self, url: str) -> str:
+        return hashlib.sha256(url.strip().encode('utf-8')).hexdigest()
+    
+    def _html_hash(self, html: Optional[str]) -> Optional[str]:
+        return hashlib.sha256(html.encode('utf-8', errors='ignore')).hexdigest() if html else None
+    
+    def _count(self, counter: str):
+        with self._counter_lock:
+            self.counters[counter] += 1
+    
+    def get_resolved_url(self, url: str) -> Optional[str]:
+        """Retorna resolução de redirecionamento já conhecida para a URL"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT resolved_url FROM url_aliases WHERE url_key = ?",
+                    (self._url_key(url),)
+                ).fetchone()
+            return row['resolved_url'] if row else None
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler alias de {url}: {e}")
+            return None
+    
+    def store_resolved_url(self, url: str, resolved_url: str):
+        """Memoriza resolução de redirecionamento"""
+        if not self.enabled or not resolved_url:
+            return
+        
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO url_aliases (url_key, resolved_url, created_at) VALUES (?, ?, ?)",
+                    (self._url_key(url), resolved_url, time.time())
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao salvar alias de {url}: {e}")
+    
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Retorna entrada do cache (fresca ou não) para a URL resolvida"""
+        if not self.enabled:
+            return None
+        
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT * FROM pages WHERE url_key = ?",
+                    (self._url_key(url),)
+                ).fetchone()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler cache de {url}: {e}")
+            return None
+        
+        if not row:
+            self._count('misses')
+            return None
+        
+        return {
+            'url': row['url'],
+            'html_hash': row['html_hash'],
+            'content': zlib.decompress(row['content']).decode('utf-8'),
+            'extractor': row['extractor'],
+            'etag': row['etag'],
+            'last_modified': row['last_modified'],
+            'fetched_at': row['fetched_at'],
+            'validated_at': row['validated_at']
+        }
+    
+    def is_fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        """Entrada validada dentro da janela de frescor"""
+        return bool(entry) and (time.time() - entry['validated_at']) < self.freshness_seconds
+    
+    def get_fresh_content(self, url: str) -> Optional[str]:
+        """Conteúdo pronto para uso sem rede, considerando alias de redirecionamento"""
+        resolved_url = self.get_resolved_url(url) or url
+        entry = self.get(resolved_url)
+        
+        if self.is_fresh(entry):
+            self._count('hits_fresh')
+            return entry['content']
+        
+        return None
+    
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Cabeçalhos para revalidação condicional da entrada"""
+        headers = {}
+        
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        return headers
+    
+    def record_hit(self, kind: str = 'hits_fresh'):
+        """Contabiliza acerto detectado pelo extrator"""
+        self._count(kind)
+    
+    def is_same_html(self, entry: Optional[Dict[str, Any]], html: Optional[str]) -> bool:
+        """HTML baixado idêntico ao armazenado (endereçamento por conteúdo)"""
+        return bool(entry and html and entry.get('html_hash') == self._html_hash(html))
+    
+    def mark_revalidated(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Renova a janela de frescor após resposta 304 ou HTML idêntico"""
+        if not self.enabled:
+            return
+        
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "UPDATE pages SET validated_at = ?, "
+                    "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                    "WHERE url_key = ?",
+                    (time.time(), etag, last_modified, self._url_key(url))
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao revalidar cache de {url}: {e}")
+    
+    def store(
+        self,
+        url: str,
+        html: Optional[str],
+        content: str,
+        extractor: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        """Armazena página extraída com sucesso"""
+        if not self.enabled or not content:
+            return
+        
+        now = time.time()
+        
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages "
+                    "(url_key, url, html, html_hash, content, extractor, etag, last_modified, fetched_at, validated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self._url_key(url), url,
+                        sqlite3.Binary(zlib.compress(html.encode('utf-8', errors='ignore'))) if html else None,
+                        self._html_hash(html),
+                        sqlite3.Binary(zlib.compress(content.encode('utf-8', errors='ignore'))),
+                        extractor, etag, last_modified, now, now
+                    )
+                )
+            self._count('stores')
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao salvar cache de {url}: {e}")
+    
+    def cleanup_expired(self) -> int:
+        """Remove páginas não revalidadas dentro do período de retenção"""
+        if not self.enabled:
+            return 0
+        
+        with closing(self._connect()) as conn:
+            cutoff = time.time() - self.retention_seconds
+            removed = conn.execute("DELETE FROM pages WHERE validated_at < ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM url_aliases WHERE created_at < ?", (cutoff,))
+        
+        return removed
+    
+    def clear(self):
+        """Limpa todas as páginas e aliases"""
+        if not self.enabled:
+            return
+        
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM url_aliases")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores e ocupação do cache"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        
+        stats.update({
+            'enabled': self.enabled,
+            'freshness_seconds': self.freshness_seconds
+        })
+        
+        if self.enabled:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS pages, "
+                    "COALESCE(SUM(LENGTH(html)), 0) + COALESCE(SUM(LENGTH(content)), 0) AS bytes "
+                    "FROM pages"
+                ).fetchone()
+            stats['pages'] = row['pages']
+            stats['bytes'] = row['bytes']
+        
+        return stats
+
+# Instância global
+page_cache = PageCache()
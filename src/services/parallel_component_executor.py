@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Parallel Component Executor
+Executa componentes independentes em paralelo respeitando dependências,
+com timeout por componente e cancelamento cooperativo
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from services.auto_save_manager import com_sessao
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ComponentTask:
+    """Definição de um componente executável"""
+    name: str
+    func: Callable[[Dict[str, Any], threading.Event], Any]
+    dependencies: List[str] = field(default_factory=list)
+    timeout: Optional[float] = None
+    require_dependencies: bool = True
+
+class ParallelComponentExecutor:
+    """Agenda componentes assim que suas dependências terminam"""
+    
+    def __init__(self, max_workers: Optional[int] = None, default_timeout: float = 300):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+    
+    def run(
+        self,
+        tasks: List[ComponentTask],
+        on_start: Optional[Callable[[str], None]] = None,
+        on_finish: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa as tarefas e retorna resultados, erros e tempos.
+        
+        `func` recebe os resultados das dependências concluídas e um
+        `threading.Event` que é sinalizado no timeout/cancelamento. Os
+        callbacks são chamados na thread que invocou `run`, na ordem de
+        declaração das tarefas prontas.
+        """
+        
+        self._validate_graph(tasks)
+        
+        by_name = {task.name: task for task in tasks}
+        pending = [task.name for task in tasks]
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        cancel_events: Dict[str, threading.Event] = {}
+        running: Dict[Future, str] = {}
+        
+        run_start = time.time()
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers or max(1, len(tasks)),
+            thread_name_prefix='component'
+        )
+        
+        def _timed(name: str, func: Callable, dep_results: Dict[str, Any], cancel_event: threading.Event):
+            timings[name]['start'] = time.time()
+            try:
+                return func(dep_results, cancel_event)
+            finally:
+                timings[name].setdefault('end', time.time())
+        
+        try:
+            while pending or running:
+                # Agenda tudo que ficou pronto, na ordem de declaração
+                for name in list(pending):
+                    task = by_name[name]
+                    deps_done = all(dep in results or dep in errors for dep in task.dependencies)
+                    if not deps_done:
+                        continue
+                    
+                    pending.remove(name)
+                    failed_deps = [dep for dep in task.dependencies if dep in errors]
+                    
+                    if failed_deps and task.require_dependencies:
+                        errors[name] = f"Dependências falharam: {', '.join(failed_deps)}"
+                        logger.warning(f"⚠️ {name} ignorado: {errors[name]}")
+                        if on_finish:
+                            on_finish(name, 'skipped')
+                        continue
+                    
+                    if on_start:
+                        on_start(name)
+                    
+                    dep_results = {dep: results[dep] for dep in task.dependencies if dep in results}
+                    cancel_events[name] = threading.Event()
+                    timings[name] = {'submitted': time.time()}
+                    future = pool.submit(com_sessao(_timed), name, task.func, dep_results, cancel_events[name])
+                    running[future] = name
+                
+                if not running:
+                    continue
+                
+                done, _ = wait(list(running), timeout=self._next_timeout(running, by_name, timings), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        status = 'success'
+                    except Exception as e:
+                        errors[name] = str(e)
+                        status = 'failed'
+                        logger.error(f"❌ Componente {name} falhou: {e}")
+                    
+                    if on_finish:
+                        on_finish(name, status)
+                
+                # Cancela componentes que estouraram o timeout
+                now = time.time()
+                for future, name in list(running.items()):
+                    started = timings[name].get('start')
+                    timeout = by_name[name].timeout or self.default_timeout
+                    if started is not None and now - started >= timeout:
+                        running.pop(future)
+                        future.cancel()
+                        cancel_events[name].set()
+                        timings[name].setdefault('end', now)
+                        errors[name] = f"Timeout de {timeout:g}s excedido"
+                        logger.error(f"⏰ Componente {name} cancelado após {timeout:g}s")
+                        if on_finish:
+                            on_finish(name, 'timeout')
+        
+        finally:
+            # Tarefas ainda na fila do pool não chegam a rodar (cancel_futures exige Python 3.9)
+            for future, name in running.items():
+                future.cancel()
+                cancel_events[name].set()
+            pool.shutdown(wait=False)
+        
+        return {
+            'results': results,
+            'errors': errors,
+            'timings': timings,
+            'wall_time': time.time() - run_start
+        }
+    
+    def critical_path(
+        self,
+        dependencies: Dict[str, List[str]],
+        timings: Dict[str, Dict[str, float]]
+    ) -> Dict[str, Any]:
+        """
+        Caminho crítico observado: parte do componente que terminou por
+        último e volta sempre pela dependência que terminou mais tarde,
+        ou seja, a que de fato liberou o início do componente seguinte.
+        """
+        
+        finished = {name: t for name, t in timings.items() if 'start' in t and 'end' in t}
+        if not finished:
+            return {'path': [], 'time': 0.0}
+        
+        current = max(finished, key=lambda name: finished[name]['end'])
+        path = [current]
+        
+        while True:
+            deps = [dep for dep in dependencies.get(current, []) if dep in finished]
+            if not deps:
+                break
+            current = max(deps, key=lambda name: finished[name]['end'])
+            path.append(current)
+        
+        path.reverse()
+        
+        return {
+            'path': path,
+            'time': finished[path[-1]]['end'] - finished[path[0]]['start']
+        }
+    
+    def _next_timeout(
+        self,
+        running: Dict[Future, str],
+        by_name: Dict[str, ComponentTask],
+        timings: Dict[str, Dict[str, float]]
+    ) -> float:
+        """Tempo até o próximo componente atingir seu timeout"""
+        
+        now = time.time()
+        remaining = [1.0]  # Reavalia periodicamente tarefas ainda na fila do pool
+        for name in running.values():
+            started = timings[name].get('start')
+            if started is None:
+                continue
+            timeout = by_name[name].timeout or self.default_timeout
+            remaining.append(started + timeout - now)
+        
+        return max(0.05, min(remaining))
+    
+    def _validate_graph(self, tasks: List[ComponentTask]):
+        """Garante dependências conhecidas e ausência de ciclos"""
+        
+        names = {task.name for task in tasks}
+        for task in tasks:
+            unknown = [dep for dep in task.dependencies if dep not in names]
+            if unknown:
+                raise ValueError(f"Dependências desconhecidas para {task.name}: {unknown}")
+        
+        visiting, visited = set(), set()
+        deps = {task.name: task.dependencies for task in tasks}
+        
+        def _visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo de dependências envolvendo {name}")
+            visiting.add(name)
+            for dep in deps[name]:
+                _visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+        
+        for task in tasks:
+            _visit(task.name)
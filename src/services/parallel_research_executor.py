@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Parallel Research Executor
+Executa buscas e extrações em paralelo com limite por domínio e prazo global
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services.near_duplicate_index import near_duplicate_detector
+from services.auto_save_manager import com_sessao
+
+logger = logging.getLogger(__name__)
+
+class ParallelResearchExecutor:
+    """Fan-out de queries de busca e extração de URLs com prazo global"""
+    
+    def __init__(self):
+        """Inicializa executor de pesquisa paralela"""
+        self.search_workers = int(os.getenv('RESEARCH_SEARCH_WORKERS', 4))
+        self.extract_workers = int(os.getenv('RESEARCH_EXTRACT_WORKERS', 12))
+        self.per_domain_limit = int(os.getenv('RESEARCH_PER_DOMAIN_LIMIT', 2))
+        self.deadline_seconds = float(os.getenv('RESEARCH_DEADLINE_SECONDS', 180))
+        
+        # Extrações em curso por domínio, somando todas as análises do processo;
+        # domínios sem extração em curso saem do dicionário
+        self._domain_active: Dict[str, int] = {}
+        self._domain_lock = threading.Lock()
+        
+        logger.info(
+            f"Parallel Research Executor inicializado: {self.search_workers} buscas, "
+            f"{self.extract_workers} extrações, {self.per_domain_limit}/domínio"
+        )
+    
+    def execute(
+        self,
+        queries: List[str],
+        search_func: Callable[[str], List[Dict[str, Any]]],
+        extract_func: Callable[[str], Optional[str]],
+        on_content: Callable[[Dict[str, Any]], None],
+        urls_per_query: int = 8,
+        min_content_length: int = 500,
+        deadline_seconds: Optional[float] = None,
+        progress_callback: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa queries em paralelo e extrai as URLs de cada resultado
+        assim que a busca termina. Resultados cujo título + snippet repetem
+        um já enfileirado (releases sindicados, espelhos) não são extraídos.
+        Cada conteúdo válido é entregue a `on_content` na ordem de chegada.
+        Uma URL só é enviada ao pool de extração quando seu domínio tem vaga,
+        de modo que nenhuma thread do pool fica parada esperando outro domínio.
+        Ao expirar o prazo, retorna o que já foi coletado e descarta o
+        trabalho pendente.
+        """
+        
+        deadline = time.time() + (deadline_seconds or self.deadline_seconds)
+        
+        all_results = []
+        seen_urls = set()
+        snippet_index = near_duplicate_detector.create_index(snippets=True)
+        stats = {
+            'queries_completed': 0,
+            'queries_failed': 0,
+            'extractions_attempted': 0,
+            'extractions_successful': 0,
+            'duplicates_skipped': 0,
+            'deadline_reached': False
+        }
+        
+        search_pool = ThreadPoolExecutor(max_workers=self.search_workers, thread_name_prefix='research-search')
+        extract_pool = ThreadPoolExecutor(max_workers=self.extract_workers, thread_name_prefix='research-extract')
+        
+        pending = {}
+        # URLs aguardando vaga no domínio, na ordem em que chegaram
+        waiting = deque()
+        cancelled = threading.Event()
+        
+        def _submit_ready_extractions():
+            for _ in range(len(waiting)):
+                query, search_result = waiting.popleft()
+                url = search_result['url']
+                domain = self._domain(url)
+                if not self._try_acquire_domain(domain):
+                    waiting.append((query, search_result))
+                    continue
+                
+                extract_future = extract_pool.submit(
+                    com_sessao(self._extract_unless_cancelled), extract_func, url, cancelled
+                )
+                # Libera a vaga quando a extração termina ou é cancelada ainda na fila
+                extract_future.add_done_callback(lambda _, domain=domain: self._release_domain(domain))
+                pending[extract_future] = ('extract', query, search_result)
+        
+        try:
+            for query in queries:
+                future = search_pool.submit(com_sessao(search_func), query)
+                pending[future] = ('search', query, None)
+            
+            while pending or waiting:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    stats['deadline_reached'] = True
+                    break
+                
+                if waiting:
+                    # Vagas podem abrir em extrações de outras análises
+                    remaining = min(remaining, 0.25)
+                if not pending:
+                    time.sleep(remaining)
+                    _submit_ready_extractions()
+                    continue
+                
+                done, _ = wait(list(pending), timeout=remaining, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    kind, query, result = pending.pop(future)
+                    
+                    if kind == 'search':
+                        try:
+                            search_results = future.result() or []
+                        except Exception as e:
+                            logger.warning(f"⚠️ Erro na query '{query}': {e}")
+                            stats['queries_failed'] += 1
+                            continue
+                        
+                        stats['queries_completed'] += 1
+                        all_results.extend(search_results)
+                        
+                        if progress_callback:
+                            progress_callback(
+                                1, f"🔍 Pesquisado: {query[:50]}...",
+                                f"Query {stats['queries_completed'] + stats['queries_failed']}/{len(queries)}"
+                            )
+                        
+                        for search_result in search_results[:urls_per_query]:
+                            url = search_result.get('url', '')
+                            if not url or url in seen_urls:
+                                continue
+                            seen_urls.add(url)
+                            
+                            original = near_duplicate_detector.check(
+                                snippet_index, url, near_duplicate_detector.snippet_text(search_result)
+                            )
+                            if original is not None:
+                                logger.debug(f"🧬 {url} repete o snippet de {original}, extração ignorada")
+                                stats['duplicates_skipped'] += 1
+                                continue
+                            
+                            stats['extractions_attempted'] += 1
+                            waiting.append((query, search_result))
+                    
+                    else:
+                        try:
+                            content = future.result()
+                        except Exception as e:
+                            logger.warning(f"⚠️ Erro na extração de {result.get('url')}: {e}")
+                            continue
+                        
+                        if content and len(content) > min_content_length:
+                            stats['extractions_successful'] += 1
+                            on_content({
+                                'success': True,
+                                'url': result['url'],
+                                'title': result.get('title', ''),
+                                'content': content,
+                                'query': query,
+                                'source': result.get('source', 'unknown')
+                            })
+                
+                _submit_ready_extractions()
+            
+            if stats['deadline_reached']:
+                logger.warning(
+                    f"⏰ Prazo da pesquisa atingido: {len(pending) + len(waiting)} tarefas descartadas, "
+                    f"{stats['extractions_successful']} fontes coletadas"
+                )
+        
+        finally:
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+            # Pendentes já cancelados acima; cancel_futures exige Python 3.9
+            search_pool.shutdown(wait=False)
+            extract_pool.shutdown(wait=False)
+        
+        return {
+            'all_results': all_results,
+            'statistics': stats
+        }
+    
+    def _extract_unless_cancelled(
+        self,
+        extract_func: Callable[[str], Optional[str]],
+        url: str,
+        cancelled: threading.Event
+    ) -> Optional[str]:
+        """Extrai a URL, a menos que a pesquisa já tenha sido encerrada pelo prazo"""
+        
+        if cancelled.is_set():
+            return None
+        return extract_func(url)
+    
+    def _domain(self, url: str) -> str:
+        return urlparse(url).netloc.lower().replace('www.', '')
+    
+    def _try_acquire_domain(self, domain: str) -> bool:
+        """Reserva uma vaga de extração no domínio, sem bloquear"""
+        
+        with self._domain_lock:
+            active = self._domain_active.get(domain, 0)
+            if active >= self.per_domain_limit:
+                return False
+            self._domain_active[domain] = active + 1
+            return True
+    
+    def _release_domain(self, domain: str):
+        """Devolve a vaga do domínio e esquece domínios sem extração em curso"""
+        
+        with self._domain_lock:
+            active = self._domain_active.get(domain, 0) - 1
+            if active > 0:
+                self._domain_active[domain] = active
+            else:
+                self._domain_active.pop(domain, None)
+
+# Instância global
+parallel_research_executor = ParallelResearchExecutor()
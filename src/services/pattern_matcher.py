@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Pattern Matcher
+Conjuntos de padrões compilados uma única vez e serialização JSON única com
+mapa de offsets para o caminho de cada valor
+"""
+
+import re
+import json
+import heapq
+from bisect import bisect_right
+from typing import Dict, List, Any, Optional, Tuple, NamedTuple, Iterator
+
+class PatternHit(NamedTuple):
+    """Ocorrência de um padrão no documento serializado"""
+    pattern: str
+    path: Tuple[Any, ...]
+    offset: int
+
+def format_path(path: Tuple[Any, ...]) -> str:
+    """Caminho legível: avatar.dores_viscerais[3]"""
+    formatted = ''
+    for key in path:
+        if isinstance(key, int):
+            formatted += f'[{key}]'
+        else:
+            formatted += f'.{key}' if formatted else str(key)
+    return formatted or '$'
+
+class PatternSet:
+    """
+    Padrões compilados uma vez. Contagens e ocorrências usam uma regex por
+    padrão, como re.findall em cada um: um trecho casado por vários padrões
+    conta para todos. A alternância única só serve para search().
+    """
+    
+    def __init__(self, patterns: List[str], flags: int = 0):
+        self.patterns = list(patterns)
+        self.compiled = [(pattern, re.compile(pattern, flags)) for pattern in self.patterns]
+        self._group_pattern = {f'p{index}': pattern for index, pattern in enumerate(self.patterns)}
+        self.regex = re.compile(
+            '|'.join(f'(?P<p{index}>{pattern})' for index, pattern in enumerate(self.patterns)),
+            flags
+        )
+    
+    def finditer(self, text: str) -> Iterator[Tuple[str, int]]:
+        """(padrão, offset) de cada ocorrência de cada padrão, em ordem de offset"""
+        return heapq.merge(
+            *(self._hits(pattern, regex, text) for pattern, regex in self.compiled),
+            key=lambda hit: hit[1]
+        )
+    
+    @staticmethod
+    def _hits(pattern: str, regex, text: str) -> Iterator[Tuple[str, int]]:
+        for match in regex.finditer(text):
+            yield pattern, match.start()
+    
+    def count(self, text: str) -> Dict[str, int]:
+        """Ocorrências por padrão (inclui padrões sem ocorrência)"""
+        return {pattern: sum(1 for _ in regex.finditer(text)) for pattern, regex in self.compiled}
+    
+    def search(self, text: str) -> Optional[str]:
+        """Primeiro padrão encontrado no texto, ou None"""
+        match = self.regex.search(text)
+        return self._group_pattern[match.lastgroup] if match else None
+
+class SerializedDocument:
+    """
+    Serializa a estrutura uma única vez, com o mesmo texto de
+    json.dumps(ensure_ascii=False), guardando onde começa cada chave e
+    valor para que ocorrências sejam atribuídas ao caminho JSON.
+    """
+    
+    def __init__(self, data: Any):
+        self._parts: List[str] = []
+        self._lower_parts: List[str] = []
+        self._starts: List[int] = []
+        self._lower_starts: List[int] = []
+        self._paths: List[Tuple[Any, ...]] = []
+        self._length = 0
+        self._lower_length = 0
+        
+        self._serialize(data, ())
+        
+        self.text = ''.join(self._parts)
+        self.lower = ''.join(self._lower_parts)
+        del self._parts, self._lower_parts
+    
+    def _emit(self, chunk: str, path: Optional[Tuple[Any, ...]] = None):
+        lower_chunk = chunk.lower()
+        if path is not None:
+            self._starts.append(self._length)
+            self._lower_starts.append(self._lower_length)
+            self._paths.append(path)
+        
+        self._parts.append(chunk)
+        self._lower_parts.append(lower_chunk)
+        self._length += len(chunk)
+        # lower() pode mudar o tamanho de alguns caracteres Unicode
+        self._lower_length += len(lower_chunk)
+    
+    def _serialize(self, value: Any, path: Tuple[Any, ...]):
+        if isinstance(value, dict):
+            self._emit('{')
+            for index, (key, item) in enumerate(value.items()):
+                if index:
+                    self._emit(', ')
+                json_key = key if isinstance(key, str) else json.dumps(key)
+                self._emit(json.dumps(json_key, ensure_ascii=False), path + (key,))
+                self._emit(': ')
+                self._serialize(item, path + (key,))
+            self._emit('}')
+        
+        elif isinstance(value, (list, tuple)):
+            self._emit('[')
+            for index, item in enumerate(value):
+                if index:
+                    self._emit(', ')
+                self._serialize(item, path + (index,))
+            self._emit(']')
+        
+        else:
+            self._emit(json.dumps(value, ensure_ascii=False), path)
+    
+    def path_at(self, offset: int, lower: bool = False) -> Tuple[Any, ...]:
+        """Caminho do valor (ou chave) que contém o offset"""
+        starts = self._lower_starts if lower else self._starts
+        index = bisect_right(starts, offset) - 1
+        return self._paths[index] if index >= 0 else ()
+    
+    def count(self, pattern_set: PatternSet, lower: bool = False) -> Dict[str, int]:
+        """Ocorrências por padrão no documento"""
+        return pattern_set.count(self.lower if lower else self.text)
+    
+    def find(self, pattern_set: PatternSet, lower: bool = False) -> List[PatternHit]:
+        """Ocorrências com o caminho JSON onde cada uma aconteceu"""
+        text = self.lower if lower else self.text
+        return [
+            PatternHit(pattern, self.path_at(offset, lower), offset)
+            for pattern, offset in pattern_set.finditer(text)
+        ]
@@ -11,38 +11,68 @@ import time
 import asyncio
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from urllib.parse import urlparse
+from services.browser_pool import browser_pool
+from services.latency_histogram import LatencyHistogram
 
 logger = logging.getLogger(__name__)
 
 # Import condicional do Playwright
 try:
-    from playwright.async_api import async_playwright, Browser, Page
+    from playwright.async_api import Page
     HAS_PLAYWRIGHT = True
 except ImportError:
     HAS_PLAYWRIGHT = False
 
+# Tipos de recurso descartados no modo enxuto: só documento, scripts e XHR/fetch importam para o texto
+LEAN_BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest', 'eventsource', 'websocket', 'other'}
+DEFAULT_BLOCKED_RESOURCE_TYPES = {'image', 'font'}
+
+# Hosts de anúncios e analytics (casam também subdomínios)
+BLOCKED_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'google-analytics.com',
+    'googletagmanager.com', 'googletagservices.com', 'adservice.google.com', 'connect.facebook.net',
+    'facebook.net', 'hotjar.com', 'clarity.ms', 'scorecardresearch.com', 'quantserve.com',
+    'taboola.com', 'outbrain.com', 'criteo.com', 'criteo.net', 'amazon-adsystem.com', 'adnxs.com',
+    'rubiconproject.com', 'pubmatic.com', 'moatads.com', 'segment.io', 'mixpanel.com',
+    'nr-data.net', 'newrelic.com', 'tiktok.com', 'analytics.twitter.com', 'ads-twitter.com'
+)
+
+# Resolve quando o DOM fica `quietMs` sem mutações ou ao fim de `budgetMs`
+DOM_STABILITY_SCRIPT = """
+    ([quietMs, budgetMs]) => new Promise(resolve => {
+        const start = performance.now();
+        let last = start;
+        const observer = new MutationObserver(() => { last = performance.now(); });
+        observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+        const check = () => {
+            const now = performance.now();
+            if (now - last >= quietMs || now - start >= budgetMs) {
+                observer.disconnect();
+                resolve(now - start);
+            } else {
+                setTimeout(check, 100);
+            }
+        };
+        setTimeout(check, 100);
+    })
+"""
+
 class PlaywrightExtractor:
     """Extrator avançado para páginas dinâmicas com JavaScript"""
     
     def __init__(self):
         """Inicializa o extrator Playwright"""
-        self.available = HAS_PLAYWRIGHT
-        self.browser = None
-        self.context = None
-        
-        # Configurações otimizadas
-        self.browser_args = [
-            '--no-sandbox',
-            '--disable-setuid-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-accelerated-2d-canvas',
-            '--no-first-run',
-            '--no-zygote',
-            '--disable-gpu',
-            '--disable-background-timer-throttling',
-            '--disable-backgrounding-occluded-windows',
-            '--disable-renderer-backgrounding'
-        ]
+        
+        self.lean_mode = os.getenv('PLAYWRIGHT_LEAN_MODE', 'true').lower() == 'true'
+        self.render_budget = int(os.getenv('PLAYWRIGHT_RENDER_BUDGET_MS', 8000))
+        self.dom_quiet_ms = int(os.getenv('PLAYWRIGHT_DOM_QUIET_MS', 500))
+        
+        # Browser e contextos vivem no browser pool (event loop dedicado)
+        browser_pool.set_context_setup(
+            self._setup_context,
+            {'viewport': {'width': 1280, 'height': 800}} if self.lean_mode else None
+        )
         
         self.page_timeout = 30000  # 30 segundos
         self.wait_timeout = 10000  # 10 segundos para elementos
@@ -53,14 +83,29 @@ class PlaywrightExtractor:
             'failed_extractions': 0,
             'dynamic_pages_handled': 0,
             'js_heavy_pages': 0,
-            'auth_pages_detected': 0
+            'auth_pages_detected': 0,
+            'pages_rendered': 0,
+            'bytes_transferred': 0,
+            'requests_allowed': 0,
+            'requests_blocked': 0
         }
+        self.render_times = LatencyHistogram()
         
-        if self.available:
+        if HAS_PLAYWRIGHT:
             logger.info("✅ Playwright Extractor inicializado")
         else:
             logger.warning("⚠️ Playwright não disponível - instale com: pip install playwright && playwright install")
     
+    @property
+    def available(self) -> bool:
+        """Playwright instalado e browser pool sem falha de lançamento"""
+        return HAS_PLAYWRIGHT and browser_pool.available
+    
+    def submit_extraction(self, url: str, wait_for_content: bool = True):
+        """Agenda a extração no browser pool e retorna um concurrent.futures.Future"""
+        self.stats['total_extractions'] += 1
+        return browser_pool.submit(lambda page: self._extract_on_page(page, url, wait_for_content))
+    
     async def extract_dynamic_content(self, url: str, wait_for_content: bool = True) -> Dict[str, Any]:
         """Extrai conteúdo de páginas dinâmicas"""
         
@@ -71,126 +116,179 @@ class PlaywrightExtractor:
                 'content': None
             }
         
-        self.stats['total_extractions'] += 1
+        try:
+            # O browser pertence ao loop do pool; aqui só aguardamos o resultado
+            return await asyncio.wrap_future(self.submit_extraction(url, wait_for_content))
+        except Exception as e:
+            return self._failure(e)
+    
+    async def _setup_context(self, context):
+        """Aplicado pelo browser pool a cada contexto novo"""
+        # Intercepta requests para otimizar
+        await context.route("**/*", self._route_request)
+    
+    async def _route_request(self, route):
+        """Descarta recursos que não contribuem para o texto da página"""
+        
+        request = route.request
+        blocked_types = LEAN_BLOCKED_RESOURCE_TYPES if self.lean_mode else DEFAULT_BLOCKED_RESOURCE_TYPES
         
+        # A lista de hosts é para rastreadores embutidos: a página pedida
+        # (documento principal) carrega mesmo que esteja num desses hosts
+        blocked_host = (
+            self.lean_mode and
+            self._is_blocked_host(request.url) and
+            not self._is_main_document(request)
+        )
+        
+        if request.resource_type in blocked_types or blocked_host:
+            self.stats['requests_blocked'] += 1
+            await route.abort()
+        else:
+            self.stats['requests_allowed'] += 1
+            await route.continue_()
+    
+    def _is_main_document(self, request) -> bool:
+        if request.resource_type != 'document':
+            return False
         try:
-            # Inicia browser se necessário
-            if not self.browser:
-                await self._init_browser()
-            
-            # Cria nova página
-            page = await self.context.new_page()
+            return request.frame.parent_frame is None
+        except Exception:
+            # Requisição sem frame (ex.: service worker): trata como navegação
+            return True
+    
+    def _is_blocked_host(self, url: str) -> bool:
+        host = (urlparse(url).hostname or '').lower()
+        return any(host == blocked or host.endswith('.' + blocked) for blocked in BLOCKED_HOSTS)
+    
+    async def _extract_on_page(self, page: Page, url: str, wait_for_content: bool = True) -> Dict[str, Any]:
+        """Extrai conteúdo em uma página emprestada pelo browser pool"""
+        
+        # Exceções (navegação, crash) sobem para o pool, que descarta a página
+        
+        # Configura timeouts
+        page.set_default_timeout(self.page_timeout)
+        
+        # Tamanhos das respostas desta navegação (a página é reutilizada entre jobs)
+        size_tasks = []
+        
+        def on_request_finished(request):
+            size_tasks.append(asyncio.ensure_future(request.sizes()))
+        
+        page.on('requestfinished', on_request_finished)
+        
+        try:
+            return await self._render_and_extract(page, url, size_tasks)
+        finally:
+            page.remove_listener('requestfinished', on_request_finished)
+            for task in size_tasks:
+                task.cancel()
+    
+    async def _render_and_extract(self, page: Page, url: str, size_tasks: List[asyncio.Future]) -> Dict[str, Any]:
+        """Navega, aguarda a renderização dentro do orçamento e extrai"""
+        
+        logger.info(f"🌐 Navegando para: {url}")
+        
+        render_start = time.time()
+        deadline = render_start + self.render_budget / 1000
+        
+        # Navega para a página
+        response = await page.goto(url, wait_until='domcontentloaded')
+        
+        if not response or response.status >= 400:
+            return {
+                'success': False,
+                'error': f'HTTP {response.status if response else "No response"}',
+                'content': None
+            }
+        
+        # Detecta tipo de página
+        page_type = await self._detect_page_type(page)
+        logger.info(f"🔍 Tipo de página detectado: {page_type}")
+        
+        # Aguarda carregamento baseado no tipo
+        if page_type == 'dynamic':
+            await self._wait_for_dynamic_content(page, deadline)
+            self.stats['dynamic_pages_handled'] += 1
+        elif page_type == 'js_heavy':
+            await self._wait_for_js_content(page, deadline)
+            self.stats['js_heavy_pages'] += 1
+        elif page_type == 'auth_required':
+            self.stats['auth_pages_detected'] += 1
+            return {
+                'success': False,
+                'error': 'Página requer autenticação',
+                'content': None,
+                'page_type': page_type
+            }
+        
+        render_time = time.time() - render_start
+        
+        # Extrai conteúdo principal
+        content = await self._extract_main_content(page)
+        
+        # Extrai metadados
+        metadata = await self._extract_metadata(page)
+        
+        bytes_transferred = await self._sum_transferred_bytes(size_tasks)
+        self._record_page(render_time, bytes_transferred)
+        
+        if content and len(content) > 100:
+            self.stats['successful_extractions'] += 1
             
-            try:
-                # Configura timeouts
-                page.set_default_timeout(self.page_timeout)
-                
-                # Intercepta requests para otimizar
-                await page.route("**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2}", lambda route: route.abort())
-                
-                logger.info(f"🌐 Navegando para: {url}")
-                
-                # Navega para a página
-                response = await page.goto(url, wait_until='domcontentloaded')
-                
-                if not response or response.status >= 400:
-                    return {
-                        'success': False,
-                        'error': f'HTTP {response.status if response else "No response"}',
-                        'content': None
-                    }
-                
-                # Detecta tipo de página
-                page_type = await self._detect_page_type(page)
-                logger.info(f"🔍 Tipo de página detectado: {page_type}")
-                
-                # Aguarda carregamento baseado no tipo
-                if page_type == 'dynamic':
-                    await self._wait_for_dynamic_content(page)
-                    self.stats['dynamic_pages_handled'] += 1
-                elif page_type == 'js_heavy':
-                    await self._wait_for_js_content(page)
-                    self.stats['js_heavy_pages'] += 1
-                elif page_type == 'auth_required':
-                    self.stats['auth_pages_detected'] += 1
-                    return {
-                        'success': False,
-                        'error': 'Página requer autenticação',
-                        'content': None,
-                        'page_type': page_type
-                    }
-                
-                # Extrai conteúdo principal
-                content = await self._extract_main_content(page)
-                
-                # Extrai metadados
-                metadata = await self._extract_metadata(page)
-                
-                if content and len(content) > 100:
-                    self.stats['successful_extractions'] += 1
-                    
-                    return {
-                        'success': True,
-                        'content': content,
-                        'metadata': metadata,
-                        'page_type': page_type,
-                        'url': url,
-                        'extraction_method': 'playwright'
-                    }
-                else:
-                    self.stats['failed_extractions'] += 1
-                    return {
-                        'success': False,
-                        'error': 'Conteúdo insuficiente extraído',
-                        'content': content,
-                        'metadata': metadata
-                    }
-                
-            finally:
-                await page.close()
-                
-        except Exception as e:
+            return {
+                'success': True,
+                'content': content,
+                'metadata': metadata,
+                'page_type': page_type,
+                'url': url,
+                'extraction_method': 'playwright',
+                'render_time': render_time,
+                'bytes_transferred': bytes_transferred
+            }
+        else:
             self.stats['failed_extractions'] += 1
-            logger.error(f"❌ Erro na extração Playwright: {str(e)}")
             return {
                 'success': False,
-                'error': str(e),
-                'content': None
+                'error': 'Conteúdo insuficiente extraído',
+                'content': content,
+                'metadata': metadata
             }
     
-    async def _init_browser(self):
-        """Inicializa browser Playwright"""
-        try:
-            try:
-                self.playwright = await async_playwright().start()
-                
-                # Usa Chromium para melhor compatibilidade
-                self.browser = await self.playwright.chromium.launch(
-                    headless=True,
-                    args=self.browser_args
-                )
-            except Exception as browser_error:
-                logger.error(f"❌ Playwright não disponível: {browser_error}")
-                self.available = False
-                return None
-            
-            # Cria contexto com configurações otimizadas
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='pt-BR',
-                timezone_id='America/Sao_Paulo',
-                extra_http_headers={
-                    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8'
-                }
-            )
-            
-            logger.info("✅ Browser Playwright inicializado")
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao inicializar browser: {e}")
-            self.available = False
-            raise
+    async def _sum_transferred_bytes(self, size_tasks: List[asyncio.Future]) -> int:
+        """Soma cabeçalhos e corpos das respostas concluídas na navegação"""
+        
+        if not size_tasks:
+            return 0
+        
+        done, _ = await asyncio.wait(list(size_tasks), timeout=1)
+        total = 0
+        for task in done:
+            if task.cancelled() or task.exception() is not None:
+                continue
+            sizes = task.result()
+            total += max(sizes.get('responseBodySize', 0), 0) + max(sizes.get('responseHeadersSize', 0), 0)
+        return total
+    
+    def _record_page(self, render_time: float, bytes_transferred: int):
+        self.stats['pages_rendered'] += 1
+        self.stats['bytes_transferred'] += bytes_transferred
+        self.render_times.record(render_time)
+    
+    def _remaining_ms(self, deadline: float) -> int:
+        """Milissegundos restantes do orçamento de renderização"""
+        return max(0, int((deadline - time.time()) * 1000))
+    
+    def _failure(self, error: Exception) -> Dict[str, Any]:
+        """Resultado de erro para exceções vindas do browser pool"""
+        self.stats['failed_extractions'] += 1
+        message = str(error) or type(error).__name__
+        logger.error(f"❌ Erro na extração Playwright: {message}")
+        return {
+            'success': False,
+            'error': message,
+            'content': None
+        }
     
     async def _detect_page_type(self, page: Page) -> str:
         """Detecta tipo de página para estratégia de extração"""
@@ -239,36 +337,30 @@ class PlaywrightExtractor:
             logger.warning(f"⚠️ Erro ao detectar tipo de página: {e}")
             return 'unknown'
     
-    async def _wait_for_dynamic_content(self, page: Page):
-        """Aguarda carregamento de conteúdo dinâmico"""
+    async def _wait_for_dynamic_content(self, page: Page, deadline: float):
+        """Aguarda carregamento de conteúdo dinâmico dentro do orçamento"""
         
         try:
-            # Aguarda elementos comuns de conteúdo
-            content_selectors = [
-                'main', 'article', '.content', '#content', 
+            # Aguarda elementos comuns de conteúdo (um único seletor, um único prazo)
+            content_selector = ', '.join([
+                'main', 'article', '.content', '#content',
                 '.post', '.article', '.entry', '.text-content',
                 '[role="main"]', '[role="article"]'
-            ]
-            
-            for selector in content_selectors:
-                try:
-                    await page.wait_for_selector(selector, timeout=5000)
-                    logger.info(f"✅ Conteúdo dinâmico carregado: {selector}")
-                    break
-                except:
-                    continue
+            ])
             
-            # Aguarda estabilização do DOM
-            await page.wait_for_load_state('networkidle', timeout=10000)
+            try:
+                await page.wait_for_selector(content_selector, timeout=min(5000, self._remaining_ms(deadline)) or 1)
+                logger.info("✅ Conteúdo dinâmico carregado")
+            except Exception:
+                pass
             
-            # Aguarda um pouco mais para renderização
-            await asyncio.sleep(2)
+            await self._wait_for_stable_page(page, deadline)
             
         except Exception as e:
             logger.warning(f"⚠️ Timeout aguardando conteúdo dinâmico: {e}")
     
-    async def _wait_for_js_content(self, page: Page):
-        """Aguarda carregamento de conteúdo JavaScript"""
+    async def _wait_for_js_content(self, page: Page, deadline: float):
+        """Aguarda carregamento de conteúdo JavaScript dentro do orçamento"""
         
         try:
             # Aguarda que o body tenha conteúdo substancial
@@ -277,13 +369,32 @@ class PlaywrightExtractor:
                     const text = document.body.innerText;
                     return text && text.length > 200;
                 }
-            """, timeout=15000)
+            """, timeout=self._remaining_ms(deadline) or 1)
             
             logger.info("✅ Conteúdo JavaScript carregado")
             
+            await self._wait_for_stable_page(page, deadline)
+            
         except Exception as e:
             logger.warning(f"⚠️ Timeout aguardando conteúdo JS: {e}")
     
+    async def _wait_for_stable_page(self, page: Page, deadline: float):
+        """Rede ociosa e DOM sem mutações, o que vier dentro do prazo restante"""
+        
+        remaining = self._remaining_ms(deadline)
+        if remaining <= 0:
+            return
+        
+        try:
+            await page.wait_for_load_state('networkidle', timeout=remaining)
+        except Exception:
+            # Conexões longas (polling, analytics) impedem networkidle; o DOM decide
+            pass
+        
+        remaining = self._remaining_ms(deadline)
+        if remaining > 0:
+            await page.evaluate(DOM_STABILITY_SCRIPT, [self.dom_quiet_ms, remaining])
+    
     async def _extract_main_content(self, page: Page) -> Optional[str]:
         """Extrai conteúdo principal da página"""
         
@@ -439,26 +550,20 @@ class PlaywrightExtractor:
         return content.strip()
     
     def extract_content_sync(self, url: str) -> Dict[str, Any]:
-        """Versão síncrona para compatibilidade"""
+        """Versão síncrona: aguarda o future do browser pool"""
         
-        try:
-            # Executa em loop de eventos
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                result = loop.run_until_complete(self.extract_dynamic_content(url))
-                return result
-            finally:
-                loop.close()
-                
-        except Exception as e:
-            logger.error(f"❌ Erro na extração síncrona: {e}")
+        if not self.available:
             return {
                 'success': False,
-                'error': str(e),
+                'error': 'Playwright não disponível',
                 'content': None
             }
+        
+        try:
+            future = self.submit_extraction(url)
+            return future.result(timeout=browser_pool.acquire_timeout + browser_pool.job_timeout)
+        except Exception as e:
+            return self._failure(e)
     
     async def batch_extract(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
         """Extrai conteúdo de múltiplas URLs em paralelo"""
@@ -466,71 +571,38 @@ class PlaywrightExtractor:
         if not self.available:
             return {}
         
-        try:
-            if not self.browser:
-                await self._init_browser()
-            
-            # Limita concorrência para não sobrecarregar
-            semaphore = asyncio.Semaphore(3)
-            
-            async def extract_with_semaphore(url):
-                async with semaphore:
-                    return await self.extract_dynamic_content(url)
-            
-            # Executa extrações em paralelo
-            tasks = [extract_with_semaphore(url) for url in urls]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Organiza resultados
-            batch_results = {}
-            for url, result in zip(urls, results):
-                if isinstance(result, Exception):
-                    batch_results[url] = {
-                        'success': False,
-                        'error': str(result),
-                        'content': None
-                    }
-                else:
-                    batch_results[url] = result
-            
-            return batch_results
-            
-        except Exception as e:
-            logger.error(f"❌ Erro na extração em lote: {e}")
-            return {}
+        # A concorrência é limitada pelo número de contextos do browser pool
+        results = await asyncio.gather(*(self.extract_dynamic_content(url) for url in urls))
+        return dict(zip(urls, results))
     
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do extrator"""
         
         total = self.stats['total_extractions']
         success_rate = (self.stats['successful_extractions'] / total * 100) if total > 0 else 0
+        pool_stats = browser_pool.get_stats()
+        pages = self.stats['pages_rendered']
+        requests_seen = self.stats['requests_allowed'] + self.stats['requests_blocked']
         
         return {
             **self.stats,
             'success_rate': success_rate,
+            'lean_mode': self.lean_mode,
+            'render_budget_ms': self.render_budget,
+            'avg_bytes_per_page': self.stats['bytes_transferred'] / pages if pages else 0,
+            'blocked_request_rate': self.stats['requests_blocked'] / requests_seen * 100 if requests_seen else 0,
+            'render_time': self.render_times.snapshot(),
             'available': self.available,
-            'browser_active': self.browser is not None
+            'browser_active': pool_stats['browser_active'],
+            'browser_pool': pool_stats
         }
     
     async def close(self):
         """Fecha browser e limpa recursos"""
         
-        try:
-            if self.context:
-                await self.context.close()
-                self.context = None
-            
-            if self.browser:
-                await self.browser.close()
-                self.browser = None
-            
-            if hasattr(self, 'playwright'):
-                await self.playwright.stop()
-            
-            logger.info("✅ Playwright Extractor fechado")
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao fechar Playwright: {e}")
+        # close() do pool bloqueia até o loop dedicado encerrar
+        await asyncio.get_running_loop().run_in_executor(None, browser_pool.close)
+        logger.info("✅ Playwright Extractor fechado")
 
 # Instância global
 playwright_extractor = PlaywrightExtractor()
@@ -10,6 +10,7 @@ from typing import Dict, List, Optional, Any
 import os
 import logging
 from .robust_content_extractor import robust_content_extractor
+from .http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -30,10 +31,9 @@ class ProductionContentExtractor:
         """Redireciona para RobustContentExtractor"""
         # RobustContentExtractor não tem extract_metadata, então mantém funcionalidade básica
         try:
-            import requests
             from bs4 import BeautifulSoup
 
-            response = requests.get(url, timeout=15)
+            response = http_client.get(url, timeout=15)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
                 title_tag = soup.find('title')
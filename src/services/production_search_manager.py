@@ -8,12 +8,17 @@ Gerenciador de busca para produção com múltiplos provedores e fallbacks
 import os
 import logging
 import time
-import requests
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Dict, List, Optional, Any, Callable
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
 import random
+from services.tiered_cache import TieredCache, normalize_cache_text
+from services.http_client import http_client
+from services.latency_histogram import LatencyHistogram
+from services.circuit_breaker import circuit_breakers
 
 logger = logging.getLogger(__name__)
 
@@ -65,8 +70,35 @@ class ProductionSearchManager:
             'Connection': 'keep-alive'
         }
         
-        self.cache = {}
-        self.cache_ttl = 3600  # 1 hora
+        self.cache_ttl = int(os.getenv('SEARCH_CACHE_TTL', 3600))  # 1 hora
+        self.cache = TieredCache(
+            namespace='search',
+            default_ttl=self.cache_ttl,
+            memory_max_bytes=int(os.getenv('SEARCH_CACHE_MEMORY_MAX_BYTES', 8 * 1024 * 1024)),
+            shared_backend=os.getenv('SEARCH_CACHE_BACKEND'),
+            shared_max_bytes=int(os.getenv('SEARCH_CACHE_DISK_MAX_BYTES', 128 * 1024 * 1024))
+        )
+        
+        # Busca com hedge: dispara o próximo provedor quando o atual passa do
+        # percentil de latência configurado e fica com a primeira resposta
+        self.hedge_enabled = os.getenv('SEARCH_HEDGE_ENABLED', 'true').lower() == 'true'
+        self.hedge_percentile = float(os.getenv('SEARCH_HEDGE_PERCENTILE', 90))
+        self.hedge_default_delay = float(os.getenv('SEARCH_HEDGE_DEFAULT_DELAY', 3.0))
+        self.hedge_min_delay = float(os.getenv('SEARCH_HEDGE_MIN_DELAY', 0.5))
+        self.hedge_min_samples = int(os.getenv('SEARCH_HEDGE_MIN_SAMPLES', 5))
+        self.hedge_merge_count = int(os.getenv('SEARCH_HEDGE_MERGE_COUNT', 1))
+        self.hedge_deadline = float(os.getenv('SEARCH_HEDGE_DEADLINE_SECONDS', 20))
+        self.provider_timeout = float(os.getenv('SEARCH_PROVIDER_TIMEOUT', 15))
+        
+        self.latency = {name: LatencyHistogram() for name in self.providers}
+        
+        # Disjuntor por provedor: abre após max_errors falhas seguidas e se recupera sozinho
+        self.breakers = circuit_breakers.group('search')
+        for name, provider in self.providers.items():
+            self.breakers.breaker(name, provider['max_errors'])
+        self.provider_wins = {name: 0 for name in self.providers}
+        self.provider_cancelled = {name: 0 for name in self.providers}
+        self._stats_lock = threading.Lock()
         
         enabled_count = sum(1 for p in self.providers.values() if p['enabled'])
         logger.info(f"Production Search Manager inicializado com {enabled_count} provedores")
@@ -74,43 +106,47 @@ class ProductionSearchManager:
     def search_with_fallback(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """Realiza busca com sistema de fallback automático"""
         
-        # Verifica cache primeiro
-        cache_key = f"{query}_{max_results}"
-        if cache_key in self.cache:
-            cache_data = self.cache[cache_key]
-            if time.time() - cache_data['timestamp'] < self.cache_ttl:
-                logger.info(f"🔄 Resultado do cache para: {query}")
-                return cache_data['results']
-        
-        # Busca com fallback
-        for provider_name in self._get_provider_order():
-            if not self._is_provider_available(provider_name):
+        # Verifica cache primeiro (compartilhado entre workers)
+        cache_key = self._build_cache_key(query, max_results)
+        cache_data = self.cache.get(cache_key)
+        if cache_data:
+            logger.info(f"🔄 Resultado do cache para: {query}")
+            return cache_data['results']
+        
+        provider_order = self._get_provider_order()
+        
+        if self.hedge_enabled and len(provider_order) > 1:
+            results, provider_name = self._hedged_search(provider_order, query, max_results)
+        else:
+            results, provider_name = self._sequential_search(provider_order, query, max_results)
+        
+        if results:
+            # Cache resultado
+            self.cache.set(cache_key, {
+                'results': results,
+                'timestamp': time.time(),
+                'provider': provider_name
+            })
+            return results
+        
+        logger.error("❌ Todos os provedores de busca falharam")
+        return []
+    
+    def _sequential_search(self, provider_order: List[str], query: str, max_results: int):
+        """Tenta um provedor por vez, na ordem de prioridade"""
+        
+        for provider_name in provider_order:
+            if not self.providers[provider_name]['enabled'] or not self.breakers.breaker(provider_name).allow_request():
                 continue
             
             try:
                 logger.info(f"🔍 Buscando com {provider_name}: {query}")
-                
-                if provider_name == 'google':
-                    results = self._search_google(query, max_results)
-                elif provider_name == 'serper':
-                    results = self._search_serper(query, max_results)
-                elif provider_name == 'bing':
-                    results = self._search_bing(query, max_results)
-                elif provider_name == 'duckduckgo':
-                    results = self._search_duckduckgo(query, max_results)
-                else:
-                    continue
+                results = self._run_provider(provider_name, query, max_results)
                 
                 if results:
-                    # Cache resultado
-                    self.cache[cache_key] = {
-                        'results': results,
-                        'timestamp': time.time(),
-                        'provider': provider_name
-                    }
-                    
                     logger.info(f"✅ {provider_name}: {len(results)} resultados")
-                    return results
+                    self._count(self.provider_wins, provider_name)
+                    return results, provider_name
                 else:
                     logger.warning(f"⚠️ {provider_name}: 0 resultados")
                     
@@ -119,36 +155,169 @@ class ProductionSearchManager:
                 self._record_provider_error(provider_name)
                 continue
         
-        logger.error("❌ Todos os provedores de busca falharam")
-        return []
+        return [], None
     
-    def _get_provider_order(self) -> List[str]:
-        """Retorna provedores ordenados por prioridade"""
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items()
-            if self._is_provider_available(name)
-        ]
+    def _hedged_search(self, provider_order: List[str], query: str, max_results: int):
+        """
+        Dispara o primeiro provedor e, se ele não responder dentro do seu
+        atraso de hedge (percentil de latência), dispara o próximo em
+        paralelo. Fica com a primeira resposta não vazia ou, com
+        SEARCH_HEDGE_MERGE_COUNT > 1, combina as primeiras N até o prazo.
+        Provedores ainda na fila são cancelados; os que já estão em voo têm
+        a resposta descartada. Cada busca tem seu próprio pool, com uma
+        thread por provedor: requisições perdedoras ainda em voo não ocupam
+        vagas de outras buscas e, com o timeout limitado ao prazo do hedge,
+        terminam no máximo junto com ele.
+        """
+        
+        executor = ThreadPoolExecutor(max_workers=len(provider_order), thread_name_prefix='search-hedge')
+        deadline = time.time() + self.hedge_deadline
+        merge_count = max(1, self.hedge_merge_count)
         
-        # Ordena por prioridade e número de erros
-        available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['error_count']))
+        pending: Dict[Future, str] = {}
+        answers = []
+        next_index = 0
+        next_launch_at = 0.0
         
-        return [name for name, _ in available_providers]
+        try:
+            while len(answers) < merge_count:
+                now = time.time()
+                if now >= deadline or (not pending and next_index >= len(provider_order)):
+                    break
+                
+                # Lança o próximo provedor se o atual estourou o atraso ou já terminou sem resposta
+                if next_index < len(provider_order) and (not pending or now >= next_launch_at):
+                    provider_name = provider_order[next_index]
+                    next_index += 1
+                    
+                    # Circuito pode ter aberto (ou o teste de recuperação já ter dono) desde a ordenação
+                    if not self.breakers.breaker(provider_name).allow_request():
+                        continue
+                    
+                    if pending:
+                        logger.info(f"🏁 Hedge: {provider_name} disparado em paralelo para: {query}")
+                    else:
+                        logger.info(f"🔍 Buscando com {provider_name}: {query}")
+                    
+                    timeout = max(0.5, min(self.provider_timeout, deadline - now))
+                    future = executor.submit(self._run_provider, provider_name, query, max_results, timeout)
+                    pending[future] = provider_name
+                    next_launch_at = now + self._get_hedge_delay(provider_name)
+                    continue
+                
+                wake_at = min(deadline, next_launch_at) if next_index < len(provider_order) else deadline
+                done, _ = wait(list(pending), timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    provider_name = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Erro em {provider_name}: {str(e)}")
+                        self._record_provider_error(provider_name)
+                        continue
+                    
+                    if results:
+                        logger.info(f"✅ {provider_name}: {len(results)} resultados")
+                        self._count(self.provider_wins, provider_name)
+                        answers.append((provider_name, results))
+                    else:
+                        logger.warning(f"⚠️ {provider_name}: 0 resultados")
+        
+        finally:
+            for future, provider_name in pending.items():
+                if future.cancel():
+                    # Nem chegou a rodar: libera o teste de recuperação, se era um
+                    self.breakers.breaker(provider_name).release_probe()
+                self._count(self.provider_cancelled, provider_name)
+            if pending:
+                logger.info(f"✂️ Hedge: descartadas respostas de {', '.join(pending.values())}")
+            executor.shutdown(wait=False)
+        
+        if not answers:
+            return [], None
+        
+        if len(answers) == 1:
+            return answers[0][1], answers[0][0]
+        
+        # Combina respostas por ordem de chegada, sem URLs repetidas
+        merged = []
+        seen_urls = set()
+        for _, results in answers:
+            for result in results:
+                url = result.get('url')
+                if url and url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                merged.append(result)
+        
+        return merged[:max_results], '+'.join(name for name, _ in answers)
+    
+    def _run_provider(
+        self,
+        provider_name: str,
+        query: str,
+        max_results: int,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Executa um provedor e registra latência e resultado no disjuntor"""
+        
+        search_funcs: Dict[str, Callable[[str, int, float], List[Dict[str, Any]]]] = {
+            'google': self._search_google,
+            'serper': self._search_serper,
+            'bing': self._search_bing,
+            'duckduckgo': self._search_duckduckgo
+        }
+        
+        start_time = time.time()
+        try:
+            results = search_funcs[provider_name](query, max_results, timeout or self.provider_timeout)
+        except Exception:
+            self.breakers.breaker(provider_name).record_failure(time.time() - start_time)
+            raise
+        finally:
+            # Inclui respostas descartadas pelo hedge para não subestimar a cauda
+            self.latency[provider_name].record(time.time() - start_time)
+        
+        self.breakers.breaker(provider_name).record_success(time.time() - start_time)
+        return results
+    
+    def _get_hedge_delay(self, provider_name: str) -> float:
+        """Tempo de espera antes de disparar o próximo provedor"""
+        
+        histogram = self.latency[provider_name]
+        if histogram.count() < self.hedge_min_samples:
+            return self.hedge_default_delay
+        
+        return max(self.hedge_min_delay, histogram.percentile(self.hedge_percentile))
+    
+    def _build_cache_key(self, query: str, max_results: int) -> str:
+        """Gera chave de cache normalizada para a query"""
+        return f"{normalize_cache_text(query)}_{max_results}"
+    
+    def _get_provider_order(self) -> List[str]:
+        """Provedores com circuito fechado, do mais rápido ao mais lento (prioridade sem histórico)"""
+        return self.breakers.order({
+            name: provider['priority'] for name, provider in self.providers.items() if provider['enabled']
+        })
     
     def _is_provider_available(self, provider_name: str) -> bool:
         """Verifica se provedor está disponível"""
         provider = self.providers.get(provider_name, {})
-        return (provider.get('enabled', False) and 
-                provider.get('error_count', 0) < provider.get('max_errors', 3))
+        return provider.get('enabled', False) and self.breakers.breaker(provider_name).is_available()
     
     def _record_provider_error(self, provider_name: str):
-        """Registra erro do provedor"""
+        """Registra erro do provedor (o disjuntor já recebeu a falha em _run_provider)"""
         if provider_name in self.providers:
-            self.providers[provider_name]['error_count'] += 1
-            
-            if self.providers[provider_name]['error_count'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Provedor {provider_name} desabilitado temporariamente")
+            with self._stats_lock:
+                self.providers[provider_name]['error_count'] += 1
+    
+    def _count(self, counters: Dict[str, int], provider_name: str):
+        """Incrementa contador por provedor; chamado por threads de requisições concorrentes"""
+        with self._stats_lock:
+            counters[provider_name] += 1
     
-    def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _search_google(self, query: str, max_results: int, timeout: float = 15) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
         provider = self.providers['google']
         
@@ -162,11 +331,11 @@ class ProductionSearchManager:
             'safe': 'off'
         }
         
-        response = requests.get(
+        response = http_client.get(
             provider['base_url'],
             params=params,
             headers=self.headers,
-            timeout=15
+            timeout=timeout
         )
         
         if response.status_code == 200:
@@ -185,7 +354,7 @@ class ProductionSearchManager:
         else:
             raise Exception(f"Google API retornou status {response.status_code}")
     
-    def _search_serper(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _search_serper(self, query: str, max_results: int, timeout: float = 15) -> List[Dict[str, Any]]:
         """Busca usando Serper API"""
         provider = self.providers['serper']
         
@@ -202,11 +371,11 @@ class ProductionSearchManager:
             'num': max_results
         }
         
-        response = requests.post(
+        response = http_client.post(
             provider['base_url'],
             json=payload,
             headers=headers,
-            timeout=15
+            timeout=timeout
         )
         
         if response.status_code == 200:
@@ -225,11 +394,11 @@ class ProductionSearchManager:
         else:
             raise Exception(f"Serper API retornou status {response.status_code}")
     
-    def _search_bing(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _search_bing(self, query: str, max_results: int, timeout: float = 15) -> List[Dict[str, Any]]:
         """Busca usando Bing (scraping)"""
         search_url = f"{self.providers['bing']['base_url']}?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
         
-        response = requests.get(search_url, headers=self.headers, timeout=15)
+        response = http_client.get(search_url, headers=self.headers, timeout=timeout)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -260,11 +429,11 @@ class ProductionSearchManager:
         else:
             raise Exception(f"Bing retornou status {response.status_code}")
     
-    def _search_duckduckgo(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    def _search_duckduckgo(self, query: str, max_results: int, timeout: float = 15) -> List[Dict[str, Any]]:
         """Busca usando DuckDuckGo (scraping)"""
         search_url = f"{self.providers['duckduckgo']['base_url']}?q={quote_plus(query)}"
         
-        response = requests.get(search_url, headers=self.headers, timeout=15)
+        response = http_client.get(search_url, headers=self.headers, timeout=timeout)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -303,25 +472,36 @@ class ProductionSearchManager:
                 'available': self._is_provider_available(name),
                 'priority': provider['priority'],
                 'error_count': provider['error_count'],
-                'max_errors': provider['max_errors']
+                'max_errors': provider['max_errors'],
+                'wins': self.provider_wins[name],
+                'cancelled': self.provider_cancelled[name],
+                'hedge_delay': self._get_hedge_delay(name),
+                'latency': self.latency[name].snapshot(),
+                'circuit': self.breakers.breaker(name).snapshot()
             }
         
         return status
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache de resultados de busca"""
+        return self.cache.get_stats()
+    
     def reset_provider_errors(self, provider_name: str = None):
         """Reset contadores de erro dos provedores"""
         if provider_name:
             if provider_name in self.providers:
                 self.providers[provider_name]['error_count'] = 0
+                self.breakers.reset(provider_name)
                 logger.info(f"🔄 Reset erros do provedor: {provider_name}")
         else:
             for provider in self.providers.values():
                 provider['error_count'] = 0
+            self.breakers.reset()
             logger.info("🔄 Reset erros de todos os provedores")
     
     def clear_cache(self):
         """Limpa cache de busca"""
-        self.cache = {}
+        self.cache.clear()
         logger.info("🧹 Cache de busca limpo")
     
     def test_provider(self, provider_name: str) -> bool:
@@ -332,16 +512,7 @@ class ProductionSearchManager:
         try:
             test_query = "teste mercado digital Brasil"
             
-            if provider_name == 'google':
-                results = self._search_google(test_query, 3)
-            elif provider_name == 'serper':
-                results = self._search_serper(test_query, 3)
-            elif provider_name == 'bing':
-                results = self._search_bing(test_query, 3)
-            elif provider_name == 'duckduckgo':
-                results = self._search_duckduckgo(test_query, 3)
-            else:
-                return False
+            results = self._run_provider(provider_name, test_query, 3)
             
             return len(results) > 0
             
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Progress Bus
+Barramento de eventos de progresso compartilhado entre workers: fluxo
+ordenado de eventos por sessão em SQLite local (ou Redis opcional), leitura
+por cursor com long-polling e expiração por TTL
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+
+class SQLiteProgressStore:
+    """Sessões e eventos em SQLite (WAL), visíveis a todos os workers da máquina"""
+    
+    name = 'sqlite'
+    
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+    
+    def ping(self):
+        with closing(self._connect()) as conn:
+            conn.execute("SELECT 1 FROM progress_sessions LIMIT 1").fetchall()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS progress_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT,
+                    last_seq INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS progress_events (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event_type TEXT NOT NULL,
+                    data TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_progress_sessions_expires ON progress_sessions(expires_at)")
+    
+    def create_session(self, session_id: str, state: Dict[str, Any], ttl: float):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM progress_events WHERE session_id = ?", (session_id,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO progress_sessions "
+                    "(session_id, state, last_seq, created_at, updated_at, expires_at) VALUES (?, ?, 0, ?, ?, ?)",
+                    (session_id, json.dumps(state, default=str), now, now, now + ttl)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def publish(
+        self,
+        session_id: str,
+        event_type: str,
+        data: Dict[str, Any],
+        state: Optional[Dict[str, Any]],
+        ttl: float
+    ) -> Optional[int]:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # Número de sequência atribuído na mesma transação que grava o evento
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT last_seq FROM progress_sessions WHERE session_id = ? AND expires_at > ?",
+                    (session_id, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("ROLLBACK")
+                    return None
+                
+                seq = row['last_seq'] + 1
+                conn.execute(
+                    "INSERT INTO progress_events (session_id, seq, event_type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, seq, event_type, json.dumps(data, default=str), now)
+                )
+                if state is not None:
+                    conn.execute(
+                        "UPDATE progress_sessions SET last_seq = ?, state = ?, updated_at = ?, expires_at = ? "
+                        "WHERE session_id = ?",
+                        (seq, json.dumps(state, default=str), now, now + ttl, session_id)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE progress_sessions SET last_seq = ?, updated_at = ?, expires_at = ? WHERE session_id = ?",
+                        (seq, now, now + ttl, session_id)
+                    )
+                conn.execute("COMMIT")
+                return seq
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM progress_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time())
+            ).fetchone()
+        return self._session_from_row(row) if row else None
+    
+    def read_events(self, session_id: str, after: int, limit: Optional[int]) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT e.seq, e.event_type, e.data, e.created_at FROM progress_events e
+                JOIN progress_sessions s ON s.session_id = e.session_id
+                WHERE e.session_id = ? AND e.seq > ? AND s.expires_at > ?
+                ORDER BY e.seq LIMIT ?
+                """,
+                (session_id, after, time.time(), limit if limit else -1)
+            ).fetchall()
+        return [
+            {'id': row['seq'], 'event': row['event_type'], 'data': json.loads(row['data']), 'timestamp': row['created_at']}
+            for row in rows
+        ]
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM progress_sessions WHERE expires_at > ? ORDER BY created_at",
+                (time.time(),)
+            ).fetchall()
+        return [self._session_from_row(row) for row in rows]
+    
+    def delete_session(self, session_id: str):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM progress_events WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM progress_sessions WHERE session_id = ?", (session_id,))
+    
+    def cleanup_expired(self) -> int:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM progress_events WHERE session_id IN "
+                "(SELECT session_id FROM progress_sessions WHERE expires_at <= ?)",
+                (now,)
+            )
+            return conn.execute("DELETE FROM progress_sessions WHERE expires_at <= ?", (now,)).rowcount
+    
+    def _session_from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'session_id': row['session_id'],
+            'state': json.loads(row['state']) if row['state'] else {},
+            'last_seq': row['last_seq'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'expires_at': row['expires_at']
+        }
+
+
+class RedisProgressStore:
+    """Sessões e eventos em Redis; o TTL das chaves faz a expiração"""
+    
+    name = 'redis'
+    
+    # Atualiza a sessão e anexa o evento de uma vez só, no servidor: dois
+    # workers publicando juntos não sobrescrevem o estado um do outro
+    PUBLISH_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return false
+    end
+    redis.call('HSET', KEYS[1], 'updated_at', ARGV[2])
+    if ARGV[3] ~= '' then
+        redis.call('HSET', KEYS[1], 'state', ARGV[3])
+    end
+    local seq = redis.call('RPUSH', KEYS[2], ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+    return seq
+    """
+    
+    def __init__(self, url: str, prefix: str = 'arqv30:progress'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._publish = self.client.register_script(self.PUBLISH_SCRIPT)
+    
+    def ping(self):
+        self.client.ping()
+    
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:session"
+    
+    def _events_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:events"
+    
+    def create_session(self, session_id: str, state: Dict[str, Any], ttl: float):
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.delete(self._events_key(session_id), self._session_key(session_id))
+        pipe.hset(self._session_key(session_id), mapping={
+            'state': json.dumps(state, default=str),
+            'created_at': now,
+            'updated_at': now
+        })
+        pipe.expire(self._session_key(session_id), int(ttl))
+        pipe.execute()
+    
+    def publish(
+        self,
+        session_id: str,
+        event_type: str,
+        data: Dict[str, Any],
+        state: Optional[Dict[str, Any]],
+        ttl: float
+    ) -> Optional[int]:
+        now = time.time()
+        event = json.dumps({'event': event_type, 'data': data, 'timestamp': now}, default=str)
+        
+        # A posição na lista é o número de sequência
+        seq = self._publish(
+            keys=[self._session_key(session_id), self._events_key(session_id)],
+            args=[event, now, json.dumps(state, default=str) if state is not None else '', int(ttl)]
+        )
+        return int(seq) if seq else None
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        pipe = self.client.pipeline()
+        pipe.hgetall(self._session_key(session_id))
+        pipe.llen(self._events_key(session_id))
+        pipe.ttl(self._session_key(session_id))
+        fields, last_seq, ttl = pipe.execute()
+        if not fields:
+            return None
+        
+        session = {
+            (key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+            for key, value in fields.items()
+        }
+        return {
+            'session_id': session_id,
+            'state': json.loads(session.get('state') or '{}'),
+            'last_seq': last_seq,
+            'created_at': float(session['created_at']) if session.get('created_at') else None,
+            'updated_at': float(session['updated_at']) if session.get('updated_at') else None,
+            'expires_at': time.time() + max(ttl, 0)
+        }
+    
+    def read_events(self, session_id: str, after: int, limit: Optional[int]) -> List[Dict[str, Any]]:
+        end = after + limit - 1 if limit else -1
+        raw_events = self.client.lrange(self._events_key(session_id), after, end)
+        events = []
+        for offset, raw in enumerate(raw_events):
+            event = json.loads(raw)
+            events.append({'id': after + offset + 1, **event})
+        return events
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        sessions = []
+        for key in self.client.scan_iter(match=f"{self.prefix}:*:session"):
+            key = key.decode() if isinstance(key, bytes) else key
+            session = self.get_session(key[len(self.prefix) + 1:-len(':session')])
+            if session:
+                sessions.append(session)
+        return sorted(sessions, key=lambda session: session.get('created_at') or 0)
+    
+    def delete_session(self, session_id: str):
+        self.client.delete(self._session_key(session_id), self._events_key(session_id))
+    
+    def cleanup_expired(self) -> int:
+        return 0
+
+
+class ProgressBus:
+    """Publica e entrega eventos de progresso de qualquer worker para qualquer worker"""
+    
+    def __init__(self):
+        """Inicializa barramento"""
+        self.session_ttl = int(os.getenv('PROGRESS_SESSION_TTL', 3600))
+        self.completed_ttl = int(os.getenv('PROGRESS_COMPLETED_TTL', 300))
+        self.poll_interval = float(os.getenv('PROGRESS_POLL_INTERVAL', 0.5))
+        self.max_wait = float(os.getenv('PROGRESS_MAX_WAIT_SECONDS', 30))
+        self.cleanup_interval = 60
+        
+        self.store = self._create_store(
+            os.getenv('PROGRESS_BUS_BACKEND', 'sqlite'),
+            os.getenv('PROGRESS_BUS_DB', 'relatorios_intermediarios/progress_bus.db')
+        )
+        
+        # Acorda long-polls deste processo sem esperar o próximo intervalo
+        self._condition = threading.Condition()
+        self._last_cleanup = 0.0
+        
+        logger.info(f"Progress Bus inicializado ({self.store.name}, TTL {self.session_ttl}s)")
+    
+    def _create_store(self, backend: str, db_path: str):
+        """Cria o armazenamento configurado, com fallback para SQLite"""
+        if (backend or '').lower() == 'redis':
+            if HAS_REDIS and os.getenv('REDIS_URL'):
+                try:
+                    store = RedisProgressStore(os.getenv('REDIS_URL'))
+                    store.client.ping()
+                    return store
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis indisponível para progresso: {e}")
+            else:
+                logger.warning("⚠️ Redis não configurado (REDIS_URL) - usando SQLite")
+        return SQLiteProgressStore(db_path)
+    
+    def create_session(self, session_id: str, state: Dict[str, Any]):
+        """Cria (ou reinicia) a sessão com fluxo de eventos vazio"""
+        self._maybe_cleanup()
+        self.store.create_session(session_id, state, self.session_ttl)
+    
+    def publish(
+        self,
+        session_id: str,
+        event_type: str,
+        data: Dict[str, Any],
+        state: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        Anexa um evento ao fluxo da sessão e, se informado, substitui o
+        estado. Renova o TTL da sessão. Retorna o número de sequência, ou
+        None se a sessão não existe ou já expirou.
+        """
+        seq = self.store.publish(session_id, event_type, data, state, ttl or self.session_ttl)
+        
+        with self._condition:
+            self._condition.notify_all()
+        
+        self._maybe_cleanup()
+        return seq
+    
+    def publish_section(self, session_id: Optional[str], section: str, content: Any):
+        """Envia uma seção já concluída da análise aos clientes do stream da sessão"""
+        if not session_id:
+            return
+        try:
+            self.publish(session_id, 'section', {'section': section, 'content': content})
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao publicar seção '{section}' de {session_id}: {e}")
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Estado e último número de sequência da sessão"""
+        return self.store.get_session(session_id)
+    
+    def read_events(self, session_id: str, cursor: int = 0, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """Eventos com número de sequência maior que o cursor, em ordem"""
+        return self.store.read_events(session_id, max(int(cursor or 0), 0), limit)
+    
+    def wait_for_events(
+        self,
+        session_id: str,
+        cursor: int = 0,
+        timeout: float = 0,
+        limit: Optional[int] = 100
+    ) -> List[Dict[str, Any]]:
+        """Long-polling: espera até `timeout` segundos por eventos depois do cursor"""
+        deadline = time.time() + min(max(timeout, 0), self.max_wait)
+        
+        while True:
+            events = self.read_events(session_id, cursor, limit)
+            remaining = deadline - time.time()
+            if events or remaining <= 0:
+                return events
+            
+            with self._condition:
+                self._condition.wait(min(self.poll_interval, remaining))
+    
+    def subscribe(
+        self,
+        session_id: str,
+        cursor: int = 0,
+        heartbeat: float = 15.0
+    ) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Entrega os eventos da sessão a partir do cursor conforme chegam,
+        para Server-Sent Events. Produz None a cada `heartbeat` segundos sem
+        eventos e termina no evento 'complete' ou quando a sessão expira.
+        """
+        while True:
+            events = self.wait_for_events(session_id, cursor, timeout=heartbeat)
+            
+            if not events:
+                if self.get_session(session_id) is None:
+                    return
+                yield None
+                continue
+            
+            for event in events:
+                cursor = event['id']
+                yield event
+                if event['event'] == 'complete':
+                    return
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Sessões ainda não expiradas"""
+        return self.store.list_sessions()
+    
+    def delete_session(self, session_id: str):
+        """Remove a sessão e seus eventos"""
+        self.store.delete_session(session_id)
+    
+    def cleanup_expired(self) -> int:
+        """Remove sessões expiradas e seus eventos"""
+        try:
+            removed = self.store.cleanup_expired()
+            if removed:
+                logger.info(f"🧹 {removed} sessões de progresso expiradas removidas")
+            return removed
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao expirar sessões de progresso: {e}")
+            return 0
+    
+    def _maybe_cleanup(self):
+        """Expiração oportunista, no máximo uma vez por intervalo em cada processo"""
+        now = time.time()
+        if now - self._last_cleanup >= self.cleanup_interval:
+            self._last_cleanup = now
+            self.cleanup_expired()
+    
+    def ping(self):
+        """Falha se o armazenamento de progresso não responder"""
+        self.store.ping()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumo do barramento"""
+        return {
+            'backend': self.store.name,
+            'active_sessions': len(self.list_sessions()),
+            'session_ttl': self.session_ttl,
+            'completed_ttl': self.completed_ttl
+        }
+
+# Instância global
+progress_bus = ProgressBus()
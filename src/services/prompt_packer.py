@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Prompt Packer
+Monta o contexto de pesquisa dos prompts dentro de um orçamento de tokens
+por provedor, priorizando os fatos de maior score e removendo repetições
+"""
+
+import os
+import math
+import logging
+import threading
+from typing import Dict, List, Any, Optional, NamedTuple
+
+from services.text_features import text_features, tokenize, TextFeatures
+from services.relevance_ranker import relevance_ranker
+
+# tiktoken é opcional: sem ele a contagem usa a razão caracteres/token do provedor
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+logger = logging.getLogger(__name__)
+
+# Razões medidas em texto em português; janelas e saídas conforme os limites usados pelo AIManager
+PROVIDER_TOKEN_PROFILES = {
+    'gemini': {'chars_per_token': 3.6, 'context_window': 1048576, 'max_output_tokens': 8192},
+    'groq': {'chars_per_token': 3.3, 'context_window': 131072, 'max_output_tokens': 8192},
+    'openai': {'chars_per_token': 3.5, 'context_window': 16385, 'max_output_tokens': 4096},
+    'huggingface': {'chars_per_token': 3.0, 'context_window': 4096, 'max_output_tokens': 1024}
+}
+
+DEFAULT_TOKEN_PROFILE = {'chars_per_token': 3.3, 'context_window': 32768, 'max_output_tokens': 4096}
+
+class PackItem(NamedTuple):
+    """Fato candidato ao contexto do prompt"""
+    section: str
+    text: str
+    score: float
+
+class PackedContext(NamedTuple):
+    """Resultado do empacotamento"""
+    text: str
+    tokens: int
+    budget: int
+    provider: str
+    included: int
+    dropped: int
+    duplicates: int
+
+class TokenEstimator:
+    """Estimativa de tokens por provedor"""
+    
+    def __init__(self):
+        self._encodings: Dict[str, Any] = {}
+    
+    def profile(self, provider: Optional[str]) -> Dict[str, Any]:
+        return PROVIDER_TOKEN_PROFILES.get(provider or '', DEFAULT_TOKEN_PROFILE)
+    
+    def estimate(self, text: str, provider: Optional[str] = None) -> int:
+        """Tokens estimados do texto para o provedor"""
+        if not text:
+            return 0
+        
+        if provider == 'openai' and HAS_TIKTOKEN:
+            encoding = self._encodings.get(provider)
+            if encoding is None:
+                encoding = tiktoken.get_encoding('cl100k_base')
+                self._encodings[provider] = encoding
+            return len(encoding.encode(text))
+        
+        return math.ceil(len(text) / self.profile(provider)['chars_per_token'])
+
+class PromptPacker:
+    """Preenche um orçamento de tokens com os fatos de maior score"""
+    
+    def __init__(self):
+        """Inicializa empacotador"""
+        self.target_tokens = int(os.getenv('PROMPT_CONTEXT_TOKEN_BUDGET', 12000))
+        self.safety_margin = int(os.getenv('PROMPT_TOKEN_SAFETY_MARGIN', 256))
+        self.estimator = TokenEstimator()
+        
+        self.stats = {'packs': 0, 'packed_tokens': 0, 'items_included': 0, 'items_dropped': 0, 'duplicates_removed': 0}
+        self._stats_lock = threading.Lock()
+        
+        logger.info(f"Prompt Packer inicializado (orçamento de contexto: {self.target_tokens} tokens)")
+    
+    def estimate_tokens(self, text: str, provider: Optional[str] = None) -> int:
+        return self.estimator.estimate(text, provider)
+    
+    def budget_for(self, provider: Optional[str], template: str = '', max_output_tokens: Optional[int] = None) -> int:
+        """
+        Orçamento para o contexto: o alvo configurado, limitado ao que sobra
+        da janela do provedor depois do template e da resposta.
+        """
+        profile = self.estimator.profile(provider)
+        output_tokens = min(max_output_tokens or profile['max_output_tokens'], profile['max_output_tokens'])
+        available = (
+            profile['context_window'] - output_tokens
+            - self.estimate_tokens(template, provider) - self.safety_margin
+        )
+        return max(0, min(self.target_tokens, available))
+    
+    def pack(
+        self,
+        items: List[PackItem],
+        provider: Optional[str] = None,
+        budget_tokens: Optional[int] = None
+    ) -> PackedContext:
+        """
+        Seleciona os itens em ordem de score até esgotar o orçamento, pulando
+        fatos repetidos. As seções saem na ordem em que aparecem em `items`.
+        """
+        budget = self.target_tokens if budget_tokens is None else budget_tokens
+        
+        section_order: Dict[str, int] = {}
+        for item in items:
+            section_order.setdefault(item.section, len(section_order))
+        
+        used = 0
+        selected: Dict[str, List[PackItem]] = {}
+        fingerprints: List[str] = []
+        dropped = duplicates = 0
+        
+        for item in sorted(items, key=lambda candidate: -candidate.score):
+            text = ' '.join(item.text.split())
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            fingerprint = f" {' '.join(tokens)} "
+            
+            # Repetido ou contido em um fato já incluído (e vice-versa)
+            if any(fingerprint in kept or kept in fingerprint for kept in fingerprints):
+                duplicates += 1
+                continue
+            
+            cost = self.estimate_tokens(f"- {text}\n", provider)
+            if item.section not in selected:
+                cost += self.estimate_tokens(f"=== {item.section} ===\n\n", provider)
+            
+            if used + cost > budget:
+                dropped += 1
+                continue
+            
+            used += cost
+            fingerprints.append(fingerprint)
+            selected.setdefault(item.section, []).append(item._replace(text=text))
+        
+        blocks = []
+        for section in sorted(selected, key=section_order.get):
+            lines = '\n'.join(f"- {item.text}" for item in selected[section])
+            blocks.append(f"=== {section} ===\n{lines}\n")
+        
+        packed_text = '\n'.join(blocks)
+        included = sum(len(section_items) for section_items in selected.values())
+        
+        with self._stats_lock:
+            self.stats['packs'] += 1
+            self.stats['packed_tokens'] += used
+            self.stats['items_included'] += included
+            self.stats['items_dropped'] += dropped
+            self.stats['duplicates_removed'] += duplicates
+        
+        logger.info(
+            f"📦 Contexto empacotado: {used}/{budget} tokens ({provider or 'padrão'}), "
+            f"{included} fatos, {dropped} fora do orçamento, {duplicates} repetidos"
+        )
+        
+        return PackedContext(packed_text, used, budget, provider or 'default', included, dropped, duplicates)
+    
+    def items_from_synthesis(self, synthesis_result: Dict[str, Any]) -> List[PackItem]:
+        """Candidatos a partir do resultado do ContentSynthesisEngine"""
+        items: List[PackItem] = []
+        
+        # Números extraídos são os fatos mais valiosos para a análise
+        for data_type, data_content in (synthesis_result.get('structured_data') or {}).items():
+            section = f"DADOS ESTRUTURADOS - {data_type.upper()}"
+            if isinstance(data_content, dict):
+                for key, values in data_content.items():
+                    if isinstance(values, list):
+                        for rank, value in enumerate(values):
+                            items.append(PackItem(section, f"{key}: {value}", 3.0 - rank * 0.01))
+            elif isinstance(data_content, list):
+                for rank, value in enumerate(data_content):
+                    items.append(PackItem(section, str(value), 2.5 - rank * 0.01))
+        
+        insights = synthesis_result.get('categorized_insights') or {}
+        priority = insights.get('priority_insights') or []
+        for rank, insight in enumerate(priority):
+            items.append(PackItem('INSIGHTS PRIORITÁRIOS', insight, 2.0 - rank / max(len(priority), 1)))
+        
+        patterns = synthesis_result.get('identified_patterns') or {}
+        themes = patterns.get('recurring_themes') or []
+        if themes:
+            items.append(PackItem('PADRÕES IDENTIFICADOS', f"Temas recorrentes: {', '.join(themes)}", 1.5))
+        for pattern in patterns.get('data_patterns') or []:
+            items.append(PackItem('PADRÕES IDENTIFICADOS', f"Padrão: {pattern}", 1.5))
+        
+        remaining = [insight for insight in insights.get('all_insights') or [] if insight not in priority]
+        for rank, insight in enumerate(remaining):
+            items.append(PackItem('INSIGHTS ADICIONAIS', insight, 1.0 - rank / max(len(remaining), 1) * 0.5))
+        
+        return items
+    
+    def items_from_sources(
+        self,
+        sources: List[Dict[str, Any]],
+        query: str = '',
+        context: Optional[Dict[str, Any]] = None,
+        weight_key: str = 'quality_score'
+    ) -> List[PackItem]:
+        """
+        Candidatos sentença a sentença das páginas extraídas: cada sentença
+        pontua pelos termos da query/contexto e pelos números que contém,
+        ponderada pelo score da fonte.
+        """
+        query_terms = relevance_ranker.build_query_terms(query, context)
+        items: List[PackItem] = []
+        
+        for index, source in enumerate(sources, 1):
+            content = source.get('content') or ''
+            features = text_features.extract(content)
+            source_weight = 1.0 + (source.get(weight_key) or 0) / 100
+            section = f"FONTE REAL {index}: {source.get('title', '')} ({source.get('url', '')})"
+            
+            for start, end in features.sentence_spans:
+                sentence = content[start:end].strip()
+                if not 40 <= len(sentence) <= 500:
+                    continue
+                
+                # Sem cache: sentenças não devem expulsar as páginas do LRU
+                sentence_features = TextFeatures(sentence)
+                term_hits = sum(
+                    weight * sentence_features.term_counts.get(term, 0)
+                    for term, weight in query_terms.items()
+                )
+                facts = sentence_features.number_count * 0.5 + sentence_features.money_value_count
+                score = source_weight * (term_hits + facts) / math.sqrt(max(sentence_features.token_count, 1))
+                
+                if score > 0:
+                    items.append(PackItem(section, sentence, score))
+        
+        return items
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas acumuladas do processo"""
+        with self._stats_lock:
+            packs = self.stats['packs']
+            return {
+                **self.stats,
+                'avg_packed_tokens': self.stats['packed_tokens'] / packs if packs else 0,
+                'target_tokens': self.target_tokens,
+                'tiktoken': HAS_TIKTOKEN
+            }
+
+# Instância global
+prompt_packer = PromptPacker()
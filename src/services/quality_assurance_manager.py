@@ -6,13 +6,35 @@ Gerenciador de garantia de qualidade com zero tolerância a simulações
 """
 
 import logging
-import json
-import re
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from services.pattern_matcher import PatternSet, SerializedDocument, PatternHit, format_path
 
 logger = logging.getLogger(__name__)
 
+# Padrões que indicam especificidade
+SPECIFICITY_PATTERNS = [
+    r'\d+%',  # Percentuais
+    r'R\$\s*\d+',  # Valores monetários
+    r'\d+\s*(mil|milhão|bilhão)',  # Quantidades
+    r'20(23|24|25)',  # Anos recentes
+    r'\d+\s*(dias|meses|anos)',  # Períodos
+    r'[A-Z][a-z]+\s+[A-Z][a-z]+',  # Nomes próprios
+    r'\d+\.\d+',  # Números decimais
+    r'\d+\s*(clientes|usuários|empresas)',  # Quantidades específicas
+]
+
+# Elementos específicos exigidos em um insight
+INSIGHT_SPECIFIC_PATTERNS = [
+    r'\d+%',  # Percentuais
+    r'R\$\s*\d+',  # Valores
+    r'\d+\s*(mil|milhão|bilhão)',  # Quantidades
+    r'20(23|24|25)',  # Anos
+]
+
+# Limite de ocorrências com caminho devolvidas no resultado
+MAX_REPORTED_HITS = 100
+
 class QualityAssuranceManager:
     """Gerenciador de garantia de qualidade ultra-rigoroso"""
     
@@ -24,6 +46,11 @@ class QualityAssuranceManager:
             r'template'
         ]
         
+        # Compilados uma vez; cada verificação faz uma única passada no texto
+        self.simulation_matcher = PatternSet(self.simulation_patterns)
+        self.specificity_matcher = PatternSet(SPECIFICITY_PATTERNS)
+        self.insight_specifics_matcher = PatternSet(INSIGHT_SPECIFIC_PATTERNS)
+        
         self.quality_requirements = {
             'min_avatar_dores': 8,
             'min_avatar_desejos': 8,
@@ -52,6 +79,8 @@ class QualityAssuranceManager:
             'errors': [],
             'warnings': [],
             'simulation_detected': False,
+            'simulation_errors': [],
+            'simulation_hits': [],
             'component_validation': {},
             'content_quality': {},
             'recommendations': [],
@@ -61,9 +90,14 @@ class QualityAssuranceManager:
         try:
             logger.info("🔍 Iniciando validação ultra-rigorosa")
             
+            # Serialização única compartilhada por todas as verificações
+            document = SerializedDocument(analysis)
+            
             # 1. Detecta simulações (ZERO TOLERÂNCIA)
-            simulation_check = self._detect_simulations_comprehensive(analysis)
+            simulation_check = self._detect_simulations_comprehensive(analysis, document)
             validation_result['simulation_detected'] = simulation_check['has_simulation']
+            validation_result['simulation_errors'] = simulation_check['simulation_errors']
+            validation_result['simulation_hits'] = simulation_check['hits']
             
             if simulation_check['has_simulation']:
                 validation_result['errors'].extend(simulation_check['simulation_errors'])
@@ -78,7 +112,7 @@ class QualityAssuranceManager:
                 validation_result['errors'].extend(structure_validation['errors'])
             
             # 3. Valida qualidade do conteúdo
-            content_validation = self._validate_content_quality(analysis)
+            content_validation = self._validate_content_quality(analysis, document)
             validation_result['content_quality'] = content_validation
             
             if not content_validation['valid']:
@@ -114,26 +148,41 @@ class QualityAssuranceManager:
             logger.error(f"❌ Erro crítico na validação: {str(e)}")
             return validation_result
     
-    def _detect_simulations_comprehensive(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def _detect_simulations_comprehensive(
+        self,
+        analysis: Dict[str, Any],
+        document: Optional[SerializedDocument] = None
+    ) -> Dict[str, Any]:
         """Detecta simulações de forma abrangente"""
         
         result = {
             'has_simulation': False,
             'simulation_errors': [],
             'simulation_count': 0,
+            'pattern_counts': {},
+            'hits': [],
             'affected_components': []
         }
         
-        # Converte análise para string
-        analysis_str = json.dumps(analysis, ensure_ascii=False).lower()
+        if document is None:
+            document = SerializedDocument(analysis)
         
-        # Verifica padrões de simulação
-        for pattern in self.simulation_patterns:
-            matches = len(re.findall(pattern, analysis_str))
+        # Verifica padrões de simulação em uma única passada
+        hits = document.find(self.simulation_matcher, lower=True)
+        result['pattern_counts'] = dict.fromkeys(self.simulation_patterns, 0)
+        for hit in hits:
+            result['pattern_counts'][hit.pattern] += 1
+        
+        for pattern, matches in result['pattern_counts'].items():
             if matches > 0:
                 result['simulation_count'] += matches
                 result['simulation_errors'].append(f"Padrão '{pattern}' encontrado {matches} vezes")
         
+        result['hits'] = [
+            {'pattern': hit.pattern, 'path': format_path(hit.path)}
+            for hit in hits[:MAX_REPORTED_HITS]
+        ]
+        
         # Verifica componentes específicos
         components_to_check = [
             'avatar_ultra_detalhado',
@@ -145,7 +194,8 @@ class QualityAssuranceManager:
         for component_name in components_to_check:
             if component_name in analysis:
                 component_simulation = self._check_component_simulation(
-                    component_name, analysis[component_name]
+                    component_name, analysis[component_name],
+                    [hit for hit in hits if hit.path[:1] == (component_name,)]
                 )
                 
                 if component_simulation['has_simulation']:
@@ -160,8 +210,16 @@ class QualityAssuranceManager:
         
         return result
     
-    def _check_component_simulation(self, component_name: str, component_data: Any) -> Dict[str, Any]:
-        """Verifica simulação em componente específico"""
+    def _check_component_simulation(
+        self,
+        component_name: str,
+        component_data: Any,
+        hits: Optional[List[PatternHit]] = None
+    ) -> Dict[str, Any]:
+        """
+        Verifica simulação em componente específico a partir das ocorrências
+        já encontradas no documento (caminhos começando pelo componente)
+        """
         
         result = {
             'has_simulation': False,
@@ -171,34 +229,47 @@ class QualityAssuranceManager:
         if not component_data:
             return result
         
-        component_str = json.dumps(component_data, ensure_ascii=False).lower()
+        if hits is None:
+            document = SerializedDocument({component_name: component_data})
+            hits = document.find(self.simulation_matcher, lower=True)
         
         # Padrões específicos por componente
         if component_name == 'avatar_ultra_detalhado':
             # Avatar não pode ter dados genéricos
             if isinstance(component_data, dict):
                 dores = component_data.get('dores_viscerais', [])
-                for dor in dores:
-                    if any(pattern in str(dor).lower() for pattern in self.simulation_patterns):
+                for index in self._hit_indexes(hits, (component_name, 'dores_viscerais')):
+                    if isinstance(dores, list) and index < len(dores):
                         result['has_simulation'] = True
-                        result['errors'].append(f"Dor simulada detectada: {str(dor)[:50]}...")
+                        result['errors'].append(f"Dor simulada detectada: {str(dores[index])[:50]}...")
         
         elif component_name == 'insights_exclusivos':
             # Insights devem ser específicos
             if isinstance(component_data, list):
-                for insight in component_data:
-                    if any(pattern in str(insight).lower() for pattern in self.simulation_patterns):
+                for index in self._hit_indexes(hits, (component_name,)):
+                    if index < len(component_data):
                         result['has_simulation'] = True
-                        result['errors'].append(f"Insight simulado detectado: {str(insight)[:50]}...")
+                        result['errors'].append(f"Insight simulado detectado: {str(component_data[index])[:50]}...")
         
-        # Verifica padrões gerais
+        # Verifica padrões gerais (um erro por padrão, na ordem declarada)
+        found_patterns = {hit.pattern for hit in hits}
         for pattern in self.simulation_patterns:
-            if pattern in component_str:
+            if pattern in found_patterns:
                 result['has_simulation'] = True
                 result['errors'].append(f"Padrão '{pattern}' em {component_name}")
         
         return result
     
+    def _hit_indexes(self, hits: List[PatternHit], list_path: tuple) -> List[int]:
+        """Índices distintos, em ordem, dos itens da lista em `list_path` com ocorrências"""
+        depth = len(list_path)
+        indexes = []
+        for hit in hits:
+            if hit.path[:depth] == list_path and len(hit.path) > depth and isinstance(hit.path[depth], int):
+                if hit.path[depth] not in indexes:
+                    indexes.append(hit.path[depth])
+        return indexes
+    
     def _validate_required_structure(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Valida estrutura obrigatória"""
         
@@ -242,7 +313,11 @@ class QualityAssuranceManager:
         
         return result
     
-    def _validate_content_quality(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def _validate_content_quality(
+        self,
+        analysis: Dict[str, Any],
+        document: Optional[SerializedDocument] = None
+    ) -> Dict[str, Any]:
         """Valida qualidade do conteúdo"""
         
         result = {
@@ -252,7 +327,7 @@ class QualityAssuranceManager:
         }
         
         # Verifica especificidade do conteúdo
-        specificity_score = self._calculate_content_specificity(analysis)
+        specificity_score = self._calculate_content_specificity(analysis, document)
         result['quality_metrics']['specificity_score'] = specificity_score
         
         if specificity_score < self.quality_requirements['min_content_specificity']:
@@ -374,30 +449,21 @@ class QualityAssuranceManager:
         
         return result
     
-    def _calculate_content_specificity(self, analysis: Dict[str, Any]) -> float:
+    def _calculate_content_specificity(
+        self,
+        analysis: Dict[str, Any],
+        document: Optional[SerializedDocument] = None
+    ) -> float:
         """Calcula especificidade do conteúdo"""
         
-        analysis_str = json.dumps(analysis, ensure_ascii=False)
-        
-        # Padrões que indicam especificidade
-        specificity_patterns = [
-            r'\d+%',  # Percentuais
-            r'R\$\s*\d+',  # Valores monetários
-            r'\d+\s*(mil|milhão|bilhão)',  # Quantidades
-            r'20(23|24|25)',  # Anos recentes
-            r'\d+\s*(dias|meses|anos)',  # Períodos
-            r'[A-Z][a-z]+\s+[A-Z][a-z]+',  # Nomes próprios
-            r'\d+\.\d+',  # Números decimais
-            r'\d+\s*(clientes|usuários|empresas)',  # Quantidades específicas
-        ]
+        if document is None:
+            document = SerializedDocument(analysis)
         
-        specificity_count = 0
-        for pattern in specificity_patterns:
-            matches = len(re.findall(pattern, analysis_str))
-            specificity_count += matches
+        # Todos os padrões de especificidade em uma única passada
+        specificity_count = sum(document.count(self.specificity_matcher).values())
         
         # Normaliza baseado no tamanho do conteúdo
-        content_length = len(analysis_str)
+        content_length = len(document.text)
         specificity_ratio = specificity_count / (content_length / 1000) if content_length > 0 else 0
         
         return min(specificity_ratio, 1.0)
@@ -411,16 +477,12 @@ class QualityAssuranceManager:
         insight_lower = insight.lower()
         
         # Rejeita insights com padrões de simulação
-        for pattern in self.simulation_patterns:
-            if pattern in insight_lower:
-                return False
+        if self.simulation_matcher.search(insight_lower):
+            return False
         
         # Verifica se tem elementos específicos
         has_specifics = (
-            re.search(r'\d+%', insight) or  # Percentuais
-            re.search(r'R\$\s*\d+', insight) or  # Valores
-            re.search(r'\d+\s*(mil|milhão|bilhão)', insight) or  # Quantidades
-            re.search(r'20(23|24|25)', insight) or  # Anos
+            self.insight_specifics_matcher.search(insight) or  # Percentuais, valores, quantidades, anos
             len(insight.split()) > 15  # Insights substanciais
         )
         
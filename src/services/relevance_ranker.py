@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Relevance Ranker
+Ranking BM25 em lote sobre todas as páginas extraídas de uma análise,
+com matriz esparsa de termos e pontuação vetorizada
+"""
+
+import os
+import math
+import logging
+from typing import Dict, List, Any, Optional
+
+from services.text_features import text_features, tokenize, TextFeatures, PORTUGUESE_STOPWORDS
+
+# NumPy é opcional: sem ele o ranking usa o mesmo cálculo em Python puro
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+logger = logging.getLogger(__name__)
+
+class TermMatrix:
+    """Matriz documento x termo em formato CSR (indptr, indices, data)"""
+    
+    def __init__(self, documents: List[TextFeatures]):
+        self.vocabulary: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        
+        for features in documents:
+            for term, count in features.term_counts.items():
+                indices.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                data.append(count)
+            indptr.append(len(indices))
+        
+        self.n_docs = len(documents)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        
+        # Documento de cada entrada não nula, para somas por linha com bincount
+        self.rows = np.repeat(np.arange(self.n_docs), np.diff(self.indptr))
+        self.doc_lengths = np.bincount(self.rows, weights=self.data, minlength=self.n_docs)
+        self.doc_freqs = np.bincount(self.indices, minlength=len(self.vocabulary))
+
+class RelevanceRanker:
+    """Pontua páginas contra termos da query e do contexto com BM25"""
+    
+    def __init__(self):
+        """Inicializa ranker"""
+        self.k1 = float(os.getenv('RELEVANCE_BM25_K1', 1.5))
+        self.b = float(os.getenv('RELEVANCE_BM25_B', 0.75))
+        self.context_weight = float(os.getenv('RELEVANCE_CONTEXT_WEIGHT', 0.5))
+        self.default_top_k = int(os.getenv('RELEVANCE_TOP_K', 20))
+        
+        logger.info(f"Relevance Ranker inicializado (BM25 k1={self.k1}, b={self.b}, numpy={HAS_NUMPY})")
+    
+    def build_query_terms(self, query: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Pesos por termo: query com peso 1, segmento/produto/público com peso de contexto"""
+        
+        weights: Dict[str, float] = {}
+        
+        def add(text: str, weight: float):
+            for term in tokenize(text):
+                if len(term) > 2 and term not in PORTUGUESE_STOPWORDS:
+                    weights[term] = max(weights.get(term, 0.0), weight)
+        
+        add(query or '', 1.0)
+        
+        for key in ('segmento', 'produto', 'publico'):
+            if context and context.get(key):
+                add(str(context[key]), self.context_weight)
+        
+        return weights
+    
+    def score(self, contents: List[str], query_terms: Dict[str, float]) -> List[float]:
+        """Scores BM25 de cada conteúdo, na ordem recebida"""
+        
+        if not contents or not query_terms:
+            return [0.0] * len(contents)
+        
+        documents = [text_features.extract(content or '') for content in contents]
+        
+        if HAS_NUMPY:
+            return self._score_vectorized(documents, query_terms)
+        return self._score_python(documents, query_terms)
+    
+    def rank(
+        self,
+        documents: List[Dict[str, Any]],
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        content_key: str = 'content',
+        score_key: str = 'bm25_score'
+    ) -> List[Dict[str, Any]]:
+        """
+        Ordena os documentos por BM25 (maior primeiro) e retorna os top_k.
+        Cada documento recebe o score em `score_key`; empates mantêm a ordem original.
+        """
+        
+        if not documents:
+            return []
+        
+        query_terms = self.build_query_terms(query, context)
+        scores = self.score([document.get(content_key) or '' for document in documents], query_terms)
+        
+        for document, value in zip(documents, scores):
+            document[score_key] = round(value, 4)
+        
+        order = sorted(range(len(documents)), key=lambda index: -scores[index])
+        if top_k is not None and top_k > 0:
+            order = order[:top_k]
+        
+        logger.info(f"📊 BM25: {len(documents)} páginas ranqueadas, {len(order)} mantidas")
+        
+        return [documents[index] for index in order]
+    
+    def _score_vectorized(self, documents: List[TextFeatures], query_terms: Dict[str, float]) -> List[float]:
+        """BM25 sobre a matriz esparsa, somando contribuições por documento"""
+        
+        matrix = TermMatrix(documents)
+        
+        term_ids = [matrix.vocabulary[term] for term in query_terms if term in matrix.vocabulary]
+        if not term_ids:
+            return [0.0] * matrix.n_docs
+        
+        term_ids_array = np.asarray(term_ids, dtype=np.int64)
+        doc_freqs = matrix.doc_freqs[term_ids_array]
+        idf = np.log1p((matrix.n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        
+        # Peso por termo do vocabulário; zero para termos fora da query
+        term_weights = np.zeros(len(matrix.vocabulary))
+        term_weights[term_ids_array] = idf * np.asarray(
+            [query_terms[term] for term in query_terms if term in matrix.vocabulary]
+        )
+        
+        mask = term_weights[matrix.indices] > 0
+        rows = matrix.rows[mask]
+        tf = matrix.data[mask]
+        
+        avg_length = matrix.doc_lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * matrix.doc_lengths[rows] / avg_length)
+        contributions = term_weights[matrix.indices[mask]] * tf * (self.k1 + 1) / (tf + norm)
+        
+        return np.bincount(rows, weights=contributions, minlength=matrix.n_docs).tolist()
+    
+    def _score_python(self, documents: List[TextFeatures], query_terms: Dict[str, float]) -> List[float]:
+        """Mesmo cálculo sem NumPy"""
+        
+        n_docs = len(documents)
+        avg_length = (sum(features.token_count for features in documents) / n_docs) or 1.0
+        
+        idf = {}
+        for term in query_terms:
+            doc_freq = sum(1 for features in documents if term in features.term_counts)
+            if doc_freq:
+                idf[term] = math.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        
+        scores = []
+        for features in documents:
+            norm = self.k1 * (1 - self.b + self.b * features.token_count / avg_length)
+            total = 0.0
+            for term, term_idf in idf.items():
+                tf = features.term_counts.get(term, 0)
+                if tf:
+                    total += query_terms[term] * term_idf * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(total)
+        
+        return scores
+
+# Instância global
+relevance_ranker = RelevanceRanker()
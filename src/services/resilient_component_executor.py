@@ -7,9 +7,10 @@ Executor resiliente que isola falhas e preserva dados
 
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
-from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro, com_sessao
 
 logger = logging.getLogger(__name__)
 
@@ -185,33 +186,22 @@ class ResilientComponentExecutor:
         executor = componente['executor']
         timeout = componente['timeout']
         
+        # Timeout por thread: funciona fora da thread principal (gunicorn/threads)
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'componente-{nome_componente}')
+        
         try:
-            # Executa com timeout
-            import signal
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError(f"Componente {nome_componente} excedeu timeout de {timeout}s")
-            
-            # Configura timeout (apenas em sistemas Unix)
-            try:
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(timeout)
-                
-                resultado = executor(dados)
-                
-                signal.alarm(0)  # Cancela timeout
-                return resultado
-                
-            except AttributeError:
-                # Sistema Windows - executa sem timeout por signal
-                return executor(dados)
-            except TimeoutError:
-                logger.error(f"⏰ Timeout em {nome_componente}")
-                return None
-            
+            future = pool.submit(com_sessao(executor), dados)
+            return future.result(timeout=timeout)
+        
+        except FutureTimeoutError:
+            logger.error(f"⏰ Timeout em {nome_componente} após {timeout}s")
+            return None
         except Exception as e:
             logger.error(f"❌ Erro isolado em {nome_componente}: {str(e)}")
             return None
+        finally:
+            # Não aguarda componente travado; a thread termina em segundo plano
+            pool.shutdown(wait=False)
     
     def _executar_fallback(self, nome_componente: str, dados: Dict[str, Any]) -> Any:
         """Executa fallback do componente"""
@@ -16,26 +16,20 @@ from urllib.parse import urljoin, urlparse
 import re
 import tempfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.auto_save_manager import salvar_etapa, salvar_erro, com_sessao
+from services.http_client import http_client
+from services.service_registry import service_registry
 
-# Imports condicionais para não quebrar se não estiver instalado
-try:
-    from services.playwright_extractor import playwright_extractor
-    HAS_PLAYWRIGHT_INTEGRATION = True
-except ImportError:
-    HAS_PLAYWRIGHT_INTEGRATION = False
+# Extratores opcionais pesados: a disponibilidade é verificada sem importar e
+# o módulo (ou o extrator de navegador) só é carregado no primeiro uso
+HAS_PLAYWRIGHT_INTEGRATION = service_registry.is_available('services.playwright_extractor')
+playwright_extractor = service_registry.register('playwright_extractor', 'services.playwright_extractor') if HAS_PLAYWRIGHT_INTEGRATION else None
 
-try:
-    from services.selenium_extractor import selenium_extractor
-    HAS_SELENIUM_INTEGRATION = True
-except ImportError:
-    HAS_SELENIUM_INTEGRATION = False
+HAS_SELENIUM_INTEGRATION = service_registry.is_available('services.selenium_extractor')
+selenium_extractor = service_registry.register('selenium_extractor', 'services.selenium_extractor') if HAS_SELENIUM_INTEGRATION else None
 
-try:
-    import trafilatura
-    HAS_TRAFILATURA = True
-except ImportError:
-    HAS_TRAFILATURA = False
+HAS_TRAFILATURA = service_registry.is_available('trafilatura')
+trafilatura = service_registry.module('trafilatura') if HAS_TRAFILATURA else None
 
 try:
     from readability import Document
@@ -43,12 +37,8 @@ try:
 except ImportError:
     HAS_READABILITY = False
 
-try:
-    import newspaper
-    from newspaper import Article
-    HAS_NEWSPAPER = True
-except ImportError:
-    HAS_NEWSPAPER = False
+HAS_NEWSPAPER = service_registry.is_available('newspaper')
+newspaper = service_registry.module('newspaper') if HAS_NEWSPAPER else None
 
 try:
     from bs4 import BeautifulSoup
@@ -69,6 +59,7 @@ except ImportError:
     HAS_PDFPLUMBER = False
 
 from services.url_resolver import url_resolver
+from services.page_cache import page_cache
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +67,7 @@ class RobustContentExtractor:
     """Extrator de conteúdo multicamadas e robusto com suporte aprimorado a PDF"""
     
     def __init__(self):
-        self.session = requests.Session()
+        self.session = http_client.create_session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -126,8 +117,11 @@ class RobustContentExtractor:
             
             logger.info(f"🔍 Iniciando extração de: {url}")
             
-            # 1. Resolve URL de redirecionamento
-            resolved_url = url_resolver.resolve_redirect_url(url)
+            # 1. Resolve URL de redirecionamento (reaproveita resolução em cache)
+            resolved_url = page_cache.get_resolved_url(url)
+            if resolved_url is None:
+                resolved_url = url_resolver.resolve_redirect_url(url)
+                page_cache.store_resolved_url(url, resolved_url)
             if resolved_url != url:
                 logger.info(f"🔄 URL resolvida: {url} -> {resolved_url}")
                 # Salva resolução de URL
@@ -145,6 +139,15 @@ class RobustContentExtractor:
                 self._update_global_stats()
                 return None
             
+            # 1.1 Cache de páginas: conteúdo fresco dispensa rede e extratores
+            cached_page = page_cache.get(url)
+            if page_cache.is_fresh(cached_page):
+                logger.info(f"📦 Conteúdo do cache de páginas ({cached_page['extractor']}): {url}")
+                page_cache.record_hit('hits_fresh')
+                self.stats['global']['total_successes'] += 1
+                self._update_global_stats()
+                return cached_page['content']
+            
             # 2. Verifica se é PDF
             if self._is_pdf_url(url):
                 logger.info("📄 Detectado PDF - usando extratores especializados")
@@ -156,12 +159,34 @@ class RobustContentExtractor:
                         "content_length": len(content),
                         "extractor": "pdf_specialized"
                     }, categoria="pesquisa_web")
+                    page_cache.store(url, None, content, "pdf_specialized")
                     self.stats['global']['total_successes'] += 1
                     self._update_global_stats()
                     return content
             
-            # 3. Baixa conteúdo HTML
-            html_content = self._fetch_html(url)
+            # 3. Baixa conteúdo HTML (revalidação condicional se já está em cache)
+            response = self._fetch_page(url, page_cache.conditional_headers(cached_page))
+            
+            if response is not None and response.status_code == 304 and cached_page:
+                logger.info(f"📦 Página não modificada (304), usando cache: {url}")
+                page_cache.mark_revalidated(url)
+                page_cache.record_hit('hits_revalidated')
+                self.stats['global']['total_successes'] += 1
+                self._update_global_stats()
+                return cached_page['content']
+            
+            html_content = response.text if response is not None else None
+            etag = response.headers.get('ETag') if response is not None else None
+            last_modified = response.headers.get('Last-Modified') if response is not None else None
+            
+            if page_cache.is_same_html(cached_page, html_content):
+                logger.info(f"📦 HTML idêntico ao do cache, pulando extratores: {url}")
+                page_cache.mark_revalidated(url, etag, last_modified)
+                page_cache.record_hit('hits_unchanged_html')
+                self.stats['global']['total_successes'] += 1
+                self._update_global_stats()
+                return cached_page['content']
+            
             if not html_content:
                 logger.error(f"❌ Falha ao baixar HTML para {url}")
                 salvar_erro("download_html", Exception(f"Falha no download: {url}"))
@@ -188,6 +213,7 @@ class RobustContentExtractor:
                         "content_length": len(content),
                         "extractor": "dynamic_specialized"
                     }, categoria="pesquisa_web")
+                    page_cache.store(url, html_content, content, "dynamic_specialized", etag, last_modified)
                     self.stats['global']['total_successes'] += 1
                     self._update_global_stats()
                     return content
@@ -227,6 +253,7 @@ class RobustContentExtractor:
                             "content_length": len(content),
                             "extraction_time": extractor_time
                         }, categoria="pesquisa_web")
+                        page_cache.store(url, html_content, content, extractor_name, etag, last_modified)
                         
                         logger.info(f"✅ Extração bem-sucedida com {extractor_name}: {len(content)} caracteres em {extractor_time:.2f}s")
                         return content
@@ -251,6 +278,7 @@ class RobustContentExtractor:
                     "content_length": len(content),
                     "extractor": "aggressive_fallback"
                 }, categoria="pesquisa_web")
+                page_cache.store(url, html_content, content, "aggressive_fallback", etag, last_modified)
                 self.stats['global']['total_successes'] += 1
                 self._update_global_stats()
                 return content
@@ -466,6 +494,11 @@ class RobustContentExtractor:
     
     def _fetch_html(self, url: str) -> Optional[str]:
         """Baixa conteúdo HTML da URL com retry"""
+        response = self._fetch_page(url)
+        return response.text if response is not None else None
+    
+    def _fetch_page(self, url: str, conditional_headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """Baixa a página com retry; retorna a resposta (inclusive 304 em requisição condicional)"""
         max_retries = 3
         
         for attempt in range(max_retries):
@@ -474,9 +507,13 @@ class RobustContentExtractor:
                     url,
                     timeout=self.timeout,
                     verify=False,  # Para evitar problemas de SSL
-                    allow_redirects=True
+                    allow_redirects=True,
+                    headers=conditional_headers or None
                 )
                 
+                if response.status_code == 304 and conditional_headers:
+                    return response
+                
                 response.raise_for_status()
                 
                 # Detecta encoding
@@ -491,7 +528,7 @@ class RobustContentExtractor:
                         time.sleep(2)  # Aguarda antes de tentar novamente
                         continue
                 
-                return html
+                return response
                 
             except requests.exceptions.Timeout:
                 logger.warning(f"⏰ Timeout na tentativa {attempt + 1} para {url}")
@@ -508,7 +545,7 @@ class RobustContentExtractor:
     
     def _extract_with_trafilatura(self, html: str, url: str) -> Optional[str]:
         """Extrai com Trafilatura (prioridade 1) com configurações aprimoradas"""
-        if not HAS_TRAFILATURA:
+        if not HAS_TRAFILATURA or not self._load_optional('trafilatura', 'trafilatura'):
             return None
         
         try:
@@ -536,7 +573,7 @@ class RobustContentExtractor:
     
     def _extract_with_playwright(self, html: str, url: str) -> Optional[str]:
         """Extrai com Playwright para páginas dinâmicas"""
-        if not HAS_PLAYWRIGHT_INTEGRATION:
+        if not HAS_PLAYWRIGHT_INTEGRATION or not self._load_optional('playwright_dynamic', 'playwright_extractor'):
             return None
         
         try:
@@ -560,7 +597,7 @@ class RobustContentExtractor:
     
     def _extract_with_selenium(self, html: str, url: str) -> Optional[str]:
         """Extrai com Selenium para páginas JavaScript pesadas"""
-        if not HAS_SELENIUM_INTEGRATION:
+        if not HAS_SELENIUM_INTEGRATION or not self._load_optional('selenium_js', 'selenium_extractor'):
             return None
         
         try:
@@ -612,11 +649,11 @@ class RobustContentExtractor:
     
     def _extract_with_newspaper(self, html: str, url: str) -> Optional[str]:
         """Extrai com Newspaper3k (prioridade 3) com configurações aprimoradas"""
-        if not HAS_NEWSPAPER:
+        if not HAS_NEWSPAPER or not self._load_optional('newspaper', 'newspaper'):
             return None
         
         try:
-            article = Article(url)
+            article = newspaper.Article(url)
             article.set_html(html)
             article.parse()
             
@@ -820,6 +857,21 @@ class RobustContentExtractor:
         logger.info(f"✅ Conteúdo válido para {url}: {len(content)} caracteres, {len(words)} palavras")
         return True
     
+    def _load_optional(self, extractor_name: str, service_name: str) -> bool:
+        """
+        Carrega no primeiro uso a dependência do extrator. Uma instalação
+        quebrada (o pacote existe, mas o import falha) desativa o extrator.
+        """
+        if service_registry.try_load(service_name):
+            return True
+        
+        stats = self.stats[extractor_name]
+        if stats['available']:
+            stats['available'] = False
+            stats['reason'] = f"Falha ao importar {service_name}"
+            logger.warning(f"⚠️ Extrator {extractor_name} desativado: falha ao importar {service_name}")
+        return False
+    
     def _is_extractor_available(self, extractor_name: str) -> bool:
         """Verifica se o extrator está disponível"""
         return self.stats.get(extractor_name, {}).get('available', False)
@@ -871,6 +923,10 @@ class RobustContentExtractor:
                 elif extractor_name == 'pdf_pdfplumber' and not HAS_PDFPLUMBER:
                     stats['reason'] = 'Biblioteca pdfplumber não instalada'
     
+    def get_page_cache_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do cache de páginas extraídas"""
+        return page_cache.get_stats()
+    
     def get_extractor_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas dos extratores"""
         self._update_global_stats()
@@ -904,10 +960,41 @@ class RobustContentExtractor:
     
     def batch_extract(self, urls: List[str], max_workers: int = 5) -> Dict[str, Optional[str]]:
         """Extrai conteúdo de múltiplas URLs em paralelo"""
+        from services.async_extraction_engine import async_extraction_engine
+        
         results = {}
         
+        # Consulta o cache de páginas antes de agendar trabalho
+        pending_urls = []
+        for url in urls:
+            cached_content = page_cache.get_fresh_content(url) if url else None
+            if cached_content:
+                results[url] = cached_content
+            else:
+                pending_urls.append(url)
+        
+        if len(pending_urls) < len(urls):
+            logger.info(f"📦 {len(urls) - len(pending_urls)}/{len(urls)} URLs servidas pelo cache de páginas")
+        
+        if not pending_urls:
+            return results
+        
+        # Caminho rápido: HTML estático em lote assíncrono; PDFs e páginas sem
+        # conteúdo válido seguem para o pipeline completo
+        if async_extraction_engine.enabled:
+            async_results = async_extraction_engine.extract_batch([url for url in pending_urls if url])
+            for url, async_result in async_results.items():
+                if async_result['success']:
+                    results[url] = async_result['content']
+                elif async_result['stage'] == 'fetch':
+                    results[url] = None
+            
+            pending_urls = [url for url in pending_urls if url not in results]
+            if not pending_urls:
+                return results
+        
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(self.extract_content, url): url for url in urls}
+            future_to_url = {executor.submit(com_sessao(self.extract_content), url): url for url in pending_urls}
             
             for future in as_completed(future_to_url):
                 url = future_to_url[future]
@@ -962,7 +1049,7 @@ class RobustContentExtractor:
     def clear_cache(self):
         """Limpa cache de sessão"""
         self.session.close()
-        self.session = requests.Session()
+        self.session = http_client.create_session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
@@ -8,11 +8,11 @@ Gerenciador inteligente de múltiplos serviços de busca com fallback automátic
 import os
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -145,7 +145,7 @@ class SearchManager:
                 'dateRestrict': 'm6'
             }
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=15)
+            response = http_client.get(url, params=params, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -187,7 +187,7 @@ class SearchManager:
                 'num': max_results
             }
             
-            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            response = http_client.post(url, json=payload, headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -217,7 +217,7 @@ class SearchManager:
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = http_client.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -257,7 +257,7 @@ class SearchManager:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = http_client.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
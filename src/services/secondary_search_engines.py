@@ -7,12 +7,14 @@ Motores de busca secundários para ampliar cobertura
 
 import logging
 import time
-import requests
 from typing import Dict, List, Any, Optional
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
 import random
+from services.http_client import http_client
+from services.near_duplicate_index import near_duplicate_detector
+from services.circuit_breaker import circuit_breakers
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +75,11 @@ class SecondarySearchEngines:
             'Connection': 'keep-alive'
         }
         
+        # Disjuntor por motor: abre após 3 falhas seguidas e se recupera sozinho
+        self.breakers = circuit_breakers.group('secondary_search')
+        for engine_name in self.engines:
+            self.breakers.breaker(engine_name, 3)
+        
         logger.info(f"Secondary Search Engines inicializado com {len(self.engines)} motores")
     
     def search_all_secondary_engines(self, query: str, max_results_per_engine: int = 10) -> List[Dict[str, Any]]:
@@ -80,10 +87,18 @@ class SecondarySearchEngines:
         
         all_results = []
         
-        for engine_name, engine_config in self.engines.items():
-            if not engine_config['enabled'] or engine_config['error_count'] >= 3:
+        # Motores com circuito fechado, dos mais rápidos aos mais lentos
+        engine_order = self.breakers.order({
+            engine_name: engine_config['priority']
+            for engine_name, engine_config in self.engines.items() if engine_config['enabled']
+        })
+        
+        for engine_name in engine_order:
+            breaker = self.breakers.breaker(engine_name)
+            if not breaker.allow_request():
                 continue
             
+            start_time = time.time()
             try:
                 logger.info(f"🔍 Buscando em {engine_name}...")
                 
@@ -100,8 +115,11 @@ class SecondarySearchEngines:
                 elif engine_name == 'brazilian_sites':
                     results = self._search_brazilian_sites(query, max_results_per_engine)
                 else:
+                    breaker.release_probe()
                     continue
                 
+                breaker.record_success(time.time() - start_time)
+                
                 if results:
                     all_results.extend(results)
                     logger.info(f"✅ {engine_name}: {len(results)} resultados")
@@ -114,6 +132,7 @@ class SecondarySearchEngines:
             except Exception as e:
                 logger.error(f"❌ Erro em {engine_name}: {str(e)}")
                 self.engines[engine_name]['error_count'] += 1
+                breaker.record_failure(time.time() - start_time)
                 continue
         
         # Remove duplicatas
@@ -129,7 +148,7 @@ class SecondarySearchEngines:
         try:
             search_url = f"https://yandex.com/search/?text={quote_plus(query)}&lr=21"  # lr=21 = Brasil
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = http_client.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -181,7 +200,7 @@ class SecondarySearchEngines:
                 'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,pt;q=0.7'
             }
             
-            response = requests.get(search_url, headers=baidu_headers, timeout=10)
+            response = http_client.get(search_url, headers=baidu_headers, timeout=10)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -222,7 +241,7 @@ class SecondarySearchEngines:
         try:
             search_url = f"https://www.startpage.com/sp/search?query={quote_plus(query)}&language=portuguese"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = http_client.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -264,7 +283,7 @@ class SecondarySearchEngines:
             # Usa instância pública do SearX
             search_url = f"https://searx.org/search?q={quote_plus(query)}&format=json&language=pt-BR"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = http_client.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -296,7 +315,7 @@ class SecondarySearchEngines:
         try:
             search_url = f"https://www.ecosia.org/search?q={quote_plus(query)}&region=br"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = http_client.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -350,7 +369,7 @@ class SecondarySearchEngines:
         
         for site in brazilian_search_sites:
             try:
-                response = requests.get(site['url'], headers=self.headers, timeout=10)
+                response = http_client.get(site['url'], headers=self.headers, timeout=10)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
@@ -415,7 +434,7 @@ class SecondarySearchEngines:
                     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
                 }
                 
-                response = requests.get(source['url'], headers=academic_headers, timeout=15)
+                response = http_client.get(source['url'], headers=academic_headers, timeout=15)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
@@ -488,7 +507,7 @@ class SecondarySearchEngines:
         
         for source in news_sources:
             try:
-                response = requests.get(source['url'], headers=self.headers, timeout=12)
+                response = http_client.get(source['url'], headers=self.headers, timeout=12)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
@@ -573,7 +592,7 @@ class SecondarySearchEngines:
         
         for source in medical_sources:
             try:
-                response = requests.get(source['url'], headers=self.headers, timeout=10)
+                response = http_client.get(source['url'], headers=self.headers, timeout=10)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
@@ -632,7 +651,7 @@ class SecondarySearchEngines:
         
         for source in tech_sources:
             try:
-                response = requests.get(source['url'], headers=self.headers, timeout=10)
+                response = http_client.get(source['url'], headers=self.headers, timeout=10)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
@@ -690,7 +709,7 @@ class SecondarySearchEngines:
         
         for source in business_sources:
             try:
-                response = requests.get(source['url'], headers=self.headers, timeout=10)
+                response = http_client.get(source['url'], headers=self.headers, timeout=10)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
@@ -735,6 +754,9 @@ class SecondarySearchEngines:
                 seen_urls.add(url)
                 unique_results.append(result)
         
+        # Mesma matéria publicada em vários portais: título + snippet quase idênticos
+        unique_results, _ = near_duplicate_detector.deduplicate(unique_results, snippets=True)
+        
         return unique_results
     
     def get_engine_status(self) -> Dict[str, Any]:
@@ -745,9 +767,10 @@ class SecondarySearchEngines:
         for engine_name, engine_config in self.engines.items():
             status[engine_name] = {
                 'enabled': engine_config['enabled'],
-                'available': engine_config['error_count'] < 3,
+                'available': engine_config['enabled'] and self.breakers.breaker(engine_name).is_available(),
                 'priority': engine_config['priority'],
-                'error_count': engine_config['error_count']
+                'error_count': engine_config['error_count'],
+                'circuit': self.breakers.breaker(engine_name).snapshot()
             }
         
         return status
@@ -757,10 +780,12 @@ class SecondarySearchEngines:
         
         if engine_name and engine_name in self.engines:
             self.engines[engine_name]['error_count'] = 0
+            self.breakers.reset(engine_name)
             logger.info(f"🔄 Reset erros do motor: {engine_name}")
         else:
             for engine in self.engines.values():
                 engine['error_count'] = 0
+            self.breakers.reset()
             logger.info("🔄 Reset erros de todos os motores secundários")
 
 # Instância global
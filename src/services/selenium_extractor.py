@@ -6,8 +6,9 @@ Extrator alternativo usando Selenium para páginas complexas
 """
 
 import os
+import queue
 import logging
-import time
+import threading
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -32,7 +33,16 @@ class SeleniumExtractor:
     def __init__(self):
         """Inicializa o extrator Selenium"""
         self.available = HAS_SELENIUM
-        self.driver = None
+        
+        # Drivers aquecidos reutilizados entre chamadas, rotacionados após N páginas
+        self.pool_size = int(os.getenv('SELENIUM_POOL_SIZE', 2))
+        self.max_pages_per_driver = int(os.getenv('SELENIUM_MAX_PAGES_PER_DRIVER', 50))
+        self.acquire_timeout = float(os.getenv('SELENIUM_ACQUIRE_TIMEOUT', 60))
+        self._idle_drivers: queue.LifoQueue = queue.LifoQueue()
+        self._drivers_created = 0
+        self._pool_pid: Optional[int] = None
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
         
         # Configurações do Chrome
         self.chrome_options = Options()
@@ -53,7 +63,10 @@ class SeleniumExtractor:
             'successful_extractions': 0,
             'failed_extractions': 0,
             'js_pages_handled': 0,
-            'auth_pages_detected': 0
+            'auth_pages_detected': 0,
+            'drivers_launched': 0,
+            'drivers_rotated': 0,
+            'drivers_reused': 0
         }
         
         if self.available:
@@ -61,6 +74,11 @@ class SeleniumExtractor:
         else:
             logger.warning("⚠️ Selenium não disponível - instale com: pip install selenium webdriver-manager")
     
+    @property
+    def driver(self):
+        """Driver emprestado à thread atual durante a extração"""
+        return getattr(self._local, 'driver', None)
+    
     def extract_js_heavy_content(self, url: str) -> Dict[str, Any]:
         """Extrai conteúdo de páginas JavaScript pesadas"""
         
@@ -72,11 +90,12 @@ class SeleniumExtractor:
             }
         
         self.stats['total_extractions'] += 1
+        entry = None
+        healthy = True
         
         try:
-            # Inicializa driver se necessário
-            if not self.driver:
-                self._init_driver()
+            entry = self._acquire_driver()
+            self._local.driver = entry['driver']
             
             logger.info(f"🌐 Navegando com Selenium para: {url}")
             
@@ -84,7 +103,7 @@ class SeleniumExtractor:
             self.driver.get(url)
             
             # Aguarda carregamento inicial
-            time.sleep(3)
+            self._wait_for_document_ready()
             
             # Detecta tipo de página
             page_type = self._detect_page_type_selenium()
@@ -127,6 +146,7 @@ class SeleniumExtractor:
                 }
                 
         except Exception as e:
+            healthy = False
             self.stats['failed_extractions'] += 1
             logger.error(f"❌ Erro na extração Selenium: {str(e)}")
             return {
@@ -134,6 +154,79 @@ class SeleniumExtractor:
                 'error': str(e),
                 'content': None
             }
+        
+        finally:
+            self._local.driver = None
+            if entry is not None:
+                self._release_driver(entry, healthy)
+    
+    def _acquire_driver(self) -> Dict[str, Any]:
+        """Empresta um driver aquecido, criando até `pool_size` drivers"""
+        
+        with self._pool_lock:
+            # Drivers herdados do processo pai não são utilizáveis após fork
+            if self._pool_pid != os.getpid():
+                self._idle_drivers = queue.LifoQueue()
+                self._drivers_created = 0
+                self._pool_pid = os.getpid()
+            
+            idle_drivers = self._idle_drivers
+            create = idle_drivers.empty() and self._drivers_created < self.pool_size
+            if create:
+                self._drivers_created += 1
+        
+        if create:
+            try:
+                return {'driver': self._init_driver(), 'pages': 0}
+            except Exception:
+                with self._pool_lock:
+                    self._drivers_created -= 1
+                raise
+        
+        try:
+            entry = idle_drivers.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Nenhum driver Selenium livre em {self.acquire_timeout:g}s")
+        
+        # Driver cujo Chrome morreu é substituído
+        try:
+            entry['driver'].current_url
+        except Exception:
+            logger.warning("⚠️ Driver Selenium sem resposta, relançando")
+            self._quit_driver(entry['driver'])
+            try:
+                return {'driver': self._init_driver(), 'pages': 0}
+            except Exception:
+                with self._pool_lock:
+                    self._drivers_created -= 1
+                raise
+        
+        self.stats['drivers_reused'] += 1
+        return entry
+    
+    def _release_driver(self, entry: Dict[str, Any], healthy: bool):
+        """Devolve o driver ao pool ou o descarta após falha/limite de páginas"""
+        
+        entry['pages'] += 1
+        
+        if self._pool_pid != os.getpid():
+            self._quit_driver(entry['driver'])
+            return
+        
+        if not healthy or entry['pages'] >= self.max_pages_per_driver:
+            self._quit_driver(entry['driver'])
+            self.stats['drivers_rotated'] += 1
+            with self._pool_lock:
+                self._drivers_created -= 1
+            return
+        
+        self._idle_drivers.put(entry)
+    
+    def _quit_driver(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
     
     def _init_driver(self):
         """Inicializa driver Selenium"""
@@ -141,18 +234,29 @@ class SeleniumExtractor:
         try:
             # Usa WebDriver Manager para gerenciar ChromeDriver
             service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=self.chrome_options)
+            driver = webdriver.Chrome(service=service, options=self.chrome_options)
             
             # Configurações adicionais
-            self.driver.implicitly_wait(10)
-            self.driver.set_page_load_timeout(30)
+            driver.implicitly_wait(10)
+            driver.set_page_load_timeout(30)
             
+            self.stats['drivers_launched'] += 1
             logger.info("✅ Driver Selenium inicializado")
+            return driver
             
         except Exception as e:
             logger.error(f"❌ Erro ao inicializar driver Selenium: {e}")
             raise
     
+    def _wait_for_document_ready(self, timeout: float = 10):
+        """Aguarda document.readyState == 'complete' em vez de um sleep fixo"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script('return document.readyState') == 'complete'
+            )
+        except Exception:
+            logger.warning(f"⚠️ Página não concluiu carregamento em {timeout:g}s, extraindo assim mesmo")
+    
     def _detect_page_type_selenium(self) -> str:
         """Detecta tipo de página usando Selenium"""
         
@@ -183,33 +287,17 @@ class SeleniumExtractor:
             # Aguarda que o body tenha conteúdo substancial
             wait = WebDriverWait(self.driver, self.wait_timeout)
             
-            # Aguarda elementos comuns de conteúdo
-            content_selectors = [
-                (By.TAG_NAME, 'main'),
-                (By.TAG_NAME, 'article'),
-                (By.CLASS_NAME, 'content'),
-                (By.ID, 'content'),
-                (By.CLASS_NAME, 'post'),
-                (By.CLASS_NAME, 'article')
-            ]
-            
-            for selector_type, selector_value in content_selectors:
-                try:
-                    wait.until(EC.presence_of_element_located((selector_type, selector_value)))
-                    logger.info(f"✅ Conteúdo JavaScript carregado: {selector_value}")
-                    break
-                except:
-                    continue
-            
-            # Aguarda estabilização
-            time.sleep(5)
-            
-            # Verifica se o conteúdo realmente carregou
-            body_text = self.driver.find_element(By.TAG_NAME, 'body').text
+            # Aguarda elementos comuns de conteúdo (um único seletor, um único prazo)
+            try:
+                wait.until(EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, 'main, article, .content, #content, .post, .article')
+                ))
+                logger.info("✅ Conteúdo JavaScript carregado")
+            except Exception:
+                pass
             
-            if len(body_text) < 200:
-                # Aguarda mais um pouco
-                time.sleep(5)
+            # Aguarda o texto renderizado em vez de pausas fixas
+            wait.until(lambda driver: len(driver.find_element(By.TAG_NAME, 'body').text) >= 200)
             
         except Exception as e:
             logger.warning(f"⚠️ Timeout aguardando conteúdo JavaScript: {e}")
@@ -370,16 +458,24 @@ class SeleniumExtractor:
             **self.stats,
             'success_rate': success_rate,
             'available': self.available,
-            'driver_active': self.driver is not None
+            'driver_active': self._drivers_created > 0,
+            'drivers_alive': self._drivers_created,
+            'pool_size': self.pool_size,
+            'max_pages_per_driver': self.max_pages_per_driver
         }
     
     def close(self):
-        """Fecha driver e limpa recursos"""
+        """Fecha drivers ociosos e limpa recursos"""
         
         try:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            while True:
+                try:
+                    entry = self._idle_drivers.get_nowait()
+                except queue.Empty:
+                    break
+                self._quit_driver(entry['driver'])
+                with self._pool_lock:
+                    self._drivers_created -= 1
             
             logger.info("✅ Selenium Extractor fechado")
             
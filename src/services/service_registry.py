@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Service Registry
+Registro de serviços com inicialização sob demanda: o módulo do serviço (e a
+instância global que ele cria) só é importado no primeiro acesso
+"""
+
+import os
+import time
+import logging
+import importlib
+import importlib.util
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """
+    Proxy para a instância global de um módulo (ou para o próprio módulo,
+    sem `attribute`). Acessos a atributos importam o módulo na primeira vez
+    e depois são repassados direto à instância.
+    """
+    
+    __slots__ = ('_registry', '_name', '_module_path', '_attribute', '_instance')
+    
+    def __init__(self, registry: 'ServiceRegistry', name: str, module_path: str, attribute: Optional[str]):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module_path', module_path)
+        object.__setattr__(self, '_attribute', attribute)
+        object.__setattr__(self, '_instance', None)
+    
+    def _resolve(self) -> Any:
+        instance = object.__getattribute__(self, '_instance')
+        if instance is None:
+            instance = object.__getattribute__(self, '_registry').get(object.__getattribute__(self, '_name'))
+            object.__setattr__(self, '_instance', instance)
+        return instance
+    
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._resolve(), item)
+    
+    def __setattr__(self, item: str, value: Any):
+        setattr(self._resolve(), item, value)
+    
+    def __repr__(self) -> str:
+        name = object.__getattribute__(self, '_name')
+        if object.__getattribute__(self, '_instance') is None:
+            return f"<LazyService {name} (não carregado)>"
+        return f"<LazyService {name}: {object.__getattribute__(self, '_instance')!r}>"
+
+
+class ServiceRegistry:
+    """Serviços registrados por nome, construídos no primeiro uso"""
+    
+    def __init__(self):
+        """Inicializa registro"""
+        self.lazy_enabled = os.getenv('LAZY_SERVICES', 'true').lower() == 'true'
+        
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # Nenhuma trava do registro fica presa durante um import: o import de um
+        # serviço pode importar módulos que registram outros (em outra thread,
+        # inclusive), e o próprio importlib já serializa a carga de cada módulo
+    
+    def _define(self, name: str, module_path: str, attribute: Optional[str]) -> Dict[str, Any]:
+        # setdefault é atômico: registrar não precisa de trava
+        return self._definitions.setdefault(name, {
+            'module': module_path,
+            'attribute': attribute,
+            'load_seconds': None,
+            'loaded_at': None,
+            'error': None
+        })
+    
+    def register(self, name: str, module_path: str, attribute: Optional[str] = None) -> Any:
+        """
+        Registra o serviço `attribute` (padrão: `name`) de `module_path` e
+        retorna um proxy. Com LAZY_SERVICES=false o serviço é carregado na hora.
+        """
+        self._define(name, module_path, attribute if attribute is not None else name)
+        if not self.lazy_enabled:
+            self.try_load(name)
+        return LazyService(self, name, module_path, attribute)
+    
+    def module(self, module_path: str) -> Any:
+        """Proxy para um módulo opcional pesado, importado no primeiro uso"""
+        self._define(module_path, module_path, None)
+        if not self.lazy_enabled:
+            self.try_load(module_path)
+        return LazyService(self, module_path, module_path, None)
+    
+    def is_available(self, module_path: str) -> bool:
+        """
+        Verifica se o módulo existe, sem importá-lo. Uma instalação quebrada
+        ainda passa aqui: confirme com try_load antes do primeiro uso.
+        """
+        try:
+            return importlib.util.find_spec(module_path) is not None
+        except (ImportError, ValueError):
+            return False
+    
+    def get(self, name: str) -> Any:
+        """Instância do serviço, carregando o módulo se ainda não foi"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        
+        definition = self._definitions.get(name)
+        if definition is None:
+            raise KeyError(f"Serviço não registrado: {name}")
+        
+        start_time = time.time()
+        try:
+            module = importlib.import_module(definition['module'])
+            instance = getattr(module, definition['attribute']) if definition['attribute'] else module
+        except Exception as e:
+            definition['error'] = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Falha ao carregar serviço '{name}': {e}")
+            raise
+        
+        # Duas threads podem ter importado juntas: fica a primeira instância registrada
+        instance = self._instances.setdefault(name, instance)
+        if definition['loaded_at'] is None:
+            definition['load_seconds'] = time.time() - start_time
+            definition['loaded_at'] = time.time()
+            definition['error'] = None
+            logger.info(f"⚙️ Serviço '{name}' carregado sob demanda em {definition['load_seconds']:.2f}s")
+        return instance
+    
+    def try_load(self, name: str) -> bool:
+        """
+        Carrega o serviço e informa se deu certo. Uma falha de import fica
+        registrada e não é tentada de novo (ex.: pacote instalado pela metade).
+        """
+        if name in self._instances:
+            return True
+        definition = self._definitions.get(name)
+        if definition is None or definition['error']:
+            return False
+        try:
+            self.get(name)
+            return True
+        except Exception:
+            return False
+    
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+    
+    def preload(self, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Carrega antecipadamente os serviços indicados (ou todos), ignorando falhas"""
+        targets = list(names if names is not None else self._definitions)
+        return {name: self.try_load(name) for name in targets}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de carregamento de cada serviço registrado"""
+        services = {
+            name: {
+                'module': definition['module'],
+                'loaded': name in self._instances,
+                'load_seconds': round(definition['load_seconds'], 4) if definition['load_seconds'] is not None else None,
+                'loaded_at': definition['loaded_at'],
+                'error': definition['error']
+            }
+            for name, definition in self._definitions.items()
+        }
+        
+        return {
+            'lazy_enabled': self.lazy_enabled,
+            'registered': len(services),
+            'loaded': sum(1 for service in services.values() if service['loaded']),
+            'services': services
+        }
+
+# Instância global
+service_registry = ServiceRegistry()
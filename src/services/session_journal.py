@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Session Journal
+Log append-only por sessão (JSONL, opcionalmente com frames gzip) com
+índice de offsets; escritas acumuladas em buffer e gravadas por thread
+de fundo
+"""
+
+import os
+import gzip
+import json
+import atexit
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# fcntl só existe em sistemas Unix; no Windows há um único processo gravando
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+class SessionJournal:
+    """Um arquivo de dados e um índice por sessão"""
+    
+    def __init__(self, journal_dir: Path):
+        """Inicializa journal de sessões"""
+        self.journal_dir = Path(journal_dir)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.compression = os.getenv('AUTO_SAVE_COMPRESSION', 'none').lower()
+        self.flush_interval = float(os.getenv('AUTO_SAVE_FLUSH_INTERVAL', 1.0))
+        self.max_buffered = int(os.getenv('AUTO_SAVE_MAX_BUFFERED', 200))
+        
+        self._buffer: List[Tuple[str, Dict[str, Any], str]] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        
+        # Thread de flush criada sob demanda em cada processo (gunicorn usa preload_app)
+        self._flusher_pid: Optional[int] = None
+        
+        atexit.register(self.flush)
+    
+    def data_path(self, session_key: str, compression: Optional[str] = None) -> Path:
+        """Arquivo de dados da sessão"""
+        suffix = '.jsonl.gz' if (compression or self.compression) == 'gzip' else '.jsonl'
+        return self.journal_dir / f"{self._safe_key(session_key)}{suffix}"
+    
+    def index_path(self, session_key: str) -> Path:
+        """Índice da sessão: uma linha JSON com offset e tamanho por registro"""
+        return self.journal_dir / f"{self._safe_key(session_key)}.idx"
+    
+    def append(self, session_key: str, meta: Dict[str, Any], payload: str, urgent: bool = False) -> Path:
+        """
+        Enfileira um registro já serializado. `meta` vai para o índice;
+        `payload` é a linha JSON completa. Registros urgentes (erros)
+        acordam a thread de flush imediatamente.
+        """
+        
+        self._ensure_flusher()
+        
+        with self._buffer_lock:
+            self._buffer.append((session_key, meta, payload))
+            buffered = len(self._buffer)
+        
+        if urgent or buffered >= self.max_buffered:
+            self._wakeup.set()
+        
+        return self.data_path(session_key)
+    
+    def flush(self):
+        """Grava todo o buffer pendente"""
+        
+        # Troca do buffer sob o lock de escrita para preservar a ordem entre flushes concorrentes
+        with self._write_lock:
+            with self._buffer_lock:
+                pending, self._buffer = self._buffer, []
+            
+            by_session: Dict[str, List[Tuple[Dict[str, Any], str]]] = {}
+            for session_key, meta, payload in pending:
+                by_session.setdefault(session_key, []).append((meta, payload))
+            
+            for session_key, records in by_session.items():
+                try:
+                    self._write_records(session_key, records)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao gravar journal da sessão {session_key}: {e}")
+    
+    def _write_records(self, session_key: str, records: List[Tuple[Dict[str, Any], str]]):
+        """Anexa registros ao arquivo de dados e suas entradas ao índice"""
+        
+        data_path = self.data_path(session_key)
+        index_lines = []
+        
+        with open(data_path, 'ab') as data_file:
+            if HAS_FCNTL:
+                fcntl.flock(data_file, fcntl.LOCK_EX)
+            try:
+                data_file.seek(0, os.SEEK_END)
+                offset = data_file.tell()
+                frames = []
+                
+                for meta, payload in records:
+                    frame = payload.encode('utf-8') + b'\n'
+                    if self.compression == 'gzip':
+                        # Cada registro é um membro gzip: o arquivo continua legível com zcat
+                        frame = gzip.compress(frame, compresslevel=5)
+                    
+                    frames.append(frame)
+                    index_lines.append(json.dumps(
+                        {**meta, 'offset': offset, 'length': len(frame), 'compression': self.compression},
+                        ensure_ascii=False, default=str
+                    ))
+                    offset += len(frame)
+                
+                data_file.write(b''.join(frames))
+                data_file.flush()
+                
+                # Índice gravado sob o mesmo lock para manter offsets consistentes
+                with open(self.index_path(session_key), 'a', encoding='utf-8') as index_file:
+                    index_file.write('\n'.join(index_lines) + '\n')
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(data_file, fcntl.LOCK_UN)
+    
+    def read_index(self, session_key: str) -> List[Dict[str, Any]]:
+        """Entradas do índice da sessão, na ordem de gravação"""
+        
+        self.flush()
+        
+        index_path = self.index_path(session_key)
+        if not index_path.exists():
+            return []
+        
+        entries = []
+        with open(index_path, 'r', encoding='utf-8') as index_file:
+            for line in index_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Linha parcial de uma gravação interrompida
+                    continue
+        
+        return entries
+    
+    def read_record(self, session_key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Lê um registro pelo offset indicado no índice"""
+        
+        # Cada entrada registra a compressão usada, caso a configuração mude entre execuções
+        data_path = self.data_path(session_key, entry.get('compression', 'none'))
+        
+        with open(data_path, 'rb') as data_file:
+            data_file.seek(entry['offset'])
+            frame = data_file.read(entry['length'])
+        
+        if entry.get('compression') == 'gzip':
+            frame = gzip.decompress(frame)
+        
+        return json.loads(frame.decode('utf-8'))
+    
+    def list_sessions(self) -> List[str]:
+        """Sessões com índice gravado"""
+        self.flush()
+        return [path.stem for path in self.journal_dir.glob('*.idx')]
+    
+    def remove_older_than(self, cutoff_time: float) -> int:
+        """Remove journals sem gravação desde `cutoff_time`"""
+        
+        self.flush()
+        removidas = 0
+        
+        with self._write_lock:
+            for index_path in self.journal_dir.glob('*.idx'):
+                if index_path.stat().st_mtime >= cutoff_time:
+                    continue
+                
+                for data_path in (index_path.with_suffix('.jsonl'), index_path.with_suffix('.jsonl.gz')):
+                    if data_path.exists():
+                        data_path.unlink()
+                index_path.unlink()
+                removidas += 1
+        
+        return removidas
+    
+    def _ensure_flusher(self):
+        """Inicia a thread de flush no processo atual"""
+        if self._flusher_pid == os.getpid():
+            return
+        
+        with self._buffer_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            
+            thread = threading.Thread(target=self._flush_loop, name='session-journal-flush', daemon=True)
+            thread.start()
+            self._flusher_pid = os.getpid()
+    
+    def _flush_loop(self):
+        """Grava o buffer a cada intervalo ou quando acordada"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ Erro no flush do journal: {e}")
+    
+    def _safe_key(self, session_key: str) -> str:
+        """Nome de arquivo seguro para a sessão"""
+        return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in session_key)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Text Features
+Extração única de atributos de texto (tokens, frequências, números,
+valores monetários, sentenças, sinais de idioma) com cache por hash do
+conteúdo, compartilhada por validadores e scorers de relevância
+"""
+
+import os
+import re
+import sys
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?%?')
+MONEY_PATTERN = re.compile(r'R\$\s*[\d,\.]+')
+SENTENCE_PATTERN = re.compile(r'[^.!?\n]+(?:[.!?]+|$)', re.MULTILINE)
+
+PORTUGUESE_STOPWORDS = frozenset([
+    'que', 'não', 'uma', 'para', 'com', 'mais', 'como',
+    'mas', 'foi', 'pelo', 'pela', 'até', 'isso', 'ela',
+    'entre', 'depois', 'sem', 'mesmo', 'aos', 'seus',
+    'quem', 'nas', 'me', 'esse', 'eles', 'você', 'tinha',
+    'foram', 'essa', 'num', 'nem', 'suas', 'meu', 'às',
+    'minha', 'numa', 'pelos', 'elas', 'qual', 'nós', 'deles'
+])
+
+ENGLISH_STOPWORDS = frozenset([
+    'the', 'and', 'that', 'with', 'for', 'this', 'from',
+    'are', 'was', 'were', 'have', 'has', 'which', 'their',
+    'they', 'will', 'would', 'there', 'what', 'about', 'been'
+])
+
+NAVIGATION_WORDS = frozenset([
+    'home', 'início', 'sobre', 'about', 'contato', 'contact',
+    'menu', 'navegação', 'navigation', 'login', 'entrar',
+    'cadastro', 'register', 'produtos', 'products', 'serviços',
+    'services', 'blog', 'notícias', 'news', 'ajuda', 'help',
+    'suporte', 'support', 'faq', 'termos', 'terms', 'privacidade',
+    'privacy', 'política', 'policy', 'cookies', 'sitemap',
+    'buscar', 'search', 'pesquisar'
+])
+
+# Custo aproximado de cada entrada dos contadores (chave str + slot do dict)
+COUNTER_ENTRY_BYTES = 96
+
+def tokenize(text: str) -> List[str]:
+    """Tokens em minúsculas, sem pontuação"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class TextFeatures:
+    """Atributos de um documento, calculados em uma única passada de cada padrão"""
+    
+    def __init__(self, content: str):
+        self.content = content
+        self.lower = content.lower()
+        self.character_count = len(content)
+        
+        # Palavras separadas por espaços: base das proporções e estatísticas dos validadores
+        words = self.lower.split()
+        self.word_count = len(words)
+        self.word_counts = Counter(words)
+        
+        # Tokens sem pontuação: base do BM25 e do empacotamento de prompt
+        tokens = TOKEN_PATTERN.findall(self.lower)
+        self.token_count = len(tokens)
+        self.term_counts = Counter(tokens)
+        
+        self.number_spans = [match.span() for match in NUMBER_PATTERN.finditer(content)]
+        self.percentage_spans = [
+            span for span in self.number_spans if content[span[1] - 1] == '%'
+        ]
+        self.money_spans = [match.span() for match in MONEY_PATTERN.finditer(content)]
+        self.sentence_spans = [
+            match.span() for match in SENTENCE_PATTERN.finditer(content)
+            if match.group().strip()
+        ]
+        
+        lines = content.split('\n')
+        self.line_count = len(lines)
+        self.paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
+        
+        self.language_signals = {
+            'pt': self.ratio(PORTUGUESE_STOPWORDS),
+            'en': self.ratio(ENGLISH_STOPWORDS)
+        }
+        self.navigation_ratio = self.ratio(NAVIGATION_WORDS)
+        
+        self._term_occurrences: Dict[str, int] = {}
+        
+        # Tamanho aproximado em memória, usado pelo limite em bytes do cache
+        self.size_bytes = (
+            sys.getsizeof(content) + sys.getsizeof(self.lower) +
+            COUNTER_ENTRY_BYTES * (len(self.word_counts) + len(self.term_counts)) +
+            16 * (len(self.number_spans) + len(self.money_spans) + len(self.sentence_spans)) +
+            sum(sys.getsizeof(paragraph) for paragraph in self.paragraphs)
+        )
+    
+    def count_term(self, term: str) -> int:
+        """
+        Ocorrências do termo como substring do texto em minúsculas, como o
+        str.count usado pelos scorers: "mercado" também conta em "mercados"
+        """
+        occurrences = self._term_occurrences.get(term)
+        if occurrences is None:
+            occurrences = self.lower.count(term) if term else 0
+            self._term_occurrences[term] = occurrences
+        return occurrences
+    
+    def count_terms(self, terms: Iterable[str]) -> int:
+        """Soma das ocorrências de vários termos"""
+        return sum(self.count_term(term) for term in terms)
+    
+    def ratio(self, vocabulary: Iterable[str]) -> float:
+        """Proporção de palavras (separadas por espaços) que pertencem ao vocabulário"""
+        if not self.word_count:
+            return 0.0
+        return sum(self.word_counts.get(word, 0) for word in set(vocabulary)) / self.word_count
+    
+    def contains(self, phrase: str) -> bool:
+        """Verifica se a expressão aparece no texto em minúsculas"""
+        return phrase in self.lower
+    
+    @property
+    def number_count(self) -> int:
+        return len(self.number_spans)
+    
+    @property
+    def percentage_count(self) -> int:
+        return len(self.percentage_spans)
+    
+    @property
+    def money_value_count(self) -> int:
+        return len(self.money_spans)
+    
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_spans)
+    
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraphs)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumo serializável dos atributos"""
+        return {
+            'character_count': self.character_count,
+            'word_count': self.word_count,
+            'token_count': self.token_count,
+            'unique_terms': len(self.term_counts),
+            'line_count': self.line_count,
+            'paragraph_count': self.paragraph_count,
+            'sentence_count': self.sentence_count,
+            'number_count': self.number_count,
+            'percentage_count': self.percentage_count,
+            'money_value_count': self.money_value_count,
+            'navigation_ratio': self.navigation_ratio,
+            'language_signals': dict(self.language_signals)
+        }
+
+class TextFeatureExtractor:
+    """Extrator com cache LRU por hash do conteúdo, limitado em entradas e em bytes"""
+    
+    def __init__(self):
+        """Inicializa extrator"""
+        self.cache_size = int(os.getenv('TEXT_FEATURES_CACHE_SIZE', 256))
+        self.cache_max_bytes = int(os.getenv('TEXT_FEATURES_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+        self._cache: 'OrderedDict[str, TextFeatures]' = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        
+        logger.info(
+            f"Text Feature Extractor inicializado (cache: {self.cache_size} entradas, "
+            f"{self.cache_max_bytes // (1024 * 1024)}MB)"
+        )
+    
+    def extract(self, content: str) -> TextFeatures:
+        """Atributos do conteúdo, reaproveitando extrações anteriores"""
+        content = content or ''
+        key = hashlib.sha1(content.encode('utf-8', 'surrogatepass')).hexdigest()
+        
+        with self._lock:
+            features = self._cache.get(key)
+            if features is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return features
+            self.stats['misses'] += 1
+        
+        # Extração fora do lock; duas threads no mesmo texto geram o mesmo resultado
+        features = TextFeatures(content)
+        
+        # Um documento maior que o limite inteiro não é guardado
+        if self.cache_size > 0 and features.size_bytes <= self.cache_max_bytes:
+            with self._lock:
+                previous = self._cache.pop(key, None)
+                if previous is not None:
+                    self._cache_bytes -= previous.size_bytes
+                self._cache[key] = features
+                self._cache_bytes += features.size_bytes
+                while len(self._cache) > self.cache_size or self._cache_bytes > self.cache_max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= evicted.size_bytes
+        
+        return features
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'cached': len(self._cache),
+                'cache_size': self.cache_size,
+                'cached_bytes': self._cache_bytes,
+                'cache_max_bytes': self.cache_max_bytes,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+            }
+    
+    def clear(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+# Instância global
+text_features = TextFeatureExtractor()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Tiered Cache
+Cache em camadas: LRU em memória limitado por bytes + camada compartilhada
+entre workers (SQLite local ou Redis opcional), com TTL por entrada
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+
+def normalize_cache_text(text: str) -> str:
+    """Normaliza texto para chave de cache (caixa, espaços e acentos)"""
+    if not text:
+        return ''
+    
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(without_accents.lower().split())
+
+
+class MemoryLRUTier:
+    """LRU em memória do processo, limitado pelo total de bytes armazenados"""
+    
+    name = 'memory'
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, Tuple[bytes, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            self._entries[key] = (value, time.time() + ttl)
+            self.current_bytes += len(value)
+            
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+    
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def cleanup_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._entries.items() if expires_at < now]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+    
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self.current_bytes -= len(value)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions
+        }
+
+
+class SQLiteTier:
+    """Camada em disco compartilhada por todos os workers da máquina"""
+    
+    name = 'sqlite'
+    
+    def __init__(self, db_path: str, namespace: str, max_bytes: int):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+    
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    cache_key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, cache_key)
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_access ON cache_entries(namespace, last_access)"
+            )
+    
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND cache_key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            
+            if row is None:
+                return None
+            
+            if row[1] < now:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND cache_key = ?",
+                    (self.namespace, key)
+                )
+                return None
+            
+            conn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND cache_key = ?",
+                (now, self.namespace, key)
+            )
+            return row[0]
+    
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self.max_bytes:
+            return
+        
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, cache_key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, sqlite3.Binary(value), len(value), now + ttl, now)
+            )
+            self._evict(conn, now)
+    
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Remove expirados e, se ainda acima do limite, os menos acessados"""
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, now)
+        )
+        
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()[0]
+        
+        if total <= self.max_bytes:
+            return
+        
+        excess = total - self.max_bytes
+        rows = conn.execute(
+            "SELECT cache_key, size FROM cache_entries WHERE namespace = ? ORDER BY last_access ASC",
+            (self.namespace,)
+        )
+        
+        to_delete = []
+        for cache_key, size in rows:
+            if excess <= 0:
+                break
+            to_delete.append((self.namespace, cache_key))
+            excess -= size
+        
+        conn.executemany(
+            "DELETE FROM cache_entries WHERE namespace = ? AND cache_key = ?",
+            to_delete
+        )
+        self.evictions += len(to_delete)
+    
+    def delete(self, key: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND cache_key = ?",
+                (self.namespace, key)
+            )
+    
+    def clear(self):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+    
+    def cleanup_expired(self) -> int:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+                (self.namespace, time.time())
+            )
+            return cursor.rowcount
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'path': str(self.db_path)
+        }
+
+
+class RedisTier:
+    """Camada compartilhada em Redis (expiração feita pelo próprio Redis)"""
+    
+    name = 'redis'
+    
+    def __init__(self, url: str, namespace: str):
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.prefix = f"arqv30:{namespace}:"
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+    
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.setex(self.prefix + key, max(1, int(ttl)), value)
+    
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+    
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+    
+    def cleanup_expired(self) -> int:
+        return 0  # Redis expira as chaves sozinho
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {'prefix': self.prefix}
+
+
+class TieredCache:
+    """Cache de objetos JSON com camada local rápida e camada compartilhada"""
+    
+    def __init__(
+        self,
+        namespace: str,
+        default_ttl: float = 3600,
+        memory_max_bytes: int = 16 * 1024 * 1024,
+        shared_backend: Optional[str] = None,
+        shared_max_bytes: int = 256 * 1024 * 1024,
+        db_path: Optional[str] = None
+    ):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.memory = MemoryLRUTier(memory_max_bytes)
+        # Entradas vindas da camada compartilhada ficam pouco tempo na memória
+        # local para não sobreviverem à expiração original
+        self.promotion_ttl = min(default_ttl, 300)
+        self.shared = self._create_shared_tier(
+            shared_backend or os.getenv('CACHE_BACKEND', 'sqlite'),
+            shared_max_bytes,
+            db_path or os.getenv('CACHE_DB_PATH', 'cache/arqv30_cache.db')
+        )
+        
+        self.counters = {
+            'hits_memory': 0,
+            'hits_shared': 0,
+            'misses': 0,
+            'sets': 0,
+            'errors': 0
+        }
+        self._counter_lock = threading.Lock()
+        
+        logger.info(
+            f"Tiered Cache '{namespace}' inicializado: memória {memory_max_bytes // 1024}KB, "
+            f"compartilhado={self.shared.name if self.shared else 'nenhum'}"
+        )
+    
+    def _create_shared_tier(self, backend: str, max_bytes: int, db_path: str):
+        """Cria camada compartilhada configurada, com fallback para SQLite"""
+        
+        backend = (backend or '').lower()
+        
+        if backend in ('none', 'memory'):
+            return None
+        
+        if backend == 'redis':
+            if HAS_REDIS and os.getenv('REDIS_URL'):
+                try:
+                    tier = RedisTier(os.getenv('REDIS_URL'), self.namespace)
+                    tier.client.ping()
+                    return tier
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis indisponível para cache '{self.namespace}': {e}")
+            else:
+                logger.warning("⚠️ Redis não configurado (REDIS_URL) - usando SQLite")
+        
+        try:
+            return SQLiteTier(db_path, self.namespace, max_bytes)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache em disco indisponível para '{self.namespace}': {e}")
+            return None
+    
+    def _count(self, counter: str):
+        with self._counter_lock:
+            self.counters[counter] += 1
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Busca valor nas camadas, promovendo acertos da camada compartilhada"""
+        
+        raw = self.memory.get(key)
+        if raw is not None:
+            self._count('hits_memory')
+            return json.loads(raw)
+        
+        if self.shared:
+            try:
+                raw = self.shared.get(key)
+            except Exception as e:
+                self._count('errors')
+                logger.warning(f"⚠️ Erro ao ler cache '{self.namespace}': {e}")
+                raw = None
+            
+            if raw is not None:
+                self._count('hits_shared')
+                self.memory.set(key, raw, self.promotion_ttl)
+                return json.loads(raw)
+        
+        self._count('misses')
+        return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Grava valor em todas as camadas"""
+        
+        ttl = ttl or self.default_ttl
+        raw = json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+        
+        self.memory.set(key, raw, ttl)
+        self._count('sets')
+        
+        if self.shared:
+            try:
+                self.shared.set(key, raw, ttl)
+            except Exception as e:
+                self._count('errors')
+                logger.warning(f"⚠️ Erro ao gravar cache '{self.namespace}': {e}")
+    
+    def delete(self, key: str):
+        """Remove chave de todas as camadas"""
+        self.memory.delete(key)
+        if self.shared:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao remover do cache '{self.namespace}': {e}")
+    
+    def clear(self):
+        """Limpa todas as camadas"""
+        self.memory.clear()
+        if self.shared:
+            try:
+                self.shared.clear()
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao limpar cache '{self.namespace}': {e}")
+    
+    def cleanup_expired(self) -> int:
+        """Remove entradas expiradas de todas as camadas"""
+        removed = self.memory.cleanup_expired()
+        if self.shared:
+            try:
+                removed += self.shared.cleanup_expired()
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao expirar cache '{self.namespace}': {e}")
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores de acerto/erro e ocupação das camadas"""
+        
+        with self._counter_lock:
+            counters = dict(self.counters)
+        
+        lookups = counters['hits_memory'] + counters['hits_shared'] + counters['misses']
+        hits = counters['hits_memory'] + counters['hits_shared']
+        
+        stats = {
+            **counters,
+            'hits': hits,
+            'hit_rate': (hits / lookups * 100) if lookups else 0.0,
+            'evictions': self.memory.evictions,
+            'memory': self.memory.get_stats(),
+            'shared_backend': self.shared.name if self.shared else None
+        }
+        
+        if self.shared:
+            try:
+                stats['shared'] = self.shared.get_stats()
+                stats['evictions'] += stats['shared'].get('evictions', 0)
+            except Exception as e:
+                stats['shared'] = {'error': str(e)}
+        
+        return stats
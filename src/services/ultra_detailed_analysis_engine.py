@@ -24,6 +24,8 @@ from services.future_prediction_engine import future_prediction_engine
 from services.enhanced_trends_service import enhanced_trends_service
 from services.resilient_component_executor import resilient_executor
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.prompt_packer import prompt_packer
+from services.progress_bus import progress_bus
 
 logger = logging.getLogger(__name__)
 
@@ -550,16 +552,32 @@ class UltraDetailedAnalysisEngine:
     ) -> Dict[str, Any]:
         """Executa análise com IA REAL - FALHA SE IA NÃO RESPONDER"""
 
+        # Orçamento de tokens do provedor que o AI Manager vai usar (sem reservar a chamada)
+        provider = ai_manager.peek_best_provider()
+        template = self._build_gigantic_analysis_prompt(data, "")
+        budget = prompt_packer.budget_for(provider, template, max_output_tokens=8192)
+
         # Prepara contexto de pesquisa REAL
-        search_context = self._prepare_search_context(research_data)
+        search_context = self._prepare_search_context(research_data, data, provider, budget)
 
         # Constrói prompt ULTRA-DETALHADO
         prompt = self._build_gigantic_analysis_prompt(data, search_context)
+        logger.info(f"📏 Prompt para {provider}: ~{prompt_packer.estimate_tokens(prompt, provider)} tokens")
 
         logger.info("🤖 Executando análise com IA REAL...")
 
-        # Executa com AI Manager (sistema de fallback automático)
-        ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        def save_section(section, content):
+            salvar_etapa(f"analise_parcial_{section}", content, categoria="analise_completa")
+            progress_bus.publish_section(data.get('session_id'), section, content)
+
+        # Executa com AI Manager (sistema de fallback automático), salvando e publicando cada seção ao fechar
+        ai_response = ai_manager.stream_analysis(
+            prompt,
+            max_tokens=8192,
+            on_section=save_section,
+            # Só respostas que passam na validação rigorosa ficam no cache
+            validate=lambda text: bool(self._process_ai_response_strict(text, data))
+        )
 
         if not ai_response:
             raise Exception("IA NÃO RESPONDEU: Nenhum provedor de IA disponível ou funcionando")
@@ -569,8 +587,14 @@ class UltraDetailedAnalysisEngine:
 
         return processed_analysis
 
-    def _prepare_search_context(self, research_data: Dict[str, Any]) -> str:
-        """Prepara contexto de pesquisa para IA"""
+    def _prepare_search_context(
+        self,
+        research_data: Dict[str, Any],
+        data: Optional[Dict[str, Any]] = None,
+        provider: Optional[str] = None,
+        budget_tokens: Optional[int] = None
+    ) -> str:
+        """Prepara contexto de pesquisa para IA com as sentenças de maior score que cabem no orçamento"""
 
         extracted_content = research_data.get('extracted_content', [])
 
@@ -583,23 +607,29 @@ class UltraDetailedAnalysisEngine:
         # Ordena por qualidade
         sorted_content = sorted(extracted_content, key=lambda x: x.get('quality_score', 0), reverse=True)
 
-        for i, content_item in enumerate(sorted_content[:10], 1):  # Top 10 páginas por qualidade
-            context += f"--- FONTE REAL {i}: {content_item['title']} ---\n"
-            context += f"URL: {content_item['url']}\n"
-            context += f"Qualidade: {content_item.get('quality_score', 0):.1f}%\n"
-            context += f"Conteúdo: {content_item['content'][:2000]}\n\n"
-
-        # Adiciona estatísticas da pesquisa
-        context += f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
-        context += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
-        context += f"Total de resultados encontrados: {research_data.get('total_results', 0)}\n"
-        context += f"Páginas únicas analisadas: {research_data.get('unique_sources', 0)}\n"
-        context += f"Extrações bem-sucedidas: {research_data.get('successful_extractions', 0)}\n"
-        context += f"Total de caracteres extraídos: {research_data.get('total_content_length', 0):,}\n"
-        context += f"Qualidade média do conteúdo: {research_data.get('quality_metrics', {}).get('avg_quality_score', 0):.1f}%\n"
-        context += f"Garantia de dados reais: 100%\n"
-
-        return context
+        # Estatísticas da pesquisa (fixas, descontadas do orçamento)
+        stats_block = f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
+        stats_block += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
+        stats_block += f"Total de resultados encontrados: {research_data.get('total_results', 0)}\n"
+        stats_block += f"Páginas únicas analisadas: {research_data.get('unique_sources', 0)}\n"
+        stats_block += f"Extrações bem-sucedidas: {research_data.get('successful_extractions', 0)}\n"
+        stats_block += f"Total de caracteres extraídos: {research_data.get('total_content_length', 0):,}\n"
+        stats_block += f"Qualidade média do conteúdo: {research_data.get('quality_metrics', {}).get('avg_quality_score', 0):.1f}%\n"
+        stats_block += f"Garantia de dados reais: 100%\n"
+
+        if budget_tokens is None:
+            budget_tokens = prompt_packer.budget_for(provider)
+        fixed_tokens = prompt_packer.estimate_tokens(context + stats_block, provider)
+
+        # Sentenças de todas as fontes competem pelo orçamento, em vez de 2000 caracteres fixos por página
+        data = data or {}
+        packed = prompt_packer.pack(
+            prompt_packer.items_from_sources(sorted_content[:20], data.get('query', ''), data),
+            provider=provider,
+            budget_tokens=max(0, budget_tokens - fixed_tokens)
+        )
+
+        return context + packed.text + stats_block
 
     def _build_gigantic_analysis_prompt(self, data: Dict[str, Any], search_context: str) -> str:
         """Constrói prompt GIGANTE para análise ultra-detalhada"""
@@ -14,7 +14,10 @@ from services.production_search_manager import production_search_manager
 from services.secondary_search_engines import secondary_search_engines
 from services.multi_layer_extractor import multi_layer_extractor
 from services.url_filter_manager import url_filter_manager
-from services.auto_save_manager import salvar_etapa, salvar_erro
+from services.auto_save_manager import salvar_etapa, salvar_erro, com_sessao
+from services.http_client import http_client
+from services.async_extraction_engine import async_extraction_engine
+from services.near_duplicate_index import near_duplicate_detector
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +52,7 @@ class UltraRobustSearchManager:
             'successful_searches': 0,
             'total_extractions': 0,
             'successful_extractions': 0,
+            'duplicates_collapsed': 0,
             'layer_performance': {},
             'quality_metrics': {}
         }
@@ -321,6 +325,9 @@ class UltraRobustSearchManager:
                 seen_urls.add(url)
                 unique_results.append(result)
         
+        # Colapsa resultados com título + snippet quase idênticos antes de extrair
+        unique_results, _ = near_duplicate_detector.deduplicate(unique_results, snippets=True)
+        
         # Ordena por prioridade (se disponível)
         unique_results.sort(key=lambda x: x.get('filtro', {}).get('prioridade', 1), reverse=True)
         
@@ -336,9 +343,31 @@ class UltraRobustSearchManager:
         # Limita número de extrações para performance
         results_to_extract = search_results[:30]  # Top 30 resultados
         
+        # Primeiro passo: extração estática assíncrona de todo o lote
+        if async_extraction_engine.enabled:
+            async_results = async_extraction_engine.extract_batch([r.get('url', '') for r in results_to_extract])
+            remaining = []
+            
+            for result in results_to_extract:
+                async_result = async_results.get(result.get('url', ''))
+                if async_result and async_result['success']:
+                    extracted_content.append({
+                        **async_result,
+                        'title': result.get('title', ''),
+                        'search_title': result.get('title', ''),
+                        'search_snippet': result.get('snippet', ''),
+                        'search_source': result.get('source', ''),
+                        'extraction_strategy': 'async_static'
+                    })
+                    self.stats['successful_extractions'] += 1
+                else:
+                    remaining.append(result)
+            
+            results_to_extract = remaining
+        
         with ThreadPoolExecutor(max_workers=5) as executor:
             future_to_result = {
-                executor.submit(self._extract_single_url, result, context): result 
+                executor.submit(com_sessao(self._extract_single_url), result, context): result 
                 for result in results_to_extract
             }
             
@@ -360,6 +389,13 @@ class UltraRobustSearchManager:
                         'title': result.get('title', '')
                     })
         
+        # Espelhos e variantes AMP/mobile extraídos de URLs diferentes viram uma única fonte
+        successful = [c for c in extracted_content if c.get('success')]
+        unique, duplicates = near_duplicate_detector.deduplicate(successful)
+        if duplicates:
+            self.stats['duplicates_collapsed'] += len(duplicates)
+            extracted_content = unique + [c for c in extracted_content if not c.get('success')]
+        
         return extracted_content
     
     def _extract_single_url(self, search_result: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
@@ -446,11 +482,10 @@ class UltraRobustSearchManager:
         """Extração de emergência como último recurso"""
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             
             # Tentativa de emergência com configurações mínimas
-            response = requests.get(
+            response = http_client.get(
                 url, 
                 timeout=10,
                 headers={'User-Agent': 'Mozilla/5.0 (compatible; ARQV30Bot/2.0)'},
@@ -8,12 +8,12 @@ Resolve URLs de redirecionamento e encurtadores com decodificação robusta
 import os
 import logging
 import base64
-import requests
 import json
 import re
 import json
 from urllib.parse import parse_qs, urlparse, unquote
 from typing import Optional
+from services.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,7 @@ class URLResolver:
     """Resolvedor robusto de URLs de redirecionamento"""
     
     def __init__(self):
-        self.session = requests.Session()
+        self.session = http_client.create_session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
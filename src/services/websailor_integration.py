@@ -8,7 +8,6 @@ Navegação web REAL sem cache ou simulação - DADOS 100% REAIS
 import os
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus, urljoin
 import json
@@ -16,6 +15,10 @@ import re
 from datetime import datetime
 from bs4 import BeautifulSoup
 import random
+from services.http_client import http_client
+from services.text_features import text_features
+from services.relevance_ranker import relevance_ranker
+from services.near_duplicate_index import near_duplicate_detector
 
 logger = logging.getLogger(__name__)
 
@@ -188,7 +191,7 @@ class WebSailorAgent:
                 "sort": "date"
             }
             
-            response = requests.get(
+            response = http_client.get(
                 self.google_search_url,
                 params=params,
                 headers=self.headers,
@@ -224,7 +227,7 @@ class WebSailorAgent:
             # Bing search via scraping
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br"
             
-            response = requests.get(
+            response = http_client.get(
                 search_url,
                 headers=self.headers,
                 timeout=10
@@ -269,7 +272,7 @@ class WebSailorAgent:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
+            response = http_client.get(
                 search_url,
                 headers=self.headers,
                 timeout=10
@@ -311,7 +314,7 @@ class WebSailorAgent:
         try:
             search_url = f"https://br.search.yahoo.com/search?p={quote_plus(query)}"
             
-            response = requests.get(
+            response = http_client.get(
                 search_url,
                 headers=self.headers,
                 timeout=10
@@ -380,7 +383,7 @@ class WebSailorAgent:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = http_client.get(
                 jina_url,
                 headers=headers,
                 timeout=30
@@ -406,7 +409,7 @@ class WebSailorAgent:
         """Extração REAL direta usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
+            response = http_client.get(
                 url,
                 headers=self.headers,
                 timeout=20,
@@ -452,7 +455,7 @@ class WebSailorAgent:
         links = []
         try:
             # Faz nova requisição para obter HTML completo
-            response = requests.get(base_url, headers=self.headers, timeout=10)
+            response = http_client.get(base_url, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
                 base_domain = base_url.split('/')[2]
@@ -486,7 +489,8 @@ class WebSailorAgent:
         if not content or len(content) < 50:
             return 0.0
         
-        content_lower = content.lower()
+        # Frequências calculadas uma vez por conteúdo (e reaproveitadas entre chamadas)
+        features = text_features.extract(content)
         query_lower = query.lower()
         
         score = 0.0
@@ -494,7 +498,7 @@ class WebSailorAgent:
         # Score baseado na query (peso maior)
         query_words = [w for w in query_lower.split() if len(w) > 2]
         for word in query_words:
-            occurrences = content_lower.count(word)
+            occurrences = features.count_term(word)
             score += occurrences * 2.0  # Peso aumentado
         
         # Score baseado no contexto
@@ -511,7 +515,7 @@ class WebSailorAgent:
         
         for term in context_terms:
             if term and len(term) > 2:
-                occurrences = content_lower.count(term)
+                occurrences = features.count_term(term)
                 score += occurrences * 1.5
         
         # Bonus para termos de mercado específicos
@@ -523,18 +527,15 @@ class WebSailorAgent:
         ]
         
         for term in market_terms:
-            occurrences = content_lower.count(term)
+            occurrences = features.count_term(term)
             score += occurrences * 0.5
         
         # Bonus por densidade de informação
-        word_count = len(content.split())
-        if word_count > 500:
+        if features.word_count > 500:
             score += 2.0
         
         # Bonus por presença de números/percentuais
-        import re
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        score += len(numbers) * 0.3
+        score += features.number_count * 0.3
         
         # Normaliza score baseado no tamanho do conteúdo
         normalized_score = score / (len(content) / 1000 + 1)
@@ -613,15 +614,16 @@ class WebSailorAgent:
         if not page_contents:
             return self._generate_emergency_real_research(query, context)
         
-        # Ordena por relevância REAL
-        page_contents.sort(key=lambda x: x["relevance_score"], reverse=True)
+        # Colapsa páginas espelhadas e ranqueia o restante de uma vez (BM25), mantendo as 20 mais relevantes
+        page_contents, _ = near_duplicate_detector.deduplicate(page_contents)
+        page_contents = relevance_ranker.rank(page_contents, query, context, top_k=20)
         
         # Combina conteúdo das páginas mais relevantes
         combined_content = ""
         sources_list = []
         unique_insights = set()
         
-        for i, page in enumerate(page_contents[:20]):  # Top 20 páginas
+        for i, page in enumerate(page_contents):
             combined_content += f"\n--- FONTE {i+1}: {page['title']} ({page['url']}) ---\n"
             combined_content += page["content"][:2000]  # Limita por página
             
@@ -629,6 +631,7 @@ class WebSailorAgent:
                 "title": page["title"],
                 "url": page["url"],
                 "relevance_score": round(page["relevance_score"], 2),
+                "bm25_score": page["bm25_score"],
                 "source_type": page["source_type"],
                 "search_engine": page.get("search_engine", "unknown")
             })
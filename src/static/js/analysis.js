@@ -58,7 +58,7 @@ class AnalysisManager {
             console.log('🚀 Iniciando análise ultra-avançada:', formData);
 
             // Mostra progresso aprimorado
-            this.showEnhancedProgress();
+            this.showEnhancedProgress(formData.session_id);
 
             // Executa análise
             const response = await fetch('/api/analyze', {
@@ -146,7 +146,7 @@ class AnalysisManager {
         return data;
     }
 
-    showEnhancedProgress() {
+    showEnhancedProgress(sessionId) {
         const progressArea = document.getElementById('progressArea');
         const resultsArea = document.getElementById('resultsArea');
         
@@ -174,49 +174,93 @@ class AnalysisManager {
         }
 
         // Inicia tracking de progresso aprimorado
-        this.startEnhancedProgressTracking();
+        this.startEnhancedProgressTracking(sessionId);
     }
 
-    async startEnhancedProgressTracking() {
+    async startEnhancedProgressTracking(sessionId) {
         try {
-            // Mensagens de progresso aprimoradas
-            const enhancedMessages = [
-                '🔍 Executando pesquisa inteligente massiva...',
-                '🧠 Sintetizando conteúdo com IA avançada...',
-                '🚀 Analisando com Gemini 2.5 Pro...',
-                '⚡ Gerando componentes ultra-robustos...',
-                '🧠 Criando drivers mentais customizados...',
-                '🎭 Desenvolvendo provas visuais inovadoras...',
-                '🛡️ Construindo sistema anti-objeção avançado...',
-                '🎯 Arquitetando pré-pitch revolucionário...',
-                '🔮 Gerando predições futuras avançadas...',
-                '📊 Consolidando relatórios premium...',
-                '💾 Salvando relatórios localmente...',
-                '📋 Gerando múltiplos formatos...',
-                '✅ Análise ultra-avançada concluída!'
-            ];
-
-            let currentStep = 0;
-            
-            this.progressInterval = setInterval(() => {
-                if (currentStep < enhancedMessages.length) {
-                    this.updateEnhancedProgressUI({
-                        current_step: currentStep + 1,
-                        total_steps: enhancedMessages.length,
-                        current_message: enhancedMessages[currentStep],
-                        percentage: ((currentStep + 1) / enhancedMessages.length) * 100
-                    });
-                    currentStep++;
-                } else {
-                    clearInterval(this.progressInterval);
-                }
-            }, 3000); // A cada 3 segundos
+            // Inicia tracking no servidor
+            await fetch('/api/start_tracking', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ session_id: sessionId })
+            });
+
+            // Progresso real por Server-Sent Events; sem suporte, volta ao polling
+            if (window.EventSource) {
+                this.startEnhancedProgressStream(sessionId);
+            } else {
+                this.startEnhancedProgressPolling(sessionId);
+            }
 
         } catch (error) {
             console.error('❌ Erro no tracking de progresso:', error);
         }
     }
 
+    startEnhancedProgressStream(sessionId) {
+        // O navegador reconecta sozinho enviando Last-Event-ID
+        const stream = new EventSource(`/api/progress/stream/${sessionId}`);
+        let received = false;
+        this.progressStream = stream;
+
+        stream.addEventListener('progress', (event) => {
+            received = true;
+            this.updateEnhancedProgressUI(JSON.parse(event.data));
+        });
+
+        stream.addEventListener('section', (event) => {
+            received = true;
+            const payload = JSON.parse(event.data);
+            console.log(`🧩 Seção concluída: ${payload.section}`);
+        });
+
+        stream.addEventListener('complete', (event) => {
+            this.updateEnhancedProgressUI(JSON.parse(event.data));
+            this.stopEnhancedProgressTracking();
+        });
+
+        stream.onerror = () => {
+            // Falha antes do primeiro evento: servidor sem streaming, usa polling
+            if (!received && stream.readyState === EventSource.CLOSED) {
+                this.progressStream = null;
+                this.startEnhancedProgressPolling(sessionId);
+            }
+        };
+    }
+
+    startEnhancedProgressPolling(sessionId) {
+        this.progressInterval = setInterval(async () => {
+            try {
+                const response = await fetch(`/api/get_progress/${sessionId}`);
+                if (!response.ok) {
+                    return;
+                }
+
+                const data = await response.json();
+                if (data.progress) {
+                    this.updateEnhancedProgressUI(data.progress);
+                    if (data.progress.is_complete) {
+                        this.stopEnhancedProgressTracking();
+                    }
+                }
+            } catch (error) {
+                console.error('❌ Erro ao atualizar progresso:', error);
+            }
+        }, 2000); // A cada 2 segundos
+    }
+
+    stopEnhancedProgressTracking() {
+        if (this.progressStream) {
+            this.progressStream.close();
+            this.progressStream = null;
+        }
+        if (this.progressInterval) {
+            clearInterval(this.progressInterval);
+            this.progressInterval = null;
+        }
+    }
+
     updateEnhancedProgressUI(progress) {
         // Atualiza barra de progresso
         const progressFill = document.querySelector('.progress-fill');
@@ -956,10 +1000,7 @@ class AnalysisManager {
             analyzeBtn.innerHTML = '<i class="fas fa-magic"></i> <span>Gerar Análise Ultra-Avançada</span>';
         }
 
-        if (this.progressInterval) {
-            clearInterval(this.progressInterval);
-            this.progressInterval = null;
-        }
+        this.stopEnhancedProgressTracking();
     }
 
     highlightFieldError(field, message) {
@@ -6,6 +6,7 @@ class ARQV30App {
         this.sessionId = this.generateSessionId();
         this.currentAnalysis = null;
         this.progressInterval = null;
+        this.progressStream = null;
         this.uploadedFiles = [];
         
         this.init();
@@ -231,16 +232,66 @@ class ARQV30App {
                 body: JSON.stringify({ session_id: this.sessionId })
             });
 
-            // Inicia polling de progresso
-            this.progressInterval = setInterval(() => {
-                this.updateProgress();
-            }, 2000); // A cada 2 segundos
+            // Recebe o progresso por Server-Sent Events; sem suporte, volta ao polling
+            if (window.EventSource) {
+                this.startProgressStream();
+            } else {
+                this.startProgressPolling();
+            }
 
         } catch (error) {
             console.error('❌ Erro ao iniciar tracking:', error);
         }
     }
 
+    startProgressStream() {
+        // O navegador reconecta sozinho enviando Last-Event-ID
+        const stream = new EventSource(`/api/progress/stream/${this.sessionId}`);
+        let received = false;
+        this.progressStream = stream;
+
+        stream.addEventListener('progress', (event) => {
+            received = true;
+            this.updateProgressUI(JSON.parse(event.data));
+        });
+
+        stream.addEventListener('section', (event) => {
+            received = true;
+            const payload = JSON.parse(event.data);
+            console.log(`🧩 Seção concluída: ${payload.section}`);
+        });
+
+        stream.addEventListener('complete', (event) => {
+            this.updateProgressUI(JSON.parse(event.data));
+            this.stopProgressTracking();
+        });
+
+        stream.onerror = () => {
+            // Falha antes do primeiro evento: servidor sem streaming, usa polling
+            if (!received && stream.readyState === EventSource.CLOSED) {
+                this.progressStream = null;
+                this.startProgressPolling();
+            }
+        };
+    }
+
+    startProgressPolling() {
+        this.progressInterval = setInterval(() => {
+            this.updateProgress();
+        }, 2000); // A cada 2 segundos
+    }
+
+    stopProgressTracking() {
+        if (this.progressStream) {
+            this.progressStream.close();
+            this.progressStream = null;
+        }
+        if (this.progressInterval) {
+            clearInterval(this.progressInterval);
+            this.progressInterval = null;
+        }
+    }
+
     async updateProgress() {
         try {
             const response = await fetch(`/api/get_progress/${this.sessionId}`);
@@ -329,11 +380,8 @@ class ARQV30App {
             analyzeBtn.innerHTML = '<i class="fas fa-magic"></i> <span>Gerar Análise Ultra-Detalhada</span>';
         }
 
-        // Para polling
-        if (this.progressInterval) {
-            clearInterval(this.progressInterval);
-            this.progressInterval = null;
-        }
+        // Para streaming/polling
+        this.stopProgressTracking();
     }
 
     displayResults(analysis) {
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Configuração dos testes
+Coloca src no path e aponta os bancos das instâncias globais para fora da
+árvore do projeto
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+_TEST_DATA_DIR = tempfile.mkdtemp(prefix='arqv30_tests_')
+atexit.register(shutil.rmtree, _TEST_DATA_DIR, ignore_errors=True)
+
+for variable, filename in (
+    ('PROGRESS_BUS_DB', 'progress_bus.db'),
+    ('ANALYSIS_JOBS_DB', 'analysis_jobs.db'),
+    ('HEALTH_PROBE_DB', 'health_probes.db'),
+    ('PAGE_CACHE_DB_PATH', 'page_cache.db'),
+    ('CACHE_DB_PATH', 'arqv30_cache.db')
+):
+    os.environ.setdefault(variable, os.path.join(_TEST_DATA_DIR, filename))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do catálogo SQLite de análises salvas
+"""
+
+import os
+import json
+
+from services.analysis_catalog import AnalysisCatalog
+
+def _write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+def _file_info(path, section):
+    return {'path': path, 'type': section, 'name': os.path.basename(path), 'size': os.path.getsize(path)}
+
+def _metadata(analysis_id, segmento, created_at, quality_score=0):
+    return {
+        'analysis_id': analysis_id,
+        'created_at': created_at,
+        'timestamp': created_at,
+        'quality_score': quality_score,
+        'project_data': {'segmento': segmento, 'produto': 'Curso', 'publico': ['a', 'b'], 'preco': 997}
+    }
+
+def test_catalog_records_lists_and_removes_analyses(tmp_path):
+    catalog = AnalysisCatalog(str(tmp_path), str(tmp_path / 'catalog.db'))
+
+    first = [_file_info(_write_file(str(tmp_path / 'reports' / 'aaaaaaaa_report.json'), 'x' * 100), 'reports')]
+    second = [
+        _file_info(_write_file(str(tmp_path / 'reports' / 'bbbbbbbb_report.json'), 'y' * 40), 'reports'),
+        _file_info(_write_file(str(tmp_path / 'avatars' / 'bbbbbbbb_avatar.json'), 'z' * 60), 'avatars')
+    ]
+    catalog.record_analysis(_metadata('aaaaaaaa-1', 'Educação', '2024-01-01T10:00:00', 80), first)
+    catalog.record_analysis(_metadata('bbbbbbbb-2', 'Saúde', '2024-01-02T10:00:00', 90), second)
+
+    listed = catalog.list_analyses()
+    assert [row['analysis_id'] for row in listed] == ['bbbbbbbb-2', 'aaaaaaaa-1']
+    assert listed[0]['total_files'] == 2 and listed[0]['total_size'] == 100
+    assert json.loads(listed[0]['publico']) == ['a', 'b']
+
+    assert [row['analysis_id'] for row in catalog.list_analyses(sort_by='quality_score', descending=False)] == ['aaaaaaaa-1', 'bbbbbbbb-2']
+    # Coluna desconhecida cai na ordenação padrão em vez de ir para o SQL
+    assert catalog.list_analyses(sort_by='1; DROP TABLE analyses') == listed
+    assert [row['analysis_id'] for row in catalog.list_analyses(limit=1, offset=1)] == ['aaaaaaaa-1']
+    assert catalog.count_analyses() == 2
+    assert catalog.count_analyses(segmento='Saúde') == 1
+
+    assert [f['section'] for f in catalog.get_files('bbbbbbbb-2')] == ['avatars', 'reports']
+    assert len(catalog.get_files('bbbbbbbb-2', section='avatars')) == 1
+
+    stats = catalog.get_storage_stats()
+    assert stats['total_analyses'] == 2
+    assert stats['total_files'] == 3
+    assert stats['total_size_bytes'] == 200
+    assert stats['sections']['reports'] == {'files': 2, 'size_bytes': 140}
+
+    # Remover parte dos arquivos atualiza os totais; remover o último remove a análise
+    catalog.remove_files([second[1]['path']])
+    assert catalog.list_analyses(segmento='Saúde')[0]['total_files'] == 1
+    catalog.remove_files([second[0]['path']])
+    assert catalog.count_analyses() == 1
+
+    catalog.remove_analysis('aaaaaaaa-1')
+    assert catalog.count_analyses() == 0
+    assert catalog.get_storage_stats()['total_files'] == 0
+
+def test_catalog_rebuild_imports_files_on_disk(tmp_path):
+    base_dir = tmp_path / 'analyses'
+    _write_file(str(base_dir / 'metadata' / 'cccccccc_metadata.json'), json.dumps(_metadata('cccccccc-3', 'Varejo', '2024-02-01')))
+    _write_file(str(base_dir / 'reports' / 'cccccccc_report.json'), '{}')
+    _write_file(str(base_dir / 'reports' / 'semprefixo.json'), '{}')
+
+    catalog = AnalysisCatalog(str(base_dir), str(tmp_path / 'catalog.db'))
+    catalog.ensure_populated(['metadata', 'reports', 'avatars'])
+
+    analyses = catalog.list_analyses()
+    assert [row['analysis_id'] for row in analyses] == ['cccccccc-3']
+    assert analyses[0]['total_files'] == 2
+
+    # Já populado: arquivos novos só entram por record_file ou rebuild
+    _write_file(str(base_dir / 'reports' / 'dddddddd_report.json'), '{}')
+    catalog.ensure_populated(['metadata', 'reports'])
+    assert catalog.get_storage_stats()['total_files'] == 2
+    assert catalog.rebuild(['metadata', 'reports']) == {'analyses': 1, 'files': 3}
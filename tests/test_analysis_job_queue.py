@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da fila de análises: execução, capacidade e retomada de jobs de
+workers encerrados
+"""
+
+import os
+import sys
+import time
+import signal
+import sqlite3
+import threading
+import subprocess
+from contextlib import closing
+
+import pytest
+
+from services.analysis_job_queue import AnalysisJobQueue
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Worker separado que pega o job e fica preso nele até ser morto
+OWNER_SCRIPT = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+from services.analysis_job_queue import AnalysisJobQueue
+queue = AnalysisJobQueue()
+
+def _hang(data, context):
+    time.sleep(3600)
+    return {}, 200
+
+queue.register_runner('analise', _hang)
+job, _ = queue.submit({'session_id': 'retomada'}, 'analise', context={'ip_address': '10.0.0.1'})
+print(job['job_id'], flush=True)
+time.sleep(3600)
+"""
+
+@pytest.fixture
+def job_queue(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANALYSIS_JOBS_DB', str(tmp_path / 'jobs.db'))
+    monkeypatch.setenv('ANALYSIS_MAX_CONCURRENT', '1')
+    monkeypatch.setenv('ANALYSIS_MAX_QUEUED', '1')
+    queue = AnalysisJobQueue()
+    queue.slot_poll_interval = 0.05
+    return queue
+
+def _wait_job(queue, job_id, statuses=('completed', 'failed'), timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get_job(job_id, include_result=True)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} não chegou a {statuses}")
+
+def test_runs_jobs_and_stores_results(job_queue):
+    def _explode(data, context):
+        raise RuntimeError('quebrou')
+
+    job_queue.register_runner('ok', lambda data, context: ({'ok': data['session_id'], 'ip': context['ip']}, 200))
+    job_queue.register_runner('erro', lambda data, context: ({'error': 'ruim'}, 500))
+    job_queue.register_runner('explode', _explode)
+
+    job, reason = job_queue.submit({'session_id': 's1'}, 'ok', context={'ip': '127.0.0.1'})
+    assert reason is None
+    finished = _wait_job(job_queue, job['job_id'])
+    assert finished['status'] == 'completed'
+    assert finished['result'] == {'ok': 's1', 'ip': '127.0.0.1'}
+    assert finished['attempts'] == 1
+
+    failed, _ = job_queue.submit({'session_id': 's2'}, 'erro')
+    assert _wait_job(job_queue, failed['job_id'])['status'] == 'failed'
+
+    crashed, _ = job_queue.submit({'session_id': 's3'}, 'explode')
+    crashed = _wait_job(job_queue, crashed['job_id'])
+    assert crashed['status'] == 'failed' and crashed['error'] == 'quebrou'
+
+    stats = job_queue.get_stats()
+    assert (stats['completed'], stats['failed']) == (1, 2)
+    assert [job['session_id'] for job in job_queue.list_jobs(status='failed')] == ['s3', 's2']
+
+    job_queue.ping()
+
+    with pytest.raises(ValueError):
+        job_queue.submit({}, 'desconhecido')
+
+def test_rejects_jobs_over_capacity(job_queue):
+    release = threading.Event()
+
+    def _blocking(data, context):
+        release.wait(5)
+        return {}, 200
+
+    job_queue.register_runner('bloqueia', _blocking)
+
+    running, _ = job_queue.submit({'session_id': 'a'}, 'bloqueia')
+    queued, _ = job_queue.submit({'session_id': 'b'}, 'bloqueia')
+    rejected, reason = job_queue.submit({'session_id': 'c'}, 'bloqueia')
+
+    assert running and queued
+    assert rejected is None and 'Capacidade esgotada' in reason
+
+    release.set()
+    assert _wait_job(job_queue, running['job_id'])['status'] == 'completed'
+    assert _wait_job(job_queue, queued['job_id'])['status'] == 'completed'
+
+def test_job_of_killed_worker_is_picked_up_again(job_queue):
+    owner = subprocess.Popen(
+        [sys.executable, '-c', OWNER_SCRIPT, SRC_DIR],
+        env={**os.environ, 'ANALYSIS_JOBS_DB': str(job_queue.db_path)},
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        job_id = owner.stdout.readline().strip()
+        job = _wait_job(job_queue, job_id, statuses=('running',))
+        assert job['attempts'] == 1
+    finally:
+        owner.send_signal(signal.SIGKILL)
+        owner.wait()
+        owner.stdout.close()
+
+    job_queue.register_runner('analise', lambda data, context: ({'retomado': data['session_id'], **context}, 200))
+
+    # A consulta de status num worker vivo retoma o job do worker morto
+    resumed = _wait_job(job_queue, job_id)
+    assert resumed['status'] == 'completed'
+    assert resumed['result'] == {'retomado': 'retomada', 'ip_address': '10.0.0.1'}
+    assert resumed['attempts'] == 2
+
+def test_fails_orphans_that_cannot_be_resumed(job_queue):
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+
+    job_queue.register_runner('analise', lambda data, context: ({}, 200))
+    with closing(job_queue._connect()) as conn:
+        for job_id, runner, attempts in (('esgotado', 'analise', job_queue.max_attempts), ('sem_executor', 'outro', 1)):
+            conn.execute(
+                "INSERT INTO analysis_jobs (job_id, session_id, status, input_data, runner, context, attempts, worker_pid, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_id, 'running', '{}', runner, '{}', attempts, dead.pid, time.time())
+            )
+
+    exhausted = job_queue.get_job('esgotado')
+    assert exhausted['status'] == 'failed'
+    assert exhausted['error'] == f"Worker encerrado durante a análise ({job_queue.max_attempts} execuções)"
+
+    unknown = job_queue.get_job('sem_executor')
+    assert unknown['status'] == 'failed'
+    assert unknown['error'] == 'Worker encerrado durante a análise'
+
+def test_migrates_databases_without_resume_columns(tmp_path, monkeypatch):
+    db_path = tmp_path / 'antigo.db'
+    with closing(sqlite3.connect(str(db_path))) as conn:
+        conn.execute(
+            "CREATE TABLE analysis_jobs (job_id TEXT PRIMARY KEY, session_id TEXT, status TEXT NOT NULL, "
+            "input_data TEXT, result TEXT, status_code INTEGER, error TEXT, worker_pid INTEGER, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+
+    monkeypatch.setenv('ANALYSIS_JOBS_DB', str(db_path))
+    queue = AnalysisJobQueue()
+    queue.register_runner('ok', lambda data, context: ({}, 200))
+    job, _ = queue.submit({'session_id': 'x'}, 'ok')
+    assert _wait_job(queue, job['job_id'])['status'] == 'completed'
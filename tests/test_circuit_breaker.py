@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Testes dos disjuntores por provedor
+"""
+
+import time
+
+from services.circuit_breaker import CircuitBreaker, CircuitBreakerGroup, CLOSED, OPEN, HALF_OPEN
+
+def _breaker(**overrides):
+    settings = {
+        'failure_threshold': 2,
+        'base_cooldown': 10,
+        'max_cooldown': 100,
+        'window_size': 10,
+        'error_rate_threshold': 0.5,
+        'min_samples': 4,
+        'probe_timeout': 60
+    }
+    settings.update(overrides)
+    return CircuitBreaker('teste', **settings)
+
+def _expire_cooldown(breaker):
+    breaker.open_until = time.time() - 1
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = _breaker()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+    assert breaker.snapshot()['retry_in'] > 0
+
+def test_circuit_half_open_allows_a_single_probe():
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    _expire_cooldown(breaker)
+
+    # is_available não reserva o teste de recuperação
+    assert breaker.is_available()
+    assert breaker.is_available()
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+
+    # Reserva devolvida: a próxima chamada pode ser o teste
+    breaker.release_probe()
+    assert breaker.allow_request()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['window_samples'] == 1
+
+def test_circuit_failed_probe_reopens_with_longer_cooldown():
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    first_cooldown = breaker.open_until - breaker.opened_at
+
+    _expire_cooldown(breaker)
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.open_until - breaker.opened_at > first_cooldown * 1.5
+    assert breaker.times_opened == 2
+
+def test_circuit_opens_on_error_rate_in_window():
+    breaker = _breaker(failure_threshold=100)
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == CLOSED
+
+    # Quarta amostra atinge min_samples com 50% de erro
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+
+def test_circuit_group_orders_measured_providers_by_cost():
+    group = CircuitBreakerGroup('teste', {
+        'failure_threshold': 3, 'base_cooldown': 10, 'max_cooldown': 100, 'window_size': 10,
+        'error_rate_threshold': 0.9, 'min_samples': 2, 'probe_timeout': 60
+    })
+    priorities = {'lento': 1, 'sem_historico': 2, 'rapido': 3}
+    assert group.order(priorities) == ['lento', 'sem_historico', 'rapido']
+
+    for _ in range(3):
+        group.breaker('lento').record_success(2.0)
+        group.breaker('rapido').record_success(0.2)
+
+    # Medidos trocam de posição entre si; o sem histórico fica onde estava
+    assert group.order(priorities) == ['rapido', 'sem_historico', 'lento']
+
+    for _ in range(3):
+        group.breaker('rapido').record_failure()
+    assert group.order(priorities) == ['lento', 'sem_historico']
+
+    group.reset('rapido')
+    assert 'rapido' in group.order(priorities)
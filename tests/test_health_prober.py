@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do health prober: uma execução por rodada entre workers e status
+resumido a partir do histórico salvo
+"""
+
+import time
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.health_prober import HealthProber
+
+EXTRACTORS = ('extractor:fetch', 'extractor:trafilatura', 'extractor:beautifulsoup')
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'health.db')
+    monkeypatch.setenv('HEALTH_PROBE_DB', path)
+    return path
+
+def _prober(checks, function=lambda: True):
+    """Prober com verificações fixas, sem descobrir extratores e provedores"""
+    prober = HealthProber()
+    prober.checks = {
+        name: {'group': name.split(':')[0], 'interval': 60, 'function': function}
+        for name in checks
+    }
+    prober.store.register(prober.checks, {name: time.time() - 1 for name in checks})
+    prober._executor = ThreadPoolExecutor(max_workers=4)
+    return prober
+
+def _record(prober, name, *results):
+    for success in results:
+        prober.store.record(name, success, 0.1, None if success else 'falhou', prober.history_size)
+
+def test_due_check_is_claimed_by_a_single_worker(db_path):
+    calls = []
+    workers = [_prober(['extractor:fetch'], lambda: calls.append(1) or True) for _ in range(8)]
+    barrier = threading.Barrier(len(workers))
+
+    def _tick(prober):
+        barrier.wait()
+        prober._dispatch_due_checks()
+
+    threads = [threading.Thread(target=_tick, args=(prober,)) for prober in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    owners = [prober for prober in workers if prober._inflight]
+    assert len(owners) == 1
+
+    owners[0]._inflight['extractor:fetch'][0].result(timeout=5)
+    owners[0]._collect_results()
+    assert len(calls) == 1
+    assert workers[1].get_summary()['checks']['extractor:fetch']['samples'] == 1
+
+    # A próxima rodada fica agendada com o intervalo (e jitter) para todos
+    next_run_at = workers[0].store.list_checks()[0]['next_run_at']
+    assert 60 * 0.8 <= next_run_at - time.time() <= 60 * 1.2
+    for prober in workers:
+        prober._dispatch_due_checks()
+    assert not any(prober._inflight for prober in workers)
+
+def test_hung_check_is_recorded_as_timeout_once(db_path):
+    release = threading.Event()
+    prober = _prober(['ai:gemini'], lambda: release.wait(5))
+    prober.timeout = 0.05
+
+    prober._dispatch_due_checks()
+    time.sleep(0.1)
+    prober._collect_results()
+    prober._collect_results()
+
+    check = prober.get_summary()['checks']['ai:gemini']
+    assert check['samples'] == 1 and 'timeout' in check['last_error']
+    assert prober.get_summary()['prober']['stuck_probes'] == ['ai:gemini']
+
+    # Resultado tardio é descartado e a verificação volta a poder rodar
+    release.set()
+    time.sleep(0.05)
+    prober._collect_results()
+    assert prober._inflight == {}
+    assert prober.get_summary()['checks']['ai:gemini']['samples'] == 1
+
+def test_summary_status_follows_recorded_results(db_path):
+    prober = _prober(EXTRACTORS + ('search:bing', 'ai:gemini'))
+    assert prober.get_summary()['status'] == 'starting'
+
+    for name in EXTRACTORS + ('search:bing', 'ai:gemini'):
+        _record(prober, name, True)
+    summary = prober.get_summary()
+    assert summary['status'] == 'healthy'
+    assert summary['groups']['extractor'] == {'total': 3, 'healthy': 3, 'checked': 3}
+
+    # Busca fora do ar: degradado
+    _record(prober, 'search:bing', False, False)
+    summary = prober.get_summary()
+    assert summary['status'] == 'degraded'
+    assert summary['checks']['search:bing']['consecutive_failures'] == 2
+    assert summary['checks']['search:bing']['success_rate'] == pytest.approx(33.3)
+
+    # Só um extrator de HTML saudável também degrada; IA fora do ar é crítico
+    _record(prober, 'search:bing', True)
+    _record(prober, 'extractor:beautifulsoup', False)
+    assert prober.get_summary()['status'] == 'degraded'
+    _record(prober, 'ai:gemini', False)
+    assert prober.get_summary()['status'] == 'critical'
+
+def test_stale_results_do_not_count_as_healthy(db_path):
+    prober = _prober(EXTRACTORS)
+    for name in EXTRACTORS:
+        _record(prober, name, True)
+
+    with closing(prober.store._connect()) as conn:
+        conn.execute(
+            "UPDATE health_results SET created_at = created_at - ? WHERE name = 'extractor:trafilatura'",
+            (60 * prober.stale_factor + 1,)
+        )
+
+    check = prober.get_summary()['checks']['extractor:trafilatura']
+    assert check['stale'] and not check['healthy'] and check['last_success']
+    assert prober.get_summary()['status'] == 'degraded'
+
+def test_disabled_prober_reports_unprobed(db_path, monkeypatch):
+    monkeypatch.setenv('HEALTH_PROBER_ENABLED', 'false')
+    prober = HealthProber()
+    prober.ensure_started()
+
+    assert not prober.is_running()
+    assert prober.get_summary()['status'] == 'unprobed'
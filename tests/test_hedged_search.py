@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da busca com hedge: atraso pelo percentil de latência de cada
+provedor e descarte das respostas perdedoras
+"""
+
+import time
+
+import pytest
+
+from services.production_search_manager import ProductionSearchManager
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv('SEARCH_CACHE_BACKEND', 'none')
+    monkeypatch.setenv('SEARCH_HEDGE_DEFAULT_DELAY', '3')
+    monkeypatch.setenv('SEARCH_HEDGE_MIN_DELAY', '0.1')
+    monkeypatch.setenv('SEARCH_HEDGE_MIN_SAMPLES', '5')
+    monkeypatch.setenv('SEARCH_HEDGE_PERCENTILE', '90')
+    manager = ProductionSearchManager()
+    for name in manager.providers:
+        manager.breakers.reset(name)
+    return manager
+
+def _fake_provider(delay, url):
+    def _search(query, max_results, timeout):
+        time.sleep(delay)
+        return [{'title': query, 'url': url}]
+    return _search
+
+def test_hedge_delay_comes_from_latency_percentile(manager):
+    histogram = manager.latency['bing']
+
+    # Sem amostras suficientes vale o atraso padrão
+    for _ in range(4):
+        histogram.record(0.4)
+    assert manager._get_hedge_delay('bing') == 3.0
+
+    for seconds in (0.4, 0.4, 0.4, 0.4, 0.4, 2.4):
+        histogram.record(seconds)
+    assert manager._get_hedge_delay('bing') == pytest.approx(histogram.percentile(90))
+    assert 0.4 < manager._get_hedge_delay('bing') < 2.4
+
+    # Provedor muito rápido não dispara o hedge antes do atraso mínimo
+    for _ in range(5):
+        manager.latency['duckduckgo'].record(0.01)
+    assert manager._get_hedge_delay('duckduckgo') == 0.1
+
+def test_slow_provider_is_hedged_after_its_percentile(manager, monkeypatch):
+    for _ in range(10):
+        manager.latency['bing'].record(0.2)
+
+    monkeypatch.setattr(manager, '_get_provider_order', lambda: ['bing', 'duckduckgo'])
+    monkeypatch.setattr(manager, '_search_bing', _fake_provider(2.0, 'https://lento.com'))
+    monkeypatch.setattr(manager, '_search_duckduckgo', _fake_provider(0.05, 'https://rapido.com'))
+
+    start = time.time()
+    results = manager.search_with_fallback('mercado pet', 5)
+    elapsed = time.time() - start
+
+    # O hedge sai em ~0.2s (p90 do bing), bem antes do atraso padrão de 3s
+    assert [result['url'] for result in results] == ['https://rapido.com']
+    assert elapsed < 1.0
+    assert manager.provider_wins['duckduckgo'] == 1
+    assert manager.provider_cancelled['bing'] == 1
+
+def test_fast_provider_is_not_hedged(manager, monkeypatch):
+    for _ in range(10):
+        manager.latency['bing'].record(0.5)
+
+    calls = []
+
+    def _never(query, max_results, timeout):
+        calls.append(query)
+        return []
+
+    monkeypatch.setattr(manager, '_get_provider_order', lambda: ['bing', 'duckduckgo'])
+    monkeypatch.setattr(manager, '_search_bing', _fake_provider(0.05, 'https://bing.com'))
+    monkeypatch.setattr(manager, '_search_duckduckgo', _never)
+
+    assert [result['url'] for result in manager.search_with_fallback('mercado pet', 5)] == ['https://bing.com']
+    assert calls == []
+    assert manager.provider_cancelled['duckduckgo'] == 0
+
+def test_cache_key_ignores_case_spacing_and_accents(manager):
+    assert manager._build_cache_key('Educação  Financeira', 10) == manager._build_cache_key('educacao financeira', 10)
+    assert manager._build_cache_key('educação financeira', 10) != manager._build_cache_key('educação financeira', 20)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do transporte HTTP compartilhado: limite de tamanho da resposta e
+espera máxima por Retry-After
+"""
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from urllib3.response import HTTPResponse
+
+from services.http_client import HttpClient, CappedRetry, ResponseTooLargeError
+
+class _Handler(BaseHTTPRequestHandler):
+    busy_hits = 0
+
+    def do_GET(self):
+        if self.path == '/ocupado' and _Handler.busy_hits == 0:
+            _Handler.busy_hits += 1
+            self._reply(503, b'tente depois', {'Retry-After': '120'})
+        elif self.path == '/declarado':
+            self._reply(200, b'x' * 2000)
+        elif self.path == '/sem_tamanho':
+            # Sem Content-Length: o corpo termina quando a conexão fecha
+            self.send_response(200)
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b'y' * 2000)
+            self.close_connection = True
+        else:
+            self._reply(200, b'ok')
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    _Handler.busy_hits = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('HTTP_MAX_RESPONSE_BYTES', '1000')
+    monkeypatch.setenv('HTTP_STATUS_RETRIES', '1')
+    monkeypatch.setenv('HTTP_BACKOFF_FACTOR', '0')
+    return HttpClient()
+
+def test_body_size_cap_with_and_without_content_length(client, server):
+    assert client.get(f"{server}/pequeno").content == b'ok'
+
+    with pytest.raises(ResponseTooLargeError, match='declara 2000 bytes'):
+        client.get(f"{server}/declarado")
+
+    with pytest.raises(ResponseTooLargeError, match='excedeu 1000 bytes'):
+        client.get(f"{server}/sem_tamanho")
+
+    # Limite por requisição e streaming sem leitura do corpo
+    assert len(client.get(f"{server}/sem_tamanho", max_bytes=5000).content) == 2000
+    assert len(client.get(f"{server}/declarado", max_bytes=None).content) == 2000
+    streamed = client.get(f"{server}/declarado", stream=True)
+    assert len(streamed.raw.read()) == 2000
+
+    stats = client.get_stats()
+    assert stats['oversized_responses'] == 2
+    assert stats['bytes_received'] == 2 + 2000 + 2000
+
+def test_retry_after_is_capped(client, server, monkeypatch):
+    retry = CappedRetry(total=1)
+    assert retry.get_retry_after(HTTPResponse(headers={'Retry-After': '120'})) == CappedRetry.max_retry_after
+    assert retry.get_retry_after(HTTPResponse(headers={'Retry-After': '1'})) == 1
+    assert retry.get_retry_after(HTTPResponse(headers={})) is None
+
+    # Servidor pede 120s; o adapter espera só o teto antes de repetir
+    monkeypatch.setattr(CappedRetry, 'max_retry_after', 0.2)
+    start = time.time()
+    response = client.get(f"{server}/ocupado")
+    assert response.status_code == 200
+    assert 0.2 <= time.time() - start < 5
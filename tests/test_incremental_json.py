@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do parser JSON incremental das respostas em streaming
+"""
+
+import json
+
+import pytest
+
+from services.incremental_json import IncrementalJSONParser
+
+def test_incremental_json_emits_sections_as_they_close():
+    document = {
+        'avatar': {'nome': 'Ana', 'dores': ['a, b', 'c }']},
+        'citacao': 'ele disse "não, {nunca}"\n',
+        'numeros': [1, 2, 3],
+        'fim': None
+    }
+    response = 'Claro! ```json\n' + json.dumps(document, ensure_ascii=False, indent=2) + '\n```\nEspero ter ajudado.'
+
+    parser = IncrementalJSONParser()
+    emitted = []
+    for char in response:
+        emitted.extend(parser.feed(char))
+
+    assert [key for key, _ in emitted] == list(document)
+    assert dict(emitted) == document
+    assert parser.complete
+    assert parser.document() == document
+    assert parser.text == response
+
+def test_incremental_json_handles_lists_and_incomplete_responses():
+    parser = IncrementalJSONParser()
+    assert parser.feed('[{"a": 1}, ') == [(0, {'a': 1})]
+    assert parser.feed('"dois"') == []
+    assert not parser.complete
+
+    with pytest.raises(json.JSONDecodeError):
+        parser.document()
+
+    assert parser.feed(']') == [(1, 'dois')]
+    assert parser.document() == [{'a': 1}, 'dois']
+
+    with pytest.raises(json.JSONDecodeError):
+        IncrementalJSONParser().document()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da detecção de quase duplicados por MinHash
+"""
+
+import services.near_duplicate_index as near_duplicate_module
+from services.near_duplicate_index import NearDuplicateDetector
+
+LOREM = (
+    "o mercado de cursos online cresce no brasil com novos produtores digitais "
+    "investindo em tráfego pago funis de vendas lançamentos perpétuos e comunidades "
+    "de alunos engajados que compram recorrência mentoria e eventos presenciais "
+    "enquanto concorrentes disputam atenção em redes sociais vídeos curtos e podcasts "
+    "com ofertas agressivas descontos bônus garantias estendidas e provas sociais"
+)
+
+OTHER_TEXT = (
+    "receitas de pão caseiro exigem farinha forte água fria sal fermento natural "
+    "e paciência para a fermentação lenta na geladeira durante uma noite inteira "
+    "antes de modelar assar em forno bem quente com vapor e deixar esfriar na grade "
+    "para a casca continuar crocante e o miolo aerado macio e úmido por vários dias "
+    "sem precisar de conservantes aditivos melhoradores ou açúcar na massa"
+)
+
+def test_minhash_finds_near_duplicates_only():
+    detector = NearDuplicateDetector()
+    index = detector.create_index()
+
+    assert index.add('original', LOREM) is None
+    assert index.add('outro', OTHER_TEXT) is None
+
+    # Mesmo texto com uma palavra trocada no fim: quase duplicado
+    mirror = LOREM.replace('provas sociais', 'provas reais')
+    assert index.find(mirror) == 'original'
+    assert index.add('espelho', mirror) == 'original'
+    assert len(index) == 2
+
+    # Curto demais para comparar
+    assert index.signature('poucas palavras aqui') is None
+    assert index.add('curto', 'poucas palavras aqui') is None
+
+def test_minhash_deduplicate_keeps_first_occurrence():
+    detector = NearDuplicateDetector()
+    items = [
+        {'url': 'https://a.com', 'content': LOREM},
+        {'url': 'https://b.com', 'content': OTHER_TEXT},
+        {'url': 'https://amp.a.com', 'content': LOREM + ' compartilhe'}
+    ]
+
+    unique, duplicates = detector.deduplicate(items)
+    assert [item['url'] for item in unique] == ['https://a.com', 'https://b.com']
+    assert [item['duplicate_of'] for item in duplicates] == ['https://a.com']
+
+def test_minhash_signature_is_same_with_and_without_numpy(monkeypatch):
+    index = NearDuplicateDetector().create_index()
+    with_numpy = index.signature(LOREM)
+
+    monkeypatch.setattr(near_duplicate_module, 'HAS_NUMPY', False)
+    assert index.signature(LOREM) == with_numpy
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do cache de páginas: janela de frescor e revalidação condicional
+"""
+
+from types import SimpleNamespace
+from contextlib import closing
+
+import pytest
+
+from services.page_cache import PageCache
+
+URL = 'https://exemplo.com.br/artigo'
+HTML = '<html><body>' + 'conteúdo do artigo ' * 50 + '</body></html>'
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('PAGE_CACHE_DB_PATH', str(tmp_path / 'pages.db'))
+    monkeypatch.setenv('PAGE_CACHE_FRESHNESS_SECONDS', '60')
+    return PageCache()
+
+def _age(cache, url, seconds):
+    with closing(cache._connect()) as conn:
+        conn.execute("UPDATE pages SET validated_at = validated_at - ? WHERE url = ?", (seconds, url))
+
+def test_page_is_served_only_inside_freshness_window(cache):
+    assert cache.get_fresh_content(URL) is None
+
+    cache.store(URL, HTML, 'texto extraído', 'trafilatura', etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    assert cache.get_fresh_content(URL) == 'texto extraído'
+
+    # Redirecionamento conhecido leva à mesma entrada
+    cache.store_resolved_url('https://bit.ly/abc', URL)
+    assert cache.get_fresh_content('https://bit.ly/abc') == 'texto extraído'
+
+    _age(cache, URL, 61)
+    entry = cache.get(URL)
+    assert not cache.is_fresh(entry)
+    assert cache.get_fresh_content(URL) is None
+    # Fora da janela a entrada continua disponível para revalidação
+    assert entry['content'] == 'texto extraído'
+
+    stats = cache.get_stats()
+    assert (stats['hits_fresh'], stats['stores'], stats['pages']) == (2, 1, 1)
+
+def test_revalidation_uses_validators_and_renews_window(cache):
+    cache.store(URL, HTML, 'texto extraído', 'trafilatura', etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    _age(cache, URL, 61)
+
+    entry = cache.get(URL)
+    assert cache.conditional_headers(entry) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+    }
+    assert cache.conditional_headers(None) == {}
+
+    # 304 sem validadores novos mantém os antigos
+    cache.mark_revalidated(URL)
+    entry = cache.get(URL)
+    assert cache.is_fresh(entry)
+    assert entry['etag'] == '"v1"'
+
+    cache.mark_revalidated(URL, etag='"v2"')
+    assert cache.get(URL)['etag'] == '"v2"'
+
+    assert cache.is_same_html(entry, HTML)
+    assert not cache.is_same_html(entry, HTML + '<!-- novo -->')
+    assert not cache.is_same_html(None, HTML)
+
+def test_extractor_answers_304_from_cache_without_extracting(cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import services.robust_content_extractor as extractor_module
+
+    monkeypatch.setattr(extractor_module, 'page_cache', cache)
+    extractor = extractor_module.robust_content_extractor
+
+    cache.store_resolved_url(URL, URL)
+    cache.store(URL, HTML, 'texto extraído', 'trafilatura', etag='"v1"')
+    _age(cache, URL, 61)
+
+    requests_sent = []
+
+    def _fetch_page(url, conditional_headers=None):
+        requests_sent.append(conditional_headers)
+        return SimpleNamespace(status_code=304, text='', headers={})
+
+    monkeypatch.setattr(extractor, '_fetch_page', _fetch_page)
+
+    assert extractor.extract_content(URL) == 'texto extraído'
+    assert requests_sent == [{'If-None-Match': '"v1"'}]
+    assert cache.is_fresh(cache.get(URL))
+    assert cache.get_stats()['hits_revalidated'] == 1
+
+    # Já revalidada: a próxima extração não vai à rede
+    assert extractor.extract_content(URL) == 'texto extraído'
+    assert len(requests_sent) == 1
+
+def test_retention_removes_pages_not_revalidated(cache):
+    cache.store(URL, HTML, 'texto extraído', 'trafilatura')
+    cache.store('https://exemplo.com.br/novo', None, 'outro texto', 'pdf_specialized')
+    _age(cache, URL, cache.retention_seconds + 1)
+
+    assert cache.cleanup_expired() == 1
+    assert cache.get(URL) is None
+    assert cache.get('https://exemplo.com.br/novo')['content'] == 'outro texto'
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do matcher de padrões combinados e do documento serializado
+"""
+
+import re
+import json
+
+from services.pattern_matcher import PatternSet, SerializedDocument, format_path
+
+def test_pattern_set_counts_like_findall_per_pattern():
+    patterns = [r'\bn/a\b', r'customizado', r'customizado para', r'\d+']
+    text = "N/A n/a customizado para 3 perfis, customizado 12 vezes; n/a"
+    pattern_set = PatternSet(patterns)
+
+    # Padrões sobrepostos contam para todos, como re.findall em cada um
+    assert pattern_set.count(text) == {pattern: len(re.findall(pattern, text)) for pattern in patterns}
+
+    hits = list(pattern_set.finditer(text))
+    assert [offset for _, offset in hits] == sorted(offset for _, offset in hits)
+    assert len(hits) == sum(pattern_set.count(text).values())
+
+    assert pattern_set.search(text) == r'\bn/a\b'
+    assert pattern_set.search("nada aqui") is None
+
+def test_serialized_document_matches_json_dumps_and_maps_paths():
+    data = {
+        'avatar': {'dores_viscerais': ['medo de falhar', 'customizado para você'], 'idade': 35},
+        'İstanbul': 'Şehir',
+        1: None
+    }
+    document = SerializedDocument(data)
+    assert document.text == json.dumps(data, ensure_ascii=False)
+    assert document.lower == document.text.lower()
+
+    hits = document.find(PatternSet([r'customizado para']))
+    assert [format_path(hit.path) for hit in hits] == ['avatar.dores_viscerais[1]']
+
+    # lower() muda o tamanho de "İ": os offsets em minúsculas têm mapa próprio
+    lower_hits = document.find(PatternSet([r'şehir']), lower=True)
+    assert [hit.path for hit in lower_hits] == [('İstanbul',)]
+    assert document.count(PatternSet([r'medo', r'\d+']), lower=True) == {r'medo': 1, r'\d+': 2}
+    assert format_path(()) == '$'
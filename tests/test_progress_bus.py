@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do barramento de progresso compartilhado entre workers
+"""
+
+import time
+import threading
+
+import pytest
+
+from services.progress_bus import ProgressBus
+
+@pytest.fixture
+def bus(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROGRESS_BUS_BACKEND', 'sqlite')
+    monkeypatch.setenv('PROGRESS_BUS_DB', str(tmp_path / 'progress.db'))
+    monkeypatch.setenv('PROGRESS_POLL_INTERVAL', '0.05')
+    return ProgressBus()
+
+def test_progress_bus_sequences_events_per_session(bus):
+    bus.create_session('s1', {'step': 0})
+
+    assert bus.publish('s1', 'progress', {'step': 1}, state={'step': 1}) == 1
+    assert bus.publish('s1', 'progress', {'step': 2}) == 2
+    assert bus.publish('desconhecida', 'progress', {}) is None
+
+    session = bus.get_session('s1')
+    assert session['state'] == {'step': 1}
+    assert session['last_seq'] == 2
+
+    assert [event['id'] for event in bus.read_events('s1')] == [1, 2]
+    assert [event['data'] for event in bus.read_events('s1', cursor=1)] == [{'step': 2}]
+    assert len(bus.read_events('s1', limit=1)) == 1
+
+    # Recriar a sessão zera o fluxo de eventos
+    bus.create_session('s1', {})
+    assert bus.read_events('s1') == []
+
+    bus.delete_session('s1')
+    assert bus.get_session('s1') is None
+
+def test_progress_bus_long_poll_and_subscribe(bus):
+    bus.create_session('s2', {})
+
+    start = time.time()
+    assert bus.wait_for_events('s2', timeout=0.2) == []
+    assert time.time() - start >= 0.2
+
+    def _publish_later():
+        time.sleep(0.1)
+        bus.publish('s2', 'section', {'section': 'avatar'})
+        bus.publish('s2', 'complete', {})
+        bus.publish('s2', 'progress', {'depois': True})
+
+    threading.Thread(target=_publish_later).start()
+
+    events = list(bus.subscribe('s2', heartbeat=2))
+    assert [event['event'] for event in events] == ['section', 'complete']
+
+def test_progress_bus_expires_sessions(bus):
+    bus.create_session('nova', {})
+    bus.store.create_session('velha', {}, ttl=-1)
+
+    assert bus.get_session('velha') is None
+    assert bus.publish('velha', 'progress', {}) is None
+    assert [session['session_id'] for session in bus.list_sessions()] == ['nova']
+    assert bus.cleanup_expired() == 1
+    bus.ping()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do empacotador de contexto: orçamento de tokens por provedor e
+remoção de fatos repetidos
+"""
+
+from services.prompt_packer import PromptPacker, PackItem, PROVIDER_TOKEN_PROFILES
+
+def _facts(section, count, base_score):
+    return [
+        PackItem(section, f"Fato {section.lower()} número {index}: o mercado cresceu {index * 7}% em {2000 + index}", base_score - index * 0.01)
+        for index in range(count)
+    ]
+
+def test_pack_respects_budget_and_keeps_best_facts():
+    packer = PromptPacker()
+    items = _facts('BAIXO', 40, 1.0) + _facts('ALTO', 40, 5.0)
+
+    for provider in ('huggingface', 'gemini', None):
+        packed = packer.pack(items, provider=provider, budget_tokens=300)
+        assert 0 < packed.tokens <= packed.budget == 300
+        assert packer.estimate_tokens(packed.text, provider) <= packed.budget
+        assert packed.included + packed.dropped == len(items)
+
+    # Orçamento cabe só parte dos fatos: os de maior score entram primeiro
+    packed = packer.pack(items, budget_tokens=300)
+    assert 'alto número 0:' in packed.text
+    assert 'baixo número' not in packed.text
+
+    # Seções saem na ordem de entrada, não na de score
+    packed = packer.pack(items, budget_tokens=100000)
+    assert packed.dropped == 0
+    assert packed.text.index('=== BAIXO ===') < packed.text.index('=== ALTO ===')
+
+    assert packer.pack(items, budget_tokens=0).text == ''
+
+def test_pack_drops_repeated_and_contained_facts():
+    packer = PromptPacker()
+    items = [
+        PackItem('A', 'O ticket médio é de R$ 497 no segmento.', 3.0),
+        PackItem('B', 'o  ticket   médio é de R$ 497 no segmento', 2.5),
+        PackItem('A', 'O ticket médio é de R$ 497', 2.0),
+        PackItem('B', 'Segundo a pesquisa, o ticket médio é de R$ 497 no segmento e cresce.', 1.0),
+        PackItem('A', 'O ticket médio caiu para R$ 397.', 1.5),
+        PackItem('A', '...', 4.0)
+    ]
+
+    packed = packer.pack(items, budget_tokens=1000)
+    assert packed.duplicates == 3
+    assert packed.included == 2
+    assert packed.text == (
+        "=== A ===\n"
+        "- O ticket médio é de R$ 497 no segmento.\n"
+        "- O ticket médio caiu para R$ 397.\n"
+    )
+
+def test_budget_leaves_room_for_template_and_response():
+    packer = PromptPacker()
+    profile = PROVIDER_TOKEN_PROFILES['huggingface']
+    template = 'x' * 3000
+
+    budget = packer.budget_for('huggingface', template)
+    assert budget == (
+        profile['context_window'] - profile['max_output_tokens']
+        - packer.estimate_tokens(template, 'huggingface') - packer.safety_margin
+    )
+    assert budget < packer.target_tokens
+
+    # Janela grande: vale o alvo configurado
+    assert packer.budget_for('gemini', template) == packer.target_tokens
+    # Template maior que a janela não gera orçamento negativo
+    assert packer.budget_for('huggingface', 'x' * 100000) == 0
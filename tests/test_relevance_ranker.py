@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do ranking BM25 das páginas extraídas
+"""
+
+import pytest
+
+from services.relevance_ranker import RelevanceRanker, HAS_NUMPY
+
+LOREM = (
+    "o mercado de cursos online cresce no brasil com novos produtores digitais "
+    "investindo em tráfego pago funis de vendas lançamentos perpétuos e comunidades "
+    "de alunos engajados que compram recorrência mentoria e eventos presenciais "
+    "enquanto concorrentes disputam atenção em redes sociais vídeos curtos e podcasts "
+    "com ofertas agressivas descontos bônus garantias estendidas e provas sociais"
+)
+
+OTHER_TEXT = (
+    "receitas de pão caseiro exigem farinha forte água fria sal fermento natural "
+    "e paciência para a fermentação lenta na geladeira durante uma noite inteira "
+    "antes de modelar assar em forno bem quente com vapor e deixar esfriar na grade "
+    "para a casca continuar crocante e o miolo aerado macio e úmido por vários dias "
+    "sem precisar de conservantes aditivos melhoradores ou açúcar na massa"
+)
+
+def test_bm25_ranks_relevant_pages_first():
+    ranker = RelevanceRanker()
+    documents = [
+        {'url': 'receitas', 'content': OTHER_TEXT},
+        {'url': 'mercado', 'content': LOREM},
+        {'url': 'mercado_repetido', 'content': LOREM + ' mercado cursos online mercado cursos'},
+        {'url': 'vazio', 'content': ''}
+    ]
+
+    ranked = ranker.rank(documents, 'mercado de cursos online', context={'segmento': 'produtores digitais'})
+    assert [d['url'] for d in ranked[:2]] == ['mercado_repetido', 'mercado']
+    assert ranked[-1]['bm25_score'] == 0.0
+    assert all('bm25_score' in d for d in documents)
+
+    top = ranker.rank(documents, 'mercado de cursos online', top_k=1)
+    assert [d['url'] for d in top] == ['mercado_repetido']
+
+    # Empates mantêm a ordem original
+    tied = ranker.rank([{'url': 'a', 'content': OTHER_TEXT}, {'url': 'b', 'content': OTHER_TEXT}], 'mercado')
+    assert [d['url'] for d in tied] == ['a', 'b']
+
+    assert ranker.rank([], 'mercado') == []
+    assert ranker.score([LOREM], {}) == [0.0]
+
+def test_bm25_query_terms_skip_stopwords_and_weight_context():
+    ranker = RelevanceRanker()
+    terms = ranker.build_query_terms('mercado para cursos', {'segmento': 'cursos e mentorias'})
+    assert 'para' not in terms
+    assert terms['mercado'] == 1.0
+    assert terms['cursos'] == 1.0
+    assert terms['mentorias'] == ranker.context_weight
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="NumPy não instalado")
+def test_bm25_vectorized_matches_pure_python():
+    from services.text_features import text_features
+    ranker = RelevanceRanker()
+    documents = [text_features.extract(text) for text in (LOREM, OTHER_TEXT, LOREM * 2, 'mercado mercado')]
+    query_terms = ranker.build_query_terms('mercado cursos farinha', {'produto': 'mentoria'})
+
+    assert ranker._score_vectorized(documents, query_terms) == pytest.approx(ranker._score_python(documents, query_terms))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do journal de sessões: índice de offsets, frames gzip e leitura das
+sessões gravadas antes do journal
+"""
+
+import os
+import json
+import time
+import contextvars
+
+import pytest
+
+from services.session_journal import SessionJournal
+
+def _append(journal, session_key, etapa, dados, status='sucesso'):
+    payload = json.dumps({'etapa': etapa, 'status': status, 'dados': dados}, ensure_ascii=False)
+    journal.append(session_key, {'etapa': etapa, 'status': status}, payload)
+
+@pytest.mark.parametrize('compression', ['none', 'gzip'])
+def test_index_and_frames_round_trip(tmp_path, monkeypatch, compression):
+    monkeypatch.setenv('AUTO_SAVE_COMPRESSION', compression)
+    journal = SessionJournal(tmp_path)
+
+    _append(journal, 'sessão/1', 'avatar', {'nome': 'Ana', 'dores': ['tempo', 'dinheiro']})
+    _append(journal, 'sessão/1', 'drivers', list(range(100)))
+    _append(journal, 'outra', 'avatar', 'texto')
+
+    entries = journal.read_index('sessão/1')
+    assert [entry['etapa'] for entry in entries] == ['avatar', 'drivers']
+    assert entries[1]['offset'] == entries[0]['offset'] + entries[0]['length']
+    assert {entry['compression'] for entry in entries} == {compression}
+
+    assert journal.read_record('sessão/1', entries[1])['dados'] == list(range(100))
+    assert journal.read_record('sessão/1', entries[0])['dados']['nome'] == 'Ana'
+    assert sorted(journal.list_sessions()) == ['outra', 'sessão_1']
+
+    # Nome seguro para o sistema de arquivos, com a extensão da compressão
+    assert journal.data_path('sessão/1').name == ('sessão_1.jsonl.gz' if compression == 'gzip' else 'sessão_1.jsonl')
+
+def test_entries_keep_the_compression_they_were_written_with(tmp_path, monkeypatch):
+    journal = SessionJournal(tmp_path)
+    _append(journal, 's1', 'antes', 1)
+    journal.flush()
+
+    monkeypatch.setenv('AUTO_SAVE_COMPRESSION', 'gzip')
+    journal = SessionJournal(tmp_path)
+    _append(journal, 's1', 'depois', 2)
+
+    entries = journal.read_index('s1')
+    assert [journal.read_record('s1', entry)['dados'] for entry in entries] == [1, 2]
+
+def test_partial_index_line_is_skipped(tmp_path):
+    journal = SessionJournal(tmp_path)
+    _append(journal, 's1', 'avatar', 'ok')
+    journal.flush()
+
+    with open(journal.index_path('s1'), 'a', encoding='utf-8') as index_file:
+        index_file.write('{"etapa": "cort')
+
+    assert [entry['etapa'] for entry in journal.read_index('s1')] == ['avatar']
+
+def test_remove_older_than_deletes_index_and_data(tmp_path):
+    journal = SessionJournal(tmp_path)
+    _append(journal, 'velha', 'avatar', 1)
+    _append(journal, 'nova', 'avatar', 2)
+    journal.flush()
+
+    old = time.time() - 3600
+    os.utime(journal.index_path('velha'), (old, old))
+
+    assert journal.remove_older_than(time.time() - 60) == 1
+    assert journal.list_sessions() == ['nova']
+    assert not journal.data_path('velha').exists()
+
+def test_auto_save_reads_journal_and_legacy_sessions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from services.auto_save_manager import AutoSaveManager
+
+    manager = AutoSaveManager()
+    session_id = 'sessao_legada'
+
+    # Sessão de antes do journal: um arquivo JSON por etapa
+    legacy_dir = manager.subdirs['avatar'] / session_id
+    legacy_dir.mkdir(parents=True)
+    with open(legacy_dir / 'avatar_20240101_000000_000.json', 'w', encoding='utf-8') as f:
+        json.dump({'etapa': 'avatar', 'status': 'sucesso', 'dados': 'antigo', 'timestamp': 1}, f)
+
+    assert manager.recuperar_etapa('avatar', session_id)['dados'] == 'antigo'
+
+    # Contexto próprio: a sessão iniciada aqui não vaza para os outros testes
+    contextvars.Context().run(_save_and_read_session, manager, session_id)
+
+def _save_and_read_session(manager, session_id):
+    manager.iniciar_sessao(session_id)
+    manager.salvar_etapa('drivers', {'total': 19})
+    manager.salvar_etapa('drivers', {'total': 0}, status='erro')
+
+    assert manager.recuperar_etapa('drivers')['dados'] == {'total': 19}
+    assert manager.recuperar_etapa('inexistente') is None
+
+    etapas = manager.listar_etapas_salvas()
+    assert set(etapas) == {'avatar', 'session_metadata', 'drivers'}
+    assert etapas['avatar'][0]['arquivo'].endswith('.json')
+    assert [registro['status'] for registro in etapas['drivers']] == ['sucesso', 'erro']
+
+    with open(manager.consolidar_sessao(), encoding='utf-8') as f:
+        consolidado = json.load(f)
+    assert consolidado['etapas_processadas']['avatar']['dados'] == 'antigo'
+    assert consolidado['etapas_processadas']['drivers']['status'] == 'erro'
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do cache em camadas: limites em bytes, promoção entre camadas e
+chaves normalizadas
+"""
+
+import time
+
+from services.tiered_cache import TieredCache, MemoryLRUTier, SQLiteTier, normalize_cache_text
+
+def test_memory_tier_evicts_least_recently_used_by_bytes():
+    tier = MemoryLRUTier(max_bytes=100)
+    tier.set('a', b'a' * 40, ttl=60)
+    tier.set('b', b'b' * 40, ttl=60)
+    assert tier.get('a') == b'a' * 40
+
+    # 'b' foi usado há mais tempo: sai para caber 'c'
+    tier.set('c', b'c' * 40, ttl=60)
+    assert tier.get('b') is None
+    assert tier.get('a') and tier.get('c')
+    assert tier.get_stats() == {'entries': 2, 'bytes': 80, 'max_bytes': 100, 'evictions': 1}
+
+    # Valor maior que o limite inteiro não entra nem derruba os demais
+    tier.set('grande', b'x' * 101, ttl=60)
+    assert tier.get('grande') is None
+    assert tier.get_stats()['entries'] == 2
+
+    # Regravar a mesma chave não conta o tamanho duas vezes
+    tier.set('a', b'a' * 10, ttl=60)
+    assert tier.current_bytes == 50
+
+    tier.set('velho', b'v', ttl=-1)
+    assert tier.get('velho') is None
+
+def test_sqlite_tier_evicts_least_recently_accessed_by_bytes(tmp_path):
+    tier = SQLiteTier(str(tmp_path / 'cache.db'), 'teste', max_bytes=100)
+    for key in ('a', 'b'):
+        tier.set(key, key.encode() * 40, ttl=60)
+        time.sleep(0.01)
+    assert tier.get('a')
+    time.sleep(0.01)
+
+    tier.set('c', b'c' * 40, ttl=60)
+    assert tier.get('b') is None
+    assert tier.get('a') and tier.get('c')
+
+    stats = tier.get_stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (2, 80, 1)
+
+    # Namespaces no mesmo arquivo têm limites independentes
+    other = SQLiteTier(str(tmp_path / 'cache.db'), 'outro', max_bytes=100)
+    other.set('a', b'o' * 90, ttl=60)
+    assert tier.get('a') == b'a' * 40
+    assert other.get('a') == b'o' * 90
+
+def test_tiered_cache_promotes_entries_from_shared_tier(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    writer = TieredCache('busca', shared_backend='sqlite', db_path=db_path)
+    reader = TieredCache('busca', shared_backend='sqlite', db_path=db_path)
+
+    writer.set('mercado', {'resultados': ['á', 1]})
+    assert reader.get('mercado') == {'resultados': ['á', 1]}
+    assert reader.get('mercado') == {'resultados': ['á', 1]}
+    assert reader.get('inexistente') is None
+
+    stats = reader.get_stats()
+    assert (stats['hits_shared'], stats['hits_memory'], stats['misses']) == (1, 1, 1)
+
+    writer.delete('mercado')
+    reader.memory.clear()
+    assert reader.get('mercado') is None
+
+    local = TieredCache('local', shared_backend='none')
+    local.set('x', 1)
+    assert local.get('x') == 1
+    assert local.get_stats()['shared_backend'] is None
+
+def test_cache_keys_fold_case_spacing_and_accents():
+    variants = ['Educação  Financeira', 'educacao financeira', ' EDUCAÇÃO\tfinanceira ', 'educação financeira']
+    assert {normalize_cache_text(variant) for variant in variants} == {'educacao financeira'}
+    assert normalize_cache_text('ﬁnanças') == 'financas'
+    assert normalize_cache_text('') == ''
+    assert normalize_cache_text(None) == ''